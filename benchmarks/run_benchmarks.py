@@ -0,0 +1,992 @@
+#!/usr/bin/env python3
+"""
+Suite de benchmarks iMouse
+Mide encoder, keymap, edición mínima de campos, trayectorias,
+carga/preparación de capturas, la cola de envío, la ruta de red (batch), los
+codecs HID / W-0xAB, el retraso al despertar con ajustes de tiempo real, el
+replay con reloj virtual, la conformidad captura/traza, el almacén de macros,
+la búsqueda de plantillas, la compilación de macros, el retarget y la
+decodificación de capturas, la captura de input reports, el barrido
+paralelo, el arranque en frío del CLI y la precisión de temporización del
+replay contra el dispositivo simulado.
+
+Los resultados se guardan en JSON y se comparan con un baseline guardado;
+cualquier métrica que empeore más allá del umbral se marca como regresión.
+"""
+
+import os
+import sys
+import json
+import time
+import timeit
+import platform
+import subprocess
+import tempfile
+import argparse
+from datetime import datetime
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from imouse_hid_protocol import iMouseHIDProtocol, ButtonState
+from imouse_complete_keymap import text_to_imouse_packets
+from imouse_edit import edit_script, retype_script
+from imouse_gestures import swipe_path
+from imouse_simulator import SimulatedDevice
+from imouse_transport import HIDTransport, KEY_RELEASE
+from imouse_network import NetworkDevice, StandInServer
+from imouse_flow import FlowController
+from imouse_sender import HIDSender, COALESCE_LATEST, DROP_OLDEST
+from imouse_capture import CaptureRing, record_struct
+from imouse_codec import HIDCodec, FramedCodec, validate_frame
+from imouse_sweep import run_sweep, filter_results
+from imouse_targets import TargetIndex, PROFILES
+from imouse_macro import compile_macro
+from imouse_sync import SyncReplay
+from imouse_shm import SenderProcess, wait_until, producer_load
+from imouse_rt import RealtimeSettings
+from imouse_clock import VirtualClock, use_clock
+from imouse_conform import conform
+from imouse_store import MacroStore
+from generate_click_json import generate_click_json
+from imouse_shortcuts import ShortcutRegistry, ShortcutSender, parse_chord, DEFAULT_SHORTCUTS_FILE
+import imouse_vision
+import imouse_reports
+from imouse_retarget import retarget
+from imouse_decode import decode_columns, summarize
+from imouse_columnar import load_columnar
+from replay_imouse import load_capture, filter_out_packets, prepare_reports, play_reports
+
+
+SAMPLES_DIR = os.path.join(ROOT_DIR, 'samples')
+DEFAULT_BASELINE = os.path.join(ROOT_DIR, 'benchmarks', 'baseline.json')
+DEFAULT_OUTPUT = os.path.join(ROOT_DIR, 'benchmarks', 'results.json')
+DEFAULT_THRESHOLD = 0.15
+
+SAMPLE_TEXT = "Hola iPhone! usuario@gmail.com P@ssw0rd123 https://www.google.com\n"
+
+BENCHMARKS = []
+
+
+def benchmark(func):
+    """Registra una función de benchmark (devuelve lista de resultados)"""
+    BENCHMARKS.append(func)
+    return func
+
+
+def result(name, value, unit, better, abs_tolerance=0.0):
+    """
+    Crea una entrada de resultado
+
+    Args:
+        better: 'higher' (throughput) o 'lower' (tiempos/latencias)
+        abs_tolerance: Diferencia absoluta ignorada al comparar (ruido)
+    """
+    return {
+        'name': name,
+        'value': value,
+        'unit': unit,
+        'better': better,
+        'abs_tolerance': abs_tolerance,
+    }
+
+
+def best_rate(func, number, repeat=5):
+    """Operaciones por segundo (mejor de `repeat` rondas de `number` llamadas)"""
+    best = min(timeit.repeat(func, number=number, repeat=repeat))
+    return number / best if best > 0 else float('inf')
+
+
+def best_time_ms(func, number=20, repeat=5):
+    """Tiempo por llamada en ms (mejor de `repeat` rondas)"""
+    best = min(timeit.repeat(func, number=number, repeat=repeat))
+    return best / number * 1000.0
+
+
+# ===== BENCHMARKS =====
+
+@benchmark
+def bench_encoder(quick=False):
+    """Throughput del encoder iMouseHIDProtocol por comando"""
+    protocol = iMouseHIDProtocol()
+    number = 2000 if quick else 20000
+
+    commands = {
+        'reset_position': protocol.reset_position,
+        'restart': protocol.restart,
+        'move_absolute': lambda: protocol.move_absolute(182, 333),
+        'move_absolute_drag': lambda: protocol.move_absolute(182, 333, button=ButtonState.LEFT),
+        'move_relative': lambda: (protocol.move_relative(5, -5), protocol.move_relative(-5, 5)),
+        'left_down': protocol.left_down,
+        'left_up': protocol.left_up,
+        'right_down': protocol.right_down,
+        'right_up': protocol.right_up,
+        'alternative_protocol_move': lambda: protocol.alternative_protocol_move(delta_x=10),
+    }
+
+    results = []
+    for name, func in commands.items():
+        protocol.move_absolute(182, 333)
+        results.append(result(f'encode.{name}', best_rate(func, number), 'ops/s', 'higher'))
+    return results
+
+
+@benchmark
+def bench_keymap(quick=False):
+    """Traducción de texto a reportes (keymap)"""
+    text = SAMPLE_TEXT * (2 if quick else 10)
+    rate = best_rate(lambda: text_to_imouse_packets(text), number=5 if quick else 20)
+    return [result('keymap.text_to_reports', rate * len(text), 'chars/s', 'higher')]
+
+
+@benchmark
+def bench_edit(quick=False):
+    """Guion de edición mínimo frente a reescribir el campo entero"""
+    current = SAMPLE_TEXT * 4
+    desired = current.replace('a', 'o', 3)[:-5] + '. Fin'
+    number = 20 if quick else 200
+
+    script_ms = best_time_ms(lambda: edit_script(current, desired), number=number)
+    keys = len(edit_script(current, desired))
+    retype = len(retype_script(current, desired))
+
+    return [
+        result('edit.script', script_ms, 'ms', 'lower'),
+        result('edit.keys_vs_retype', keys / retype * 100.0, '%', 'lower'),
+    ]
+
+
+@benchmark
+def bench_gestures(quick=False):
+    """Generación de trayectorias de swipe (con y sin codificación)"""
+    protocol = iMouseHIDProtocol()
+    number = 500 if quick else 5000
+
+    def path_only():
+        swipe_path(182, 120, 182, 587, steps=20)
+
+    def path_encoded():
+        for x, y in swipe_path(182, 120, 182, 587, steps=20):
+            protocol.move_absolute(x, y, button=ButtonState.LEFT)
+
+    return [
+        result('gesture.swipe_path', best_rate(path_only, number), 'paths/s', 'higher'),
+        result('gesture.swipe_encoded', best_rate(path_encoded, number), 'paths/s', 'higher'),
+    ]
+
+
+@benchmark
+def bench_samples(quick=False):
+    """Carga JSON y preparación de replay para cada archivo de samples/"""
+    results = []
+    number = 5 if quick else 50
+
+    for filename in sorted(os.listdir(SAMPLES_DIR)):
+        if not filename.endswith('.json'):
+            continue
+
+        path = os.path.join(SAMPLES_DIR, filename)
+        stem = os.path.splitext(filename)[0]
+        out_packets = filter_out_packets(load_capture(path))
+
+        load_ms = best_time_ms(lambda: load_capture(path), number=number)
+        prepare_ms = best_time_ms(lambda: prepare_reports(filter_out_packets(load_capture(path)), 9),
+                                  number=number)
+        prepare_only_ms = best_time_ms(lambda: prepare_reports(out_packets, 9), number=number)
+
+        results.extend([
+            result(f'samples.{stem}.load', load_ms, 'ms', 'lower', abs_tolerance=0.05),
+            result(f'samples.{stem}.load_prepare', prepare_ms, 'ms', 'lower', abs_tolerance=0.05),
+            result(f'samples.{stem}.prepare', prepare_only_ms, 'ms', 'lower', abs_tolerance=0.05),
+        ])
+
+    return results
+
+
+@benchmark
+def bench_replay_timing(quick=False):
+    """Precisión de temporización del replay end-to-end (dispositivo simulado)"""
+    path = os.path.join(SAMPLES_DIR, 'demo.json')
+    speed = 4.0 if quick else 1.0
+
+    device = SimulatedDevice()
+    transport = HIDTransport(device=device)
+    transport.open()
+    reports = prepare_reports(filter_out_packets(load_capture(path)), transport.report_size, speed)
+
+    play_reports(transport, reports, verbose=False)
+
+    sent_times = [t for t, _ in device.log]
+    t0 = sent_times[0]
+    target0 = reports[0][1]
+    lateness = sorted(abs((t - t0) - (target - target0)) * 1000.0
+                      for t, (_, target, _, _) in zip(sent_times, reports))
+
+    p95 = lateness[min(len(lateness) - 1, int(len(lateness) * 0.95))]
+    return [
+        result('replay.reports', len(sent_times), 'reports', 'higher'),
+        result('replay.lateness_mean', sum(lateness) / len(lateness), 'ms', 'lower', abs_tolerance=0.5),
+        result('replay.lateness_p95', p95, 'ms', 'lower', abs_tolerance=0.5),
+        result('replay.lateness_max', lateness[-1], 'ms', 'lower', abs_tolerance=1.0),
+    ]
+
+
+@benchmark
+def bench_network(quick=False):
+    """Ruta de red contra el stand-in local: escritura directa frente a batch"""
+    count = 2000 if quick else 20000
+    packets = [text_to_imouse_packets('a')[0]['bytes'], KEY_RELEASE] * (count // 2)
+    entries = []
+
+    with StandInServer() as server:
+        for batch in (1, 8):
+            transport = HIDTransport(device=NetworkDevice(*server.address, batch=batch))
+            transport.open()
+            received = server.stats['records']
+            started = time.perf_counter()
+            for packet in packets:
+                transport.send(packet)
+            transport.flush()
+            while server.stats['records'] - received < count:
+                time.sleep(0.0005)
+            elapsed = time.perf_counter() - started
+            writes = transport.device.stats['writes']
+            transport.close()
+            entries.append(result(f'network.batch{batch}', count / elapsed, 'reports/s', 'higher'))
+            entries.append(result(f'network.batch{batch}_writes', writes, 'writes', 'lower', abs_tolerance=count * 0.05))
+
+    return entries
+
+
+@benchmark
+def bench_flow(quick=False):
+    """Escritura con esperas fijas frente a control de flujo por acks"""
+    count = 100 if quick else 400
+    latency = 0.002
+    packets = [text_to_imouse_packets('a')[0]['bytes'], KEY_RELEASE] * (count // 2)
+    entries = []
+
+    # Referencia: espera fija dimensionada para el peor caso (2.5x la latencia)
+    transport = HIDTransport(device=SimulatedDevice(ack_latency=latency))
+    transport.open()
+    started = time.perf_counter()
+    for packet in packets:
+        transport.send(packet)
+        time.sleep(latency * 2.5)
+    entries.append(result('flow.fixed_sleep', count / (time.perf_counter() - started), 'reports/s', 'higher'))
+    transport.close()
+
+    for window in (1, 4):
+        transport = HIDTransport(device=SimulatedDevice(ack_latency=latency))
+        transport.open()
+        flow = FlowController(transport, window=window)
+        flow.attach()
+        started = time.perf_counter()
+        for packet in packets:
+            flow.send(packet)
+        flow.drain()
+        elapsed = time.perf_counter() - started
+        transport.close()
+        entries.append(result(f'flow.window{window}', count / elapsed, 'reports/s', 'higher'))
+        entries.append(result(f'flow.window{window}_timeouts', flow.get_stats()['timeouts'], 'timeouts', 'lower',
+                              abs_tolerance=1))
+
+    return entries
+
+
+@benchmark
+def bench_write_deadline(quick=False):
+    """Coste del plazo de escritura y tiempo hasta detectar un dongle bloqueado"""
+    count = 2000 if quick else 20000
+    entries = []
+
+    for name, timeout in (('blocking', 0), ('deadline', 0.5)):
+        transport = HIDTransport(device=SimulatedDevice(), write_timeout=timeout)
+        transport.open()
+        started = time.perf_counter()
+        for _ in range(count):
+            transport.send(KEY_RELEASE)
+        elapsed = time.perf_counter() - started
+        transport.close()
+        entries.append(result(f'write.{name}_us', elapsed / count * 1e6, 'us', 'lower'))
+
+    # Con el dispositivo bloqueado, send() debe volver en ~write_timeout
+    device = SimulatedDevice()
+    transport = HIDTransport(device=device, write_timeout=0.02)
+    transport.open()
+    device.stall(0.5)
+    started = time.perf_counter()
+    transport.send(KEY_RELEASE)
+    entries.append(result('write.stall_detect_ms', (time.perf_counter() - started) * 1000, 'ms', 'lower',
+                          abs_tolerance=5.0))
+    transport.close()
+
+    return entries
+
+
+@benchmark
+def bench_shortcuts(quick=False):
+    """Navegación por atajos: combinaciones sueltas frente a secuencia precompilada"""
+    chords = ['Win+H', 'Win+Space', 'Win+Tab', 'Win+H']
+    entries = []
+
+    registry = ShortcutRegistry(DEFAULT_SHORTCUTS_FILE)
+    registry.define('bench_nav', sequence=chords)
+
+    # Referencia: send_key_combo por combinación (hold 50 ms + pausa fija de 50 ms)
+    sender = ShortcutSender(device=SimulatedDevice(), registry=registry)
+    sender.transport = HIDTransport(device=sender.device)
+    sender.transport.open()
+    started = time.perf_counter()
+    for chord in chords:
+        sender.send_key_combo(*parse_chord(chord))
+    entries.append(result('shortcuts.per_combo_ms', (time.perf_counter() - started) * 1000, 'ms', 'lower',
+                          abs_tolerance=10.0))
+
+    sender.prepare('bench_nav')
+    started = time.perf_counter()
+    sender.send_shortcut('bench_nav')
+    entries.append(result('shortcuts.sequence_ms', (time.perf_counter() - started) * 1000, 'ms', 'lower',
+                          abs_tolerance=10.0))
+    sender.transport.close()
+
+    def compile_cold():
+        registry._compiled.clear()
+        registry.compile('open_app', {'text': 'Telegram'})
+
+    entries.append(result('shortcuts.compile', best_rate(compile_cold, 200 if quick else 2000),
+                          'sequences/s', 'higher'))
+    return entries
+
+
+@benchmark
+def bench_sync(quick=False):
+    """Replay sincronizado: dispersión del mismo reporte entre 4 dispositivos simulados"""
+    devices = 4
+    count = 100 if quick else 400
+    protocol = iMouseHIDProtocol()
+    packets = [{'timestamp': i * 0.002, 'direction': 'out', 'bytes': protocol.move_absolute(i % 365, 333)}
+               for i in range(count)]
+
+    transports = [HIDTransport(device=SimulatedDevice()) for _ in range(devices)]
+    for transport in transports:
+        transport.open()
+    session = SyncReplay(transports)
+    session.prepare(packets)
+    report = session.run()
+    for transport in transports:
+        transport.close()
+
+    spread = report['spread_ms']
+    lateness = max(device['lateness_ms']['p99'] for device in report['devices'])
+    return [
+        result('sync.spread_p50', spread['p50'], 'ms', 'lower', abs_tolerance=0.5),
+        result('sync.spread_p99', spread['p99'], 'ms', 'lower', abs_tolerance=1.0),
+        result('sync.lateness_p99', lateness, 'ms', 'lower', abs_tolerance=1.0),
+    ]
+
+
+@benchmark
+def bench_shm(quick=False):
+    """Retraso de envío con carga en el productor: en el mismo proceso frente a proceso dedicado"""
+    import threading
+
+    count = 100 if quick else 500
+    interval = 0.002
+    lead = 0.05
+    load_threads = 2
+    packets = [text_to_imouse_packets('a')[0]['bytes'], KEY_RELEASE] * (count // 2)
+    entries = []
+
+    def with_load(run):
+        threads = [threading.Thread(target=producer_load, args=(count * interval + lead,), daemon=True)
+                   for _ in range(load_threads)]
+        for thread in threads:
+            thread.start()
+        stats = run()
+        for thread in threads:
+            thread.join()
+        return stats
+
+    def inline():
+        transport = HIDTransport(device=SimulatedDevice())
+        transport.open()
+        lateness = []
+        start = time.perf_counter() + lead
+        for i, packet in enumerate(packets):
+            deadline = start + i * interval
+            wait_until(deadline)
+            sent_at = time.perf_counter()
+            transport.send(packet)
+            lateness.append(sent_at - deadline)
+        transport.close()
+        return {'lateness_mean_ms': sum(lateness) / len(lateness) * 1000, 'lateness_max_ms': max(lateness) * 1000}
+
+    def process():
+        sender = SenderProcess(simulate=True)
+        sender.start()
+        start = time.perf_counter() + lead
+        for i, packet in enumerate(packets):
+            sender.put(packet, deadline=start + i * interval)
+        return sender.stop()
+
+    for name, run in (('inline', inline), ('process', process)):
+        stats = with_load(run)
+        entries.append(result(f'shm.{name}_lateness_mean', stats['lateness_mean_ms'], 'ms', 'lower',
+                              abs_tolerance=0.5))
+        entries.append(result(f'shm.{name}_lateness_max', stats['lateness_max_ms'], 'ms', 'lower',
+                              abs_tolerance=2.0))
+    return entries
+
+
+@benchmark
+def bench_virtual_clock(quick=False):
+    """Replay de una captura larga con reloj virtual: tiempo real y exactitud de la traza"""
+    minutes = 3 if quick else 30
+    interval = 0.05
+    packet = text_to_imouse_packets('a')[0]['bytes']
+    count = int(minutes * 60 / interval)
+    packets = [{'direction': 'out', 'bytes': packet if i % 2 == 0 else KEY_RELEASE, 'timestamp': i * interval}
+               for i in range(count)]
+
+    device = SimulatedDevice()
+    transport = HIDTransport(device=device, write_timeout=0)
+    transport.open()
+    reports = prepare_reports(packets, transport.report_size)
+    started = time.perf_counter()
+    with use_clock(VirtualClock()):
+        play_reports(transport, reports, verbose=False)
+    wall = time.perf_counter() - started
+    transport.close()
+
+    error = max(abs(entry['timestamp'] - i * interval) for i, entry in enumerate(device.to_capture()))
+    return [
+        result('virtual_clock.replay_wall', wall * 1000, 'ms', 'lower', abs_tolerance=20.0),
+        result('virtual_clock.speedup', minutes * 60 / wall, 'x', 'higher'),
+        result('virtual_clock.timestamp_error', error * 1e6, 'us', 'lower', abs_tolerance=1.0),
+    ]
+
+
+@benchmark
+def bench_conform(quick=False):
+    """Alineación vectorizada captura/traza con pérdidas, duplicados y reordenados"""
+    import numpy as np
+
+    count = 10000 if quick else 100000
+    rng = np.random.default_rng(7)
+    data = np.zeros((count, imouse_reports.REPORT_SIZE), dtype=np.uint8)
+    data[:, 1] = 0xa2
+    data[0::2, 4] = rng.integers(4, 40, count // 2 + count % 2)   # keypress / release alternos
+    intended = imouse_reports.ReportArray(np.arange(count) * 0.025, data)
+
+    keep = np.ones(count, dtype=bool)
+    keep[rng.choice(count, count // 1000, replace=False)] = False
+    rows = np.flatnonzero(keep)
+    rows = np.sort(np.r_[rows, rng.choice(rows, count // 1000)])
+    observed = imouse_reports.ReportArray(intended.timestamps[rows] + 1.5 + rng.uniform(0, 0.002, len(rows)),
+                                          data[rows])
+
+    report = conform(intended, observed)
+    elapsed = best_time_ms(lambda: conform(intended, observed), number=1, repeat=3)
+    return [
+        result('conform.align', elapsed, 'ms', 'lower', abs_tolerance=20.0),
+        result('conform.reports_per_s', count / elapsed * 1000, 'reports/s', 'higher'),
+        result('conform.missing_error', abs(report['missing'] - count // 1000), 'reports', 'lower'),
+        result('conform.duplicated_error', abs(report['duplicated'] - count // 1000), 'reports', 'lower'),
+    ]
+
+
+@benchmark
+def bench_store(quick=False):
+    """Almacén de macros: deduplicación de una biblioteca de clicks y textos, y carga fría/caliente"""
+    import random
+    import contextlib
+    import io
+
+    clicks = 50 if quick else 300
+    texts = 20 if quick else 100
+    rng = random.Random(3)
+    entries = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {}
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(clicks):
+                path = os.path.join(tmp, f'click_{i}.json')
+                generate_click_json(rng.randrange(365), rng.randrange(667), path)
+                files[f'click_{i}'] = path
+        for i in range(texts):
+            path = os.path.join(tmp, f'mail_{i}.json')
+            with open(path, 'w') as f:
+                json.dump(text_to_imouse_packets(f"usuario{i}@gmail.com\n"), f, indent=2)
+            files[f'mail_{i}'] = path
+
+        root = os.path.join(tmp, 'store')
+        store = MacroStore(root)
+        for name, path in files.items():
+            with open(path) as f:
+                store.add(name, json.load(f), source=path)
+        summary = store.summary()
+        logical = sum(os.path.getsize(path) for path in files.values())
+
+        def load_files():
+            for path in files.values():
+                with open(path) as f:
+                    json.load(f)
+
+        def load_store(target):
+            for name in files:
+                target.load(name)
+
+        cold = MacroStore(root)
+        started = time.perf_counter()
+        load_store(cold)
+        cold_ms = (time.perf_counter() - started) * 1000
+        hit_rate = cold.stats['hits'] / (cold.stats['hits'] + cold.stats['misses'])
+
+        entries.append(result('store.dedup_ratio', logical / summary['stored_bytes'], 'x', 'higher'))
+        entries.append(result('store.blocks_per_macro', summary['blocks'] / len(files), 'blocks', 'lower'))
+        entries.append(result('store.cold_hit_rate', hit_rate * 100, '%', 'higher', abs_tolerance=1.0))
+        entries.append(result('store.load_json_files', best_time_ms(load_files, number=1), 'ms', 'lower',
+                              abs_tolerance=2.0))
+        entries.append(result('store.load_cold', cold_ms, 'ms', 'lower', abs_tolerance=5.0))
+        entries.append(result('store.load_warm', best_time_ms(lambda: load_store(cold), number=1), 'ms', 'lower',
+                              abs_tolerance=2.0))
+    return entries
+
+
+def _cpu_burner(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def _realtime_probe(spec, count, interval, queue):
+    """Despertares periódicos con time.sleep en un proceso aparte (mlockall es por proceso)"""
+    status = RealtimeSettings.parse(spec).apply(verbose=False)
+    lateness = []
+    deadline = time.perf_counter() + interval
+    for _ in range(count):
+        remaining = deadline - time.perf_counter()
+        if remaining > 0:
+            time.sleep(remaining)
+        lateness.append(time.perf_counter() - deadline)
+        deadline += interval
+    queue.put((status, sorted(lateness)))
+
+
+@benchmark
+def bench_realtime(quick=False):
+    """Retraso al despertar del hilo de envío con CPUs ocupadas, por ajuste de imouse_rt"""
+    import multiprocessing
+
+    count = 200 if quick else 1000
+    interval = 0.001
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else [0]
+    burners = max(2, len(cpus))
+    configs = (
+        ('none', ''),
+        ('cpus', f'cpus={cpus[-1]}'),
+        ('fifo', 'fifo:50'),
+        ('mlock', 'mlock'),
+        ('all', f'fifo:50,cpus={cpus[-1]},mlock'),
+    )
+
+    entries = []
+    for name, spec in configs:
+        load = [multiprocessing.Process(target=_cpu_burner, args=(count * interval + 1.0,), daemon=True)
+                for _ in range(burners)]
+        for process in load:
+            process.start()
+        queue = multiprocessing.Queue()
+        probe = multiprocessing.Process(target=_realtime_probe, args=(spec, count, interval, queue))
+        probe.start()
+        status, lateness = queue.get()
+        probe.join()
+        for process in load:
+            process.terminate()
+            process.join()
+
+        # Un ajuste sin permisos mediría lo mismo que 'none': no se informa
+        if any(value != 'ok' for value in status.values()):
+            print(f"   ⚠️  realtime.{name}: no aplicado ({', '.join(f'{k}: {v}' for k, v in status.items())})")
+            continue
+        p99 = lateness[min(len(lateness) - 1, int(len(lateness) * 0.99))]
+        entries.append(result(f'realtime.{name}_wake_p99', p99 * 1000, 'ms', 'lower', abs_tolerance=1.0))
+        entries.append(result(f'realtime.{name}_wake_max', lateness[-1] * 1000, 'ms', 'lower', abs_tolerance=5.0))
+    return entries
+
+
+@benchmark
+def bench_sender(quick=False):
+    """Latencia del productor con la cola acotada y un dispositivo lento"""
+    count = 500 if quick else 5000
+
+    device = SimulatedDevice(write_latency=0.001)
+    transport = HIDTransport(device=device)
+    transport.open()
+    sender = HIDSender(transport)
+    sender.add_stream('motion', COALESCE_LATEST, capacity=8)
+    sender.add_stream('telemetry', DROP_OLDEST, capacity=64)
+    sender.start()
+
+    protocol = iMouseHIDProtocol()
+    latencies = []
+    for i in range(count):
+        packet = protocol.move_absolute(i % 365, 333)
+        started = time.perf_counter()
+        sender.put('motion', packet, key='move')
+        sender.put('telemetry', packet)
+        latencies.append((time.perf_counter() - started) * 1e6)
+
+    sender.stop(drain=False)
+    latencies.sort()
+    stats = sender.get_stats()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return [
+        result('sender.put_p99', p99, 'us', 'lower', abs_tolerance=20.0),
+        result('sender.max_depth', stats['motion']['max_depth'] + stats['telemetry']['max_depth'],
+               'items', 'lower', abs_tolerance=8),
+    ]
+
+
+@benchmark
+def bench_cold_start(quick=False):
+    """Arranque en frío del CLI imouse.py (proceso nuevo por comando)"""
+    cli = os.path.join(ROOT_DIR, 'imouse.py')
+    repeat = 3 if quick else 10
+    commands = {
+        'help': ['--help'],
+        'shortcut_list': ['shortcut', '--list'],
+        'type_simulated': ['type', 'a', '--delay', '0.001', '--simulate'],
+    }
+
+    results = []
+    for name, args in commands.items():
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            subprocess.run([sys.executable, cli] + args, stdout=subprocess.DEVNULL,
+                           stderr=subprocess.DEVNULL, check=True)
+            timings.append((time.perf_counter() - started) * 1000.0)
+        results.append(result(f'cold_start.{name}', min(timings), 'ms', 'lower', abs_tolerance=10.0))
+    return results
+
+
+@benchmark
+def bench_capture(quick=False):
+    """Captura de input reports: ring buffer y volcado binario"""
+    number = 20000 if quick else 200000
+    report = [0x00, 0xa2, 0x00, 0x00, 0x04, 0x00, 0x00, 0x00, 0x00]
+
+    ring = CaptureRing(capacity=number, report_size=16)
+    append_rate = best_rate(lambda: ring.append(report), number=number, repeat=3)
+
+    record = record_struct(ring.report_size)
+    started = time.perf_counter()
+    _, count, _, _ = ring.pack_since(0, record)
+    pack_rate = count / (time.perf_counter() - started)
+
+    return [
+        result('capture.append', append_rate, 'reports/s', 'higher'),
+        result('capture.spill_pack', pack_rate, 'reports/s', 'higher'),
+    ]
+
+
+@benchmark
+def bench_codec(quick=False):
+    """Codificación de flujos completos (HID y tramas W-0xAB) y validación"""
+    protocol = iMouseHIDProtocol()
+    stream = [protocol.move_absolute(100, 100), protocol.left_down()]
+    stream.extend(protocol.move_relative(1 if step % 2 else -1, 0) for step in range(200))
+    stream.append(protocol.left_up())
+    number = 20 if quick else 200
+
+    hid_rate = best_rate(lambda: HIDCodec(9).encode_batch(stream), number=number) * len(stream)
+    framed_rate = best_rate(lambda: FramedCodec(64).encode_batch(stream), number=number) * len(stream)
+
+    frames = [bytes(report) for report in FramedCodec(64).encode_batch(stream)]
+    validate_rate = best_rate(lambda: [validate_frame(frame) for frame in frames], number=number) * len(frames)
+
+    return [
+        result('codec.hid_batch', hid_rate, 'reports/s', 'higher'),
+        result('codec.framed_batch', framed_rate, 'reports/s', 'higher'),
+        result('codec.validate_frame', validate_rate, 'frames/s', 'higher'),
+    ]
+
+
+@benchmark
+def bench_targets(quick=False):
+    """Resolución de objetivos con nombre y compilación de macros por perfil"""
+    index = TargetIndex()
+    for app in range(20):
+        for target in range(50):
+            index.define(f"app{app}.target{target}", target * 7, app * 30)
+    names = index.names()
+    macro = {'steps': [{'op': 'tap', 'target': name} for name in names[:50]]
+             + [{'op': 'swipe', 'from': names[0], 'to': names[-1]}]}
+    number = 50 if quick else 500
+
+    resolve_rate = best_rate(lambda: [index.resolve(name, 'ipad') for name in names], number=number // 10) * len(names)
+    compile_ms = best_time_ms(lambda: [compile_macro(macro, profile, index) for profile in PROFILES],
+                              number=number // 50)
+
+    return [
+        result('targets.resolve', resolve_rate, 'lookups/s', 'higher'),
+        result('targets.compile_macro_all_profiles', compile_ms, 'ms', 'lower'),
+    ]
+
+
+@benchmark
+def bench_vision(quick=False):
+    """Búsqueda de plantillas de UI en frames del espejo (requiere NumPy)"""
+    np = imouse_vision.np
+    if np is None:
+        print("     (NumPy no instalado, se omite)")
+        return []
+
+    rng = np.random.default_rng(0)
+    frame = (rng.random((1334, 750)) * 255).astype(np.float32)
+    button = (rng.random((60, 120)) * 255).astype(np.float32)
+    frame[1200:1260, 600:720] = button
+    number = 3 if quick else 20
+
+    matcher = imouse_vision.TemplateMatcher()
+    matcher.register('send_button', button)
+    cold_ms = best_time_ms(lambda: matcher.locate('send_button', frame.copy()), number=number)
+    warm_ms = best_time_ms(lambda: matcher.locate('send_button', frame), number=number)
+    full_ms = best_time_ms(lambda: imouse_vision.match_template(frame, button), number=1, repeat=3)
+
+    return [
+        result('vision.locate_cold', cold_ms, 'ms', 'lower'),
+        result('vision.locate_cached_pyramid', warm_ms, 'ms', 'lower'),
+        result('vision.full_resolution_ncc', full_ms, 'ms', 'lower'),
+    ]
+
+
+@benchmark
+def bench_retarget(quick=False):
+    """Retarget vectorizado de capturas grandes entre perfiles (requiere NumPy)"""
+    np = imouse_reports.np
+    if np is None:
+        print("     (NumPy no instalado, se omite)")
+        return []
+
+    protocol = iMouseHIDProtocol(screen_width=365, screen_height=667)
+    stream = [protocol.move_absolute(182, 333), protocol.left_down()]
+    stream += [protocol.move_relative(1, -1) if i % 2 else protocol.move_relative(-1, 1) for i in range(998)]
+    count = 20_000 if quick else 100_000
+    reports = imouse_reports.ReportArray(np.arange(count) * 0.008,
+                                         np.tile(np.array([list(p) for p in stream], dtype=np.uint8),
+                                                 (count // len(stream), 1)))
+    number = 3 if quick else 10
+
+    stretch_ms = best_time_ms(lambda: retarget(reports, (365, 667), (768, 1024)), number=number)
+    rotate_ms = best_time_ms(lambda: retarget(reports, (365, 667), (1024, 768), 90, 'letterbox'),
+                             number=number)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source, output = os.path.join(tmp, 'iphone.imcl'), os.path.join(tmp, 'ipad.imcl')
+        imouse_reports.save_reports(reports, source)
+        roundtrip_ms = best_time_ms(
+            lambda: imouse_reports.save_reports(
+                retarget(imouse_reports.load_reports(source), (365, 667), (768, 1024)), output),
+            number=number)
+
+    return [
+        result('retarget.stretch', count / stretch_ms * 1000, 'reports/s', 'higher'),
+        result('retarget.rotate_letterbox', count / rotate_ms * 1000, 'reports/s', 'higher'),
+        result('retarget.columnar_roundtrip', roundtrip_ms, 'ms', 'lower'),
+    ]
+
+
+@benchmark
+def bench_decode(quick=False):
+    """Decodificación columnar de capturas y resumen estadístico (requiere NumPy)"""
+    np = imouse_reports.np
+    if np is None:
+        print("     (NumPy no instalado, se omite)")
+        return []
+
+    protocol = iMouseHIDProtocol(screen_width=365, screen_height=667)
+    stream = [protocol.move_absolute(182, 333), protocol.left_down(), protocol.move_relative(5, -3),
+              protocol.left_up(), bytes([0x00, 0xa2, 0x00, 0x00, 0x04, 0, 0, 0, 0]), bytes([0x00, 0xa2] + [0] * 7)]
+    count = len(stream) * (5_000 if quick else 20_000)
+    reports = imouse_reports.ReportArray(np.arange(count) * 0.008,
+                                         np.tile(np.array([list(p) for p in stream], dtype=np.uint8),
+                                                 (count // len(stream), 1)))
+    number = 3 if quick else 10
+
+    decode_ms = best_time_ms(lambda: decode_columns(reports, (365, 667)), number=number)
+    columns = decode_columns(reports, (365, 667))
+    summary_ms = best_time_ms(lambda: summarize(columns), number=number)
+
+    return [
+        result('decode.columns', count / decode_ms * 1000, 'reports/s', 'higher'),
+        result('decode.summary', summary_ms, 'ms', 'lower'),
+    ]
+
+
+@benchmark
+def bench_sweep(quick=False):
+    """Barrido paralelo de reportes (simulado) y filtrado columnar"""
+    spec = {'fields': {'1': '0xa0-0xaf', '2': '0x00-0x0f', '4': '0x04-0x1d' if quick else '0x00-0x3f'},
+            'settle': 0.0}
+    entries = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'sweep.imcl')
+        for workers in (1, 2):
+            summary = run_sweep(spec, output, workers=workers, simulate=True, verbose=False)
+            entries.append(result(f'sweep.candidates.{workers}w', summary['rate'], 'candidates/s', 'higher'))
+
+        started = time.perf_counter()
+        responses = load_columnar(output, ['responses'])['responses']
+        [row for row, count in enumerate(responses) if count]
+        elapsed = time.perf_counter() - started
+        entries.append(result('sweep.filter_responded', len(responses) / elapsed, 'rows/s', 'higher'))
+
+        # Máscara sobre report/responses; el resto de columnas solo para las filas que pasan
+        where = {1: [0xa0, 0xa2], 4: [0x05, 0x07]}
+        elapsed = best_time_ms(lambda: filter_results(output, True, where), number=5) / 1000
+        entries.append(result('sweep.filter_where', len(responses) / elapsed, 'rows/s', 'higher'))
+
+    return entries
+
+
+# ===== EJECUCIÓN Y COMPARACIÓN =====
+
+def run_benchmarks(name_filter=None, quick=False):
+    """Ejecuta los benchmarks registrados y devuelve el documento de resultados"""
+    results = []
+    started = time.perf_counter()
+
+    for func in BENCHMARKS:
+        if name_filter and name_filter not in func.__name__:
+            continue
+
+        print(f"⏱️  {func.__name__}: {func.__doc__}")
+        entries = func(quick=quick)
+        for entry in entries:
+            print(f"     {entry['name']:<40} {entry['value']:>14.3f} {entry['unit']}")
+        results.extend(entries)
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'quick': quick,
+            'duration_s': round(time.perf_counter() - started, 3),
+        },
+        'results': results,
+    }
+
+
+def compare_results(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compara resultados actuales contra un baseline
+
+    Returns:
+        list: [(entrada, valor_baseline, cambio_relativo, es_regresion), ...]
+    """
+    base_by_name = {entry['name']: entry for entry in baseline.get('results', [])}
+    comparison = []
+
+    for entry in current['results']:
+        base = base_by_name.get(entry['name'])
+        if base is None:
+            continue
+
+        old, new = base['value'], entry['value']
+        change = (new - old) / old if old else 0.0
+
+        if entry['better'] == 'higher':
+            worse = new < old * (1 - threshold)
+        else:
+            worse = new > old * (1 + threshold)
+
+        if abs(new - old) <= entry.get('abs_tolerance', 0.0):
+            worse = False
+
+        comparison.append((entry, old, change, worse))
+
+    return comparison
+
+
+def save_json(document, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmarks de iMouse (encoder, keymap, gestos, replay)',
+        epilog='''
+EJEMPLOS DE USO:
+
+  Ejecutar y guardar como baseline:
+    python benchmarks/run_benchmarks.py --save-baseline
+
+  Ejecutar y comparar contra el baseline (umbral 15%):
+    python benchmarks/run_benchmarks.py
+
+  Solo el encoder, modo rápido:
+    python benchmarks/run_benchmarks.py -k encoder --quick
+        ''',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT,
+                        help='Archivo JSON de resultados')
+    parser.add_argument('-b', '--baseline', default=DEFAULT_BASELINE,
+                        help='Archivo JSON de baseline')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Guardar los resultados como nuevo baseline')
+    parser.add_argument('-t', '--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Umbral de regresión relativo (default: 0.15)')
+    parser.add_argument('-k', '--filter', help='Ejecutar solo benchmarks que contengan este texto')
+    parser.add_argument('--quick', action='store_true', help='Menos iteraciones (smoke test)')
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("📊 iMOUSE BENCHMARKS")
+    print("=" * 80)
+
+    document = run_benchmarks(args.filter, args.quick)
+    save_json(document, args.output)
+    print(f"\n💾 Resultados guardados en: {args.output}")
+
+    if args.save_baseline:
+        save_json(document, args.baseline)
+        print(f"📌 Baseline actualizado: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("ℹ️  Sin baseline para comparar (usa --save-baseline)")
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    comparison = compare_results(document, baseline, args.threshold)
+    regressions = [c for c in comparison if c[3]]
+
+    print()
+    print("=" * 80)
+    print(f"📈 COMPARACIÓN CON BASELINE (umbral {args.threshold:.0%})")
+    print("=" * 80)
+    for entry, old, change, worse in comparison:
+        mark = "❌" if worse else "✓"
+        print(f"  {mark} {entry['name']:<40} {old:>12.3f} → {entry['value']:>12.3f} "
+              f"{entry['unit']:<8} ({change:+.1%})")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} regresiones detectadas")
+        return 1
+
+    print("\n✅ Sin regresiones")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -216,7 +216,7 @@ def generate_drag_json(x1: int, y1: int, x2: int, y2: int, output_file: str,
     print(f"   Total paquetes: {len(packets)}")
 
 
-def main():
+def main(argv=None):
     import argparse
     import sys
 
@@ -271,14 +271,16 @@ RESOLUCIONES COMUNES:
     parser.add_argument('--restart', action='store_true', help='Usar HT_Restart (0xa4) en lugar de reset normal')
 
     # Si no hay argumentos, mostrar ayuda
-    if len(sys.argv) == 1:
+    if argv is None:
+        argv = sys.argv[1:]
+    if not argv:
         parser.print_help()
         print("\n⚡ INICIO RÁPIDO:")
         print("  python generate_click_json.py -x 182 -y 333 -o samples/test_click.json")
         print("  python replay_imouse.py samples/test_click.json")
         sys.exit(0)
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     reset = not args.no_reset
     use_restart = args.restart
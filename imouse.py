@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+imouse - Punto de entrada único para las herramientas iMouse
+
+Cada subcomando importa sus módulos (pywinusb, pynput, keymaps, asyncio...)
+solo cuando se ejecuta, así el arranque en frío se mantiene bajo para los
+orquestadores que lanzan estas herramientas miles de veces al día.
+
+    python imouse.py click 182 333
+    python imouse.py swipe 182 500 182 150 --duration 0.2
+    python imouse.py type "Hola iPhone"
+    python imouse.py type "Hola iPhone 15" --from "Hola iPhone"
+    python imouse.py type "Hola iPhone" --ack --window 2
+    python imouse.py shortcut home
+    python imouse.py shortcut open_app --text Telegram
+    python imouse.py replay samples/demo.json -s 2.0
+    python imouse.py gen -x 182 -y 333 -o samples/center.json
+    python imouse.py gen-text "Hola" -o samples/hola.json
+    python imouse.py sweep --set 1=0xa0-0xaf -j 4 --simulate
+    python imouse.py retarget samples/telegram.json -o telegram_ipad.json --to ipad
+    python imouse.py decode samples/demo.json --stats
+    python imouse.py sync samples/demo.json --devices 3 --simulate
+    python imouse.py realtime
+    python imouse.py serve --port 7420
+    python imouse.py type "Hola" --network 192.168.1.50:7430
+
+Todos los subcomandos de dispositivo aceptan --simulate (sin USB) y
+--network HOST:PUERTO (ruta de red, ver imouse_network.py).
+Código de salida: 0 si el comando se completó, 1 si falló.
+"""
+
+import sys
+import argparse
+
+
+# ===== Utilidades =====
+
+def _device(args):
+    """
+    Dispositivo de red si se pidió --network, simulado con --simulate, si
+    no None (dongle real)
+    """
+    if args.network:
+        from imouse_network import NetworkDevice, parse_address
+        return NetworkDevice(*parse_address(args.network), batch=args.batch)
+    if not args.simulate:
+        return None
+    from imouse_simulator import SimulatedDevice, DEFAULT_ACK_LATENCY
+    # Con --ack el simulado confirma cada reporte como el dongle
+    return SimulatedDevice(ack_latency=DEFAULT_ACK_LATENCY if getattr(args, 'ack', False) else None)
+
+
+def _check_device_options(args) -> bool:
+    """Valida --network/--batch antes de abrir nada (serve admite varias direcciones)"""
+    if getattr(args, 'batch', 1) < 1:
+        print(f"❌ --batch debe ser >= 1 (hay {args.batch})")
+        return False
+    if getattr(args, 'network', None):
+        from imouse_network import parse_address
+        try:
+            for address in args.network.split(','):
+                parse_address(address)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return False
+    return True
+
+
+def _exit_code(ok) -> int:
+    return 0 if ok else 1
+
+
+# ===== Subcomandos =====
+
+def cmd_click(args):
+    from imouse_clicker import InteractiveClicker
+
+    clicker = InteractiveClicker(args.width, args.height, device=_device(args))
+    if not clicker.connect_device():
+        return 1
+
+    try:
+        if args.double:
+            ok = clicker.perform_double_click(args.x, args.y)
+        else:
+            ok = clicker.perform_click(args.x, args.y, args.button, reset=not args.no_reset)
+    finally:
+        clicker.transport.close()
+
+    return _exit_code(ok)
+
+
+def cmd_swipe(args):
+    from imouse_swipe import SwipeController
+
+    controller = SwipeController(args.width, args.height, device=_device(args))
+    if not controller.connect_device():
+        return 1
+
+    try:
+        ok = controller.swipe(args.x1, args.y1, args.x2, args.y2, args.duration, args.steps)
+    finally:
+        controller.close()
+
+    return _exit_code(ok)
+
+
+def cmd_type(args):
+    from imouse_transport import HIDTransport
+    from imouse_typer import send_text_directly, send_text_edit
+
+    text = args.text
+    if args.enter:
+        text += '\n'
+
+    transport = HIDTransport(device=_device(args))
+    if not transport.open():
+        return 1
+
+    delay = args.delay
+    hold = None
+    if args.ack:
+        from imouse_flow import FlowController
+        from imouse_typer import MIN_KEY_HOLD
+
+        # La confirmación del dongle sustituye a las esperas fijas entre
+        # teclas; la pulsación mantiene un mínimo entre keypress y release
+        transport = FlowController(transport, window=args.window)
+        transport.attach()
+        delay = 0.0
+        hold = MIN_KEY_HOLD
+
+    try:
+        if args.current is not None:
+            print(f"✏️  Editando campo ({len(args.current)} → {len(text)} caracteres)...", end='', flush=True)
+            sent, errors = send_text_edit(args.current, text, transport, delay, args.cursor, hold)
+            if not sent and not errors:
+                print(" ✅ (sin cambios)")
+                return 0
+        else:
+            print(f"📤 Enviando {len(text)} caracteres...", end='', flush=True)
+            sent, errors = send_text_directly(text, transport, delay, hold)
+        if args.ack:
+            transport.drain()
+    except ValueError as e:
+        print(f" ❌ {e}")
+        return 1
+    finally:
+        transport.close()
+
+    print(f" ✅ ({sent} teclas enviadas)" if sent else " ❌ No se pudo enviar")
+    if args.ack:
+        stats = transport.get_stats()
+        print(f"   Acks: {stats['acked']}/{stats['sent']}, timeouts: {stats['timeouts']}, "
+              f"RTT medio: {stats['rtt_mean'] * 1000:.2f} ms")
+    return _exit_code(sent > 0 and errors == 0)
+
+
+def cmd_shortcut(args):
+    from imouse_shortcuts import ShortcutSender, ShortcutRegistry, get_shortcut_registry
+
+    try:
+        registry = ShortcutRegistry(args.file) if args.file else get_shortcut_registry()
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    if args.list or not args.name:
+        for name in registry.names():
+            print(f"  {name:<12} {registry.describe(name)}")
+        return 0
+
+    if args.name not in registry:
+        print(f"❌ Atajo desconocido: {args.name} (opciones: {', '.join(registry.names())})")
+        return 1
+
+    sender = ShortcutSender(device=_device(args), registry=registry)
+    if not sender.connect_device():
+        return 1
+
+    try:
+        ok = sender.send_named(args.name, {'text': args.text} if args.text is not None else None)
+    finally:
+        sender.transport.close()
+
+    return _exit_code(ok)
+
+
+def cmd_realtime(args):
+    from imouse_realtime import RealtimeTyper
+
+    typer = RealtimeTyper()
+    typer.device = _device(args)
+    try:
+        typer.run()
+    except KeyboardInterrupt:
+        print("\n⚠️  Interrupción detectada")
+    return 0
+
+
+def cmd_serve(args):
+    import asyncio
+    from imouse_server import serve
+
+    try:
+        ok = asyncio.run(serve(args.host, args.port, args.devices, args.simulate,
+                               network=args.network, batch=args.batch))
+    except KeyboardInterrupt:
+        print("\n👋 Servidor detenido")
+        return 0
+    return _exit_code(ok)
+
+
+# Subcomandos que reenvían sus argumentos al CLI del script original
+def run_replay(argv):
+    from replay_imouse import main
+    return main(argv)
+
+
+def run_gen(argv):
+    from generate_click_json import main
+    main(argv)
+    return 0
+
+
+def run_gen_text(argv):
+    from imouse_complete_keymap import main
+    main(argv)
+    return 0
+
+
+def run_sweep(argv):
+    from imouse_sweep import main
+    return main(argv)
+
+
+def run_targets(argv):
+    from imouse_targets import main
+    return main(argv)
+
+
+def run_macro(argv):
+    from imouse_macro import main
+    return main(argv)
+
+
+def run_vision(argv):
+    from imouse_vision import main
+    return main(argv)
+
+
+def run_retarget(argv):
+    from imouse_retarget import main
+    return main(argv)
+
+
+def run_decode(argv):
+    from imouse_decode import main
+    return main(argv)
+
+
+def run_network(argv):
+    from imouse_network import main
+    return main(argv)
+
+
+def run_sync(argv):
+    from imouse_sync import main
+    return main(argv)
+
+
+def run_shm(argv):
+    from imouse_shm import main
+    return main(argv)
+
+
+def run_rt(argv):
+    from imouse_rt import main
+    return main(argv)
+
+
+def run_clock(argv):
+    from imouse_clock import main
+    return main(argv)
+
+
+def run_conform(argv):
+    from imouse_conform import main
+    return main(argv)
+
+
+def run_store(argv):
+    from imouse_store import main
+    return main(argv)
+
+
+PASSTHROUGH = {
+    'replay': (run_replay, 'Reproducir una captura JSON (ver: imouse replay --help)'),
+    'gen': (run_gen, 'Generar JSON de click/doble click/drag (ver: imouse gen --help)'),
+    'gen-text': (run_gen_text, 'Generar JSON de texto (ver: imouse gen-text --help)'),
+    'sweep': (run_sweep, 'Barrido paralelo de reportes candidatos (ver: imouse sweep --help)'),
+    'targets': (run_targets, 'Índice de objetivos de UI con nombre (ver: imouse targets --help)'),
+    'macro': (run_macro, 'Compilar una macro para un perfil (ver: imouse macro --help)'),
+    'vision': (run_vision, 'Tap guiado por plantillas sobre el espejo (ver: imouse vision --help)'),
+    'retarget': (run_retarget, 'Adaptar una captura a otra resolución (ver: imouse retarget --help)'),
+    'decode': (run_decode, 'Decodificar una captura a columnas + resumen (ver: imouse decode --help)'),
+    'network': (run_network, 'Stand-in / puente de la ruta de red (ver: imouse network --help)'),
+    'sync': (run_sync, 'Replay sincronizado en varios dispositivos (ver: imouse sync --help)'),
+    'shm': (run_shm, 'Replay con proceso de envío dedicado en memoria compartida (ver: imouse shm --help)'),
+    'rt': (run_rt, 'Comprobar ajustes de tiempo real del envío (ver: imouse rt --help)'),
+    'clock': (run_clock, 'Replay con reloj virtual y digest de la traza (ver: imouse clock --help)'),
+    'conform': (run_conform, 'Comprobar una traza observada contra la captura (ver: imouse conform --help)'),
+    'store': (run_store, 'Almacén de macros direccionado por contenido (ver: imouse store --help)'),
+}
+
+
+# ===== Parser =====
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='imouse',
+        description='Herramientas iMouse (control remoto de iPhone/iPad por HID)',
+    )
+    parser.add_argument('--trace', metavar='TRACE_JSON',
+                        help='Guardar trace Chrome/Perfetto de la ejecución')
+    subparsers = parser.add_subparsers(dest='command', metavar='COMANDO')
+
+    device_options = argparse.ArgumentParser(add_help=False)
+    device_options.add_argument('--simulate', action='store_true',
+                                help='Usar dispositivo simulado (sin USB)')
+    device_options.add_argument('--network', metavar='HOST:PUERTO',
+                                help='Usar la ruta de red W 0xAB 0xFF 0x02 (ver imouse_network.py)')
+    device_options.add_argument('--batch', type=int, default=1,
+                                help='Registros por escritura en la ruta de red (default: 1)')
+
+    screen_options = argparse.ArgumentParser(add_help=False)
+    screen_options.add_argument('-w', '--width', type=int, default=365,
+                                help='Ancho de pantalla (default: 365)')
+    screen_options.add_argument('--height', type=int, default=667,
+                                help='Alto de pantalla (default: 667)')
+
+    p = subparsers.add_parser('click', parents=[device_options, screen_options],
+                              help='Click en (x, y)')
+    p.add_argument('x', type=int)
+    p.add_argument('y', type=int)
+    p.add_argument('--button', choices=['left', 'right'], default='left', help='Botón del mouse')
+    p.add_argument('--double', action='store_true', help='Doble click')
+    p.add_argument('--no-reset', action='store_true', help='No resetear posición antes de mover')
+    p.set_defaults(func=cmd_click)
+
+    p = subparsers.add_parser('swipe', parents=[device_options, screen_options],
+                              help='Swipe de (x1, y1) a (x2, y2)')
+    p.add_argument('x1', type=int)
+    p.add_argument('y1', type=int)
+    p.add_argument('x2', type=int)
+    p.add_argument('y2', type=int)
+    p.add_argument('--duration', type=float, default=0.3, help='Duración en segundos (default: 0.3)')
+    p.add_argument('--steps', type=int, default=10, help='Pasos intermedios (default: 10)')
+    p.set_defaults(func=cmd_swipe)
+
+    p = subparsers.add_parser('type', parents=[device_options], help='Escribir texto')
+    p.add_argument('text')
+    p.add_argument('--delay', type=float, default=0.03, help='Retraso entre teclas (default: 0.03)')
+    p.add_argument('--enter', action='store_true', help='Pulsar Enter al final')
+    p.add_argument('--from', dest='current', metavar='ACTUAL',
+                   help='Contenido actual del campo: enviar solo la edición mínima')
+    p.add_argument('--cursor', type=int, help='Posición del cursor en el campo actual (default: al final)')
+    p.add_argument('--ack', action='store_true',
+                   help='Esperar la confirmación del dongle en vez de --delay, con pulsación mínima '
+                   'de 10 ms (ver imouse_flow.py)')
+    p.add_argument('--window', type=int, default=1, help='Reportes sin confirmar con --ack (default: 1)')
+    p.set_defaults(func=cmd_type)
+
+    p = subparsers.add_parser('shortcut', parents=[device_options], help='Atajo de teclado de iOS')
+    p.add_argument('name', nargs='?', help='Atajo de la tabla (home, spotlight, open_app... ver --list)')
+    p.add_argument('--text', help='Texto para las secuencias con {text} (ej: open_app --text Telegram)')
+    p.add_argument('--file', help='Tabla de atajos (default: shortcuts/shortcuts.json)')
+    p.add_argument('--list', action='store_true', help='Listar atajos disponibles')
+    p.set_defaults(func=cmd_shortcut)
+
+    p = subparsers.add_parser('realtime', parents=[device_options],
+                              help='Modo espejo de teclado en tiempo real (requiere pynput)')
+    p.set_defaults(func=cmd_realtime)
+
+    p = subparsers.add_parser('serve', parents=[device_options],
+                              help='Servidor TCP de comandos JSON por líneas')
+    p.add_argument('--host', default='127.0.0.1', help='Dirección (default: 127.0.0.1)')
+    p.add_argument('--port', type=int, default=7420, help='Puerto (default: 7420)')
+    p.add_argument('-n', '--devices', type=int, default=1,
+                   help='Número de dispositivos (con --network: uno por dirección, separadas por comas)')
+    p.set_defaults(func=cmd_serve)
+
+    for name, (_, help_text) in PASSTHROUGH.items():
+        subparsers.add_parser(name, help=help_text, add_help=False)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    if argv is None:
+        argv = sys.argv[1:]
+
+    # --trace va antes del subcomando
+    if len(argv) >= 2 and argv[0] == '--trace':
+        from imouse_trace import enable_tracing
+        enable_tracing(argv[1], process_name=f"imouse {argv[2] if len(argv) > 2 else ''}".strip())
+        argv = argv[2:]
+
+    # replay / gen / gen-text: reenviar tal cual al CLI original
+    if argv and argv[0] in PASSTHROUGH:
+        handler, _ = PASSTHROUGH[argv[0]]
+        return handler(argv[1:])
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.trace:
+        from imouse_trace import enable_tracing
+        enable_tracing(args.trace, process_name=f"imouse {args.command or ''}".strip())
+
+    if not args.command:
+        parser.print_help()
+        return 0
+
+    if not _check_device_options(args):
+        return 1
+
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
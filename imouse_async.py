@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+iMouse Async - API asyncio para controlar uno o varios dispositivos iMouse
+La temporización la lleva el event loop (deadlines sobre loop.time()) y las
+escrituras HID se ejecutan en un único hilo de I/O compartido, de modo que
+un solo proceso puede manejar muchos iPhones sin un hilo por dispositivo.
+
+Ejemplo:
+    async with AsyncIMouseClient(open_transport()) as phone:
+        await phone.tap(182, 333)
+        await phone.type_text("Hola")
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from imouse_hid_protocol import iMouseHIDProtocol, ButtonState
+from imouse_complete_keymap import char_to_imouse_packet
+from imouse_edit import edit_packets
+from imouse_gestures import swipe_path
+from imouse_transport import HIDTransport, KEY_RELEASE, open_transport
+
+
+_io_executor = None
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """Hilo de I/O dedicado (compartido por todos los clientes)"""
+    global _io_executor
+    if _io_executor is None:
+        _io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='imouse-io')
+    return _io_executor
+
+
+class AsyncIMouseClient:
+    """
+    Cliente asyncio para un dispositivo iMouse
+
+    Cada operación (tap, swipe, type_text, shortcut, replay) se serializa por
+    dispositivo con un asyncio.Lock; operaciones sobre distintos dispositivos
+    se intercalan libremente en el mismo event loop.
+    """
+
+    def __init__(self, transport: HIDTransport, screen_width: int = 365, screen_height: int = 667,
+                 io_executor: Optional[ThreadPoolExecutor] = None):
+        self.transport = transport
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.protocol = iMouseHIDProtocol(screen_width=screen_width, screen_height=screen_height)
+        self.io_executor = io_executor or get_io_executor()
+        self.stats = {'taps': 0, 'swipes': 0, 'chars': 0, 'shortcuts': 0, 'replays': 0, 'errors': 0}
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+        return False
+
+    async def close(self):
+        """Cierra el transporte desde el hilo de I/O"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.io_executor, self.transport.close)
+
+    # ===== Primitivas =====
+
+    async def send(self, packet) -> bool:
+        """Envía un paquete desde el hilo de I/O sin bloquear el event loop"""
+        loop = asyncio.get_running_loop()
+        ok = await loop.run_in_executor(self.io_executor, self.transport.send, packet)
+        if not ok:
+            self.stats['errors'] += 1
+        return ok
+
+    @staticmethod
+    async def sleep_until(deadline: float):
+        """Espera hasta un deadline absoluto en tiempo del event loop"""
+        delay = deadline - asyncio.get_running_loop().time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def send_timeline(self, timeline) -> bool:
+        """
+        Envía una secuencia [(offset_segundos, paquete), ...]
+
+        Los offsets son relativos al inicio, así los retrasos de un paso no
+        se acumulan en los siguientes.
+        """
+        start = asyncio.get_running_loop().time()
+        for offset, packet in timeline:
+            await self.sleep_until(start + offset)
+            if not await self.send(packet):
+                return False
+        return True
+
+    # ===== Operaciones de alto nivel =====
+
+    async def tap_target(self, name: str, **kwargs) -> bool:
+        """Click en un objetivo con nombre (ej: 'home.telegram', ver imouse_targets)"""
+        from imouse_targets import get_target_index
+
+        x, y = get_target_index().resolve_pixels(name, self.screen_width, self.screen_height)
+        return await self.tap(x, y, **kwargs)
+
+    async def tap(self, x: int, y: int, button: str = 'left', reset: bool = True,
+                  hold_time: float = 0.065) -> bool:
+        """Click (toque) en (x, y)"""
+        async with self._lock:
+            timeline = []
+            t = 0.0
+            if reset:
+                timeline.append((t, self.protocol.reset_position()))
+                t += 0.05
+            timeline.append((t, self.protocol.move_absolute(x, y)))
+            t += 0.1
+            if button == 'left':
+                timeline.append((t, self.protocol.left_down()))
+                timeline.append((t + hold_time, self.protocol.left_up()))
+            else:
+                timeline.append((t, self.protocol.right_down()))
+                timeline.append((t + hold_time, self.protocol.right_up()))
+
+            ok = await self.send_timeline(timeline)
+            if ok:
+                self.stats['taps'] += 1
+            return ok
+
+    async def swipe(self, start_x: int, start_y: int, end_x: int, end_y: int,
+                    duration: float = 0.3, steps: int = 10) -> bool:
+        """Swipe con easing desde (start_x, start_y) hasta (end_x, end_y)"""
+        async with self._lock:
+            step_delay = duration / steps
+            timeline = [
+                (0.0, self.protocol.reset_position()),
+                (0.05, self.protocol.move_absolute(start_x, start_y)),
+                (0.15, self.protocol.left_down()),
+            ]
+            t = 0.2
+            for x, y in swipe_path(start_x, start_y, end_x, end_y, steps):
+                timeline.append((t, self.protocol.move_absolute(x, y, button=ButtonState.LEFT)))
+                t += step_delay
+            timeline.append((t, self.protocol.left_up()))
+
+            ok = await self.send_timeline(timeline)
+            if ok:
+                self.stats['swipes'] += 1
+            return ok
+
+    async def type_text(self, text: str, typing_delay: float = 0.03) -> int:
+        """Escribe texto; devuelve el número de caracteres enviados"""
+        async with self._lock:
+            timeline = []
+            t = 0.0
+            for char in text:
+                packet = char_to_imouse_packet(char)
+                if packet is None:
+                    continue
+                timeline.append((t, packet))
+                timeline.append((t + typing_delay, KEY_RELEASE))
+                t += typing_delay * 1.5
+
+            if not await self.send_timeline(timeline):
+                return 0
+
+            sent = len(timeline) // 2
+            self.stats['chars'] += sent
+            return sent
+
+    async def edit_text(self, current: str, desired: str, typing_delay: float = 0.03,
+                        cursor: Optional[int] = None) -> int:
+        """
+        Cambia un campo de `current` a `desired` con el guion de edición
+        mínimo (imouse_edit); devuelve el número de teclas enviadas
+        """
+        async with self._lock:
+            timeline = []
+            t = 0.0
+            for packet in edit_packets(current, desired, cursor):
+                timeline.append((t, packet))
+                timeline.append((t + typing_delay, KEY_RELEASE))
+                t += typing_delay * 1.5
+
+            if not await self.send_timeline(timeline):
+                return 0
+
+            sent = len(timeline) // 2
+            self.stats['chars'] += sent
+            return sent
+
+    async def shortcut(self, scancode: int, modifier: int = 0x00, hold_time: float = 0.05) -> bool:
+        """Combinación de teclas (ej: Win+H → scancode 0x0b, modifier 0x08)"""
+        async with self._lock:
+            ok = await self.send_timeline([
+                (0.0, [0x00, 0xa2, modifier, 0x00, scancode]),
+                (hold_time, KEY_RELEASE),
+            ])
+            # Pequeña pausa después de soltar
+            await asyncio.sleep(0.05)
+            if ok:
+                self.stats['shortcuts'] += 1
+            return ok
+
+    async def run_shortcut(self, name: str, params: Optional[Dict[str, str]] = None) -> bool:
+        """Atajo de la tabla (combinación o secuencia, ver imouse_shortcuts) de una tirada"""
+        from imouse_shortcuts import get_shortcut_registry
+
+        timeline = get_shortcut_registry().compile(name, params)
+        async with self._lock:
+            ok = await self.send_timeline([(offset, packet) for offset, packet, _ in timeline])
+            if ok:
+                self.stats['shortcuts'] += 1
+            return ok
+
+    async def replay(self, capture_file: str, speed: float = 1.0) -> int:
+        """Reproduce un JSON de captura o una macro; devuelve el número de reportes enviados"""
+        from replay_imouse import load_packets, filter_out_packets, prepare_reports
+        from imouse_targets import profile_for
+
+        loop = asyncio.get_running_loop()
+        profile = profile_for(self.screen_width, self.screen_height)
+        packets = await loop.run_in_executor(None, load_packets, capture_file, profile)
+        reports = prepare_reports(filter_out_packets(packets), self.transport.report_size, speed)
+
+        async with self._lock:
+            timeline = [(target_time, data_list) for _, target_time, data_list, _ in reports]
+            start = loop.time()
+            sent = 0
+            for offset, data_list in timeline:
+                await self.sleep_until(start + offset)
+                if await self.send(data_list):
+                    sent += 1
+
+            self.stats['replays'] += 1
+            return sent
+
+
+async def _demo(num_devices: int, simulate: bool):
+    """Demo: varios dispositivos en paralelo desde un solo event loop"""
+    clients = []
+    for index in range(num_devices):
+        transport = open_transport(simulate=simulate, device_index=index)
+        if transport is None:
+            for client in clients:
+                await client.close()
+            return
+        clients.append(AsyncIMouseClient(transport))
+
+    print(f"📱 Controlando {len(clients)} dispositivo(s) en paralelo...")
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+
+    await asyncio.gather(*[
+        client.tap(182, 333) for client in clients
+    ])
+    await asyncio.gather(*[
+        client.swipe(182, 500, 182, 150, duration=0.2, steps=8) for client in clients
+    ])
+    await asyncio.gather(*[
+        client.type_text("Hola iPhone") for client in clients
+    ])
+
+    print(f"✅ Completado en {loop.time() - start:.3f}s")
+    for i, client in enumerate(clients, 1):
+        print(f"   [{i}] {client.stats} (reportes: {client.transport.stats['sent']})")
+        await client.close()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Demo de la API asyncio de iMouse')
+    parser.add_argument('-n', '--devices', type=int, default=1,
+                        help='Número de dispositivos a controlar')
+    parser.add_argument('--simulate', action='store_true',
+                        help='Usar dispositivos simulados (sin USB)')
+    args = parser.parse_args()
+
+    asyncio.run(_demo(args.devices, args.simulate))
+
+
+if __name__ == "__main__":
+    main()
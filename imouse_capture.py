@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+iMouse Capture - Captura de input reports a alta tasa
+Guarda los reportes que devuelve el dongle en un ring buffer preasignado
+(sin crecer en memoria), los vuelca a disco en formato binario desde un hilo
+aparte y calcula estadísticas de tasa en vivo. Pensado para grabar durante
+horas mientras se estresa la ruta de envío.
+
+Formato del archivo (little endian):
+    Cabecera  '<4sHHd'            magic b'IMCP', versión, report_size, inicio (epoch)
+    Registros '<dH' + report_size  timestamp (perf_counter), longitud, datos
+"""
+
+import time
+import struct
+import threading
+from array import array
+from typing import Iterator, List, Optional, Tuple
+
+
+CAPTURE_MAGIC = b'IMCP'
+CAPTURE_FORMAT_VERSION = 1
+CAPTURE_HEADER = struct.Struct('<4sHHd')
+
+DEFAULT_CAPACITY = 65536
+DEFAULT_REPORT_SIZE = 64
+
+
+def record_struct(report_size: int) -> struct.Struct:
+    """Estructura de un registro de captura para un tamaño de reporte"""
+    return struct.Struct(f'<dH{report_size}s')
+
+
+class RateStats:
+    """Estadísticas de tasa en vivo (ventanas de `window` segundos)"""
+
+    def __init__(self, window: float = 1.0):
+        self.window = window
+        self.total = 0
+        self.total_bytes = 0
+        self.first = None
+        self.last = None
+        self.max_gap = 0.0
+        self.rate = 0.0
+        self.peak_rate = 0.0
+        self._window_start = None
+        self._window_count = 0
+
+    def update(self, timestamp: float, size: int):
+        if self.first is None:
+            self.first = timestamp
+            self._window_start = timestamp
+        elif timestamp - self.last > self.max_gap:
+            self.max_gap = timestamp - self.last
+
+        self.last = timestamp
+        self.total += 1
+        self.total_bytes += size
+        self._window_count += 1
+
+        elapsed = timestamp - self._window_start
+        if elapsed >= self.window:
+            self.rate = self._window_count / elapsed
+            self.peak_rate = max(self.peak_rate, self.rate)
+            self._window_start = timestamp
+            self._window_count = 0
+
+    def snapshot(self) -> dict:
+        duration = (self.last - self.first) if self.total > 1 else 0.0
+        return {
+            'reports': self.total,
+            'bytes': self.total_bytes,
+            'duration_s': duration,
+            'rate': self.rate,
+            'peak_rate': self.peak_rate,
+            'mean_rate': self.total / duration if duration > 0 else 0.0,
+            'max_gap_ms': self.max_gap * 1000.0,
+        }
+
+
+class CaptureRing:
+    """
+    Ring buffer preasignado de reportes con timestamp
+
+    Cada reporte ocupa un slot fijo de `report_size` bytes; cuando se llena
+    se sobrescribe el más antiguo. Los lectores usan números de secuencia
+    monótonos (ver read_since) y se enteran de cuántos reportes perdieron.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, report_size: int = DEFAULT_REPORT_SIZE,
+                 stats_window: float = 1.0):
+        self.capacity = capacity
+        self.report_size = report_size
+        self.stats = RateStats(stats_window)
+        self._data = bytearray(capacity * report_size)
+        self._lengths = array('H', [0]) * capacity
+        self._times = array('d', [0.0]) * capacity
+        self._head = 0
+        self._lock = threading.Lock()
+
+    @property
+    def total(self) -> int:
+        """Reportes recibidos desde el inicio (siguiente número de secuencia)"""
+        return self._head
+
+    def __len__(self) -> int:
+        return min(self._head, self.capacity)
+
+    def append(self, data, timestamp: Optional[float] = None):
+        """Guarda un reporte (lista de ints o bytes); llamado desde el callback HID"""
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        size = min(len(data), self.report_size)
+
+        with self._lock:
+            slot = self._head % self.capacity
+            offset = slot * self.report_size
+            self._data[offset:offset + size] = bytes(data[:size])
+            self._lengths[slot] = size
+            self._times[slot] = timestamp
+            self._head += 1
+            self.stats.update(timestamp, size)
+
+    def read_since(self, seq: int) -> Tuple[List[Tuple[float, bytes]], int, int]:
+        """
+        Copia los reportes con número de secuencia >= seq
+
+        Returns:
+            tuple: ([(timestamp, bytes), ...], siguiente_seq, perdidos)
+        """
+        with self._lock:
+            head = self._head
+            oldest = max(0, head - self.capacity)
+            lost = max(0, oldest - seq)
+            records = []
+            for current in range(max(seq, oldest), head):
+                slot = current % self.capacity
+                offset = slot * self.report_size
+                records.append((self._times[slot],
+                                bytes(self._data[offset:offset + self._lengths[slot]])))
+        return records, head, lost
+
+    def pack_since(self, seq: int, record: struct.Struct) -> Tuple[bytes, int, int, int]:
+        """
+        Igual que read_since pero devuelve los registros ya empaquetados
+
+        Bajo el lock solo se copian los tramos del ring (como mucho dos, si
+        dan la vuelta); el empaquetado se hace fuera para no bloquear append()
+        en el callback HID aunque haya mucho pendiente.
+
+        Returns:
+            tuple: (bytes, registros, siguiente_seq, perdidos)
+        """
+        with self._lock:
+            head = self._head
+            oldest = max(0, head - self.capacity)
+            lost = max(0, oldest - seq)
+            start = max(seq, oldest)
+            count = head - start
+            first = start % self.capacity
+            spans = [(first, min(first + count, self.capacity))]
+            if first + count > self.capacity:
+                spans.append((0, first + count - self.capacity))
+            copies = [(self._times[a:b], self._lengths[a:b],
+                       bytes(self._data[a * self.report_size:b * self.report_size]))
+                      for a, b in spans if b > a]
+
+        buffer = bytearray(record.size * count)
+        i = 0
+        size = self.report_size
+        for times, lengths, data in copies:
+            for j, (timestamp, length) in enumerate(zip(times, lengths)):
+                record.pack_into(buffer, i * record.size, timestamp, length, data[j * size:(j + 1) * size])
+                i += 1
+        return bytes(buffer), count, head, lost
+
+
+class SpillWriter:
+    """
+    Vuelca el ring a un archivo binario desde un hilo en segundo plano
+
+    Si el escritor se queda atrás más de `capacity` reportes, los perdidos
+    se cuentan en `lost` (el productor nunca se bloquea).
+    """
+
+    def __init__(self, ring: CaptureRing, path: str, interval: float = 0.25):
+        self.ring = ring
+        self.path = path
+        self.interval = interval
+        self.record = record_struct(ring.report_size)
+        self.written = 0
+        self.lost = 0
+        self._next = ring.total
+        self._file = open(path, 'wb')
+        self._file.write(CAPTURE_HEADER.pack(CAPTURE_MAGIC, CAPTURE_FORMAT_VERSION,
+                                             ring.report_size, time.time()))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name='imouse-capture-spill')
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        """Escribe en disco lo pendiente del ring"""
+        chunk, count, self._next, lost = self.ring.pack_since(self._next, self.record)
+        if chunk:
+            self._file.write(chunk)
+            self._file.flush()
+        self.written += count
+        self.lost += lost
+
+    def close(self):
+        """Detiene el hilo, vuelca lo pendiente y cierra el archivo"""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.flush()
+        self._file.close()
+
+
+def read_capture(path: str) -> Iterator[Tuple[float, bytes]]:
+    """Lee un archivo de captura binario: genera (timestamp, bytes)"""
+    with open(path, 'rb') as f:
+        header = f.read(CAPTURE_HEADER.size)
+        magic, version, report_size, _ = CAPTURE_HEADER.unpack(header)
+        if magic != CAPTURE_MAGIC:
+            raise ValueError(f"Magic inválido: {magic!r}")
+        if version != CAPTURE_FORMAT_VERSION:
+            raise ValueError(f"Versión de formato no soportada: {version}")
+
+        record = record_struct(report_size)
+        body = f.read()
+
+    usable = len(body) - len(body) % record.size
+    for timestamp, size, data in record.iter_unpack(body[:usable]):
+        yield timestamp, data[:size]
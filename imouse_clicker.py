@@ -5,90 +5,60 @@ Pide coordenadas y envía clicks directamente al dispositivo
 """
 
 import sys
-import time
 import os
 
-try:
-    import pywinusb.hid as hid
-except ImportError:
-    print("❌ Error: pywinusb no está instalado")
-    print("   pip install pywinusb")
-    sys.exit(1)
-
 from imouse_hid_protocol import iMouseHIDProtocol, ButtonState
+from imouse_trace import get_tracer, STAGE_WAIT
+from imouse_clock import get_clock
+from imouse_transport import HIDTransport
 
 
 class InteractiveClicker:
-    def __init__(self, screen_width=365, screen_height=667):
+    def __init__(self, screen_width=365, screen_height=667, device=None):
         self.screen_width = screen_width
         self.screen_height = screen_height
         self.protocol = iMouseHIDProtocol(screen_width=screen_width, screen_height=screen_height)
-        self.device = None
-        self.out_report = None
+        self.device = device
+        self.transport = None
         self.report_size = 0
         self.stats = {'clicks': 0, 'double_clicks': 0, 'drags': 0, 'errors': 0}
 
     def connect_device(self):
         """Conecta con el dispositivo iMouse"""
-        VENDOR_ID = 0x720a
-        PRODUCT_ID = 0x3dab
-
         print("🔌 Conectando con dispositivo iMouse...")
-        devices = hid.HidDeviceFilter(vendor_id=VENDOR_ID, product_id=PRODUCT_ID).get_devices()
+        self.transport = HIDTransport(device=self.device)
 
-        if not devices:
-            print(f"❌ Dispositivo no encontrado: 0x{VENDOR_ID:04x}:0x{PRODUCT_ID:04x}")
+        if not self.transport.open():
             return False
 
-        self.device = devices[0]
-
-        try:
-            self.device.open()
-        except Exception as e:
-            print(f"❌ No se pudo abrir el dispositivo: {e}")
-            return False
+        self.device = self.transport.device
+        self.transport.on_reconnect.append(self.on_reconnect)
+        print(f"✅ Conectado a: {self.transport.product_name}")
 
-        print(f"✅ Conectado a: {self.device.product_name}")
-
-        # Obtener output report
-        for report in self.device.find_output_reports():
-            self.out_report = report
-            break
-
-        if not self.out_report:
-            print("❌ No se encontró output report")
-            self.device.close()
-            return False
-
-        self.report_size = len(self.out_report.get_raw_data())
+        self.report_size = self.transport.report_size
         print(f"   Report size: {self.report_size} bytes")
         print(f"   Resolución: {self.screen_width}x{self.screen_height}")
         return True
 
+    def on_reconnect(self):
+        """Restaura el estado del protocolo tras reconectar el dongle"""
+        self.protocol.reset_state()
+
     def send_packet(self, packet, delay=0):
         """Envía un paquete al dispositivo"""
-        if not self.out_report:
+        if not self.transport:
             return False
 
-        try:
-            # Ajustar al tamaño del reporte
-            data_list = list(packet)
-            while len(data_list) < self.report_size:
-                data_list.append(0x00)
-
-            self.out_report.set_raw_data(data_list)
-            self.out_report.send()
-
-            if delay > 0:
-                time.sleep(delay)
-
-            return True
-
-        except Exception as e:
+        if not self.transport.send(packet):
             self.stats['errors'] += 1
-            print(f"❌ Error enviando paquete: {e}")
             return False
 
+        if delay > 0:
+            with get_tracer().span('sleep', STAGE_WAIT, delay=delay):
+                get_clock().sleep(delay)
+
+        return True
+
     def perform_click(self, x, y, button='left', reset=True):
         """Realiza un click simple en las coordenadas especificadas"""
         print(f"\n🖱️  Click {button} en ({x}, {y})")
@@ -337,8 +307,8 @@ class InteractiveClicker:
 
         finally:
             # Cerrar dispositivo
-            if self.device:
-                self.device.close()
+            if self.transport:
+                self.transport.close()
 
             # Mostrar estadísticas
             print()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+iMouse Clock - Reloj de la capa de temporización (real o virtual)
+El replay, los swipes, el typer, los atajos y el simulado esperan con
+get_clock().sleep() y miden con get_clock().now(). Por defecto es el reloj
+real (time.perf_counter / time.sleep); con un VirtualClock las esperas solo
+avanzan el tiempo virtual, así que una macro de 30 minutos contra un
+SimulatedDevice se ejecuta en milisegundos y el registro del simulado tiene
+exactamente los timestamps de la línea de tiempo.
+
+    with use_clock(VirtualClock()):
+        play_reports(transport, reports)
+    device.to_capture()             # [{'bytes', 'timestamp', ...}, ...]
+
+Limitaciones: los acks simulados, stall() y los plazos de escritura del
+transporte siguen en tiempo real (dependen de otros hilos). El reloj
+virtual solo tiene sentido con un dispositivo simulado.
+
+CLI: reproduce capturas/macros con reloj virtual y compara un digest de lo
+recibido, para comprobar una biblioteca de macros en cada cambio:
+
+    python imouse_clock.py samples/*.json samples/macros/*.json --save digests.json
+    python imouse_clock.py samples/*.json samples/macros/*.json --check digests.json
+    python imouse_clock.py samples/demo.json -o trazas/
+
+Los digests (y las trazas de -o) se guardan por ruta relativa a la raíz
+común de los archivos (o a --root), así samples/llamada.json y
+samples/macros/llamada.json no se pisan. Para comparar con --check un
+subconjunto de la biblioteca, fija la misma raíz con --root.
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from contextlib import contextmanager
+
+
+class RealClock:
+    """Reloj real: time.perf_counter() y time.sleep()"""
+    virtual = False
+
+    def now(self) -> float:
+        return time.perf_counter()
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class VirtualClock:
+    """
+    Reloj virtual: sleep() avanza el tiempo al instante sin esperar
+
+    Pensado para un único hilo que marca el ritmo (el que hace el replay);
+    el avance está protegido con un lock por si otros hilos leen now().
+    """
+    virtual = True
+
+    def __init__(self, start: float = 0.0):
+        self._now = start
+        self._lock = threading.Lock()
+        self.sleeps = 0
+
+    def now(self) -> float:
+        return self._now
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            self.advance(seconds)
+
+    def advance(self, seconds: float):
+        with self._lock:
+            self._now += seconds
+            self.sleeps += 1
+
+
+# ===== RELOJ GLOBAL =====
+_clock = RealClock()
+
+
+def get_clock():
+    """Devuelve el reloj global (real salvo set_clock/use_clock)"""
+    return _clock
+
+
+def set_clock(clock=None):
+    """Instala un reloj global (None = reloj real). Devuelve el anterior"""
+    global _clock
+    previous = _clock
+    _clock = clock if clock is not None else RealClock()
+    return previous
+
+
+@contextmanager
+def use_clock(clock):
+    """Usa `clock` como reloj global dentro del bloque"""
+    previous = set_clock(clock)
+    try:
+        yield clock
+    finally:
+        set_clock(previous)
+
+
+def trace_digest(capture: list) -> str:
+    """sha256 de los timestamps (µs) y bytes de una traza de to_capture()"""
+    digest = hashlib.sha256()
+    for entry in capture:
+        digest.update(f"{round(entry['timestamp'] * 1e6)}:{bytes(entry['bytes']).hex()}\n".encode())
+    return digest.hexdigest()
+
+
+def run_virtual(capture_file: str, speed: float = 1.0, profile=None, codec=None) -> dict:
+    """
+    Reproduce una captura o macro con reloj virtual contra un dispositivo simulado
+
+    Returns:
+        dict: trace (to_capture), digest, duration (s virtuales), wall (s reales)
+
+    Raises:
+        OSError, ValueError: si la captura no se puede cargar o abrir
+    """
+    from imouse_simulator import SimulatedDevice
+    from imouse_transport import HIDTransport
+    # Ejecutado como script este módulo es __main__: el reloj global que
+    # consultan los demás módulos es el de imouse_clock
+    from imouse_clock import use_clock, VirtualClock
+    from replay_imouse import load_packets, filter_out_packets, prepare_reports, play_reports
+
+    out_packets = filter_out_packets(load_packets(capture_file, profile))
+    device = SimulatedDevice()
+    # Escritura bloqueante: sin hilo escritor ni plazos en tiempo real
+    transport = HIDTransport(device=device, codec=codec, write_timeout=0, auto_reconnect=False)
+    if not transport.open():
+        raise OSError(f"No se pudo abrir el dispositivo simulado para {capture_file}")
+
+    started = time.perf_counter()
+    with use_clock(VirtualClock()) as clock:
+        reports = prepare_reports(out_packets, transport.report_size, speed, codec=transport.codec)
+        begin = clock.now()
+        sent, errors, _, _ = play_reports(transport, reports, verbose=False, encoded=True) if reports else (0, 0, 0.0, 0)
+        duration = clock.now() - begin
+    wall = time.perf_counter() - started
+    transport.close()
+
+    trace = device.to_capture()
+    return {'file': capture_file, 'reports': len(reports), 'sent': sent, 'errors': errors,
+            'duration': duration, 'wall': wall, 'digest': trace_digest(trace), 'trace': trace}
+
+
+def library_keys(paths, root=None) -> dict:
+    """
+    Ruta → clave de digest: ruta relativa (con '/') a `root` o a la raíz
+    común de los archivos
+
+    Raises:
+        ValueError: si un archivo queda fuera de `root`
+    """
+    if root is None:
+        root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths]) if paths else ''
+    keys = {}
+    for path in paths:
+        key = os.path.relpath(os.path.abspath(path), os.path.abspath(root)).replace(os.sep, '/')
+        if key.startswith('../'):
+            raise ValueError(f"{path} está fuera de la raíz {root}")
+        keys[path] = key
+    return keys
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    from imouse_targets import PROFILES, DEFAULT_PROFILE
+
+    parser = argparse.ArgumentParser(description='Replay con reloj virtual contra el dispositivo simulado')
+    parser.add_argument('files', nargs='+', help='Capturas JSON o macros')
+    parser.add_argument('-s', '--speed', type=float, default=1.0, help='Velocidad de reproducción')
+    parser.add_argument('--profile', default=DEFAULT_PROFILE, choices=sorted(PROFILES),
+                        help='Perfil para compilar macros (default: iphone)')
+    parser.add_argument('-o', '--output-dir', help='Guardar la traza recibida de cada archivo como captura JSON')
+    parser.add_argument('--root', help='Raíz para las claves de los digests (default: raíz común de los archivos)')
+    parser.add_argument('--save', metavar='DIGESTS_JSON', help='Guardar los digests de las trazas')
+    parser.add_argument('--check', metavar='DIGESTS_JSON', help='Comparar con digests guardados')
+    args = parser.parse_args(argv)
+
+    if args.speed <= 0:
+        print("❌ --speed debe ser > 0")
+        return 1
+
+    expected = {}
+    if args.check:
+        try:
+            with open(args.check, 'r', encoding='utf-8') as f:
+                expected = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"❌ {e}")
+            return 1
+
+    try:
+        keys = library_keys(args.files, args.root)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    digests = {}
+    failures = 0
+    for path in args.files:
+        try:
+            run = run_virtual(path, args.speed, args.profile)
+        except (OSError, ValueError) as e:
+            print(f"❌ {path}: {e}")
+            failures += 1
+            continue
+
+        key = keys[path]
+        digests[key] = run['digest']
+        status = '✅'
+        note = ''
+        if args.check:
+            if key not in expected:
+                status, note = '⚠️ ', ' (sin digest guardado)'
+            elif expected[key] != run['digest']:
+                status, note = '❌', ' (la traza ha cambiado)'
+                failures += 1
+        if run['errors'] or run['sent'] != run['reports']:
+            status = '❌'
+            failures += 1
+        print(f"{status} {path}: {run['sent']}/{run['reports']} reportes, "
+              f"{run['duration']:.3f}s virtuales en {run['wall'] * 1000:.1f} ms{note}")
+
+        if args.output_dir:
+            target = os.path.join(args.output_dir, *key.split('/'))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'w', encoding='utf-8') as f:
+                json.dump(run['trace'], f, indent=2)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(digests, f, indent=2, sort_keys=True)
+        print(f"💾 Digests guardados en: {args.save}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
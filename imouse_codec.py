@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+iMouse Codec - Codificación de reportes hacia el dongle
+Decide cómo viajan los reportes que generan las herramientas (siempre en el
+formato HID de 9 bytes [0x00][cmd][...]) según el firmware del dongle:
+
+    hid     Reporte HID de 9 bytes rellenado hasta report_size (todas las
+            revisiones de firmware)
+    framed  Trama de 11 bytes con cabecera 'W' 0xAB y checksum (protocolo
+            alternativo de MouseKeyItem.dll). Solo cubre botones y
+            movimiento relativo en un eje; el resto de reportes (teclado,
+            absoluto, restart) sigue yendo como HID
+
+La negociación lee la revisión de firmware del dispositivo (version_number
+del descriptor USB en pywinusb) y el tamaño del output report: el modo
+enmarcado necesita firmware >= FRAMED_MIN_FIRMWARE y reportes de al menos
+FRAME_SIZE bytes.
+
+Selección: HIDTransport(codec=...) o variable de entorno IMOUSE_CODEC
+(auto | hid | framed).
+"""
+
+import os
+from typing import Dict, Iterable, List, Optional
+
+
+CODEC_AUTO = "auto"
+CODEC_HID = "hid"
+CODEC_FRAMED = "framed"
+CODECS = (CODEC_AUTO, CODEC_HID, CODEC_FRAMED)
+
+CODEC_ENV_VAR = "IMOUSE_CODEC"
+
+FRAME_MAGIC = (ord('W'), 0xAB)
+FRAME_SIZE = 11
+FRAMED_MIN_FIRMWARE = 0x37           # Primera revisión con movimiento enmarcado (variante B)
+
+FRAME_IDLE = 0x04                    # Variante A: solo botón (firmware < 0x37)
+FRAME_MOVE = 0x05                    # Variante B: botón + delta
+
+MOVE_RELATIVE = 0xa1
+
+
+class FrameError(ValueError):
+    """Trama W-0xAB inválida (magic, tamaño o checksum)"""
+
+
+# ===== Tramas W 0xAB =====
+
+def frame_checksum(frame) -> int:
+    """Checksum de una trama según su variante (byte 3)"""
+    if frame[3] == FRAME_IDLE:
+        return sum(frame[0:10]) & 0xFF
+    return (frame[6] + frame[7] + 0x0d) & 0xFF
+
+
+def build_frame(button: int, delta: int = 0, firmware: int = FRAMED_MIN_FIRMWARE) -> bytes:
+    """
+    Construye una trama de 11 bytes (mismo formato que
+    iMouseHIDProtocol.alternative_protocol_move)
+
+    Args:
+        button: Estado de botones
+        delta: Desplazamiento (24 bits con signo)
+        firmware: Revisión de firmware (decide la variante sin movimiento)
+    """
+    frame = bytearray(FRAME_SIZE)
+    frame[0], frame[1] = FRAME_MAGIC
+    frame[2] = 0x00                               # Reserved
+
+    if firmware < FRAMED_MIN_FIRMWARE and delta == 0:
+        frame[3] = FRAME_IDLE                     # Command type
+        frame[4] = 0x07                           # Subtype
+        frame[5] = 0x02                           # Data length
+        frame[6] = button
+    else:
+        frame[3] = FRAME_MOVE                     # Command type
+        frame[4] = 0x05                           # Subtype
+        frame[5] = 0x01                           # Data length
+        frame[6] = button
+        frame[7] = delta & 0xFF
+        frame[8] = (delta >> 8) & 0xFF
+        frame[9] = (delta >> 16) & 0xFF
+
+    frame[10] = frame_checksum(frame)
+    return bytes(frame)
+
+
+def is_frame(data) -> bool:
+    return len(data) >= 2 and data[0] == FRAME_MAGIC[0] and data[1] == FRAME_MAGIC[1]
+
+
+def validate_frame(frame) -> bool:
+    """True si la trama tiene magic, tamaño y checksum correctos"""
+    return (len(frame) >= FRAME_SIZE and is_frame(frame)
+            and frame[3] in (FRAME_IDLE, FRAME_MOVE)
+            and frame[10] == frame_checksum(frame))
+
+
+def decode_frame(frame) -> Dict[str, int]:
+    """
+    Decodifica una trama W-0xAB
+
+    Returns:
+        dict: command, subtype, length, button, delta
+
+    Raises:
+        FrameError: si la trama no es válida
+    """
+    if len(frame) < FRAME_SIZE:
+        raise FrameError(f"Trama truncada: {len(frame)} bytes")
+    if not is_frame(frame):
+        raise FrameError(f"Magic inválido: {frame[0]:02x} {frame[1]:02x}")
+    if frame[3] not in (FRAME_IDLE, FRAME_MOVE):
+        raise FrameError(f"Tipo de comando desconocido: 0x{frame[3]:02x}")
+    if frame[10] != frame_checksum(frame):
+        raise FrameError(f"Checksum inválido: 0x{frame[10]:02x} (esperado 0x{frame_checksum(frame):02x})")
+
+    delta = frame[7] | (frame[8] << 8) | (frame[9] << 16)
+    if delta & 0x800000:
+        delta -= 1 << 24
+
+    return {
+        'command': frame[3],
+        'subtype': frame[4],
+        'length': frame[5],
+        'button': frame[6],
+        'delta': delta,
+    }
+
+
+# ===== Codecs =====
+
+class HIDCodec:
+    """Reportes HID de 9 bytes rellenados hasta report_size"""
+
+    name = CODEC_HID
+
+    def __init__(self, report_size: int = 9):
+        self.report_size = report_size
+        self.stats = {'encoded': 0, 'framed': 0, 'invalid': 0}
+
+    def pad(self, packet) -> list:
+        data_list = list(packet)[:self.report_size]
+        if len(data_list) < self.report_size:
+            data_list.extend([0x00] * (self.report_size - len(data_list)))
+        return data_list
+
+    def encode(self, packet) -> list:
+        """Reporte listo para set_raw_data"""
+        self.stats['encoded'] += 1
+        return self.pad(packet)
+
+    def encode_batch(self, packets: Iterable) -> List[list]:
+        """Codifica un flujo completo de una vez (ej: al preparar un replay)"""
+        return [self.encode(packet) for packet in packets]
+
+    def validate(self, data) -> bool:
+        """Valida un input report; en modo HID no hay trama que comprobar"""
+        return True
+
+
+class FramedCodec(HIDCodec):
+    """
+    Tramas W-0xAB para botones y movimiento relativo; HID para el resto
+
+    Un reporte 0xa1 se convierte en trama si su delta Y es 0 (la trama solo
+    lleva un desplazamiento). Las tramas se cachean por contenido, así que
+    en encode_batch cada checksum distinto se calcula una sola vez.
+    """
+
+    name = CODEC_FRAMED
+
+    def __init__(self, report_size: int = FRAME_SIZE, firmware: int = FRAMED_MIN_FIRMWARE):
+        if report_size < FRAME_SIZE:
+            raise ValueError(f"El modo enmarcado necesita reportes de {FRAME_SIZE} bytes (hay {report_size})")
+        super().__init__(report_size)
+        self.firmware = firmware
+        self._cache: Dict[bytes, list] = {}
+
+    def to_frame(self, packet) -> Optional[bytes]:
+        """Trama equivalente a un reporte HID, o None si no es representable"""
+        if len(packet) < 9 or packet[0] != 0x00 or packet[1] != MOVE_RELATIVE:
+            return None
+        if packet[6] or packet[7]:
+            return None
+
+        delta = packet[3] | (packet[4] << 8) | (packet[5] << 16)
+        if delta & 0x800000:
+            delta -= 1 << 24
+        return build_frame(packet[2], delta, self.firmware)
+
+    def encode(self, packet) -> list:
+        key = bytes(packet)
+        cached = self._cache.get(key)
+        if cached is None:
+            frame = self.to_frame(key)
+            cached = self.pad(frame if frame is not None else key)
+            if len(self._cache) < 4096:
+                self._cache[key] = cached
+
+        self.stats['encoded'] += 1
+        if is_frame(cached):
+            self.stats['framed'] += 1
+        return list(cached)
+
+    def validate(self, data) -> bool:
+        if is_frame(data) and not validate_frame(data):
+            self.stats['invalid'] += 1
+            return False
+        return True
+
+
+def negotiate_codec(device, report_size: int, mode: Optional[str] = None,
+                    firmware: Optional[int] = None, verbose: bool = True) -> HIDCodec:
+    """
+    Elige el codec para un dispositivo abierto
+
+    Args:
+        device: HidDevice / SimulatedDevice (se lee version_number)
+        report_size: Tamaño del output report
+        mode: auto | hid | framed (default: IMOUSE_CODEC o auto)
+        firmware: Forzar la revisión de firmware en vez de leerla
+    """
+    mode = mode or os.environ.get(CODEC_ENV_VAR) or CODEC_AUTO
+    if mode not in CODECS:
+        raise ValueError(f"Codec desconocido: {mode} (opciones: {', '.join(CODECS)})")
+
+    if firmware is None:
+        firmware = getattr(device, 'version_number', None)
+
+    if mode == CODEC_HID:
+        return HIDCodec(report_size)
+
+    supported = firmware is not None and firmware >= FRAMED_MIN_FIRMWARE and report_size >= FRAME_SIZE
+
+    if mode == CODEC_FRAMED and not supported:
+        if verbose:
+            fw = f"0x{firmware:02x}" if firmware is not None else "desconocido"
+            print(f"⚠️  Firmware {fw} / reporte de {report_size} bytes sin modo W-0xAB, usando HID")
+        return HIDCodec(report_size)
+
+    if supported:
+        return FramedCodec(report_size, firmware)
+    return HIDCodec(report_size)
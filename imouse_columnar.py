@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+iMouse Columnar - Archivo de resultados por columnas
+Cada columna se guarda como un bloque contiguo de array.array, así se puede
+leer solo la columna que se quiere filtrar sin parsear el resto.
+
+Formato:
+    Cabecera  '<4sHI'  magic b'IMCL', versión, longitud de la cabecera JSON
+    JSON               filas, metadatos y descripción de columnas
+    Bloques            datos de cada columna (little endian), uno tras otro
+
+La cabecera JSON describe cada columna:
+    {"rows": N, "meta": {...}, "columns": {"nombre": {"type": "I", "width": 1,
+     "offset": ..., "nbytes": ...}, ...}}
+
+`width` > 1 indica columnas de ancho fijo (ej: los bytes de un reporte),
+guardadas aplanadas: la fila i ocupa [i * width, (i + 1) * width).
+"""
+
+import sys
+import json
+import struct
+from array import array
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional
+
+
+COLUMNAR_MAGIC = b'IMCL'
+COLUMNAR_FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHI')
+
+
+def save_columnar(path: str, columns: Dict[str, array], rows: int,
+                  widths: Optional[Dict[str, int]] = None, meta: Optional[dict] = None):
+    """
+    Guarda columnas (array.array) en un archivo columnar
+
+    Args:
+        columns: {nombre: array} con `rows * width` elementos cada una
+        widths: Ancho por fila de las columnas de ancho fijo (default 1)
+        meta: Metadatos libres (se guardan en la cabecera)
+    """
+    widths = widths or {}
+    header = {'rows': rows, 'meta': meta or {}, 'columns': {}}
+
+    offset = 0
+    for name, column in columns.items():
+        width = widths.get(name, 1)
+        if len(column) != rows * width:
+            raise ValueError(f"Columna '{name}': {len(column)} elementos, esperados {rows * width}")
+        nbytes = len(column) * column.itemsize
+        header['columns'][name] = {'type': column.typecode, 'width': width,
+                                   'offset': offset, 'nbytes': nbytes}
+        offset += nbytes
+
+    header_bytes = json.dumps(header).encode('utf-8')
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(COLUMNAR_MAGIC, COLUMNAR_FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for column in columns.values():
+            if sys.byteorder != 'little':
+                column = array(column.typecode, column)
+                column.byteswap()
+            column.tofile(f)
+
+
+def read_header(path: str) -> dict:
+    """Lee solo la cabecera (filas, metadatos y columnas disponibles)"""
+    with open(path, 'rb') as f:
+        return _read_header(f)[0]
+
+
+def _read_header(f):
+    magic, version, length = HEADER.unpack(f.read(HEADER.size))
+    if magic != COLUMNAR_MAGIC:
+        raise ValueError(f"Magic inválido: {magic!r}")
+    if version != COLUMNAR_FORMAT_VERSION:
+        raise ValueError(f"Versión de formato no soportada: {version}")
+    header = json.loads(f.read(length).decode('utf-8'))
+    return header, f.tell()
+
+
+def load_columnar(path: str, names: Optional[Iterable[str]] = None) -> Dict[str, array]:
+    """
+    Carga columnas de un archivo columnar
+
+    Args:
+        names: Columnas a leer (default: todas); el resto no se toca
+
+    Returns:
+        dict: {nombre: array}
+    """
+    with open(path, 'rb') as f:
+        header, data_start = _read_header(f)
+        columns = header['columns']
+        names = list(columns) if names is None else list(names)
+
+        result = {}
+        for name in names:
+            if name not in columns:
+                raise KeyError(f"Columna desconocida: {name} (disponibles: {', '.join(columns)})")
+            info = columns[name]
+            column = array(info['type'])
+            f.seek(data_start + info['offset'])
+            column.frombytes(f.read(info['nbytes']))
+            if sys.byteorder != 'little':
+                column.byteswap()
+            result[name] = column
+
+    return result
+
+
+def load_rows(path: str, names: Iterable[str], rows: List[int]) -> Dict[str, array]:
+    """
+    Carga solo las filas `rows` (índices crecientes) de algunas columnas
+
+    Con pocas filas se lee cada una con seek; si son muchas se lee el
+    bloque de la columna y se copian las filas con itemgetter.
+
+    Returns:
+        dict: {nombre: array} con len(rows) * width elementos
+    """
+    if not rows:
+        return {name: array(info['type']) for name, info in read_header(path)['columns'].items()
+                if name in names}
+
+    with open(path, 'rb') as f:
+        header, data_start = _read_header(f)
+        columns = header['columns']
+        sparse = len(rows) * 8 < header['rows']
+        getters = {}            # Bytes por fila → itemgetter de las filas (lectura densa)
+
+        result = {}
+        for name in names:
+            if name not in columns:
+                raise KeyError(f"Columna desconocida: {name} (disponibles: {', '.join(columns)})")
+            info = columns[name]
+            column = array(info['type'])
+            size = info['width'] * column.itemsize
+            start = data_start + info['offset']
+            if sparse:
+                chunks = []
+                for row in rows:
+                    f.seek(start + row * size)
+                    chunks.append(f.read(size))
+                column.frombytes(b''.join(chunks))
+            elif len(rows) == header['rows']:
+                f.seek(start)
+                column.frombytes(f.read(info['nbytes']))
+            else:
+                f.seek(start)
+                block = f.read(info['nbytes'])
+                if size not in getters:
+                    getters[size] = itemgetter(*[slice(row * size, (row + 1) * size) for row in rows])
+                picked = getters[size](block)
+                column.frombytes(b''.join(picked) if len(rows) > 1 else picked)
+            if sys.byteorder != 'little':
+                column.byteswap()
+            result[name] = column
+
+    return result
+
+
+def row_slice(column: array, width: int, row: int):
+    """Elementos de la fila `row` de una columna de ancho fijo"""
+    return column[row * width:(row + 1) * width]
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+iMouse Conform - Conformidad de una traza observada con la captura de origen
+Tras un replay no hay forma de demostrar que el dispositivo recibió lo que
+la captura pretendía, en orden y a tiempo. Este módulo alinea el flujo de
+reportes de la captura (o macro) con una traza observada (registro del
+simulado, sniffer de hidraw o captura del analizador en cualquier formato
+de imouse_reports) y calcula, en una pasada vectorizada con NumPy:
+
+    latencia por reporte   respecto a la línea de tiempo de la captura
+    missing                reportes de la captura que no aparecen
+    duplicated             reportes observados de más con bytes de la captura
+    unexpected             reportes observados que la captura no contiene
+    reordered              reportes que llegan después de uno posterior
+
+Alineación: cada reporte observado se empareja con el de la captura con los
+mismos bytes más cercano a su tiempo objetivo, tras estimar el desfase entre
+relojes. Un reporte repetido (ej: 'release') solo se distingue si la
+latencia no llega a la mitad del hueco entre dos iguales. La latencia se
+mide desde el primer reporte emparejado (--align first) o quitando la
+mediana del desfase (--align median, solo jitter).
+
+Las tolerancias (Tolerances, flags o --tolerances JSON) deciden el código
+de salida, así las regresiones de temporización de las macros se detectan
+automáticamente:
+
+    python imouse_conform.py samples/demo.json trazas/demo.json
+    python imouse_conform.py samples/demo.json --simulate --p99 1 --max 5
+    python imouse_conform.py samples/macros/llamada.json sniff.ndjson --align median --json
+"""
+
+import os
+import sys
+import json
+import argparse
+from dataclasses import dataclass, fields, asdict
+from typing import List, Optional
+
+from imouse_reports import ReportArray, from_packets, load_reports, require_numpy
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+ALIGN_FIRST = 'first'
+ALIGN_MEDIAN = 'median'
+ALIGNMENTS = (ALIGN_FIRST, ALIGN_MEDIAN)
+
+LATENCY_PERCENTILES = (50, 99)
+LISTED = 10                 # Índices que se listan por categoría
+
+
+@dataclass
+class Tolerances:
+    """Límites de conformidad (latencias en ms, el resto en reportes)"""
+    p99_ms: float = 2.0
+    max_ms: float = 10.0
+    early_ms: float = 1.0       # Adelanto máximo respecto a la captura
+    missing: int = 0
+    duplicated: int = 0
+    unexpected: int = 0
+    reordered: int = 0
+
+    @classmethod
+    def load(cls, path: str) -> 'Tolerances':
+        """
+        Tolerancias desde JSON ({"p99_ms": 1.5, "missing": 0, ...})
+
+        Raises:
+            OSError, ValueError: si el archivo no existe o tiene claves desconocidas
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        known = {field.name for field in fields(cls)}
+        unknown = sorted(set(data) - known)
+        if unknown:
+            raise ValueError(f"Tolerancias desconocidas en {path}: {', '.join(unknown)}")
+        return cls(**data)
+
+    def check(self, report: dict) -> List[str]:
+        """Devuelve las tolerancias incumplidas (vacía = conforme)"""
+        violations = []
+        latency = report['latency_ms']
+        if report['matched']:
+            if latency['p99'] > self.p99_ms:
+                violations.append(f"latencia p99 {latency['p99']:.3f} ms > {self.p99_ms} ms")
+            if latency['max'] > self.max_ms:
+                violations.append(f"latencia máxima {latency['max']:.3f} ms > {self.max_ms} ms")
+            if -latency['min'] > self.early_ms:
+                violations.append(f"adelanto {-latency['min']:.3f} ms > {self.early_ms} ms")
+        for name in ('missing', 'duplicated', 'unexpected', 'reordered'):
+            if report[name] > getattr(self, name):
+                violations.append(f"{name}: {report[name]} > {getattr(self, name)}")
+        return violations
+
+
+def report_ids(rows):
+    """
+    Id entero por contenido de reporte (mismos bytes = mismo id)
+
+    Los 9 bytes se reparten en un uint64 (bytes 0-7) y el último byte para
+    ordenar enteros en vez de filas (np.unique(axis=0) es mucho más lento).
+    """
+    rows = np.ascontiguousarray(rows, dtype=np.uint8)
+    head = rows[:, :8].copy().view('<u8').ravel()
+    head_ids = np.unique(head, return_inverse=True)[1].ravel().astype(np.int64)
+    return np.unique(head_ids * 256 + rows[:, 8], return_inverse=True)[1].ravel().astype(np.int64)
+
+
+def occurrence_rank(ids):
+    """Número de aparición de cada id (0 la primera vez que sale, 1 la segunda...)"""
+    order = np.argsort(ids, kind='stable')
+    sorted_ids = ids[order]
+    starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+    group_start = np.repeat(starts, np.diff(np.r_[starts, len(ids)]))
+    rank = np.empty(len(ids), dtype=np.int64)
+    rank[order] = np.arange(len(ids)) - group_start
+    return rank
+
+
+def _rank_pairs(ids_a, ids_b, base: int):
+    """Emparejamiento por (id, número de aparición)"""
+    keys_a = ids_a * base + occurrence_rank(ids_a)
+    keys_b = ids_b * base + occurrence_rank(ids_b)
+    _, index_a, index_b = np.intersect1d(keys_a, keys_b, assume_unique=True, return_indices=True)
+    return index_a, index_b
+
+
+def estimate_offset(target, arrived, ids_a, ids_b) -> float:
+    """
+    Desfase entre los relojes de la captura y de la traza
+
+    Mediana de (llegada - objetivo) sobre los pares por número de aparición
+    de los reportes que aparecen las mismas veces en ambos flujos: un
+    'release' perdido desplaza todos los siguientes del mismo tipo, pero no
+    a las teclas distintas.
+    """
+    count = int(max(ids_a.max(initial=-1), ids_b.max(initial=-1))) + 1
+    index_a, index_b = _rank_pairs(ids_a, ids_b, len(ids_a) + len(ids_b) + 1)
+    if not len(index_a):
+        return 0.0
+    same = np.bincount(ids_a, minlength=count) == np.bincount(ids_b, minlength=count)
+    stable = same[ids_a[index_a]]
+    if stable.any():
+        index_a, index_b = index_a[stable], index_b[stable]
+    return float(np.median(arrived[index_b] - target[index_a]))
+
+
+def align(intended: ReportArray, observed: ReportArray, speed: float = 1.0):
+    """
+    Empareja cada reporte observado con el de la captura con los mismos
+    bytes más cercano a su tiempo objetivo (una vez corregido el desfase
+    entre relojes). Si varios observados caen en el mismo reporte se queda
+    el más cercano; el resto son duplicados.
+
+    Returns:
+        tuple: (índices en intended, índices en observed) emparejados y
+               ordenados por intended, e ids de reporte de ambos flujos
+    """
+    empty = np.zeros(0, dtype=np.int64)
+    rows = np.concatenate([intended.data, observed.data])
+    if not len(rows):
+        return empty, empty, empty, empty
+    ids = report_ids(rows)
+    ids_a, ids_b = ids[:len(intended)], ids[len(intended):]
+    if not len(ids_a) or not len(ids_b):
+        return empty, empty, ids_a, ids_b
+
+    target = intended.timestamps / speed
+    arrived = observed.timestamps - estimate_offset(target, observed.timestamps, ids_a, ids_b)
+
+    # Clave compuesta id * escala + tiempo: una sola búsqueda ordenada para todos los grupos
+    scale = 2.0 * max(np.abs(target).max(), np.abs(arrived).max()) + 1.0
+    keys_a = ids_a * scale + target
+    order_a = np.argsort(keys_a, kind='stable')
+    sorted_keys = keys_a[order_a]
+    keys_b = ids_b * scale + arrived
+
+    position = np.searchsorted(sorted_keys, keys_b)
+    left = np.clip(position - 1, 0, len(sorted_keys) - 1)
+    right = np.clip(position, 0, len(sorted_keys) - 1)
+    dist_left = np.where(ids_a[order_a[left]] == ids_b, np.abs(sorted_keys[left] - keys_b), np.inf)
+    dist_right = np.where(ids_a[order_a[right]] == ids_b, np.abs(sorted_keys[right] - keys_b), np.inf)
+    nearest = np.where(dist_left <= dist_right, left, right)
+    distance = np.minimum(dist_left, dist_right)
+
+    found = np.isfinite(distance)
+    index_a = order_a[nearest[found]]
+    index_b = np.flatnonzero(found)
+    distance = distance[found]
+
+    # Un único observado por reporte de la captura: el más cercano
+    order = np.lexsort((distance, index_a))
+    first = np.r_[True, index_a[order][1:] != index_a[order][:-1]]
+    keep = order[first]
+    return index_a[keep], index_b[keep], ids_a, ids_b
+
+
+def _latency_summary(latency) -> dict:
+    if not len(latency):
+        return {'mean': 0.0, **{f'p{p}': 0.0 for p in LATENCY_PERCENTILES}, 'min': 0.0, 'max': 0.0}
+    ms = latency * 1000.0
+    return {
+        'mean': float(ms.mean()),
+        **{f'p{p}': float(v) for p, v in zip(LATENCY_PERCENTILES, np.percentile(ms, LATENCY_PERCENTILES))},
+        'min': float(ms.min()),
+        'max': float(ms.max()),
+    }
+
+
+def conform(intended: ReportArray, observed: ReportArray, speed: float = 1.0,
+            alignment: str = ALIGN_FIRST) -> dict:
+    """
+    Compara la traza observada con la captura de origen
+
+    Args:
+        intended: Reportes OUT de la captura (timestamps de la captura)
+        observed: Reportes recibidos (cualquier origen de tiempos)
+        speed: Velocidad a la que se reprodujo la captura
+        alignment: first | median (ver cabecera del módulo)
+    """
+    require_numpy()
+    if alignment not in ALIGNMENTS:
+        raise ValueError(f"Alineación desconocida: {alignment} (opciones: {', '.join(ALIGNMENTS)})")
+
+    index_a, index_b, ids_a, ids_b = align(intended, observed, speed)
+
+    latency = np.zeros(0)
+    if len(index_a):
+        target = intended.timestamps[index_a] / speed
+        arrived = observed.timestamps[index_b]
+        if alignment == ALIGN_FIRST:
+            latency = (arrived - arrived[0]) - (target - target[0])
+        else:
+            latency = arrived - target
+            latency -= np.median(latency)
+
+    missing = np.ones(len(intended), dtype=bool)
+    missing[index_a] = False
+    extra = np.ones(len(observed), dtype=bool)
+    extra[index_b] = False
+    duplicated = extra & np.isin(ids_b, ids_a)
+    unexpected = extra & ~duplicated
+
+    # Llega después de un reporte que la captura pone más tarde
+    late_order = index_b < np.maximum.accumulate(index_b) if len(index_b) else np.zeros(0, dtype=bool)
+
+    worst = np.argsort(-np.abs(latency))[:LISTED] if len(latency) else []
+    return {
+        'intended': len(intended),
+        'observed': len(observed),
+        'matched': len(index_a),
+        'missing': int(missing.sum()),
+        'duplicated': int(duplicated.sum()),
+        'unexpected': int(unexpected.sum()),
+        'reordered': int(late_order.sum()),
+        'alignment': alignment,
+        'latency_ms': _latency_summary(latency),
+        # Índices 1-based: missing/reordered en la captura (como --start-at de
+        # replay_imouse), duplicated/unexpected en la traza observada
+        'missing_at': (np.flatnonzero(missing)[:LISTED] + 1).tolist(),
+        'duplicated_at': (np.flatnonzero(duplicated)[:LISTED] + 1).tolist(),
+        'unexpected_at': (np.flatnonzero(unexpected)[:LISTED] + 1).tolist(),
+        'reordered_at': (index_a[late_order][:LISTED] + 1).tolist(),
+        'worst': [{'report': int(index_a[i]) + 1, 'latency_ms': float(latency[i] * 1000.0)} for i in worst],
+    }
+
+
+def load_intended(path: str, profile: Optional[str] = None) -> ReportArray:
+    """Captura de origen; las macros JSON se compilan para el perfil (store:NOMBRE, ver imouse_store)"""
+    from imouse_store import STORE_PREFIX
+    if path.startswith(STORE_PREFIX) or os.path.splitext(path)[1].lower() == '.json':
+        from replay_imouse import load_packets
+        return from_packets(load_packets(path, profile))
+    return load_reports(path)
+
+
+def observe_simulated(intended_path: str, speed: float = 1.0, profile: Optional[str] = None) -> ReportArray:
+    """Reproduce la captura en tiempo real contra el simulado y devuelve lo recibido"""
+    from imouse_simulator import SimulatedDevice
+    from imouse_transport import HIDTransport
+    from replay_imouse import load_packets, filter_out_packets, prepare_reports, play_reports
+
+    out_packets = filter_out_packets(load_packets(intended_path, profile))
+    device = SimulatedDevice()
+    transport = HIDTransport(device=device)
+    if not transport.open():
+        raise OSError("No se pudo abrir el dispositivo simulado")
+    reports = prepare_reports(out_packets, transport.report_size, speed, codec=transport.codec)
+    play_reports(transport, reports, verbose=False, encoded=True,
+                 prepare=lambda: prepare_reports(out_packets, transport.report_size, speed, codec=transport.codec))
+    transport.close()
+    return from_packets(device.to_capture())
+
+
+def print_report(report: dict, violations: List[str]):
+    latency = report['latency_ms']
+    print(f"📊 Emparejados: {report['matched']}/{report['intended']} de la captura "
+          f"({report['observed']} observados, alineación {report['alignment']})")
+    print(f"   Latencia (ms): media {latency['mean']:.3f}, p50 {latency['p50']:.3f}, "
+          f"p99 {latency['p99']:.3f}, mín {latency['min']:.3f}, máx {latency['max']:.3f}")
+    for name in ('missing', 'duplicated', 'unexpected', 'reordered'):
+        if report[name]:
+            listed = ', '.join(map(str, report[f'{name}_at']))
+            more = ', ...' if report[name] > len(report[f'{name}_at']) else ''
+            print(f"   {name}: {report[name]} (#{listed}{more})")
+    if report['worst'] and violations:
+        print("   Peores: " + ', '.join(f"#{w['report']} {w['latency_ms']:+.3f} ms" for w in report['worst'][:5]))
+
+    if violations:
+        for violation in violations:
+            print(f"❌ {violation}")
+    else:
+        print("✅ Traza conforme")
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    from imouse_targets import PROFILES, DEFAULT_PROFILE
+
+    defaults = Tolerances()
+    parser = argparse.ArgumentParser(description='Comprueba que una traza observada cumple la captura de origen')
+    parser.add_argument('intended', help='Captura o macro de origen')
+    parser.add_argument('observed', nargs='?', help='Traza observada (.json, .ndjson, .imcl, .bin)')
+    parser.add_argument('--simulate', action='store_true',
+                        help='Sin traza: reproducir la captura contra el simulado y comprobar lo recibido')
+    parser.add_argument('-s', '--speed', type=float, default=1.0, help='Velocidad a la que se reprodujo')
+    parser.add_argument('--profile', default=DEFAULT_PROFILE, choices=sorted(PROFILES),
+                        help='Perfil para compilar macros (default: iphone)')
+    parser.add_argument('--align', default=ALIGN_FIRST, choices=ALIGNMENTS,
+                        help='Origen de la latencia: primer reporte o mediana del desfase (default: first)')
+    parser.add_argument('--tolerances', metavar='JSON', help='Tolerancias desde JSON (los flags las sobrescriben)')
+    parser.add_argument('--p99', type=float, metavar='MS', help=f'Latencia p99 máxima (default: {defaults.p99_ms})')
+    parser.add_argument('--max', type=float, metavar='MS', help=f'Latencia máxima (default: {defaults.max_ms})')
+    parser.add_argument('--early', type=float, metavar='MS', help=f'Adelanto máximo (default: {defaults.early_ms})')
+    for name in ('missing', 'duplicated', 'unexpected', 'reordered'):
+        parser.add_argument(f'--{name}', type=int, metavar='N', help=f'Reportes {name} permitidos (default: 0)')
+    parser.add_argument('--json', action='store_true', help='Informe como JSON')
+    args = parser.parse_args(argv)
+
+    if bool(args.observed) == args.simulate:
+        print("❌ Indica una traza observada o --simulate (no ambos)")
+        return 1
+    if args.speed <= 0:
+        print("❌ --speed debe ser > 0")
+        return 1
+
+    try:
+        require_numpy()
+        tolerances = Tolerances.load(args.tolerances) if args.tolerances else Tolerances()
+        for flag, name in (('p99', 'p99_ms'), ('max', 'max_ms'), ('early', 'early_ms'), ('missing', 'missing'),
+                           ('duplicated', 'duplicated'), ('unexpected', 'unexpected'),
+                           ('reordered', 'reordered')):
+            if getattr(args, flag) is not None:
+                setattr(tolerances, name, getattr(args, flag))
+
+        intended = load_intended(args.intended, args.profile)
+        if args.simulate:
+            observed = observe_simulated(args.intended, args.speed, args.profile)
+        else:
+            observed = load_reports(args.observed)
+        report = conform(intended, observed, args.speed, args.align)
+    except (ImportError, OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    violations = tolerances.check(report)
+    if args.json:
+        print(json.dumps({**report, 'tolerances': asdict(tolerances), 'violations': violations}, indent=2))
+    else:
+        print_report(report, violations)
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
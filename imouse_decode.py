@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+iMouse Decode - Decodificador columnar de capturas
+format_packet_detailed decodifica un paquete cada vez a texto; para analizar
+miles de reportes este módulo decodifica la captura completa (JSON, NDJSON,
+columnar o binaria, vía imouse_reports) a columnas tipadas de NumPy:
+
+    timestamp   float64  segundos
+    command     uint8    0xa0 / 0xa1 / 0xa2 / ...
+    button      uint8    estado de botones (0xa0 / 0xa1; 0 en el resto)
+    modifier    uint8    modificador de teclado (0xa2; 0 en el resto)
+    scancode    uint8    scancode de teclado (0xa2; 0 en el resto)
+    x, y        int32    posición absoluta en píxeles (-1 si no es 0xa0 o es reset)
+    dx, dy      int32    delta relativo en complemento a dos (0 si no es 0xa1)
+
+Las columnas se guardan como .npz, .imcl o, si pyarrow está instalado,
+.parquet / .arrow. El resumen incluye la distribución de huecos entre
+reportes, reportes/s y el tiempo que se mantiene pulsado cada botón y tecla.
+
+    python imouse_decode.py samples/demo.json --stats
+    python imouse_decode.py captura.bin --screen ipad --head 20
+    python imouse_decode.py captura.ndjson -o captura.parquet
+"""
+
+import os
+import sys
+import json
+import argparse
+from array import array
+from typing import Dict, Tuple
+
+from imouse_reports import ReportArray, load_reports, require_numpy
+from imouse_retarget import (decode_absolute, decode_relative, parse_size,
+                             MOVE_ABSOLUTE, MOVE_RELATIVE, RESET_POSITION)
+from imouse_targets import DEFAULT_PROFILE, NORM_MAX
+from imouse_columnar import save_columnar
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+KEYBOARD = 0xa2
+
+COMMAND_NAMES = {
+    MOVE_ABSOLUTE: 'MOVE_ABSOLUTE',
+    MOVE_RELATIVE: 'MOVE_RELATIVE',
+    KEYBOARD: 'KEYBOARD',
+    0xa4: 'RESTART',
+}
+
+BUTTON_NAMES = {1: 'LEFT', 2: 'RIGHT'}
+
+COLUMNS = ('timestamp', 'command', 'button', 'modifier', 'scancode', 'x', 'y', 'dx', 'dy')
+
+# Tipos de array.array para guardar en imouse_columnar
+COLUMNAR_TYPES = {'float64': 'd', 'uint8': 'B', 'int32': 'i'}
+
+OUTPUT_FORMATS = ('.npz', '.imcl', '.parquet', '.arrow', '.feather')
+
+GAP_PERCENTILES = (50, 90, 99)
+
+
+def decode_columns(reports: ReportArray, screen: Tuple[int, int]) -> Dict[str, 'np.ndarray']:
+    """
+    Decodifica todos los reportes de una vez a columnas tipadas
+
+    Args:
+        reports: Captura como arrays (imouse_reports.load_reports)
+        screen: (ancho, alto) para pasar las coordenadas 0xa0 a píxeles
+    """
+    require_numpy()
+    data = reports.data
+    count = len(reports)
+    command = data[:, 1].copy()
+    width, height = screen
+
+    columns = {
+        'timestamp': reports.timestamps.astype(np.float64),
+        'command': command,
+        'button': np.zeros(count, dtype=np.uint8),
+        'modifier': np.zeros(count, dtype=np.uint8),
+        'scancode': np.zeros(count, dtype=np.uint8),
+        'x': np.full(count, -1, dtype=np.int32),
+        'y': np.full(count, -1, dtype=np.int32),
+        'dx': np.zeros(count, dtype=np.int32),
+        'dy': np.zeros(count, dtype=np.int32),
+    }
+
+    mouse = (command == MOVE_ABSOLUTE) | (command == MOVE_RELATIVE)
+    columns['button'][mouse] = data[mouse, 2]
+
+    keyboard = command == KEYBOARD
+    columns['modifier'][keyboard] = data[keyboard, 2]
+    columns['scancode'][keyboard] = data[keyboard, 4]
+
+    rows = np.flatnonzero(command == MOVE_ABSOLUTE)
+    x_norm, y_norm = decode_absolute(data[rows])
+    moves = ~((x_norm == RESET_POSITION) & (y_norm == RESET_POSITION))
+    rows = rows[moves]
+    # Mismo truncado que format_packet_detailed
+    columns['x'][rows] = (x_norm[moves] * width // NORM_MAX).astype(np.int32)
+    columns['y'][rows] = (y_norm[moves] * height // NORM_MAX).astype(np.int32)
+
+    rows = np.flatnonzero(command == MOVE_RELATIVE)
+    dx, dy = decode_relative(data[rows])
+    columns['dx'][rows] = dx.astype(np.int32)
+    columns['dy'][rows] = dy.astype(np.int32)
+
+    return columns
+
+
+# ===== Resumen =====
+
+def held_time(timestamps, active) -> Tuple[float, int]:
+    """
+    Tiempo total y número de pulsaciones de un estado que se mantiene hasta
+    el siguiente reporte del mismo tipo
+
+    Returns:
+        tuple: (segundos pulsado, pulsaciones)
+    """
+    if len(timestamps) == 0:
+        return 0.0, 0
+    durations = np.diff(timestamps, append=timestamps[-1])
+    presses = np.count_nonzero(active[1:] & ~active[:-1]) + int(active[0])
+    return float(durations[active].sum()), int(presses)
+
+
+def summarize(columns: Dict[str, 'np.ndarray']) -> dict:
+    """Estadísticas de la captura: huecos, reportes/s, comandos, botones y teclas"""
+    timestamps = columns['timestamp']
+    command = columns['command']
+    count = len(timestamps)
+    duration = float(timestamps[-1] - timestamps[0]) if count > 1 else 0.0
+
+    summary = {
+        'reports': count,
+        'duration_s': duration,
+        'reports_per_s': (count - 1) / duration if duration > 0 else 0.0,
+        'commands': {COMMAND_NAMES.get(int(cmd), f"0x{int(cmd):02x}"): int(n)
+                     for cmd, n in zip(*np.unique(command, return_counts=True))},
+    }
+
+    if count > 1:
+        gaps = np.diff(timestamps) * 1000.0
+        summary['gaps_ms'] = {
+            'min': float(gaps.min()),
+            'mean': float(gaps.mean()),
+            **{f'p{p}': float(v) for p, v in zip(GAP_PERCENTILES, np.percentile(gaps, GAP_PERCENTILES))},
+            'max': float(gaps.max()),
+        }
+
+    # Botones: el estado viaja en cada reporte de ratón y se mantiene hasta el siguiente
+    mouse = (command == MOVE_ABSOLUTE) | (command == MOVE_RELATIVE)
+    mouse_times, buttons = timestamps[mouse], columns['button'][mouse]
+    summary['buttons'] = {}
+    for mask, name in BUTTON_NAMES.items():
+        seconds, presses = held_time(mouse_times, (buttons & mask) != 0)
+        if presses:
+            summary['buttons'][name] = {'presses': presses, 'held_s': seconds}
+
+    # Teclas: cada 0xa2 sustituye al anterior (el release es scancode 0)
+    keyboard = command == KEYBOARD
+    key_times, scancodes = timestamps[keyboard], columns['scancode'][keyboard]
+    summary['keys'] = {}
+    for scancode in np.unique(scancodes[scancodes != 0]).tolist():
+        seconds, presses = held_time(key_times, scancodes == scancode)
+        summary['keys'][f"0x{scancode:02x}"] = {'presses': presses, 'held_s': seconds}
+
+    return summary
+
+
+# ===== Salida =====
+
+def to_arrow(columns: Dict[str, 'np.ndarray']):
+    """Columnas → pyarrow.Table (requiere pyarrow)"""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ImportError("pyarrow no está instalado (pip install pyarrow)")
+    return pa.table({name: columns[name] for name in COLUMNS})
+
+
+def save_columns(columns: Dict[str, 'np.ndarray'], path: str, meta: dict = None):
+    """Guarda las columnas según la extensión (.npz, .imcl, .parquet, .arrow/.feather)"""
+    ext = os.path.splitext(path)[1].lower()
+
+    if ext == '.npz':
+        np.savez(path, **{name: columns[name] for name in COLUMNS})
+
+    elif ext == '.imcl':
+        save_columnar(path, {name: array(COLUMNAR_TYPES[columns[name].dtype.name], columns[name].tolist())
+                             for name in COLUMNS},
+                      len(columns['timestamp']), meta=meta)
+
+    elif ext == '.parquet':
+        table = to_arrow(columns)
+        import pyarrow.parquet as pq
+        pq.write_table(table, path)
+
+    elif ext in ('.arrow', '.feather'):
+        table = to_arrow(columns)
+        import pyarrow.feather as feather
+        feather.write_feather(table, path)
+
+    else:
+        raise ValueError(f"Formato de salida desconocido: {ext or path} (opciones: {', '.join(OUTPUT_FORMATS)})")
+
+
+def print_rows(columns: Dict[str, 'np.ndarray'], limit: int):
+    print(f"{'t (s)':>10} {'cmd':>4} {'btn':>3} {'mod':>4} {'scan':>4} {'x':>5} {'y':>5} {'dx':>7} {'dy':>7}")
+    for row in range(min(limit, len(columns['timestamp']))):
+        c = {name: columns[name][row] for name in COLUMNS}
+        print(f"{c['timestamp']:>10.4f} {c['command']:>4x} {c['button']:>3} {c['modifier']:>4x} "
+              f"{c['scancode']:>4x} {c['x']:>5} {c['y']:>5} {c['dx']:>+7} {c['dy']:>+7}")
+
+
+def print_summary(summary: dict):
+    print(f"📊 Reportes: {summary['reports']}, duración: {summary['duration_s']:.3f}s, "
+          f"{summary['reports_per_s']:.1f} reportes/s")
+    print(f"   Comandos: {', '.join(f'{name}={n}' for name, n in summary['commands'].items())}")
+    if 'gaps_ms' in summary:
+        gaps = summary['gaps_ms']
+        print("   Huecos (ms): " + ', '.join(f"{key}={value:.2f}" for key, value in gaps.items()))
+    for name, info in summary['buttons'].items():
+        print(f"   🖱️  {name}: {info['presses']} pulsaciones, {info['held_s'] * 1000:.1f} ms pulsado")
+    for scancode, info in summary['keys'].items():
+        print(f"   ⌨️  {scancode}: {info['presses']} pulsaciones, {info['held_s'] * 1000:.1f} ms pulsada")
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    parser = argparse.ArgumentParser(description='Decodifica una captura iMouse a columnas tipadas')
+    parser.add_argument('input', help='Captura (.json, .ndjson, .imcl, .bin)')
+    parser.add_argument('--screen', default=DEFAULT_PROFILE,
+                        help='Resolución para los 0xa0: perfil o ANCHOxALTO (default: iphone)')
+    parser.add_argument('-o', '--output', help=f"Guardar columnas ({', '.join(OUTPUT_FORMATS)})")
+    parser.add_argument('--head', type=int, default=0, metavar='N', help='Mostrar las primeras N filas')
+    parser.add_argument('--stats', action='store_true', help='Mostrar resumen (por defecto si no hay -o/--head)')
+    parser.add_argument('--json', action='store_true', help='Resumen como JSON')
+    args = parser.parse_args(argv)
+
+    try:
+        require_numpy()
+        screen = parse_size(args.screen)
+        columns = decode_columns(load_reports(args.input), screen)
+        if args.output:
+            save_columns(columns, args.output, meta={'source': os.path.basename(args.input),
+                                                     'screen': list(screen)})
+    except (ImportError, OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    if args.head:
+        print_rows(columns, args.head)
+
+    if args.stats or args.json or not (args.output or args.head):
+        summary = summarize(columns)
+        if args.json:
+            print(json.dumps(summary, indent=2))
+        else:
+            print_summary(summary)
+
+    if args.output:
+        print(f"💾 {len(columns['timestamp'])} filas guardadas en: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+iMouse Edit - Actualizar un campo de texto con el mínimo de teclas
+En vez de borrar el campo y reescribirlo entero (send_text_directly: dos
+reportes y dos esperas por carácter), compara el contenido actual con el
+deseado y genera un guion de edición: flechas para mover el cursor,
+backspace para borrar e inserciones con el keymap. Un cambio pequeño en un
+campo largo queda en unas pocas teclas.
+
+El guion es una lista de teclas del keymap: caracteres ('a', '\\b' para
+backspace) o nombres ('<Left>', '<Right>'). Los bloques cambiados salen de
+difflib y se aplican de derecha a izquierda, así las posiciones de los
+bloques pendientes no se desplazan.
+
+    python imouse_edit.py "Hola mundo" "Hola mundo cruel"
+    python imouse.py type "Hola mundo cruel" --from "Hola mundo" --simulate
+"""
+
+import sys
+import argparse
+import difflib
+import itertools
+from typing import List, Optional
+
+from imouse_keymap_data import IMOUSE_KEYMAP
+
+
+KEY_LEFT = '<Left>'
+KEY_RIGHT = '<Right>'
+KEY_BACKSPACE = '\b'
+
+
+def _move(keys: List[str], cursor: int, target: int):
+    if target < cursor:
+        keys.extend([KEY_LEFT] * (cursor - target))
+    else:
+        keys.extend([KEY_RIGHT] * (target - cursor))
+
+
+def edit_script(current: str, desired: str, cursor: Optional[int] = None) -> List[str]:
+    """
+    Teclas que convierten `current` en `desired`
+
+    Args:
+        current: Contenido actual del campo
+        desired: Contenido deseado
+        cursor: Posición del cursor en `current` (default: al final)
+
+    Returns:
+        list: Teclas del keymap; nunca más que borrar todo y reescribir
+
+    Raises:
+        ValueError: si un carácter a insertar no está en el keymap
+    """
+    unsupported = sorted({char for char in desired if char not in IMOUSE_KEYMAP})
+    if unsupported:
+        raise ValueError(f"Caracteres no soportados: {''.join(unsupported)!r}")
+
+    cursor = len(current) if cursor is None else cursor
+    if not 0 <= cursor <= len(current):
+        raise ValueError(f"Cursor fuera del texto: {cursor} (longitud {len(current)})")
+
+    retype = retype_script(current, desired, cursor)
+    matcher = difflib.SequenceMatcher(None, current, desired, autojunk=False)
+    keys: List[str] = []
+    for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+        if tag == 'equal':
+            continue
+        _move(keys, cursor, i2)
+        keys.extend([KEY_BACKSPACE] * (i2 - i1))
+        keys.extend(desired[j1:j2])
+        cursor = i1 + (j2 - j1)
+
+    # Nunca peor que borrar todo y reescribir
+    return keys if len(keys) <= len(retype) else retype
+
+
+def retype_script(current: str, desired: str, cursor: Optional[int] = None) -> List[str]:
+    """Teclas para borrar todo el campo y escribirlo de nuevo (referencia)"""
+    keys: List[str] = []
+    _move(keys, len(current) if cursor is None else cursor, len(current))
+    return keys + [KEY_BACKSPACE] * len(current) + list(desired)
+
+
+def key_packet(key: str) -> list:
+    """Tecla del keymap → paquete 0xa2 de 9 bytes"""
+    scancode, modifier = IMOUSE_KEYMAP[key]
+    return [0x00, 0xa2, modifier, 0x00, scancode, 0x00, 0x00, 0x00, 0x00]
+
+
+def edit_packets(current: str, desired: str, cursor: Optional[int] = None) -> List[list]:
+    """Paquetes de pulsación del guion de edición (sin los release)"""
+    return [key_packet(key) for key in edit_script(current, desired, cursor)]
+
+
+def describe(keys: List[str]) -> str:
+    """Resumen legible de un guion (ej: "<Left>x3 <Backspace>x2 'abc'")"""
+    names = {KEY_LEFT: KEY_LEFT, KEY_RIGHT: KEY_RIGHT, KEY_BACKSPACE: '<Backspace>'}
+    parts = []
+    for key, group in itertools.groupby(keys, key=lambda k: k if k in names else None):
+        group = list(group)
+        parts.append(f"{names[key]}x{len(group)}" if key else repr(''.join(group)))
+    return ' '.join(parts)
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    parser = argparse.ArgumentParser(description='Guion de teclas mínimo para editar un campo de texto')
+    parser.add_argument('current', help='Contenido actual del campo')
+    parser.add_argument('desired', help='Contenido deseado')
+    parser.add_argument('--cursor', type=int, help='Posición del cursor (default: al final)')
+    args = parser.parse_args(argv)
+
+    try:
+        keys = edit_script(args.current, args.desired, args.cursor)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    full = retype_script(args.current, args.desired, args.cursor)
+    print(f"✏️  {len(keys)} teclas (reescribir: {len(full)})")
+    if keys:
+        print(f"   {describe(keys)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
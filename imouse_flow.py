@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+iMouse Flow - Control de flujo por acks del dispositivo
+Los envíos se regulan con time.sleep fijos, dimensionados para el peor caso.
+El dongle devuelve input reports (ver scripts/analyze_imouse_protocol.py),
+así que se pueden usar como confirmación: FlowController mantiene una
+ventana acotada de reportes en vuelo y libera el siguiente en cuanto llega
+el ack del anterior, en vez de esperar el retraso fijo.
+
+Emparejamiento: por defecto cada input report confirma el reporte en vuelo
+más antiguo (FIFO). Con `match(enviado, recibido) -> bool` se confirma el
+más antiguo que case. Si un ack no llega en `timeout`, el reporte se da por
+confirmado (se cuenta en stats['timeouts']) para no bloquear el envío.
+
+    flow = FlowController(transport, window=2)
+    flow.attach()
+    for packet in packets:
+        flow.send(packet)
+    flow.drain()
+
+Para pruebas: SimulatedDevice(ack_latency=0.002) responde a cada reporte
+con un input report tras esa latencia.
+"""
+
+import time
+import threading
+from collections import deque
+from typing import Callable, Optional
+
+from imouse_trace import get_tracer, STAGE_WAIT
+from imouse_transport import CodecChanged
+
+
+DEFAULT_WINDOW = 1
+DEFAULT_ACK_TIMEOUT = 0.05
+
+
+class FlowController:
+    """
+    Ventana de reportes en vuelo sobre un HIDTransport
+
+    Expone la misma operación send(packet) que el transporte (y delega el
+    resto de atributos), así se puede pasar a send_text_directly,
+    play_reports, etc. en lugar del transporte.
+
+    Args:
+        transport: HIDTransport abierto
+        window: Reportes sin confirmar permitidos a la vez
+        timeout: Espera máxima de un ack (s)
+        match: Función (enviado, recibido) -> bool; None = FIFO
+        forward: Callback adicional para cada input report (ej: CaptureRing.append)
+    """
+
+    def __init__(self, transport, window: int = DEFAULT_WINDOW, timeout: float = DEFAULT_ACK_TIMEOUT,
+                 match: Optional[Callable[[bytes, bytes], bool]] = None,
+                 forward: Optional[Callable] = None):
+        if window < 1:
+            raise ValueError(f"window debe ser >= 1 (hay {window})")
+        self.transport = transport
+        self.window = window
+        self.timeout = timeout
+        self.match = match
+        self.forward = forward
+        self.flow_stats = {'sent': 0, 'acked': 0, 'timeouts': 0, 'unmatched': 0,
+                           'max_in_flight': 0, 'rtt_total': 0.0, 'rtt_max': 0.0}
+        self._in_flight = deque()          # (enviado_en, bytes)
+        self._cond = threading.Condition()
+
+    def __getattr__(self, name):
+        return getattr(self.transport, name)
+
+    def attach(self):
+        """Registra el handler de input reports (y lo re-registra tras reconectar)"""
+        self._attach()
+        self.transport.on_reconnect.append(self._on_reconnect)
+
+    def _attach(self):
+        self.transport.device.set_raw_data_handler(self._on_input)
+
+    def _on_reconnect(self):
+        # Los reportes en vuelo se perdieron con el dispositivo
+        with self._cond:
+            self._in_flight.clear()
+            self._cond.notify_all()
+        self._attach()
+
+    # ===== Acks =====
+
+    def _on_input(self, data):
+        now = time.perf_counter()
+        data = bytes(data)
+        with self._cond:
+            index = 0
+            if self.match is not None:
+                index = next((i for i, (_, sent) in enumerate(self._in_flight) if self.match(sent, data)), None)
+
+            if index is None or not self._in_flight:
+                self.flow_stats['unmatched'] += 1
+            else:
+                sent_at, _ = self._in_flight[index]
+                del self._in_flight[index]
+                rtt = now - sent_at
+                self.flow_stats['acked'] += 1
+                self.flow_stats['rtt_total'] += rtt
+                self.flow_stats['rtt_max'] = max(self.flow_stats['rtt_max'], rtt)
+                self._cond.notify_all()
+
+        if self.forward is not None:
+            self.forward(data)
+
+    def _wait_slot(self, limit: int):
+        """Espera hasta que haya como mucho `limit` reportes en vuelo"""
+        with self._cond:
+            while len(self._in_flight) > limit:
+                sent_at, _ = self._in_flight[0]
+                remaining = sent_at + self.timeout - time.perf_counter()
+                if remaining <= 0:
+                    self._in_flight.popleft()
+                    self.flow_stats['timeouts'] += 1
+                    continue
+                self._cond.wait(remaining)
+
+    # ===== Envío =====
+
+    def send(self, packet) -> bool:
+        """Envía en cuanto la ventana lo permite"""
+        return self._send(packet, self.transport.send)
+
+    def send_encoded(self, data_list, generation: Optional[int] = None) -> bool:
+        """Como send() para un reporte ya codificado (ver HIDTransport.send_encoded)"""
+        return self._send(data_list, lambda data: self.transport.send_encoded(data, generation))
+
+    def _send(self, packet, send: Callable) -> bool:
+        with get_tracer().span('ack_wait', STAGE_WAIT, in_flight=len(self._in_flight)):
+            self._wait_slot(self.window - 1)
+
+        with self._cond:
+            self._in_flight.append((time.perf_counter(), bytes(packet)))
+            self.flow_stats['max_in_flight'] = max(self.flow_stats['max_in_flight'], len(self._in_flight))
+
+        try:
+            ok = send(packet)
+        except CodecChanged:
+            # No se envió: el llamador lo recodifica y lo vuelve a mandar
+            with self._cond:
+                if self._in_flight:
+                    self._in_flight.pop()
+            raise
+
+        if not ok:
+            # Con una escritura colgada el reporte aún puede llegar (y
+            # confirmarse): se queda en vuelo hasta su ack o su timeout
+            if not self.transport.write_pending:
+                with self._cond:
+                    if self._in_flight:
+                        self._in_flight.pop()
+            return False
+
+        self.flow_stats['sent'] += 1
+        return True
+
+    def drain(self) -> bool:
+        """Espera a que se confirmen (o caduquen) todos los reportes en vuelo"""
+        timeouts = self.flow_stats['timeouts']
+        self._wait_slot(0)
+        return self.flow_stats['timeouts'] == timeouts
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def get_stats(self) -> dict:
+        stats = dict(self.flow_stats)
+        acked = stats.pop('rtt_total')
+        stats['rtt_mean'] = acked / stats['acked'] if stats['acked'] else 0.0
+        return stats
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+iMouse Gestures - Cálculo de trayectorias para swipes y gestos
+Separado de imouse_swipe.py para poder reutilizarse sin el dispositivo USB
+"""
+
+from typing import List, Tuple
+
+
+def ease_out_cubic(progress: float) -> float:
+    """Curva de easing con desaceleración al final (0.0 - 1.0)"""
+    return 1 - pow(1 - progress, 3)
+
+
+def swipe_path(start_x: int, start_y: int, end_x: int, end_y: int,
+               steps: int = 10) -> List[Tuple[int, int]]:
+    """
+    Calcula los puntos intermedios de un swipe con easing natural
+
+    Args:
+        start_x, start_y: Punto inicial
+        end_x, end_y: Punto final
+        steps: Número de pasos intermedios
+
+    Returns:
+        list: [(x, y), ...] con `steps` puntos, el último es el punto final
+    """
+    delta_x = end_x - start_x
+    delta_y = end_y - start_y
+
+    path = []
+    for i in range(1, steps + 1):
+        eased_progress = ease_out_cubic(i / steps)
+        path.append((int(start_x + delta_x * eased_progress),
+                     int(start_y + delta_y * eased_progress)))
+
+    return path
@@ -8,6 +8,8 @@ import struct
 from typing import Tuple, Optional
 from enum import IntEnum
 
+from imouse_codec import build_frame
+
 
 class MouseCommand(IntEnum):
     """Comandos HID confirmados"""
@@ -33,6 +35,17 @@ class iMouseHIDProtocol:
         self.current_y = 0
         self.button_state = ButtonState.NONE
 
+    def reset_state(self):
+        """
+        Resetea el tracking interno (posición y botón) sin generar paquete
+
+        Útil tras reconectar el dongle, cuando el estado real del dispositivo
+        ya se restauró con reset_position() y botones liberados
+        """
+        self.current_x = 0
+        self.current_y = 0
+        self.button_state = ButtonState.NONE
+
     def reset_position(self) -> bytes:
         """
         Genera paquete para resetear posición del mouse a (0,0) usando HT_ResetMousePos
@@ -116,6 +129,32 @@ class iMouseHIDProtocol:
         x_norm = int((x / self.screen_width) * 32767)
         y_norm = int((y / self.screen_height) * 32767)
 
+        packet = self.move_normalized(x_norm, y_norm)
+
+        # Actualizar posición actual (exacta en píxeles)
+        self.current_x = x
+        self.current_y = y
+
+        return packet
+
+    def move_normalized(self, x_norm: int, y_norm: int, button: Optional[ButtonState] = None) -> bytes:
+        """
+        Genera paquete de movimiento absoluto (0xa0) con coordenadas ya
+        normalizadas a 0-32767 (independientes de la resolución)
+
+        Args:
+            x_norm, y_norm: Coordenadas normalizadas (0 - 32767)
+            button: Estado del botón (None = mantener estado actual)
+
+        Returns:
+            bytes: Paquete HID de 9 bytes
+        """
+        if not (0 <= x_norm <= 32767 and 0 <= y_norm <= 32767):
+            raise ValueError(f"Coordenadas normalizadas fuera de rango: ({x_norm}, {y_norm})")
+
+        if button is not None:
+            self.button_state = button
+
         # Construir paquete HID
         packet = bytearray(9)
         packet[0] = 0x00                              # Padding
@@ -128,9 +167,9 @@ class iMouseHIDProtocol:
         packet[7] = 0x00                              # Padding
         packet[8] = 0x00                              # Padding
 
-        # Actualizar posición actual
-        self.current_x = x
-        self.current_y = y
+        # Posición actual aproximada en píxeles
+        self.current_x = round(x_norm * self.screen_width / 32767)
+        self.current_y = round(y_norm * self.screen_height / 32767)
 
         return bytes(packet)
 
@@ -201,38 +240,10 @@ class iMouseHIDProtocol:
         if button is not None:
             self.button_state = button
 
-        packet = bytearray(11)
-        packet[0] = ord('W')                          # Magic byte 1
-        packet[1] = 0xAB                              # Magic byte 2
-        packet[2] = 0x00                              # Reserved
-
         delta = delta_x if delta_x != 0 else delta_y
 
-        if firmware_version < 0x37 and delta == 0:
-            # Variante A: Sin movimiento
-            packet[3] = 0x04                          # Command type
-            packet[4] = 0x07                          # Subtype
-            packet[5] = 0x02                          # Data length
-            packet[6] = self.button_state             # Button state
-            packet[7] = 0x00                          # No delta
-            packet[8] = 0x00
-            packet[9] = 0x00
-            # Checksum
-            checksum = sum(packet[0:10]) & 0xFF
-            packet[10] = checksum
-        else:
-            # Variante B: Con movimiento
-            packet[3] = 0x05                          # Command type
-            packet[4] = 0x05                          # Subtype
-            packet[5] = 0x01                          # Data length
-            packet[6] = self.button_state             # Button state
-            packet[7] = delta & 0xFF                  # Delta byte 0
-            packet[8] = (delta >> 8) & 0xFF           # Delta byte 1
-            packet[9] = (delta >> 16) & 0xFF          # Delta byte 2
-            # Checksum simple
-            packet[10] = (self.button_state + (delta & 0xFF) + 0x0d) & 0xFF
-
-        return bytes(packet)
+        # Formato y checksum de la trama: imouse_codec (compartido con FramedCodec)
+        return build_frame(self.button_state, delta, firmware_version)
 
     def left_down(self) -> bytes:
         """
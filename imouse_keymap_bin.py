@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Formato binario de keymap iMouse (generado por scripts/parse_lookup_table.py)
+
+Estructura (little endian):
+    Cabecera  '<4sHHH16s'  magic b'IMKM', versión de formato, entradas ASCII
+                           (siempre 128), entradas con nombre, firmware
+    ASCII     128 x 2 B    (scancode, modifier) indexado por ord(char);
+                           0xff 0xff = carácter no soportado
+    Nombres   N x '<16sBB' nombre UTF-8 con relleno, scancode, modifier
+              (teclas como '<F1>', '<Home>', '<Ctrl>')
+
+La parte ASCII se consulta directamente por índice, sin parseo por entrada.
+"""
+
+import struct
+from typing import Dict, Tuple
+
+
+KEYMAP_MAGIC = b'IMKM'
+KEYMAP_FORMAT_VERSION = 1
+ASCII_SIZE = 128
+UNMAPPED = 0xff
+
+HEADER = struct.Struct('<4sHHH16s')
+NAMED_ENTRY = struct.Struct('<16sBB')
+
+
+def pack_keymap(keymap: Dict[str, Tuple[int, int]], firmware: str = 'default') -> bytes:
+    """Serializa un keymap {tecla: (scancode, modifier)} al formato binario"""
+    ascii_table = bytearray([UNMAPPED]) * (ASCII_SIZE * 2)
+    named = []
+
+    for key, (scancode, modifier) in keymap.items():
+        if len(key) == 1 and ord(key) < ASCII_SIZE:
+            ascii_table[ord(key) * 2] = scancode
+            ascii_table[ord(key) * 2 + 1] = modifier
+        else:
+            name = key.encode('utf-8')
+            if len(name) > NAMED_ENTRY.size - 2:
+                raise ValueError(f"Nombre de tecla demasiado largo: {key!r}")
+            named.append(NAMED_ENTRY.pack(name, scancode, modifier))
+
+    header = HEADER.pack(KEYMAP_MAGIC, KEYMAP_FORMAT_VERSION, ASCII_SIZE, len(named),
+                         firmware.encode('utf-8')[:16])
+    return header + bytes(ascii_table) + b''.join(named)
+
+
+def unpack_keymap(data: bytes) -> Tuple[str, Dict[str, Tuple[int, int]]]:
+    """
+    Lee un keymap binario
+
+    Returns:
+        tuple: (firmware, {tecla: (scancode, modifier)})
+
+    Raises:
+        ValueError: si la cabecera o el tamaño no son válidos
+    """
+    if len(data) < HEADER.size:
+        raise ValueError("Keymap binario truncado")
+
+    magic, version, ascii_count, named_count, firmware = HEADER.unpack_from(data)
+    if magic != KEYMAP_MAGIC:
+        raise ValueError(f"Magic inválido: {magic!r}")
+    if version != KEYMAP_FORMAT_VERSION:
+        raise ValueError(f"Versión de formato no soportada: {version}")
+
+    ascii_end = HEADER.size + ascii_count * 2
+    if len(data) != ascii_end + named_count * NAMED_ENTRY.size:
+        raise ValueError("Tamaño de keymap binario inconsistente")
+
+    keymap = {}
+    ascii_table = data[HEADER.size:ascii_end]
+    for code in range(ascii_count):
+        scancode, modifier = ascii_table[code * 2], ascii_table[code * 2 + 1]
+        if scancode != UNMAPPED:
+            keymap[chr(code)] = (scancode, modifier)
+
+    for name, scancode, modifier in NAMED_ENTRY.iter_unpack(data[ascii_end:]):
+        keymap[name.rstrip(b'\x00').decode('utf-8')] = (scancode, modifier)
+
+    return firmware.rstrip(b'\x00').decode('utf-8'), keymap
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Keymap iMouse GENERADO por scripts/parse_lookup_table.py --generate
+No editar a mano: regenerar desde la tabla de lookup del firmware.
+"""
+
+KEYMAP_FORMAT_VERSION = 1
+FIRMWARE = 'default'
+SOURCE_SHA256 = '60e0a5e858669c5c566a68fdb4825cc7fa311ed0fa6d26347e93683022e788c5'
+
+# Formato: carácter/tecla → (scancode, modifier)
+IMOUSE_KEYMAP = {
+    'a': (0x04, 0x00),
+    '\x08': (0x2a, 0x00),
+    '\t': (0x2b, 0x00),
+    '<Shift>': (0x00, 0x02),
+    '<Ctrl>': (0x00, 0x01),
+    '<Esc>': (0x29, 0x00),
+    '<PageUp>': (0x4b, 0x00),
+    '<PageDown>': (0x4e, 0x00),
+    '<End>': (0x4d, 0x00),
+    '<Home>': (0x4a, 0x00),
+    '<Pause>': (0x48, 0x00),
+    '<Insert>': (0x49, 0x00),
+    '<Delete>': (0x4c, 0x00),
+    '<Right>': (0x4f, 0x00),
+    '<Left>': (0x50, 0x00),
+    '<Down>': (0x51, 0x00),
+    '<Up>': (0x52, 0x00),
+    '<PrintScreen>': (0x46, 0x00),
+    ' ': (0x2c, 0x00),
+    '[': (0x2f, 0x00),
+    'b': (0x05, 0x00),
+    'c': (0x06, 0x00),
+    'd': (0x07, 0x00),
+    'e': (0x08, 0x00),
+    'f': (0x09, 0x00),
+    'g': (0x0a, 0x00),
+    'h': (0x0b, 0x00),
+    'i': (0x0c, 0x00),
+    'j': (0x0d, 0x00),
+    'k': (0x0e, 0x00),
+    'l': (0x0f, 0x00),
+    'm': (0x10, 0x00),
+    'n': (0x11, 0x00),
+    'o': (0x12, 0x00),
+    'p': (0x13, 0x00),
+    'q': (0x14, 0x00),
+    'r': (0x15, 0x00),
+    's': (0x16, 0x00),
+    't': (0x17, 0x00),
+    'u': (0x18, 0x00),
+    'v': (0x19, 0x00),
+    'w': (0x1a, 0x00),
+    'x': (0x1b, 0x00),
+    'y': (0x1c, 0x00),
+    'z': (0x1d, 0x00),
+    '0': (0x27, 0x00),
+    '1': (0x1e, 0x00),
+    '2': (0x1f, 0x00),
+    '3': (0x20, 0x00),
+    '4': (0x21, 0x00),
+    '5': (0x22, 0x00),
+    '6': (0x23, 0x00),
+    '7': (0x24, 0x00),
+    '8': (0x25, 0x00),
+    '9': (0x26, 0x00),
+    '-': (0x2d, 0x00),
+    '+': (0x2e, 0x02),
+    '{': (0x2f, 0x02),
+    '}': (0x30, 0x02),
+    '|': (0x31, 0x02),
+    ':': (0x33, 0x02),
+    '"': (0x34, 0x02),
+    '~': (0x35, 0x02),
+    '<': (0x36, 0x02),
+    '>': (0x37, 0x02),
+    '?': (0x38, 0x02),
+    'A': (0x04, 0x02),
+    'B': (0x05, 0x02),
+    'C': (0x06, 0x02),
+    'D': (0x07, 0x02),
+    'E': (0x08, 0x02),
+    'F': (0x09, 0x02),
+    'G': (0x0a, 0x02),
+    'H': (0x0b, 0x02),
+    'I': (0x0c, 0x02),
+    'J': (0x0d, 0x02),
+    'K': (0x0e, 0x02),
+    'L': (0x0f, 0x02),
+    'M': (0x10, 0x02),
+    'N': (0x11, 0x02),
+    'O': (0x12, 0x02),
+    'P': (0x13, 0x02),
+    'Q': (0x14, 0x02),
+    'R': (0x15, 0x02),
+    'S': (0x16, 0x02),
+    'T': (0x17, 0x02),
+    'U': (0x18, 0x02),
+    'V': (0x19, 0x02),
+    'W': (0x1a, 0x02),
+    'X': (0x1b, 0x02),
+    'Y': (0x1c, 0x02),
+    'Z': (0x1d, 0x02),
+    '!': (0x1e, 0x02),
+    '@': (0x1f, 0x02),
+    '#': (0x20, 0x02),
+    '$': (0x21, 0x02),
+    '%': (0x22, 0x02),
+    '^': (0x23, 0x02),
+    '&': (0x24, 0x02),
+    '*': (0x25, 0x02),
+    '(': (0x26, 0x02),
+    ')': (0x27, 0x02),
+    '_': (0x2d, 0x02),
+    '=': (0x2e, 0x00),
+    ']': (0x30, 0x00),
+    ';': (0x33, 0x00),
+    '`': (0x35, 0x00),
+    ',': (0x36, 0x00),
+    '.': (0x37, 0x00),
+    '/': (0x38, 0x00),
+    '<Keypad8>': (0x60, 0x00),
+    '<Keypad9>': (0x61, 0x00),
+    '<Keypad0>': (0x62, 0x00),
+    '<KeypadDot>': (0x63, 0x00),
+    '<F1>': (0x3a, 0x00),
+    '<F2>': (0x3b, 0x00),
+    '<F3>': (0x3c, 0x00),
+    '<F4>': (0x3d, 0x00),
+    '<F5>': (0x3e, 0x00),
+    '<F6>': (0x3f, 0x00),
+    '<F7>': (0x40, 0x00),
+    '<F8>': (0x41, 0x00),
+    '<F9>': (0x42, 0x00),
+    '<F10>': (0x43, 0x00),
+    '<F11>': (0x44, 0x00),
+    '<F12>': (0x45, 0x00),
+    '\\': (0x31, 0x00),
+    "'": (0x34, 0x00),
+    '\n': (0x28, 0x00),
+    '<Alt>': (0x00, 0x04),
+    '<Win>': (0x00, 0x08),
+    '<Keypad1>': (0x59, 0x00),
+    '<Keypad2>': (0x5a, 0x00),
+    '<Keypad3>': (0x5b, 0x00),
+    '<Keypad4>': (0x5c, 0x00),
+    '<Keypad5>': (0x5d, 0x00),
+    '<Keypad6>': (0x5e, 0x00),
+    '<Keypad7>': (0x5f, 0x00),
+    '<KeypadEnter>': (0x58, 0x00),
+    '<KeypadPlus>': (0x57, 0x00),
+    '<KeypadMinus>': (0x56, 0x00),
+}
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+iMouse Macro - Macros lógicas que se compilan a capturas de replay
+Una macro describe pasos por nombre (objetivos de imouse_targets) en vez de
+coordenadas; al compilarla para un perfil de dispositivo se resuelven los
+nombres y se genera la misma lista de paquetes que produce
+generate_click_json.py, lista para replay_imouse.py. Una sola macro sirve
+para todas las resoluciones.
+
+Formato:
+    {
+        "name": "abrir_telegram",
+        "steps": [
+            {"op": "shortcut", "name": "home"},
+            {"op": "wait", "seconds": 0.5},
+            {"op": "tap", "target": "home.telegram"},
+            {"op": "type", "text": "Hola"},
+            {"op": "swipe", "from": "home.telegram", "to": [182, 100], "duration": 0.3}
+        ]
+    }
+
+Las coordenadas explícitas ([x, y] o "x"/"y") se interpretan en píxeles del
+perfil para el que se compila.
+
+    python imouse_macro.py samples/macros/abrir_telegram.json --profile ipad -o telegram_ipad.json
+    python replay_imouse.py samples/macros/abrir_telegram.json --profile ipad
+"""
+
+import sys
+import json
+import argparse
+from typing import List, Optional
+
+from imouse_hid_protocol import iMouseHIDProtocol, ButtonState
+from imouse_gestures import swipe_path
+from imouse_targets import (TargetIndex, get_target_index, profile_size, normalize,
+                            DEFAULT_PROFILE, PROFILES)
+from imouse_trace import get_tracer, STAGE_COMPILE
+
+
+KEY_RELEASE = [0x00, 0xa2, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00]
+
+
+def is_macro(data) -> bool:
+    """True si el JSON cargado es una macro (y no una captura de paquetes)"""
+    return isinstance(data, dict) and 'steps' in data
+
+
+class MacroCompiler:
+    """Compila los pasos de una macro a paquetes para un perfil"""
+
+    def __init__(self, profile: str = DEFAULT_PROFILE, index: Optional[TargetIndex] = None):
+        self.profile = profile
+        self.width, self.height = profile_size(profile)
+        self.index = index or get_target_index()
+        self.protocol = iMouseHIDProtocol(screen_width=self.width, screen_height=self.height)
+        self.packets: List[dict] = []
+        self.t = 0.0
+
+    def emit(self, packet, description: str, delay: float = 0.0):
+        self.packets.append({
+            "timestamp": round(self.t, 6),
+            "direction": "out",
+            "description": description,
+            "bytes": list(packet),
+        })
+        self.t += delay
+
+    def point(self, step: dict, key: str, x_key: str = 'x', y_key: str = 'y'):
+        """
+        Resuelve un punto del paso a coordenadas normalizadas
+
+        Acepta un nombre de objetivo ("home.telegram"), una lista [x, y] o
+        los campos x/y (en píxeles del perfil)
+        """
+        value = step.get(key)
+        if isinstance(value, str):
+            return self.index.resolve(value, self.profile), value
+        if value is None:
+            value = (step[x_key], step[y_key])
+        x, y = int(value[0]), int(value[1])
+        if not (0 <= x <= self.width and 0 <= y <= self.height):
+            raise ValueError(f"({x}, {y}) fuera de la pantalla {self.profile} ({self.width}x{self.height})")
+        return normalize(x, y, self.width, self.height), f"({x}, {y})"
+
+    # ===== Operaciones =====
+
+    def op_tap(self, step):
+        (x_norm, y_norm), label = self.point(step, 'target')
+        if step.get('reset', True):
+            self.emit(self.protocol.reset_position(), "Reset mouse a (0,0)", 0.050)
+        self.emit(self.protocol.move_normalized(x_norm, y_norm), f"Mover a {label}", 0.100)
+        if step.get('button', 'left') == 'left':
+            self.emit(self.protocol.left_down(), "Click izquierdo DOWN", 0.065)
+            self.emit(self.protocol.left_up(), "Click izquierdo UP")
+        else:
+            self.emit(self.protocol.right_down(), "Click derecho DOWN", 0.065)
+            self.emit(self.protocol.right_up(), "Click derecho UP")
+
+    def op_swipe(self, step):
+        (x1, y1), start = self.point(step, 'from', 'x1', 'y1')
+        (x2, y2), end = self.point(step, 'to', 'x2', 'y2')
+        steps = int(step.get('steps', 10))
+        step_delay = float(step.get('duration', 0.3)) / steps
+
+        self.emit(self.protocol.reset_position(), "Reset mouse a (0,0)", 0.050)
+        self.emit(self.protocol.move_normalized(x1, y1), f"Mover a {start}", 0.100)
+        self.emit(self.protocol.left_down(), "Inicio swipe DOWN", 0.050)
+        for x, y in swipe_path(x1, y1, x2, y2, steps):
+            self.emit(self.protocol.move_normalized(x, y, button=ButtonState.LEFT),
+                      f"Swipe → {end}", step_delay)
+        self.emit(self.protocol.left_up(), "Fin swipe UP", 0.050)
+
+    def op_type(self, step):
+        from imouse_complete_keymap import char_to_imouse_packet
+
+        for char in step['text']:
+            packet = char_to_imouse_packet(char)
+            if packet is None:
+                print(f"⚠️  Carácter no soportado: '{char}' (ignorado)")
+                continue
+            self.emit(packet, f"Keypress: {char!r}", 0.05)
+            self.emit(KEY_RELEASE, "Release", 0.01)
+
+    def op_shortcut(self, step):
+        from imouse_shortcuts import get_shortcut_registry
+
+        registry = get_shortcut_registry()
+        params = {'text': step['text']} if 'text' in step else None
+        start = self.t
+        for offset, packet, description in registry.compile(step['name'], params):
+            self.t = start + offset
+            self.emit(packet, description)
+        self.t = start + registry.duration(step['name'], params)
+
+    def op_wait(self, step):
+        self.t += float(step.get('seconds', 0.0))
+
+    def compile(self, steps: list) -> List[dict]:
+        with get_tracer().span('compile_macro', STAGE_COMPILE, steps=len(steps), profile=self.profile):
+            for number, step in enumerate(steps, 1):
+                handler = getattr(self, f"op_{step.get('op')}", None)
+                if handler is None:
+                    raise ValueError(f"Paso {number}: operación desconocida {step.get('op')!r}")
+                try:
+                    handler(step)
+                except KeyError as e:
+                    raise ValueError(f"Paso {number} ({step['op']}): {e.args[0] if e.args else e}")
+        return self.packets
+
+
+def compile_macro(macro: dict, profile: str = DEFAULT_PROFILE,
+                  index: Optional[TargetIndex] = None) -> List[dict]:
+    """
+    Compila una macro a paquetes de captura (formato de replay_imouse.py)
+
+    Raises:
+        ValueError: si un paso es inválido o un objetivo no existe
+    """
+    return MacroCompiler(profile, index).compile(macro.get('steps', []))
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    parser = argparse.ArgumentParser(description='Compila una macro iMouse para un perfil de dispositivo')
+    parser.add_argument('macro', help='Archivo JSON de la macro')
+    parser.add_argument('--profile', default=DEFAULT_PROFILE, choices=sorted(PROFILES),
+                        help='Perfil de dispositivo (default: iphone)')
+    parser.add_argument('--targets', help='Archivo de objetivos (default: targets/targets.json)')
+    parser.add_argument('-o', '--output', help='JSON de salida (captura para replay_imouse.py)')
+    args = parser.parse_args(argv)
+
+    try:
+        with open(args.macro, 'r', encoding='utf-8') as f:
+            macro = json.load(f)
+        if not is_macro(macro):
+            print(f"❌ {args.macro} no es una macro (falta 'steps')")
+            return 1
+        index = TargetIndex(args.targets) if args.targets else None
+        packets = compile_macro(macro, args.profile, index)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    width, height = profile_size(args.profile)
+    print(f"✅ Macro '{macro.get('name', args.macro)}' compilada para {args.profile} ({width}x{height})")
+    print(f"   Pasos: {len(macro['steps'])}, paquetes: {len(packets)}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(packets, f, indent=2)
+        print(f"💾 Guardado en: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""
+iMouse Network - Transporte por red (ruta 'W 0xAB 0xFF 0x02')
+FUN_100024b0 tiene una segunda ruta (docs/GHIDRA_ANALYSIS.md) que envía
+tramas de 8 bytes por red en vez de USB:
+
+    57 AB FF 02 MM DD FF 00     MM = modificador, DD = scancode
+
+NetworkDevice imita la interfaz de pywinusb (como SimulatedDevice), así se
+usa con HIDTransport(device=...) y todas las herramientas de alto nivel
+(click, type, replay, asyncio, servidor) funcionan sin cambios, con la
+reconexión y las estadísticas del transporte.
+
+Conexión TCP persistente con TCP_NODELAY (sin Nagle). Los reportes se
+acumulan y se escriben varios por llamada: el buffer se vacía al llegar a
+`batch` registros, cuando el llamador hace flush() (replay lo hace antes de
+cada espera) o tras `linger` segundos como red de seguridad.
+
+Flujo de bytes: cada registro se delimita por su cabecera
+    57 AB FF 02 ...     trama de red de 8 bytes (teclado 0xa2)
+    00 <cmd> ...        reporte HID de 9 bytes tal cual (ratón, restart...)
+La trama de red solo documenta teclado; el resto viaja como reporte HID
+para que el extremo remoto (iMouseSrv o el stand-in) lo reenvíe por USB.
+
+Stand-in local para pruebas (registra lo recibido o lo reenvía a un dongle):
+    python imouse_network.py --listen 7430
+    python imouse_network.py --listen 0.0.0.0:7430 --relay
+    python imouse.py type "Hola" --network 127.0.0.1:7430
+    python replay_imouse.py samples/demo.json --network 127.0.0.1:7430 --batch 8
+"""
+
+import sys
+import time
+import socket
+import argparse
+import threading
+import socketserver
+from typing import List, Optional, Tuple
+
+from imouse_codec import FrameError
+
+
+NET_MAGIC = bytes([0x57, 0xAB, 0xFF, 0x02])
+NET_FRAME_SIZE = 8
+NET_FLAGS = 0xFF
+REPORT_SIZE = 9
+
+KEYBOARD = 0xa2
+
+DEFAULT_NET_PORT = 7430
+DEFAULT_LINGER = 0.002
+
+
+def parse_address(address: str, default_host: str = '127.0.0.1') -> Tuple[str, int]:
+    """'host:puerto', ':puerto' o 'puerto' → (host, puerto)"""
+    host, sep, port = address.rpartition(':')
+    if not sep:
+        host, port = '', address
+    try:
+        return host or default_host, int(port)
+    except ValueError:
+        raise ValueError(f"Dirección inválida: {address} (formato host:puerto)")
+
+
+# ===== Tramas de red =====
+
+def build_net_frame(modifier: int, scancode: int, flags: int = NET_FLAGS) -> bytes:
+    """Trama de 8 bytes 57 AB FF 02 MM DD FF 00"""
+    return NET_MAGIC + bytes([modifier & 0xFF, scancode & 0xFF, flags & 0xFF, 0x00])
+
+
+def to_record(report) -> bytes:
+    """
+    Reporte HID de 9 bytes → registro del flujo de red
+
+    Los reportes de teclado con una sola tecla van como trama de red; el
+    resto como reporte HID de 9 bytes
+    """
+    data = bytes(report[:REPORT_SIZE]).ljust(REPORT_SIZE, b'\x00')
+    if data[0] == 0x00 and data[1] == KEYBOARD and data[3] == 0x00 and not any(data[5:]):
+        return build_net_frame(data[2], data[4])
+    return data
+
+
+def record_to_report(record: bytes) -> bytes:
+    """Registro del flujo → reporte HID de 9 bytes (para reenviarlo por USB)"""
+    if record[:4] == NET_MAGIC:
+        return bytes([0x00, KEYBOARD, record[4], 0x00, record[5], 0x00, 0x00, 0x00, 0x00])
+    return record
+
+
+class StreamParser:
+    """Separa los registros de un flujo TCP (pueden llegar partidos o juntos)"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """
+        Returns:
+            list: Registros completos (tramas de 8 bytes o reportes de 9)
+
+        Raises:
+            FrameError: si el flujo no empieza por una cabecera conocida
+        """
+        self._buffer.extend(data)
+        records = []
+        while self._buffer:
+            head = self._buffer[0]
+            if head == NET_MAGIC[0]:
+                size = NET_FRAME_SIZE
+                if len(self._buffer) >= 4 and self._buffer[:4] != NET_MAGIC:
+                    raise FrameError(f"Cabecera de red inválida: {bytes(self._buffer[:4]).hex(' ')}")
+            elif head == 0x00:
+                size = REPORT_SIZE
+            else:
+                raise FrameError(f"Byte de inicio desconocido: 0x{head:02x}")
+
+            if len(self._buffer) < size:
+                break
+            records.append(bytes(self._buffer[:size]))
+            del self._buffer[:size]
+        return records
+
+
+# ===== Dispositivo de red (API compatible con pywinusb) =====
+
+class NetworkOutputReport:
+    """Output report de red (misma API que pywinusb.hid.HidReport)"""
+
+    def __init__(self, device: 'NetworkDevice', report_size: int = REPORT_SIZE):
+        self.device = device
+        self.report_size = report_size
+        self._raw_data = [0x00] * report_size
+
+    def get_raw_data(self) -> List[int]:
+        return list(self._raw_data)
+
+    def set_raw_data(self, data):
+        if len(data) != self.report_size:
+            raise ValueError(f"Tamaño de reporte inválido: {len(data)} (esperado {self.report_size})")
+        self._raw_data = list(data)
+
+    def send(self, raw_data=None):
+        if raw_data is not None:
+            self.set_raw_data(raw_data)
+        return self.device._write(bytes(self._raw_data))
+
+
+class NetworkDevice:
+    """
+    Dispositivo iMouse remoto por TCP
+
+    Args:
+        host, port: Extremo remoto (iMouseSrv o stand-in)
+        batch: Registros por escritura (1 = escribir cada reporte al momento)
+        linger: Espera máxima de un registro en el buffer (s) con batch > 1
+        connect_timeout: Timeout de conexión (s)
+
+    `reconnectable` indica a HIDTransport que puede reabrirlo directamente
+    tras un corte (no hay re-enumeración USB que esperar).
+    """
+
+    reconnectable = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = DEFAULT_NET_PORT, batch: int = 1,
+                 linger: float = DEFAULT_LINGER, connect_timeout: float = 2.0):
+        if batch < 1:
+            raise ValueError(f"batch debe ser >= 1 (hay {batch})")
+        self.host = host
+        self.port = port
+        self.batch = batch
+        self.linger = linger
+        self.connect_timeout = connect_timeout
+        self.product_name = f"iMouse (red {host}:{port})"
+        self.version_number = None          # Sin modo W-0xAB de 11 bytes
+        self.stats = {'records': 0, 'frames': 0, 'writes': 0, 'bytes': 0}
+        self._sock: Optional[socket.socket] = None
+        self._buffer = bytearray()
+        self._pending = 0
+        self._oldest = 0.0
+        self._error: Optional[OSError] = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._flusher: Optional[threading.Thread] = None
+        self._out_report = NetworkOutputReport(self)
+
+    # ===== API compatible con pywinusb =====
+
+    def open(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.connect_timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        sock.settimeout(None)
+        with self._lock:
+            self._sock = sock
+            self._error = None
+            self._buffer.clear()
+            self._pending = 0
+
+        if self.batch > 1 and (self._flusher is None or not self._flusher.is_alive()):
+            self._flusher = threading.Thread(target=self._flush_loop, name='imouse-net-flush', daemon=True)
+            self._flusher.start()
+
+    def close(self):
+        with self._lock:
+            sock, self._sock = self._sock, None
+            if sock is not None:
+                try:
+                    self._flush_locked(sock)
+                except OSError:
+                    pass
+                sock.close()
+            self._wakeup.notify_all()
+
+    def is_plugged(self) -> bool:
+        return self._sock is not None and self._error is None
+
+    def find_output_reports(self) -> List[NetworkOutputReport]:
+        return [self._out_report]
+
+    def set_raw_data_handler(self, handler):
+        """La ruta de red no devuelve input reports"""
+
+    # ===== Envío =====
+
+    def _write(self, data: bytes) -> bool:
+        record = to_record(data)
+        with self._lock:
+            self._check()
+            self._buffer.extend(record)
+            self._pending += 1
+            self.stats['records'] += 1
+            if record[:4] == NET_MAGIC:
+                self.stats['frames'] += 1
+
+            if self._pending >= self.batch:
+                self._flush_locked(self._sock)
+            elif self._pending == 1:
+                self._oldest = time.monotonic()
+                self._wakeup.notify()
+        return True
+
+    def flush(self):
+        """Escribe ya los registros acumulados"""
+        with self._lock:
+            self._check()
+            self._flush_locked(self._sock)
+
+    def _check(self):
+        if self._error is not None:
+            raise self._error
+        if self._sock is None:
+            raise IOError(f"Sin conexión con {self.host}:{self.port}")
+
+    def _flush_locked(self, sock):
+        if not self._buffer:
+            return
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        self._pending = 0
+        try:
+            sock.sendall(data)
+        except OSError as e:
+            self._error = e
+            raise
+        self.stats['writes'] += 1
+        self.stats['bytes'] += len(data)
+
+    def _flush_loop(self):
+        """Vacía el buffer si un registro lleva más de `linger` esperando"""
+        with self._lock:
+            while True:
+                while self._sock is not None and not self._pending:
+                    self._wakeup.wait()
+                if self._sock is None:
+                    return
+                remaining = self._oldest + self.linger - time.monotonic()
+                if remaining > 0:
+                    self._wakeup.wait(remaining)
+                    continue
+                if self._error is None:
+                    try:
+                        self._flush_locked(self._sock)
+                    except OSError:
+                        pass
+
+
+# ===== Stand-in local =====
+
+class _StandInHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server: 'StandInServer' = self.server.stand_in
+        parser = StreamParser()
+        server._connected(self.request)
+        try:
+            while True:
+                data = self.request.recv(65536)
+                if not data:
+                    break
+                try:
+                    records = parser.feed(data)
+                except FrameError as e:
+                    server.errors += 1
+                    print(f"❌ {e} (cerrando conexión)")
+                    break
+                server._received(records, len(data))
+        except OSError:
+            pass
+        finally:
+            server._disconnected(self.request)
+
+
+class StandInServer:
+    """
+    Extremo remoto local para pruebas
+
+    Registra cada registro recibido en `log` como (timestamp, reporte de 9
+    bytes), igual que SimulatedDevice. Con `relay` (un HIDTransport abierto)
+    reenvía cada reporte al dongle: un puente red → USB.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, relay=None, verbose: bool = False):
+        self.relay = relay
+        self.verbose = verbose
+        self.log: List[Tuple[float, bytes]] = []
+        self.records: List[bytes] = []
+        self.stats = {'connections': 0, 'records': 0, 'frames': 0, 'reads': 0}
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._clients = set()
+        self._server = socketserver.ThreadingTCPServer((host, port), _StandInHandler, bind_and_activate=False)
+        self._server.allow_reuse_address = True
+        self._server.daemon_threads = True
+        self._server.stand_in = self
+        self._server.server_bind()
+        self._server.server_activate()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    def start(self) -> 'StandInServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, name='imouse-net-standin', daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        """Deja de escuchar y cierra las conexiones abiertas"""
+        self._server.shutdown()
+        self._server.server_close()
+        with self._lock:
+            clients = list(self._clients)
+        for sock in clients:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def reports(self) -> List[bytes]:
+        with self._lock:
+            return [data for _, data in self.log]
+
+    def _connected(self, sock):
+        with self._lock:
+            self._clients.add(sock)
+            self.stats['connections'] += 1
+
+    def _disconnected(self, sock):
+        with self._lock:
+            self._clients.discard(sock)
+
+    def _received(self, records: List[bytes], nbytes: int):
+        now = time.perf_counter()
+        with self._lock:
+            self.stats['reads'] += 1
+            for record in records:
+                report = record_to_report(record)
+                self.records.append(record)
+                self.log.append((now, report))
+                self.stats['records'] += 1
+                if record[:4] == NET_MAGIC:
+                    self.stats['frames'] += 1
+
+        for record in records:
+            if self.verbose:
+                print(f"📥 {record.hex(' ')}")
+            if self.relay is not None:
+                self.relay.send(record_to_report(record))
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    parser = argparse.ArgumentParser(description='Stand-in de red iMouse (tramas W 0xAB 0xFF 0x02)')
+    parser.add_argument('--listen', default=str(DEFAULT_NET_PORT), metavar='[HOST:]PUERTO',
+                        help=f'Dirección de escucha (default: 127.0.0.1:{DEFAULT_NET_PORT})')
+    parser.add_argument('--relay', action='store_true', help='Reenviar los reportes al dongle USB')
+    parser.add_argument('--simulate', action='store_true', help='Con --relay, usar dispositivo simulado')
+    parser.add_argument('-q', '--quiet', action='store_true', help='No mostrar cada registro')
+    args = parser.parse_args(argv)
+
+    relay = None
+    try:
+        host, port = parse_address(args.listen)
+        if args.relay:
+            from imouse_transport import open_transport
+            relay = open_transport(simulate=args.simulate)
+            if relay is None:
+                return 1
+        server = StandInServer(host, port, relay=relay, verbose=not args.quiet)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    host, port = server.address
+    print(f"🌐 Stand-in escuchando en {host}:{port}" + (" (reenviando a USB)" if relay else ""))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stand-in detenido")
+    finally:
+        server.stop()
+        if relay is not None:
+            relay.close()
+
+    stats = server.stats
+    print(f"📊 Conexiones: {stats['connections']}, registros: {stats['records']} "
+          f"(tramas de red: {stats['frames']}), lecturas: {stats['reads']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,187 +4,130 @@ iMouse Realtime - Envío de teclas en tiempo real al iPhone
 Cada tecla que presiones se envía instantáneamente al dispositivo
 """
 
-import sys
 import time
-import threading
-from queue import Queue
 
-try:
-    import pywinusb.hid as hid
-except ImportError:
-    print("❌ Error: pywinusb no está instalado")
-    print("   pip install pywinusb")
-    sys.exit(1)
+from imouse_trace import get_tracer, STAGE_ENCODE, STAGE_WAIT
+from imouse_transport import HIDTransport, KEY_RELEASE
+from imouse_sender import HIDSender, BLOCK
+from imouse_keymap_data import IMOUSE_KEYMAP
 
-try:
-    from pynput import keyboard
-except ImportError:
-    print("❌ Error: pynput no está instalado")
-    print("   pip install pynput")
-    sys.exit(1)
+# pynput se importa bajo demanda en load_keyboard() para que importar este
+# módulo (ej: desde el CLI imouse.py) no requiera la dependencia
+keyboard = None
 
 
 # ===== CONFIGURACIÓN =====
 VENDOR_ID = 0x720a
 PRODUCT_ID = 0x3dab
 
-# Tecla de activación/desactivación
+# Tecla de activación/desactivación (nombre en pynput.keyboard.Key)
 # Opciones comunes:
-# - keyboard.Key.f9          (Tecla F9)
-# - keyboard.Key.f10         (Tecla F10)
-# - keyboard.Key.f12         (Tecla F12)
-# - keyboard.Key.pause       (Tecla Pause/Break)
-# - keyboard.Key.scroll_lock (Scroll Lock - no todos los teclados la tienen)
-# - keyboard.Key.insert      (Tecla Insert)
-TOGGLE_KEY = keyboard.Key.f9  # Cambiado a F9 que todos los teclados tienen
-
-# ===== KEYMAP =====
-IMOUSE_KEYMAP = {
-    # Letras minúsculas
-    'a': (0x04, 0x00), 'b': (0x05, 0x00), 'c': (0x06, 0x00), 'd': (0x07, 0x00),
-    'e': (0x08, 0x00), 'f': (0x09, 0x00), 'g': (0x0a, 0x00), 'h': (0x0b, 0x00),
-    'i': (0x0c, 0x00), 'j': (0x0d, 0x00), 'k': (0x0e, 0x00), 'l': (0x0f, 0x00),
-    'm': (0x10, 0x00), 'n': (0x11, 0x00), 'o': (0x12, 0x00), 'p': (0x13, 0x00),
-    'q': (0x14, 0x00), 'r': (0x15, 0x00), 's': (0x16, 0x00), 't': (0x17, 0x00),
-    'u': (0x18, 0x00), 'v': (0x19, 0x00), 'w': (0x1a, 0x00), 'x': (0x1b, 0x00),
-    'y': (0x1c, 0x00), 'z': (0x1d, 0x00),
-
-    # Letras mayúsculas
-    'A': (0x04, 0x02), 'B': (0x05, 0x02), 'C': (0x06, 0x02), 'D': (0x07, 0x02),
-    'E': (0x08, 0x02), 'F': (0x09, 0x02), 'G': (0x0a, 0x02), 'H': (0x0b, 0x02),
-    'I': (0x0c, 0x02), 'J': (0x0d, 0x02), 'K': (0x0e, 0x02), 'L': (0x0f, 0x02),
-    'M': (0x10, 0x02), 'N': (0x11, 0x02), 'O': (0x12, 0x02), 'P': (0x13, 0x02),
-    'Q': (0x14, 0x02), 'R': (0x15, 0x02), 'S': (0x16, 0x02), 'T': (0x17, 0x02),
-    'U': (0x18, 0x02), 'V': (0x19, 0x02), 'W': (0x1a, 0x02), 'X': (0x1b, 0x02),
-    'Y': (0x1c, 0x02), 'Z': (0x1d, 0x02),
-
-    # Números
-    '0': (0x27, 0x00), '1': (0x1e, 0x00), '2': (0x1f, 0x00), '3': (0x20, 0x00),
-    '4': (0x21, 0x00), '5': (0x22, 0x00), '6': (0x23, 0x00), '7': (0x24, 0x00),
-    '8': (0x25, 0x00), '9': (0x26, 0x00),
-
-    # Símbolos sin Shift
-    ' ': (0x2c, 0x00), '-': (0x2d, 0x00), '=': (0x2e, 0x00), '[': (0x2f, 0x00),
-    ']': (0x30, 0x00), '\\': (0x31, 0x00), ';': (0x33, 0x00), "'": (0x34, 0x00),
-    '`': (0x35, 0x00), ',': (0x36, 0x00), '.': (0x37, 0x00), '/': (0x38, 0x00),
-
-    # Símbolos con Shift
-    '+': (0x2e, 0x02), '{': (0x2f, 0x02), '}': (0x30, 0x02), '|': (0x31, 0x02),
-    ':': (0x33, 0x02), '"': (0x34, 0x02), '~': (0x35, 0x02), '<': (0x36, 0x02),
-    '>': (0x37, 0x02), '?': (0x38, 0x02),
-
-    # Símbolos números con Shift
-    '!': (0x1e, 0x02), '@': (0x1f, 0x02), '#': (0x20, 0x02), '$': (0x21, 0x02),
-    '%': (0x22, 0x02), '^': (0x23, 0x02), '&': (0x24, 0x02), '*': (0x25, 0x02),
-    '(': (0x26, 0x02), ')': (0x27, 0x02), '_': (0x2d, 0x02),
+# - 'f9'          (Tecla F9)
+# - 'f10'         (Tecla F10)
+# - 'f12'         (Tecla F12)
+# - 'pause'       (Tecla Pause/Break)
+# - 'scroll_lock' (Scroll Lock - no todos los teclados la tienen)
+# - 'insert'      (Tecla Insert)
+TOGGLE_KEY_NAME = 'f9'  # Cambiado a F9 que todos los teclados tienen
+TOGGLE_KEY = None
+
+# Cola de envío: teclas pendientes como máximo. El hook de teclado no espera
+# nunca: con la cola llena la tecla se descarta, se cuenta y se muestra '!'
+KEY_QUEUE_CAPACITY = 128
+
+
+# Mapeo de teclas especiales de pynput (nombre en keyboard.Key) a scancodes
+SPECIAL_KEY_NAMES = {
+    'enter': (0x28, 0x00),       # Enter
+    'tab': (0x2b, 0x00),         # Tab
+    'backspace': (0x2a, 0x00),   # Backspace
+    'space': (0x2c, 0x00),       # Space
+    'esc': (0x29, 0x00),         # Escape
+    'delete': (0x4c, 0x00),      # Delete
+    'home': (0x4a, 0x00),        # Home
+    'end': (0x4d, 0x00),         # End
+    'page_up': (0x4b, 0x00),     # Page Up
+    'page_down': (0x4e, 0x00),   # Page Down
+    'right': (0x4f, 0x00),       # Right Arrow
+    'left': (0x50, 0x00),        # Left Arrow
+    'down': (0x51, 0x00),        # Down Arrow
+    'up': (0x52, 0x00),          # Up Arrow
 }
+SPECIAL_KEYS = {}
 
-# Mapeo de teclas especiales de pynput a scancodes
-SPECIAL_KEYS = {
-    keyboard.Key.enter: (0x28, 0x00),       # Enter
-    keyboard.Key.tab: (0x2b, 0x00),         # Tab
-    keyboard.Key.backspace: (0x2a, 0x00),   # Backspace
-    keyboard.Key.space: (0x2c, 0x00),       # Space
-    keyboard.Key.esc: (0x29, 0x00),         # Escape
-    keyboard.Key.delete: (0x4c, 0x00),      # Delete
-    keyboard.Key.home: (0x4a, 0x00),        # Home
-    keyboard.Key.end: (0x4d, 0x00),         # End
-    keyboard.Key.page_up: (0x4b, 0x00),     # Page Up
-    keyboard.Key.page_down: (0x4e, 0x00),   # Page Down
-    keyboard.Key.right: (0x4f, 0x00),       # Right Arrow
-    keyboard.Key.left: (0x50, 0x00),        # Left Arrow
-    keyboard.Key.down: (0x51, 0x00),        # Down Arrow
-    keyboard.Key.up: (0x52, 0x00),          # Up Arrow
-}
+
+def load_keyboard() -> bool:
+    """Importa pynput y resuelve TOGGLE_KEY / SPECIAL_KEYS (solo la primera vez)"""
+    global keyboard, TOGGLE_KEY
+
+    if keyboard is not None:
+        return True
+
+    try:
+        from pynput import keyboard as pynput_keyboard
+    except ImportError:
+        print("❌ Error: pynput no está instalado")
+        print("   pip install pynput")
+        return False
+
+    keyboard = pynput_keyboard
+    TOGGLE_KEY = getattr(keyboard.Key, TOGGLE_KEY_NAME)
+    SPECIAL_KEYS.update({getattr(keyboard.Key, name): value
+                         for name, value in SPECIAL_KEY_NAMES.items()})
+    return True
 
 
 class RealtimeTyper:
     def __init__(self):
         self.device = None
-        self.out_report = None
+        self.transport = None
         self.report_size = 0
         self.active = False
         self.running = True
-        self.key_queue = Queue()
+        self.sender = None
         self.shift_pressed = False
         self.caps_lock = False
-        self.stats = {'keys': 0, 'errors': 0}
+        self.stats = {'keys': 0, 'errors': 0, 'dropped': 0}
 
     def connect_device(self):
         """Conecta con el dispositivo iMouse"""
         print("🔌 Conectando con dispositivo iMouse...")
-        devices = hid.HidDeviceFilter(vendor_id=VENDOR_ID, product_id=PRODUCT_ID).get_devices()
+        self.transport = HIDTransport(VENDOR_ID, PRODUCT_ID, device=self.device)
 
-        if not devices:
-            print(f"❌ Dispositivo no encontrado: 0x{VENDOR_ID:04x}:0x{PRODUCT_ID:04x}")
+        if not self.transport.open():
             return False
 
-        self.device = devices[0]
+        self.device = self.transport.device
+        print(f"✅ Conectado a: {self.transport.product_name}")
 
-        try:
-            self.device.open()
-        except Exception as e:
-            print(f"❌ No se pudo abrir el dispositivo: {e}")
-            return False
-
-        print(f"✅ Conectado a: {self.device.product_name}")
+        self.report_size = self.transport.report_size
 
-        # Obtener output report
-        for report in self.device.find_output_reports():
-            self.out_report = report
-            break
-
-        if not self.out_report:
-            print("❌ No se encontró output report")
-            self.device.close()
-            return False
-
-        self.report_size = len(self.out_report.get_raw_data())
+        self.sender = HIDSender(self.transport)
+        self.sender.add_stream('keys', BLOCK, capacity=KEY_QUEUE_CAPACITY,
+                               handler=lambda key_data: self.send_key(*key_data))
         return True
 
     def send_key(self, scancode, modifier):
         """Envía una tecla al dispositivo"""
-        if not self.out_report:
+        if not self.transport:
             return False
 
-        try:
-            # Preparar paquete keypress
-            packet = [0x00, 0xa2, modifier, 0x00, scancode]
-            while len(packet) < self.report_size:
-                packet.append(0x00)
-
-            # Enviar keypress
-            self.out_report.set_raw_data(packet)
-            self.out_report.send()
+        # Enviar keypress
+        if not self.transport.send([0x00, 0xa2, modifier, 0x00, scancode]):
+            self.stats['errors'] += 1
+            return False
 
-            # Pequeño delay
+        # Pequeño delay
+        with get_tracer().span('sleep', STAGE_WAIT, delay=0.01):
             time.sleep(0.01)
 
-            # Enviar release
-            release = [0x00, 0xa2, 0x00, 0x00, 0x00]
-            while len(release) < self.report_size:
-                release.append(0x00)
-
-            self.out_report.set_raw_data(release)
-            self.out_report.send()
-
-            self.stats['keys'] += 1
-            return True
-
-        except Exception as e:
+        # Enviar release
+        if not self.transport.send(KEY_RELEASE):
             self.stats['errors'] += 1
             return False
 
-    def process_queue(self):
-        """Procesa la cola de teclas en un thread separado"""
-        while self.running:
-            try:
-                key_data = self.key_queue.get(timeout=0.1)
-                if key_data:
-                    scancode, modifier = key_data
-                    self.send_key(scancode, modifier)
-            except:
-                continue
+        self.stats['keys'] += 1
+        return True
 
     def on_press(self, key):
         """Callback cuando se presiona una tecla"""
@@ -220,6 +163,21 @@ class RealtimeTyper:
             return
 
         # Procesar la tecla
+        with get_tracer().span('key_lookup', STAGE_ENCODE):
+            key_data = self.lookup_key(key)
+
+        # Enviar la tecla si se encontró mapping
+        if key_data:
+            # Nunca bloquear el hook: timeout=0
+            if self.sender.put('keys', key_data, timeout=0):
+                # Mostrar feedback visual
+                print(".", end="", flush=True)
+            else:
+                self.stats['dropped'] += 1
+                print("!", end="", flush=True)
+
+    def lookup_key(self, key):
+        """Traduce una tecla de pynput a (scancode, modifier) o None"""
         key_data = None
 
         # Verificar si es una tecla especial
@@ -241,11 +199,7 @@ class RealtimeTyper:
             if char in IMOUSE_KEYMAP:
                 key_data = IMOUSE_KEYMAP[char]
 
-        # Enviar la tecla si se encontró mapping
-        if key_data:
-            self.key_queue.put(key_data)
-            # Mostrar feedback visual
-            print(".", end="", flush=True)
+        return key_data
 
     def on_release(self, key):
         """Callback cuando se suelta una tecla"""
@@ -255,6 +209,9 @@ class RealtimeTyper:
 
     def run(self):
         """Ejecuta el modo tiempo real"""
+        if not load_keyboard():
+            return
+
         if not self.connect_device():
             return
 
@@ -277,9 +234,8 @@ class RealtimeTyper:
         print("=" * 80)
         print(f"   Presiona {TOGGLE_KEY.name.upper()} para activar...")
 
-        # Iniciar thread para procesar teclas
-        processor_thread = threading.Thread(target=self.process_queue, daemon=True)
-        processor_thread.start()
+        # Iniciar hilo de envío
+        self.sender.start()
 
         # Iniciar listener de teclado
         with keyboard.Listener(
@@ -290,8 +246,9 @@ class RealtimeTyper:
 
         # Limpiar
         self.running = False
-        if self.device:
-            self.device.close()
+        self.sender.stop(drain=False, timeout=1.0)
+        if self.transport:
+            self.transport.close()
 
         # Mostrar estadísticas
         print()
@@ -299,6 +256,13 @@ class RealtimeTyper:
         print("📊 ESTADÍSTICAS DE LA SESIÓN:")
         print(f"   Teclas enviadas: {self.stats['keys']}")
         print(f"   Errores:         {self.stats['errors']}")
+        if self.stats['dropped']:
+            print(f"   Descartadas:     {self.stats['dropped']} (cola llena)")
+        if self.transport and self.transport.stats['stalls']:
+            print(f"   Bloqueos:        {self.transport.stats['stalls']} "
+                  f"(sin entregar: {self.transport.stats['skipped']}, "
+                  f"entregados tarde: {self.transport.stats['late']})")
+        self.sender.print_stats()
         print("=" * 80)
 
 
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+iMouse Reports - Capturas completas como arrays NumPy
+Carga y guarda capturas de reportes OUT en cualquiera de los formatos del
+proyecto, como un bloque de arrays (timestamps + matriz N x 9 de bytes) en
+vez de una lista de dicts, para procesarlas vectorizadas.
+
+Formatos (se deducen de la extensión):
+    .json           Lista de paquetes (replay_imouse.py / generate_click_json.py)
+    .ndjson/.jsonl  Un paquete JSON por línea
+    .imcl           Columnar (imouse_columnar): timestamp + report
+    .bin            Binario de imouse_capture (cabecera IMCP + registros)
+"""
+
+import os
+import json
+import time
+from array import array
+from typing import List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from imouse_capture import CAPTURE_MAGIC, CAPTURE_FORMAT_VERSION, CAPTURE_HEADER
+from imouse_columnar import save_columnar, load_columnar
+
+
+REPORT_SIZE = 9
+
+FORMAT_JSON = 'json'
+FORMAT_NDJSON = 'ndjson'
+FORMAT_COLUMNAR = 'imcl'
+FORMAT_BINARY = 'bin'
+FORMATS = (FORMAT_JSON, FORMAT_NDJSON, FORMAT_COLUMNAR, FORMAT_BINARY)
+
+EXTENSIONS = {
+    '.json': FORMAT_JSON,
+    '.ndjson': FORMAT_NDJSON,
+    '.jsonl': FORMAT_NDJSON,
+    '.imcl': FORMAT_COLUMNAR,
+    '.bin': FORMAT_BINARY,
+}
+
+
+def require_numpy():
+    """Lanza ImportError con instrucciones si NumPy no está instalado"""
+    if np is None:
+        raise ImportError("NumPy no está instalado (pip install numpy)")
+
+
+def detect_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in EXTENSIONS:
+        raise ValueError(f"Extensión de captura desconocida: {ext or path} "
+                         f"(opciones: {', '.join(sorted(EXTENSIONS))})")
+    return EXTENSIONS[ext]
+
+
+def binary_dtype(report_size: int = REPORT_SIZE):
+    """dtype equivalente a imouse_capture.record_struct ('<dH' + datos)"""
+    return np.dtype([('timestamp', '<f8'), ('length', '<u2'), ('data', 'u1', (report_size,))])
+
+
+class ReportArray:
+    """
+    Captura como arrays
+
+    Attributes:
+        timestamps: float64 (N,) en segundos
+        data: uint8 (N, 9) con los bytes de cada reporte
+        descriptions: Lista de N descripciones ('' si el formato no las guarda)
+    """
+
+    def __init__(self, timestamps, data, descriptions: Optional[List[str]] = None):
+        require_numpy()
+        self.timestamps = np.asarray(timestamps, dtype=np.float64)
+        self.data = np.asarray(data, dtype=np.uint8).reshape(-1, REPORT_SIZE)
+        self.descriptions = list(descriptions) if descriptions is not None else [''] * len(self.data)
+        if not (len(self.timestamps) == len(self.data) == len(self.descriptions)):
+            raise ValueError("timestamps, data y descriptions deben tener la misma longitud")
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    @property
+    def command(self):
+        return self.data[:, 1]
+
+    def copy(self) -> 'ReportArray':
+        return ReportArray(self.timestamps.copy(), self.data.copy(), list(self.descriptions))
+
+
+# ===== Conversión desde/hacia paquetes JSON =====
+
+def packet_bytes(packet: dict) -> Optional[list]:
+    """Bytes de un paquete ('bytes' o 'data' hex), ajustados a REPORT_SIZE"""
+    data = packet.get('bytes')
+    if not data and packet.get('data'):
+        try:
+            data = list(bytes.fromhex(packet['data']))
+        except ValueError:
+            return None
+    if not data:
+        return None
+    data = list(data[:REPORT_SIZE])
+    return data + [0x00] * (REPORT_SIZE - len(data))
+
+
+def from_packets(packets: list) -> ReportArray:
+    """Lista de paquetes de captura → ReportArray (solo dirección 'out')"""
+    require_numpy()
+    timestamps, rows, descriptions = [], [], []
+    for packet in packets:
+        if packet.get('direction', 'out') != 'out':
+            continue
+        data = packet_bytes(packet)
+        if data is None:
+            continue
+        timestamps.append(float(packet.get('timestamp', 0.0)))
+        rows.append(data)
+        descriptions.append(packet.get('description', ''))
+
+    data = np.array(rows, dtype=np.uint8) if rows else np.zeros((0, REPORT_SIZE), dtype=np.uint8)
+    return ReportArray(timestamps, data, descriptions)
+
+
+def to_packets(reports: ReportArray) -> List[dict]:
+    """ReportArray → lista de paquetes (formato de replay_imouse.py)"""
+    return [{
+        "timestamp": timestamp,
+        "direction": "out",
+        "description": description,
+        "bytes": row,
+    } for timestamp, row, description in zip(reports.timestamps.tolist(), reports.data.tolist(),
+                                              reports.descriptions)]
+
+
+# ===== Carga / guardado =====
+
+def load_reports(path: str, fmt: Optional[str] = None) -> ReportArray:
+    """Carga una captura en cualquier formato como ReportArray"""
+    require_numpy()
+    fmt = fmt or detect_format(path)
+
+    if fmt == FORMAT_JSON:
+        with open(path, 'r', encoding='utf-8') as f:
+            return from_packets(json.load(f))
+
+    if fmt == FORMAT_NDJSON:
+        with open(path, 'r', encoding='utf-8') as f:
+            return from_packets([json.loads(line) for line in f if line.strip()])
+
+    if fmt == FORMAT_COLUMNAR:
+        columns = load_columnar(path, ['timestamp', 'report'])
+        return ReportArray(np.array(columns['timestamp'], dtype=np.float64),
+                           np.frombuffer(columns['report'], dtype=np.uint8))
+
+    if fmt == FORMAT_BINARY:
+        with open(path, 'rb') as f:
+            magic, version, report_size, _ = CAPTURE_HEADER.unpack(f.read(CAPTURE_HEADER.size))
+            if magic != CAPTURE_MAGIC:
+                raise ValueError(f"Magic inválido: {magic!r}")
+            if version != CAPTURE_FORMAT_VERSION:
+                raise ValueError(f"Versión de formato no soportada: {version}")
+            body = f.read()
+
+        dtype = binary_dtype(report_size)
+        records = np.frombuffer(body, dtype=dtype, count=len(body) // dtype.itemsize)
+        data = np.zeros((len(records), REPORT_SIZE), dtype=np.uint8)
+        width = min(report_size, REPORT_SIZE)
+        data[:, :width] = records['data'][:, :width]
+        return ReportArray(records['timestamp'], data)
+
+    raise ValueError(f"Formato desconocido: {fmt}")
+
+
+def save_reports(reports: ReportArray, path: str, fmt: Optional[str] = None):
+    """Guarda un ReportArray en cualquier formato de captura"""
+    fmt = fmt or detect_format(path)
+
+    if fmt == FORMAT_JSON:
+        with open(path, 'w') as f:
+            json.dump(to_packets(reports), f, indent=2)
+
+    elif fmt == FORMAT_NDJSON:
+        with open(path, 'w') as f:
+            for packet in to_packets(reports):
+                f.write(json.dumps(packet) + '\n')
+
+    elif fmt == FORMAT_COLUMNAR:
+        save_columnar(path, {'timestamp': array('d', reports.timestamps.tolist()),
+                             'report': array('B', reports.data.tobytes())},
+                      len(reports), widths={'report': REPORT_SIZE})
+
+    elif fmt == FORMAT_BINARY:
+        records = np.zeros(len(reports), dtype=binary_dtype())
+        records['timestamp'] = reports.timestamps
+        records['length'] = REPORT_SIZE
+        records['data'] = reports.data
+        with open(path, 'wb') as f:
+            f.write(CAPTURE_HEADER.pack(CAPTURE_MAGIC, CAPTURE_FORMAT_VERSION, REPORT_SIZE, time.time()))
+            f.write(records.tobytes())
+
+    else:
+        raise ValueError(f"Formato desconocido: {fmt}")
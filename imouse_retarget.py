@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+iMouse Retarget - Adaptar capturas a otra resolución / orientación
+Una captura grabada para el perfil iPhone (365x667) no sirve tal cual en un
+iPad (768x1024) ni en landscape. El payload 0xa0 lleva coordenadas
+normalizadas 0-32767 y el 0xa1 deltas en píxeles, así que basta con
+decodificar la captura completa a arrays (imouse_reports), aplicar una
+transformación afín (rotación + escala o letterbox) y volver a codificar.
+Todo se hace vectorizado con NumPy: una librería grande de macros se
+convierte en segundos.
+
+Modos de escala:
+    stretch     Cada eje se escala por separado (ocupa toda la pantalla)
+    letterbox   Misma escala en ambos ejes, centrado (conserva proporciones)
+
+    python imouse_retarget.py samples/telegram.json -o telegram_ipad.json --from iphone --to ipad
+    python imouse_retarget.py captura.bin -o captura_land.imcl --to iphone-landscape --rotate 90
+    python imouse_retarget.py captura.ndjson -o ipad.ndjson --to 768x1024 --mode letterbox
+"""
+
+import re
+import sys
+import time
+import argparse
+from typing import Tuple
+
+from imouse_reports import (ReportArray, load_reports, save_reports, require_numpy,
+                            detect_format, FORMATS)
+from imouse_targets import PROFILES, DEFAULT_PROFILE, NORM_MAX
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+MOVE_ABSOLUTE = 0xa0
+MOVE_RELATIVE = 0xa1
+RESET_POSITION = 0xFFFF
+
+MODE_STRETCH = 'stretch'
+MODE_LETTERBOX = 'letterbox'
+MODES = (MODE_STRETCH, MODE_LETTERBOX)
+
+ROTATIONS = (0, 90, 180, 270)
+
+DX_LIMIT = 1 << 23          # Delta X: 24 bits con signo (bytes 3-5)
+DY_LIMIT = 1 << 15          # Delta Y: 16 bits con signo (bytes 6-7)
+
+MOVE_DESCRIPTION = re.compile(r'^(Mover a )\((\d+), (\d+)\)$')
+
+
+def parse_size(value: str) -> Tuple[int, int]:
+    """Nombre de perfil ('ipad') o 'ANCHOxALTO' → (ancho, alto)"""
+    if value in PROFILES:
+        return PROFILES[value]
+    match = re.fullmatch(r'(\d+)[xX](\d+)', value)
+    if not match or not int(match.group(1)) or not int(match.group(2)):
+        raise ValueError(f"Resolución inválida: {value} (perfil o ANCHOxALTO; "
+                         f"perfiles: {', '.join(PROFILES)})")
+    return int(match.group(1)), int(match.group(2))
+
+
+def transform_matrix(src: Tuple[int, int], dst: Tuple[int, int], rotate: int = 0,
+                     mode: str = MODE_STRETCH):
+    """
+    Transformación afín en píxeles: p_dst = A @ p_src + b
+
+    La rotación es en sentido horario y se aplica antes de escalar, así que
+    para pasar de portrait a landscape con stretch basta --rotate 90.
+
+    Returns:
+        tuple: (A 2x2, b 2) como arrays float64
+    """
+    require_numpy()
+    if rotate not in ROTATIONS:
+        raise ValueError(f"Rotación inválida: {rotate} (opciones: {', '.join(map(str, ROTATIONS))})")
+    if mode not in MODES:
+        raise ValueError(f"Modo inválido: {mode} (opciones: {', '.join(MODES)})")
+
+    width, height = src
+    rotations = {
+        0: ([[1, 0], [0, 1]], [0, 0], (width, height)),
+        90: ([[0, -1], [1, 0]], [height, 0], (height, width)),
+        180: ([[-1, 0], [0, -1]], [width, height], (width, height)),
+        270: ([[0, 1], [-1, 0]], [0, width], (height, width)),
+    }
+    rotation, offset, (rot_w, rot_h) = rotations[rotate]
+
+    dst_w, dst_h = dst
+    scale_x, scale_y = dst_w / rot_w, dst_h / rot_h
+    margin = np.zeros(2)
+    if mode == MODE_LETTERBOX:
+        scale_x = scale_y = min(scale_x, scale_y)
+        margin = np.array([(dst_w - rot_w * scale_x) / 2, (dst_h - rot_h * scale_y) / 2])
+
+    scale = np.diag([scale_x, scale_y])
+    matrix = scale @ np.array(rotation, dtype=np.float64)
+    bias = scale @ np.array(offset, dtype=np.float64) + margin
+    return matrix, bias
+
+
+# ===== Decodificación / codificación de payloads =====
+
+def decode_absolute(data):
+    """Filas 0xa0 → (x_norm, y_norm) como int64"""
+    x = data[:, 3].astype(np.int64) | (data[:, 4].astype(np.int64) << 8)
+    y = data[:, 5].astype(np.int64) | (data[:, 6].astype(np.int64) << 8)
+    return x, y
+
+
+def decode_relative(data):
+    """Filas 0xa1 → (dx 24 bits, dy 16 bits) con signo como int64"""
+    dx = (data[:, 3].astype(np.int64) | (data[:, 4].astype(np.int64) << 8)
+          | (data[:, 5].astype(np.int64) << 16))
+    dx = np.where(dx & DX_LIMIT, dx - (1 << 24), dx)
+    dy = data[:, 6].astype(np.int64) | (data[:, 7].astype(np.int64) << 8)
+    dy = np.where(dy & DY_LIMIT, dy - (1 << 16), dy)
+    return dx, dy
+
+
+def encode_absolute(data, x, y):
+    data[:, 3], data[:, 4] = x & 0xFF, (x >> 8) & 0xFF
+    data[:, 5], data[:, 6] = y & 0xFF, (y >> 8) & 0xFF
+
+
+def encode_relative(data, dx, dy):
+    dx = dx & 0xFFFFFF
+    dy = dy & 0xFFFF
+    data[:, 3], data[:, 4], data[:, 5] = dx & 0xFF, (dx >> 8) & 0xFF, (dx >> 16) & 0xFF
+    data[:, 6], data[:, 7] = dy & 0xFF, (dy >> 8) & 0xFF
+
+
+def round_cumulative(values):
+    """Redondea deltas sin acumular error: la suma redondeada se mantiene exacta"""
+    totals = np.rint(np.cumsum(values))
+    return np.diff(totals, prepend=0.0).astype(np.int64)
+
+
+# ===== Retarget =====
+
+def retarget(reports: ReportArray, src: Tuple[int, int], dst: Tuple[int, int],
+             rotate: int = 0, mode: str = MODE_STRETCH) -> ReportArray:
+    """
+    Adapta una captura de la resolución `src` a `dst`
+
+    - 0xa0: coordenadas normalizadas → píxeles de src → transformación →
+      normalizadas de dst (los reset 0xFFFF se mantienen)
+    - 0xa1: solo la parte lineal (rotación + escala); los deltas se redondean
+      de forma acumulada para que el recorrido total no derive
+    - Resto de reportes (teclado, restart): sin cambios
+
+    Returns:
+        ReportArray: captura nueva (la original no se modifica)
+    """
+    matrix, bias = transform_matrix(src, dst, rotate, mode)
+    result = reports.copy()
+    data = result.data
+    command = data[:, 1]
+    (src_w, src_h), (dst_w, dst_h) = src, dst
+
+    # Movimiento absoluto
+    rows = np.flatnonzero(command == MOVE_ABSOLUTE)
+    if len(rows):
+        x_norm, y_norm = decode_absolute(data[rows])
+        moves = ~((x_norm == RESET_POSITION) & (y_norm == RESET_POSITION))
+        rows, x_norm, y_norm = rows[moves], x_norm[moves], y_norm[moves]
+
+        points = np.stack([x_norm * (src_w / NORM_MAX), y_norm * (src_h / NORM_MAX)])
+        points = matrix @ points + bias[:, None]
+        x_new = np.clip(np.rint(points[0] / dst_w * NORM_MAX), 0, NORM_MAX).astype(np.int64)
+        y_new = np.clip(np.rint(points[1] / dst_h * NORM_MAX), 0, NORM_MAX).astype(np.int64)
+
+        block = data[rows]
+        encode_absolute(block, x_new, y_new)
+        data[rows] = block
+        _update_descriptions(result.descriptions, rows, points)
+
+    # Movimiento relativo
+    rows = np.flatnonzero(command == MOVE_RELATIVE)
+    if len(rows):
+        dx, dy = decode_relative(data[rows])
+        moving = np.flatnonzero((dx != 0) | (dy != 0))
+        if len(moving):
+            deltas = matrix @ np.stack([dx[moving], dy[moving]]).astype(np.float64)
+            dx[moving] = np.clip(round_cumulative(deltas[0]), -DX_LIMIT, DX_LIMIT - 1)
+            dy[moving] = np.clip(round_cumulative(deltas[1]), -DY_LIMIT, DY_LIMIT - 1)
+
+            block = data[rows]
+            encode_relative(block, dx, dy)
+            data[rows] = block
+
+    return result
+
+
+def _update_descriptions(descriptions, rows, points):
+    """Actualiza 'Mover a (x, y)' con los píxeles nuevos"""
+    xs, ys = np.rint(points).astype(np.int64)
+    for row, x, y in zip(rows.tolist(), xs.tolist(), ys.tolist()):
+        match = MOVE_DESCRIPTION.match(descriptions[row])
+        if match:
+            descriptions[row] = f"{match.group(1)}({x}, {y})"
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    parser = argparse.ArgumentParser(description='Adapta una captura iMouse a otra resolución / orientación')
+    parser.add_argument('input', help='Captura de entrada (.json, .ndjson, .imcl, .bin)')
+    parser.add_argument('-o', '--output', required=True, help='Captura de salida (formato según extensión)')
+    parser.add_argument('--from', dest='src', default=DEFAULT_PROFILE,
+                        help='Resolución de origen: perfil o ANCHOxALTO (default: iphone)')
+    parser.add_argument('--to', dest='dst', required=True,
+                        help='Resolución de destino: perfil o ANCHOxALTO')
+    parser.add_argument('--rotate', type=int, default=0, choices=ROTATIONS,
+                        help='Rotación horaria en grados (default: 0)')
+    parser.add_argument('--mode', default=MODE_STRETCH, choices=MODES,
+                        help='Escalado: stretch | letterbox (default: stretch)')
+    parser.add_argument('--format', choices=FORMATS, help='Forzar formato de salida')
+    args = parser.parse_args(argv)
+
+    try:
+        require_numpy()
+        src, dst = parse_size(args.src), parse_size(args.dst)
+        fmt = args.format or detect_format(args.output)
+
+        started = time.perf_counter()
+        reports = load_reports(args.input)
+        retargeted = retarget(reports, src, dst, args.rotate, args.mode)
+        save_reports(retargeted, args.output, fmt)
+        elapsed = time.perf_counter() - started
+    except (ImportError, OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    command = reports.command
+    print(f"✅ {args.input} ({src[0]}x{src[1]}) → {args.output} ({dst[0]}x{dst[1]}, {fmt})")
+    print(f"   Reportes: {len(reports)} (absolutos: {int((command == MOVE_ABSOLUTE).sum())}, "
+          f"relativos: {int((command == MOVE_RELATIVE).sum())})")
+    print(f"   Rotación: {args.rotate}°, modo: {args.mode}, tiempo: {elapsed * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
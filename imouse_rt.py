@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+iMouse RT - Prioridad de tiempo real, afinidad de CPU y mlockall (Linux)
+Aunque el envío esté bien temporizado, el hilo que escribe compite con el
+resto de procesos de la máquina. En granjas sensibles a la latencia se
+puede cambiar CPU por jitter con tres ajustes opcionales, que se aplican al
+hilo de envío desde dentro del propio hilo:
+
+    fifo:N / rr:N   SCHED_FIFO / SCHED_RR con prioridad N (1-99)
+    cpus=2-3+5      Afinidad de CPU del hilo
+    mlock           mlockall(MCL_CURRENT | MCL_FUTURE): sin fallos de página
+
+Especificación: los ajustes separados por comas (ej: "fifo:50,cpus=3,mlock"),
+vía HIDTransport(realtime=...), HIDSender(realtime=...),
+SenderProcess(realtime=...), la opción --realtime de replay_imouse.py o la
+variable de entorno IMOUSE_REALTIME. Si un ajuste no está permitido (sin
+CAP_SYS_NICE, otro sistema operativo...) se avisa y se sigue sin él.
+
+    python imouse_rt.py "fifo:50,cpus=1,mlock"     # comprobar qué se puede aplicar
+"""
+
+import os
+import sys
+import ctypes
+import argparse
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+REALTIME_ENV_VAR = "IMOUSE_REALTIME"
+
+POLICY_FIFO = 'fifo'
+POLICY_RR = 'rr'
+POLICIES = (POLICY_FIFO, POLICY_RR)
+DEFAULT_PRIORITY = 50
+
+MCL_CURRENT = 1
+MCL_FUTURE = 2
+
+
+def parse_cpus(text: str) -> List[int]:
+    """'2-3+5' → [2, 3, 5]"""
+    cpus = []
+    for part in text.split('+'):
+        part = part.strip()
+        if '-' in part:
+            low, high = part.split('-', 1)
+            cpus.extend(range(int(low), int(high) + 1))
+        elif part:
+            cpus.append(int(part))
+    return sorted(set(cpus))
+
+
+@dataclass
+class RealtimeSettings:
+    """Ajustes de tiempo real para un hilo de envío"""
+    policy: Optional[str] = None
+    priority: int = DEFAULT_PRIORITY
+    cpus: List[int] = field(default_factory=list)
+    mlock: bool = False
+
+    def __bool__(self):
+        return bool(self.policy or self.cpus or self.mlock)
+
+    @classmethod
+    def parse(cls, spec: Optional[str]) -> 'RealtimeSettings':
+        """
+        "fifo:50,cpus=2-3,mlock" → RealtimeSettings
+
+        Las partes de la lista de CPUs se separan con '+' (cpus=1+3-4)
+        para no chocar con la coma entre ajustes.
+
+        Raises:
+            ValueError: si la especificación no es válida
+        """
+        settings = cls()
+        for item in (spec or '').split(','):
+            item = item.strip()
+            if not item:
+                continue
+            name, _, value = item.partition(':') if ':' in item else item.partition('=')
+            name = name.lower()
+            try:
+                if name in POLICIES:
+                    settings.policy = name
+                    settings.priority = int(value) if value else DEFAULT_PRIORITY
+                    if not 1 <= settings.priority <= 99:
+                        raise ValueError(f"prioridad fuera de rango: {settings.priority} (1-99)")
+                elif name == 'cpus':
+                    settings.cpus = parse_cpus(value)
+                elif name == 'mlock':
+                    settings.mlock = True
+                else:
+                    raise ValueError(f"ajuste desconocido: {name}")
+            except ValueError as e:
+                raise ValueError(f"Especificación de tiempo real inválida ({item}): {e}")
+        return settings
+
+    @classmethod
+    def from_env(cls) -> 'RealtimeSettings':
+        try:
+            return cls.parse(os.environ.get(REALTIME_ENV_VAR))
+        except ValueError as e:
+            print(f"⚠️  {REALTIME_ENV_VAR}: {e}")
+            return cls()
+
+    def describe(self) -> str:
+        parts = []
+        if self.policy:
+            parts.append(f"{self.policy}:{self.priority}")
+        if self.cpus:
+            parts.append(f"cpus={'+'.join(map(str, self.cpus))}")
+        if self.mlock:
+            parts.append('mlock')
+        return ','.join(parts) or 'ninguno'
+
+    def apply(self, label: str = 'envío', verbose: bool = True) -> Dict[str, str]:
+        """
+        Aplica los ajustes al hilo que llama
+
+        Returns:
+            dict: ajuste → 'ok' o el motivo por el que no se aplicó
+        """
+        status = {}
+        if self.policy:
+            status['policy'] = _try(_set_policy, self.policy, self.priority)
+        if self.cpus:
+            status['cpus'] = _try(_set_affinity, self.cpus)
+        if self.mlock:
+            status['mlock'] = _try(_mlockall)
+
+        if verbose:
+            for name, result in status.items():
+                if result != 'ok':
+                    print(f"⚠️  Hilo de {label}: {name} no aplicado ({result}), se continúa sin él")
+        return status
+
+
+def realtime_settings(value=None) -> RealtimeSettings:
+    """None → IMOUSE_REALTIME; texto → parse(); RealtimeSettings tal cual"""
+    if value is None:
+        return RealtimeSettings.from_env()
+    if isinstance(value, RealtimeSettings):
+        return value
+    return RealtimeSettings.parse(value)
+
+
+def _try(func, *args) -> str:
+    try:
+        func(*args)
+        return 'ok'
+    except (OSError, AttributeError, ValueError) as e:
+        return str(e) or type(e).__name__
+
+
+def _set_policy(policy: str, priority: int):
+    if not hasattr(os, 'sched_setscheduler'):
+        raise OSError("planificación de tiempo real no disponible en este sistema")
+    sched = os.SCHED_FIFO if policy == POLICY_FIFO else os.SCHED_RR
+    # En Linux pid 0 es el hilo que llama (la planificación es por hilo)
+    os.sched_setscheduler(0, sched, os.sched_param(priority))
+
+
+def _set_affinity(cpus: List[int]):
+    if not hasattr(os, 'sched_setaffinity'):
+        raise OSError("afinidad de CPU no disponible en este sistema")
+    os.sched_setaffinity(0, cpus)
+
+
+def _mlockall():
+    if not sys.platform.startswith('linux'):
+        raise OSError("mlockall solo está disponible en Linux")
+    libc = ctypes.CDLL(None, use_errno=True)
+    if libc.mlockall(MCL_CURRENT | MCL_FUTURE) != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    parser = argparse.ArgumentParser(description='Comprueba qué ajustes de tiempo real se pueden aplicar')
+    parser.add_argument('spec', nargs='?', help=f'Ajustes (ej: "fifo:50,cpus=1,mlock"; default: {REALTIME_ENV_VAR})')
+    args = parser.parse_args(argv)
+
+    try:
+        settings = RealtimeSettings.parse(args.spec) if args.spec else RealtimeSettings.from_env()
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    if not settings:
+        print("ℹ️  Sin ajustes de tiempo real")
+        return 0
+
+    status = settings.apply(verbose=False)
+    print(f"⚙️  {settings.describe()}")
+    for name, result in status.items():
+        print(f"   {'✅' if result == 'ok' else '⚠️ '} {name}: {result}")
+    return 0 if all(result == 'ok' for result in status.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+iMouse Sender - Cola de envío acotada con backpressure
+Un hilo de envío compartido consume varios streams, cada uno con un ring
+buffer de capacidad fija y una política explícita para cuando se llena:
+
+- BLOCK:           el productor espera (teclado, replay: no se pierde nada)
+- COALESCE_LATEST: el último elemento pendiente con la misma clave se
+                   reemplaza (movimiento del mouse: solo importa la posición
+                   más reciente)
+- DROP_OLDEST:     se descarta el elemento más antiguo (telemetría)
+
+Así los productores nunca hacen crecer la memoria sin límite y, con
+timeout=0, nunca bloquean el hook de entrada aunque el dispositivo sea más
+lento que la fuente.
+"""
+
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from imouse_trace import get_tracer
+from imouse_rt import realtime_settings
+
+
+BLOCK = "block"
+COALESCE_LATEST = "coalesce-latest"
+DROP_OLDEST = "drop-oldest"
+
+POLICIES = (BLOCK, COALESCE_LATEST, DROP_OLDEST)
+
+
+class SenderStream:
+    """
+    Stream de envío con ring buffer acotado
+
+    Args:
+        name: Nombre del stream (aparece en estadísticas y trazas)
+        policy: BLOCK, COALESCE_LATEST o DROP_OLDEST
+        capacity: Número máximo de elementos pendientes
+        handler: Función llamada por el hilo de envío con cada elemento
+    """
+
+    def __init__(self, name: str, policy: str, capacity: int, handler: Callable):
+        if policy not in POLICIES:
+            raise ValueError(f"Política desconocida: {policy} (opciones: {', '.join(POLICIES)})")
+        if capacity < 1:
+            raise ValueError("La capacidad debe ser al menos 1")
+
+        self.name = name
+        self.policy = policy
+        self.capacity = capacity
+        self.handler = handler
+        self._items = deque()
+        self.stats = {'enqueued': 0, 'sent': 0, 'dropped': 0, 'coalesced': 0,
+                      'rejected': 0, 'errors': 0, 'max_depth': 0}
+
+    @property
+    def depth(self) -> int:
+        return len(self._items)
+
+    def full(self) -> bool:
+        return len(self._items) >= self.capacity
+
+
+class HIDSender:
+    """
+    Hilo de envío compartido por varios streams
+
+    Los streams se atienden en orden de registro (round-robin), de modo que
+    un stream saturado no deja sin turno a los demás.
+
+    Ejemplo:
+        sender = HIDSender(transport)
+        sender.add_stream('keys', BLOCK, capacity=128)
+        sender.add_stream('motion', COALESCE_LATEST, capacity=8)
+        sender.start()
+        sender.put('motion', packet, key='move')
+    """
+
+    def __init__(self, transport=None, name: str = "imouse-sender", realtime=None):
+        self.transport = transport
+        self.name = name
+        # Ajustes de tiempo real del hilo de envío (ver imouse_rt)
+        self.realtime = realtime_settings(realtime) if realtime is not None else None
+        self.realtime_status: Dict[str, str] = {}
+        self.streams: Dict[str, SenderStream] = {}
+        self._order: List[SenderStream] = []
+        self._next = 0
+        self._cond = threading.Condition()
+        self._running = False
+        self._busy = False
+        self._thread: Optional[threading.Thread] = None
+
+    def add_stream(self, name: str, policy: str = BLOCK, capacity: int = 64,
+                   handler: Optional[Callable] = None) -> SenderStream:
+        """Registra un stream; por defecto cada elemento es un paquete para transport.send"""
+        if handler is None:
+            if self.transport is None:
+                raise ValueError("Se necesita un handler o un transporte")
+            handler = self.transport.send
+
+        stream = SenderStream(name, policy, capacity, handler)
+        with self._cond:
+            self.streams[name] = stream
+            self._order.append(stream)
+        return stream
+
+    # ===== Productores =====
+
+    def put(self, stream_name: str, item, key=None, timeout: Optional[float] = None) -> bool:
+        """
+        Encola un elemento en un stream
+
+        Args:
+            key: Clave de coalescencia (solo COALESCE_LATEST); si el último
+                 elemento pendiente tiene la misma clave se reemplaza
+            timeout: Espera máxima con la cola llena (solo BLOCK). None espera
+                     indefinidamente; 0 no espera nunca
+
+        Returns:
+            bool: False si el elemento no se encoló (BLOCK con timeout agotado
+                  o sender detenido)
+        """
+        stream = self.streams[stream_name]
+
+        with self._cond:
+            if not self._running:
+                stream.stats['rejected'] += 1
+                return False
+
+            items = stream._items
+
+            if stream.policy == COALESCE_LATEST:
+                if key is not None and items and items[-1][0] == key:
+                    items[-1] = (key, item)
+                    stream.stats['coalesced'] += 1
+                    return True
+                if stream.full():
+                    items.popleft()
+                    stream.stats['dropped'] += 1
+
+            elif stream.policy == DROP_OLDEST:
+                if stream.full():
+                    items.popleft()
+                    stream.stats['dropped'] += 1
+
+            else:
+                if stream.full():
+                    if not self._cond.wait_for(lambda: not stream.full() or not self._running,
+                                               timeout=timeout):
+                        stream.stats['rejected'] += 1
+                        return False
+                    if not self._running:
+                        stream.stats['rejected'] += 1
+                        return False
+
+            items.append((key, item))
+            stream.stats['enqueued'] += 1
+            stream.stats['max_depth'] = max(stream.stats['max_depth'], len(items))
+            get_tracer().counter(f'queue.{stream.name}', depth=len(items))
+            self._cond.notify_all()
+            return True
+
+    # ===== Hilo de envío =====
+
+    def _pop_next(self):
+        """Siguiente (stream, item) en round-robin, o None si todo está vacío"""
+        count = len(self._order)
+        for offset in range(count):
+            stream = self._order[(self._next + offset) % count]
+            if stream._items:
+                self._next = (self._next + offset + 1) % count
+                return stream, stream._items.popleft()[1]
+        return None
+
+    def _run(self):
+        if self.realtime:
+            self.realtime_status = self.realtime.apply(self.name)
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: not self._running or self.depth() > 0)
+                entry = self._pop_next()
+                if entry is None:
+                    # Detenido y sin pendientes
+                    return
+                self._busy = True
+                # Liberar productores bloqueados
+                self._cond.notify_all()
+
+            stream, item = entry
+            try:
+                ok = stream.handler(item)
+            except Exception as e:
+                print(f"❌ Error en stream '{stream.name}': {e}")
+                ok = False
+
+            with self._cond:
+                self._busy = False
+                if ok is False:
+                    stream.stats['errors'] += 1
+                else:
+                    stream.stats['sent'] += 1
+                self._cond.notify_all()
+
+    def start(self):
+        """Inicia el hilo de envío"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name=self.name)
+        self._thread.start()
+
+    def stop(self, drain: bool = True, timeout: Optional[float] = None):
+        """
+        Detiene el hilo de envío
+
+        Args:
+            drain: Enviar antes lo que quede pendiente; si es False se descarta
+        """
+        with self._cond:
+            if not drain:
+                for stream in self._order:
+                    stream.stats['dropped'] += len(stream._items)
+                    stream._items.clear()
+            self._running = False
+            self._cond.notify_all()
+
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que se vacíen todas las colas. Devuelve False si vence el timeout"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.depth() == 0 and not self._busy, timeout=timeout)
+
+    # ===== Estadísticas =====
+
+    def depth(self) -> int:
+        """Elementos pendientes en todos los streams"""
+        return sum(len(stream._items) for stream in self._order)
+
+    def get_stats(self) -> Dict[str, dict]:
+        """Contadores por stream, incluida la profundidad actual"""
+        with self._cond:
+            return {stream.name: dict(stream.stats, depth=stream.depth) for stream in self._order}
+
+    def print_stats(self):
+        """Imprime los contadores de cada stream"""
+        for name, stats in self.get_stats().items():
+            print(f"   [{name}] enviados: {stats['sent']}, descartados: {stats['dropped']}, "
+                  f"fusionados: {stats['coalesced']}, rechazados: {stats['rejected']}, "
+                  f"máx. profundidad: {stats['max_depth']}")
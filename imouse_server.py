@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+iMouse Server - Servidor TCP de comandos (JSON por líneas)
+Mantiene abiertos los dispositivos y el intérprete, así un orquestador que
+envía miles de comandos al día no paga el arranque de Python ni la apertura
+del dongle en cada uno.
+
+Protocolo: una petición JSON por línea, una respuesta JSON por línea.
+    → {"id": 1, "op": "tap", "x": 182, "y": 333}
+    ← {"id": 1, "ok": true, "result": true}
+
+Operaciones: ping, tap, swipe, type, shortcut, replay, stats. El campo
+opcional "device" (índice, default 0) elige el dispositivo. "tap" acepta
+"target" (objetivo con nombre, ej: "home.telegram") en lugar de x/y; "type"
+acepta "current" (contenido actual del campo) para enviar solo la edición
+mínima hasta "text"; "shortcut" acepta "name" (atajo o secuencia de la
+tabla, con "text" para las que lo usan) o "scancode"/"modifier".
+"""
+
+import json
+import asyncio
+from typing import List, Optional
+
+from imouse_async import AsyncIMouseClient
+from imouse_transport import open_transport, VENDOR_ID, PRODUCT_ID
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 7420
+
+
+async def _op_ping(client, request):
+    return 'pong'
+
+
+async def _op_tap(client, request):
+    if 'target' in request:
+        return await client.tap_target(request['target'], button=request.get('button', 'left'),
+                                       reset=request.get('reset', True))
+    return await client.tap(int(request['x']), int(request['y']),
+                            button=request.get('button', 'left'),
+                            reset=request.get('reset', True))
+
+
+async def _op_swipe(client, request):
+    return await client.swipe(int(request['x1']), int(request['y1']),
+                              int(request['x2']), int(request['y2']),
+                              duration=float(request.get('duration', 0.3)),
+                              steps=int(request.get('steps', 10)))
+
+
+async def _op_type(client, request):
+    delay = float(request.get('delay', 0.03))
+    if 'current' in request:
+        cursor = request.get('cursor')
+        return await client.edit_text(request['current'], request['text'], typing_delay=delay,
+                                      cursor=int(cursor) if cursor is not None else None)
+    return await client.type_text(request['text'], typing_delay=delay)
+
+
+async def _op_shortcut(client, request):
+    if 'name' in request:
+        params = {'text': request['text']} if 'text' in request else None
+        return await client.run_shortcut(request['name'], params)
+    scancode, modifier = int(request['scancode']), int(request.get('modifier', 0))
+    return await client.shortcut(scancode, modifier)
+
+
+async def _op_replay(client, request):
+    return await client.replay(request['file'], speed=float(request.get('speed', 1.0)))
+
+
+async def _op_stats(client, request):
+    return dict(client.stats, transport=client.transport.stats)
+
+
+OPERATIONS = {
+    'ping': _op_ping,
+    'tap': _op_tap,
+    'swipe': _op_swipe,
+    'type': _op_type,
+    'shortcut': _op_shortcut,
+    'replay': _op_replay,
+    'stats': _op_stats,
+}
+
+
+async def handle_request(clients: List[AsyncIMouseClient], request: dict) -> dict:
+    """Ejecuta una petición y devuelve la respuesta (nunca lanza excepciones)"""
+    response = {'id': request.get('id')}
+
+    op = OPERATIONS.get(request.get('op'))
+    if op is None:
+        response.update(ok=False, error=f"Operación desconocida: {request.get('op')}")
+        return response
+
+    try:
+        client = clients[int(request.get('device', 0))]
+        result = await op(client, request)
+    except (KeyError, IndexError, ValueError, TypeError) as e:
+        response.update(ok=False, error=f"Petición inválida: {e!r}")
+        return response
+    except Exception as e:
+        response.update(ok=False, error=str(e))
+        return response
+
+    response.update(ok=result is not False, result=result)
+    return response
+
+
+async def _handle_connection(clients, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    peer = writer.get_extra_info('peername')
+    print(f"🔗 Conexión de {peer}")
+
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if not line.strip():
+                continue
+
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("se esperaba un objeto JSON")
+            except ValueError as e:
+                response = {'id': None, 'ok': False, 'error': f"JSON inválido: {e}"}
+            else:
+                response = await handle_request(clients, request)
+
+            writer.write(json.dumps(response).encode('utf-8') + b'\n')
+            await writer.drain()
+
+    except ConnectionError:
+        pass
+
+    finally:
+        writer.close()
+        print(f"👋 Desconectado {peer}")
+
+
+async def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, devices: int = 1,
+                simulate: bool = False, vendor_id: int = VENDOR_ID, product_id: int = PRODUCT_ID,
+                network: Optional[str] = None, batch: int = 1):
+    """
+    Abre los dispositivos y atiende conexiones hasta que se cancele
+
+    Args:
+        network: Direcciones 'host:puerto' separadas por comas (un
+                 dispositivo por dirección, ruta de red de imouse_network)
+    """
+    addresses = network.split(',') if network else [None] * devices
+    clients = []
+    for index, address in enumerate(addresses):
+        transport = open_transport(vendor_id, product_id, simulate=simulate, network=address, batch=batch,
+                                   device_index=index)
+        if transport is None:
+            for client in clients:
+                await client.close()
+            return False
+        clients.append(AsyncIMouseClient(transport))
+
+    server = await asyncio.start_server(
+        lambda reader, writer: _handle_connection(clients, reader, writer), host, port)
+
+    print(f"🚀 Servidor iMouse escuchando en {host}:{port} ({len(clients)} dispositivo(s))")
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        for client in clients:
+            await client.close()
+
+    return True
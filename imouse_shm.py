@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+iMouse SHM - Proceso de envío dedicado alimentado por un ring en memoria compartida
+En un solo proceso, la codificación, el JSON, los print y los callbacks de
+pynput comparten el GIL con los send() del HID: una pausa del GC o un
+productor pesado se convierten en jitter de los reportes. Con SenderProcess
+un proceso aparte es el dueño del dispositivo y solo hace una cosa: leer
+del ring (multiprocessing.shared_memory) reportes ya codificados con su
+instante objetivo y enviarlos a tiempo. Los productores (el proceso
+principal u otros procesos que reciban el ring como argumento) solo
+escriben en el ring.
+
+Ring (little endian):
+    Cabecera  '<4sHHIIBxH'   magic b'IMSR', versión, tamaño de slot, capacidad,
+                             report_size, codec, firmware
+    Head      '<Q'           reportes encolados (solo productores)
+    Stats     '<QQQdd'       enviados, errores, tarde (>1 ms), retraso total
+                             y máximo en s (solo el proceso de envío)
+    Slots     '<dH' + slot   instante objetivo (perf_counter, 0 = ya),
+                             longitud (0 = parar), reporte codificado
+
+La sincronización va por semáforos (huecos libres / reportes pendientes) y
+un lock entre productores; el proceso de envío es el único lector. Si
+este termina (error o kill), put() lanza SenderGone en vez de encolar en
+vano o esperar hueco para siempre. Los reportes del ring van codificados
+con el codec publicado al abrir: si una reconexión lo renegocia
+(CodecChanged), el proceso de envío no reenvía bytes obsoletos y termina. El
+instante objetivo usa time.perf_counter(), que es un reloj de todo el
+sistema (CLOCK_MONOTONIC / QueryPerformanceCounter), así que vale entre
+procesos. El proceso de envío congela y desactiva el GC tras abrir el
+dispositivo, duerme hasta poco antes de cada instante y espera activamente
+el resto. Con realtime (ver imouse_rt) el bucle de envío y el hilo escritor
+del transporte pasan además a prioridad de tiempo real, CPUs fijas y/o
+memoria bloqueada.
+
+    python imouse_shm.py samples/demo.json --simulate
+    python imouse_shm.py samples/demo.json --simulate --realtime fifo:50,cpus=1,mlock
+    python imouse_shm.py samples/telegram.json --simulate --load 4
+"""
+
+import gc
+import sys
+import time
+import struct
+import argparse
+import multiprocessing
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+from imouse_transport import HIDTransport, CodecChanged, VENDOR_ID, PRODUCT_ID
+from imouse_rt import realtime_settings
+from imouse_codec import HIDCodec, FramedCodec, CODEC_FRAMED
+
+
+RING_MAGIC = b'IMSR'
+RING_FORMAT_VERSION = 1
+RING_LAYOUT = struct.Struct('<4sHHIIBxH')
+RING_HEAD = struct.Struct('<Q')
+RING_STATS = struct.Struct('<QQQdd')
+HEAD_OFFSET = RING_LAYOUT.size
+STATS_OFFSET = HEAD_OFFSET + RING_HEAD.size
+SLOTS_OFFSET = STATS_OFFSET + RING_STATS.size
+
+DEFAULT_CAPACITY = 1024
+SLOT_SIZE = 64
+SPIN_MARGIN = 0.0005        # El último tramo hasta el instante objetivo se espera activamente (s)
+LATE_THRESHOLD = 0.001      # Reporte "tarde" si sale más de 1 ms después de su instante
+READY_TIMEOUT = 10.0
+PUT_POLL = 0.1              # Con el ring lleno, cada cuánto se comprueba que el lector sigue vivo (s)
+
+_CODEC_IDS = {'hid': 1, CODEC_FRAMED: 2}
+
+
+class SenderGone(RuntimeError):
+    """El proceso de envío (lector del ring) ha terminado: nadie vaciará el ring"""
+
+
+class ShmRing:
+    """
+    Ring de reportes en memoria compartida (varios productores, un lector)
+
+    Se pasa tal cual como argumento a otros procesos (multiprocessing.Process,
+    también con el método 'spawn' de Windows y macOS): la memoria se vuelve a
+    abrir por nombre, los semáforos se heredan y el struct del slot (que no
+    se puede serializar) se reconstruye a partir de slot_size.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, slot_size: int = SLOT_SIZE):
+        if capacity < 1:
+            raise ValueError("La capacidad debe ser al menos 1")
+        self.capacity = capacity
+        self.slot_size = slot_size
+        self.slot = struct.Struct(f'<dH{slot_size}s')
+        self.shm = shared_memory.SharedMemory(create=True, size=SLOTS_OFFSET + capacity * self.slot.size)
+        RING_LAYOUT.pack_into(self.shm.buf, 0, RING_MAGIC, RING_FORMAT_VERSION, slot_size, capacity, 0, 0, 0)
+        RING_HEAD.pack_into(self.shm.buf, HEAD_OFFSET, 0)
+        RING_STATS.pack_into(self.shm.buf, STATS_OFFSET, 0, 0, 0, 0.0, 0.0)
+        self.space = multiprocessing.Semaphore(capacity)
+        self.items = multiprocessing.Semaphore(0)
+        self.lock = multiprocessing.Lock()
+        self.ready = multiprocessing.Event()
+        self.stopped = multiprocessing.Event()     # El lector ha terminado (normal o por error)
+        self.reader = None                         # Proceso lector (solo en el proceso que lo crea)
+        self._tail = 0
+        self._codec = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['slot']
+        state['_codec'] = None
+        state['reader'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.slot = struct.Struct(f'<dH{self.slot_size}s')
+
+    # ===== Cabecera =====
+
+    def publish(self, report_size: int, codec):
+        """Lo llama el proceso de envío al abrir el dispositivo"""
+        RING_LAYOUT.pack_into(self.shm.buf, 0, RING_MAGIC, RING_FORMAT_VERSION, self.slot_size, self.capacity,
+                              report_size, _CODEC_IDS.get(codec.name, 1), getattr(codec, 'firmware', 0) or 0)
+        self.ready.set()
+
+    @property
+    def report_size(self) -> int:
+        return RING_LAYOUT.unpack_from(self.shm.buf, 0)[4]
+
+    def codec(self):
+        """Codec equivalente al negociado por el proceso de envío (para los productores)"""
+        if self._codec is None:
+            _, _, _, _, report_size, codec_id, firmware = RING_LAYOUT.unpack_from(self.shm.buf, 0)
+            if codec_id == _CODEC_IDS[CODEC_FRAMED]:
+                self._codec = FramedCodec(report_size, firmware)
+            else:
+                self._codec = HIDCodec(report_size)
+        return self._codec
+
+    def stats(self) -> dict:
+        sent, errors, late, total, worst = RING_STATS.unpack_from(self.shm.buf, STATS_OFFSET)
+        return {
+            'queued': RING_HEAD.unpack_from(self.shm.buf, HEAD_OFFSET)[0],
+            'sent': sent,
+            'errors': errors,
+            'late': late,
+            'lateness_mean_ms': total / sent * 1000 if sent else 0.0,
+            'lateness_max_ms': worst * 1000,
+        }
+
+    # ===== Productores =====
+
+    def put(self, packet, deadline: float = 0.0, timeout: Optional[float] = None,
+            encoded: bool = False) -> bool:
+        """
+        Encola un reporte para el instante `deadline` (perf_counter; 0 = ya)
+
+        Args:
+            encoded: El paquete ya está codificado (prepare_reports con codec())
+            timeout: Espera máxima si el ring está lleno (None = esperar)
+
+        Returns:
+            bool: False si no hubo hueco a tiempo
+
+        Raises:
+            SenderGone: si el proceso de envío terminó
+        """
+        data = bytes(packet if encoded else self.codec().encode(packet))
+        if not data or len(data) > self.slot_size:
+            raise ValueError(f"Reporte de {len(data)} bytes (máximo {self.slot_size})")
+        return self._push(deadline, data, timeout)
+
+    def close_writer(self):
+        """Pide al proceso de envío que termine tras vaciar lo pendiente"""
+        self._push(0.0, b'', None)
+
+    def reader_alive(self) -> bool:
+        if self.stopped.is_set():
+            return False
+        return self.reader is None or self.reader.is_alive()
+
+    def _acquire_space(self, timeout: Optional[float]) -> bool:
+        """Espera un hueco en tramos de PUT_POLL comprobando que el lector sigue vivo"""
+        end = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            wait = PUT_POLL if end is None else min(PUT_POLL, end - time.perf_counter())
+            if self.space.acquire(timeout=max(wait, 0.0)):
+                return True
+            if not self.reader_alive():
+                raise SenderGone("El proceso de envío ha terminado con el ring lleno")
+            if end is not None and time.perf_counter() >= end:
+                return False
+
+    def _push(self, deadline: float, data: bytes, timeout: Optional[float]) -> bool:
+        if self.stopped.is_set():
+            raise SenderGone("El proceso de envío ha terminado")
+        if not self._acquire_space(timeout):
+            return False
+        with self.lock:
+            head, = RING_HEAD.unpack_from(self.shm.buf, HEAD_OFFSET)
+            self.slot.pack_into(self.shm.buf, SLOTS_OFFSET + (head % self.capacity) * self.slot.size,
+                                deadline, len(data), data)
+            RING_HEAD.pack_into(self.shm.buf, HEAD_OFFSET, head + 1)
+        self.items.release()
+        return True
+
+    # ===== Lector (proceso de envío) =====
+
+    def get(self) -> Tuple[float, bytes]:
+        """Siguiente reporte (bloquea); longitud 0 = parar"""
+        self.items.acquire()
+        offset = SLOTS_OFFSET + (self._tail % self.capacity) * self.slot.size
+        deadline, length, data = self.slot.unpack_from(self.shm.buf, offset)
+        self._tail += 1
+        self.space.release()
+        return deadline, data[:length]
+
+    def record(self, ok: bool, lateness: float):
+        """Actualiza las estadísticas (solo el proceso de envío)"""
+        sent, errors, late, total, worst = RING_STATS.unpack_from(self.shm.buf, STATS_OFFSET)
+        if ok:
+            sent += 1
+            total += lateness
+            worst = max(worst, lateness)
+            late += lateness > LATE_THRESHOLD
+        else:
+            errors += 1
+        RING_STATS.pack_into(self.shm.buf, STATS_OFFSET, sent, errors, late, total, worst)
+
+    def unlink(self):
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def wait_until(deadline: float):
+    """Duerme hasta poco antes de `deadline` y espera activamente el resto"""
+    remaining = deadline - time.perf_counter()
+    if remaining > SPIN_MARGIN:
+        time.sleep(remaining - SPIN_MARGIN)
+    while time.perf_counter() < deadline:
+        pass
+
+
+def _sender_main(ring: ShmRing, options: dict):
+    """Proceso de envío: abre el dispositivo y vacía el ring a su ritmo"""
+    try:
+        _sender_loop(ring, options)
+    finally:
+        # También si falla: los productores no deben esperar hueco para siempre
+        ring.stopped.set()
+        ring.ready.set()             # report_size 0 = fallo al abrir
+
+
+def _sender_loop(ring: ShmRing, options: dict):
+    device = None
+    if options.get('network'):
+        from imouse_network import NetworkDevice, parse_address
+        device = NetworkDevice(*parse_address(options['network']), batch=options.get('batch', 1))
+    elif options.get('simulate'):
+        from imouse_simulator import SimulatedDevice
+        device = SimulatedDevice()
+
+    realtime = realtime_settings(options.get('realtime'))
+    transport = HIDTransport(options.get('vendor_id', VENDOR_ID), options.get('product_id', PRODUCT_ID),
+                             device=device, codec=options.get('codec'), firmware=options.get('firmware'),
+                             realtime=realtime)
+    if not transport.open():
+        return
+    if realtime:
+        realtime.apply('envío (proceso)')
+
+    ring.publish(transport.report_size, transport.codec)
+    generation = transport.codec_generation
+
+    gc.collect()
+    gc.freeze()
+    gc.disable()
+
+    while True:
+        deadline, data = ring.get()
+        if not data:
+            break
+        if deadline:
+            if deadline - time.perf_counter() > SPIN_MARGIN:
+                transport.flush()
+            wait_until(deadline)
+        sent_at = time.perf_counter()
+        try:
+            ok = transport.send_encoded(data, generation)
+        except CodecChanged as e:
+            # Los productores codifican con el codec publicado: aquí no se puede recodificar
+            print(f"❌ {e}; el proceso de envío termina")
+            ring.record(False, 0.0)
+            break
+        ring.record(ok, sent_at - deadline if deadline else 0.0)
+
+    transport.flush()
+    transport.close()
+
+
+class SenderProcess:
+    """
+    Proceso dueño del dispositivo, alimentado por un ShmRing
+
+        with SenderProcess(simulate=True) as sender:
+            start = time.perf_counter() + 0.05
+            for offset, packet in timeline:
+                sender.put(packet, deadline=start + offset)
+
+    Args:
+        simulate, network, batch: Dispositivo simulado o ruta de red (ver imouse.py)
+        codec, firmware: Codec del transporte (ver imouse_codec)
+        capacity: Reportes que caben en el ring (lo que puede adelantarse el productor)
+        realtime: Ajustes de tiempo real del proceso de envío (ver imouse_rt;
+                  default IMOUSE_REALTIME)
+    """
+
+    def __init__(self, simulate: bool = False, network: Optional[str] = None, batch: int = 1,
+                 vendor_id: int = VENDOR_ID, product_id: int = PRODUCT_ID,
+                 codec: Optional[str] = None, firmware: Optional[int] = None,
+                 capacity: int = DEFAULT_CAPACITY, realtime=None):
+        self.options = {'simulate': simulate, 'network': network, 'batch': batch, 'vendor_id': vendor_id,
+                        'product_id': product_id, 'codec': codec, 'firmware': firmware,
+                        'realtime': realtime_settings(realtime)}
+        self.ring = ShmRing(capacity)
+        self.process = None
+
+    def start(self) -> bool:
+        """Arranca el proceso y espera a que abra el dispositivo"""
+        self.process = multiprocessing.Process(target=_sender_main, args=(self.ring, self.options),
+                                               name='imouse-shm-sender', daemon=True)
+        self.process.start()
+        self.ring.reader = self.process
+        if not self.ring.ready.wait(READY_TIMEOUT) or not self.ring.report_size:
+            print("❌ El proceso de envío no pudo abrir el dispositivo")
+            self.stop(drain=False)
+            return False
+        return True
+
+    def put(self, packet, deadline: float = 0.0, timeout: Optional[float] = None, encoded: bool = False) -> bool:
+        return self.ring.put(packet, deadline, timeout, encoded)
+
+    def stop(self, drain: bool = True, timeout: Optional[float] = None) -> dict:
+        """Termina el proceso (tras enviar lo pendiente si drain) y devuelve las estadísticas"""
+        if self.process is not None and self.process.is_alive():
+            if drain:
+                try:
+                    self.ring.close_writer()
+                    self.process.join(timeout)
+                except SenderGone:
+                    pass
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join()
+        stats = self.ring.stats()
+        self.ring.unlink()
+        return stats
+
+    def __enter__(self):
+        if not self.start():
+            raise RuntimeError("El proceso de envío no pudo abrir el dispositivo")
+        return self
+
+    def __exit__(self, *exc):
+        self.stop(drain=exc[0] is None)
+
+
+def producer_load(seconds: float):
+    """Carga de fondo en el productor: JSON y objetos con ciclos (dispara el GC)"""
+    import json
+
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        nodes = [{'id': i, 'data': list(range(20))} for i in range(200)]
+        for a, b in zip(nodes, nodes[1:]):
+            a['next'], b['prev'] = b, a
+        json.loads(json.dumps([n['data'] for n in nodes]))
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    from replay_imouse import load_packets, filter_out_packets, prepare_reports
+    from imouse_targets import PROFILES, DEFAULT_PROFILE
+
+    parser = argparse.ArgumentParser(description='Replay a través de un proceso de envío dedicado (memoria compartida)')
+    parser.add_argument('capture_file', help='Captura JSON o macro')
+    parser.add_argument('-s', '--speed', type=float, default=1.0, help='Velocidad de reproducción')
+    parser.add_argument('--simulate', action='store_true', help='Usar dispositivo simulado')
+    parser.add_argument('--network', metavar='HOST:PUERTO', help='Ruta de red (ver imouse_network.py)')
+    parser.add_argument('--batch', type=int, default=1, help='Registros por escritura en la ruta de red')
+    parser.add_argument('--codec', help='Codificación de reportes (auto | hid | framed)')
+    parser.add_argument('--profile', default=DEFAULT_PROFILE, choices=sorted(PROFILES),
+                        help='Perfil para compilar macros (default: iphone)')
+    parser.add_argument('--capacity', type=int, default=DEFAULT_CAPACITY, help='Reportes en el ring')
+    parser.add_argument('--lead', type=float, default=0.05, help='Margen antes del primer reporte (s)')
+    parser.add_argument('--load', type=int, default=0, metavar='N',
+                        help='Hilos de carga en el productor durante el replay (prueba de aislamiento)')
+    parser.add_argument('--realtime', metavar='AJUSTES',
+                        help='Tiempo real del proceso de envío (ej: fifo:50,cpus=1,mlock; ver imouse_rt.py)')
+    args = parser.parse_args(argv)
+
+    try:
+        out_packets = filter_out_packets(load_packets(args.capture_file, args.profile))
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    if not out_packets:
+        print("❌ No hay paquetes OUT para enviar")
+        return 1
+
+    try:
+        sender = SenderProcess(simulate=args.simulate, network=args.network, batch=args.batch,
+                               codec=args.codec, capacity=args.capacity, realtime=args.realtime)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    if not sender.start():
+        return 1
+
+    ring = sender.ring
+    reports = prepare_reports(out_packets, ring.report_size, args.speed, codec=ring.codec())
+    duration = reports[-1][1] if reports else 0.0
+    print(f"🔄 {len(reports)} reportes al proceso de envío (pid {sender.process.pid}, "
+          f"codec {ring.codec().name}, ring de {args.capacity})")
+
+    load = []
+    if args.load:
+        import threading
+        load = [threading.Thread(target=producer_load, args=(duration + args.lead,), daemon=True)
+                for _ in range(args.load)]
+        for thread in load:
+            thread.start()
+        print(f"🔥 {args.load} hilo(s) de carga en el productor")
+
+    start = time.perf_counter() + args.lead
+    try:
+        for _, target_time, data_list, _ in reports:
+            sender.put(data_list, deadline=start + target_time, encoded=True)
+    except KeyboardInterrupt:
+        print("\n⚠️  Interrumpido")
+        sender.stop(drain=False)
+        return 1
+    except SenderGone as e:
+        print(f"❌ {e}")
+        sender.stop(drain=False)
+        return 1
+
+    stats = sender.stop()
+    for thread in load:
+        thread.join()
+
+    print(f"📊 Enviados: {stats['sent']}/{len(reports)}, errores: {stats['errors']}")
+    print(f"   Retraso: media {stats['lateness_mean_ms']:.3f} ms, máx {stats['lateness_max_ms']:.3f} ms, "
+          f"tarde (>{LATE_THRESHOLD * 1000:.0f} ms): {stats['late']}")
+    return 0 if stats['sent'] == len(reports) and not stats['errors'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,18 +2,32 @@
 """
 iMouse Shortcuts - Envío de atajos de teclado al iPhone/iPad
 Envía combinaciones de teclas como Win+H (Home), Win+Tab (App Switcher), etc.
+
+Los atajos se cargan de una tabla (shortcuts/shortcuts.json) y pueden ser
+una combinación ("keys": "Win+Shift+3") o una secuencia de varios pasos:
+otros atajos por nombre, combinaciones, esperas y texto:
+
+    "search": {
+        "description": "Home, Spotlight y escribir {text}",
+        "sequence": ["home", {"wait": 0.4}, "spotlight", {"wait": 0.3}, {"type": "{text}"}]
+    }
+
+Cada atajo se compila una vez a una línea de tiempo de reportes
+[(offset, paquete, descripción), ...] con los tiempos de pulsación de la
+tabla ("timing": hold / gap, ajustables por atajo) y se envía de una tirada,
+ya codificada, sin pausas fijas entre combinaciones.
+
+    python imouse.py shortcut --list
+    python imouse.py shortcut open_app --text Telegram
 """
 
-import sys
-import time
 import os
+import json
+from typing import Dict, List, Optional, Tuple
 
-try:
-    import pywinusb.hid as hid
-except ImportError:
-    print("❌ Error: pywinusb no está instalado")
-    print("   pip install pywinusb")
-    sys.exit(1)
+from imouse_transport import HIDTransport, CodecChanged, KEY_RELEASE
+from imouse_keymap_data import IMOUSE_KEYMAP
+from imouse_clock import get_clock
 
 
 # Modificadores de teclado (pueden combinarse con OR)
@@ -31,46 +45,255 @@ SCANCODE_SPACE = 0x2c   # Barra espaciadora (para Spotlight)
 SCANCODE_3 = 0x20       # Número 3 (para Screenshot)
 
 
+SHORTCUTS_FORMAT_VERSION = 1
+DEFAULT_SHORTCUTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'shortcuts', 'shortcuts.json')
+
+DEFAULT_HOLD = 0.05     # Tiempo pulsado si la tabla no indica otro (s)
+DEFAULT_GAP = 0.05      # Pausa tras soltar antes de la siguiente combinación (s)
+MAX_DEPTH = 8           # Anidamiento máximo de secuencias
+
+MODIFIER_NAMES = {
+    'ctrl': MODIFIER_CTRL,
+    'shift': MODIFIER_SHIFT,
+    'alt': MODIFIER_ALT,
+    'win': MODIFIER_WIN,
+    'cmd': MODIFIER_WIN,
+}
+
+# Nombres de tecla → entrada del keymap
+KEY_NAMES = {
+    'enter': '\n',
+    'return': '\n',
+    'tab': '\t',
+    'space': ' ',
+    'backspace': '\b',
+}
+
+Timeline = List[Tuple[float, list, str]]
+
+
+def key_report(scancode: int, modifier: int = MODIFIER_NONE) -> list:
+    """Reporte 0xa2 de 9 bytes con una tecla pulsada"""
+    return [0x00, 0xa2, modifier, 0x00, scancode, 0x00, 0x00, 0x00, 0x00]
+
+
+def parse_chord(chord: str) -> Tuple[int, int]:
+    """
+    "Win+Shift+3" → (scancode, modifier)
+
+    La tecla es el último elemento: un carácter del keymap ('h', '3'), un
+    nombre (Enter, Tab, Space, Backspace) o una tecla especial del keymap
+    sin los <> (Left, Esc, F5...).
+
+    Raises:
+        ValueError: si un modificador o la tecla no existen
+    """
+    *modifiers, key = chord.split('+')
+    modifier = MODIFIER_NONE
+    for name in modifiers:
+        if name.strip().lower() not in MODIFIER_NAMES:
+            raise ValueError(f"Modificador desconocido en {chord!r}: {name} "
+                             f"(opciones: {', '.join(MODIFIER_NAMES)})")
+        modifier |= MODIFIER_NAMES[name.strip().lower()]
+
+    key = key.strip()
+    entry = KEY_NAMES.get(key.lower())
+    if entry is None:
+        entry = f"<{key}>" if f"<{key}>" in IMOUSE_KEYMAP else key.lower() if len(key) == 1 else key
+    if entry not in IMOUSE_KEYMAP:
+        raise ValueError(f"Tecla desconocida en {chord!r}: {key}")
+
+    scancode, key_modifier = IMOUSE_KEYMAP[entry]
+    return scancode, modifier | key_modifier
+
+
+class ShortcutRegistry:
+    """
+    Tabla de atajos con nombre y sus líneas de tiempo compiladas
+
+    Las líneas de tiempo se guardan por (nombre, parámetros), así repetir un
+    atajo no vuelve a resolver la tabla.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.hold = DEFAULT_HOLD
+        self.gap = DEFAULT_GAP
+        self._shortcuts: Dict[str, dict] = {}
+        self._compiled: Dict[tuple, Timeline] = {}
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self) -> int:
+        return len(self._shortcuts)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._shortcuts
+
+    def load(self, path: str):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        version = data.get('version')
+        if version != SHORTCUTS_FORMAT_VERSION:
+            raise ValueError(f"Versión de formato no soportada: {version}")
+
+        timing = data.get('timing', {})
+        self.hold = float(timing.get('hold', DEFAULT_HOLD))
+        self.gap = float(timing.get('gap', DEFAULT_GAP))
+        self._shortcuts = dict(data.get('shortcuts', {}))
+        self._compiled.clear()
+        self.path = path
+
+    def names(self) -> List[str]:
+        return list(self._shortcuts)
+
+    def describe(self, name: str) -> str:
+        entry = self._shortcuts[name]
+        return entry.get('description') or entry.get('keys') or name
+
+    def define(self, name: str, keys: Optional[str] = None, sequence: Optional[list] = None,
+               description: str = '', **timing):
+        """Añade (o sustituye) un atajo en memoria"""
+        if (keys is None) == (sequence is None):
+            raise ValueError("Un atajo necesita 'keys' o 'sequence'")
+        entry = {'description': description, **timing}
+        entry['keys' if keys is not None else 'sequence'] = keys if keys is not None else list(sequence)
+        self._shortcuts[name] = entry
+        self._compiled.clear()
+
+    # ===== Compilación =====
+
+    def compile(self, name: str, params: Optional[Dict[str, str]] = None) -> Timeline:
+        """
+        Línea de tiempo de un atajo: [(offset_s, paquete, descripción), ...]
+
+        El último reporte es siempre un release; la pausa tras él no se
+        incluye (duration() la tiene en cuenta al encadenar atajos).
+
+        Raises:
+            KeyError: si el atajo no existe
+            ValueError: si un paso es inválido, falta un parámetro o hay un ciclo
+        """
+        params = params or {}
+        key = (name, tuple(sorted(params.items())))
+        timeline = self._compiled.get(key)
+        if timeline is None:
+            if name not in self._shortcuts:
+                raise KeyError(f"Atajo desconocido: {name} (opciones: {', '.join(self._shortcuts)})")
+            timeline = []
+            self._expand(name, params, timeline, 0.0, [])
+            self._compiled[key] = timeline
+        return timeline
+
+    def duration(self, name: str, params: Optional[Dict[str, str]] = None) -> float:
+        """Tiempo hasta que se puede enviar lo siguiente (último release + gap)"""
+        timeline = self.compile(name, params)
+        return timeline[-1][0] + self._shortcuts[name].get('gap', self.gap) if timeline else 0.0
+
+    def _chord(self, timeline: Timeline, t: float, chord: str, hold: float, gap: float,
+               description: str) -> float:
+        scancode, modifier = parse_chord(chord)
+        timeline.append((t, key_report(scancode, modifier), description))
+        timeline.append((t + hold, list(KEY_RELEASE), "Release"))
+        return t + hold + gap
+
+    def _expand(self, name: str, params: dict, timeline: Timeline, t: float, stack: List[str]) -> float:
+        if name in stack:
+            raise ValueError(f"Atajo recursivo: {' → '.join(stack + [name])}")
+        if len(stack) >= MAX_DEPTH:
+            raise ValueError(f"Demasiado anidamiento en {stack[0]}")
+
+        entry = self._shortcuts[name]
+        hold = float(entry.get('hold', self.hold))
+        gap = float(entry.get('gap', self.gap))
+        stack = stack + [name]
+
+        if 'keys' in entry:
+            return self._chord(timeline, t, entry['keys'], hold, gap, self.describe(name))
+
+        for number, step in enumerate(entry.get('sequence', []), 1):
+            try:
+                t = self._step(step, params, timeline, t, hold, gap, stack)
+            except (KeyError, ValueError) as e:
+                raise ValueError(f"{name}, paso {number}: {e.args[0] if e.args else e}")
+        return t
+
+    def _step(self, step, params: dict, timeline: Timeline, t: float, hold: float, gap: float,
+              stack: List[str]) -> float:
+        if isinstance(step, str):
+            if step in self._shortcuts:
+                return self._expand(step, params, timeline, t, stack)
+            return self._chord(timeline, t, step, hold, gap, step)
+
+        if not isinstance(step, dict):
+            raise ValueError(f"Paso desconocido: {step!r}")
+
+        if 'wait' in step:
+            return t + float(step['wait'])
+
+        if 'keys' in step:
+            return self._chord(timeline, t, step['keys'], float(step.get('hold', hold)),
+                               float(step.get('gap', gap)), step['keys'])
+
+        if 'type' in step:
+            try:
+                text = step['type'].format(**params)
+            except KeyError as e:
+                raise ValueError(f"Falta el parámetro {e.args[0]!r} (ej: --text)")
+            for char in text:
+                if char not in IMOUSE_KEYMAP:
+                    raise ValueError(f"Carácter no soportado: {char!r}")
+                scancode, modifier = IMOUSE_KEYMAP[char]
+                timeline.append((t, key_report(scancode, modifier), f"Keypress: {char!r}"))
+                timeline.append((t + hold, list(KEY_RELEASE), "Release"))
+                t += hold + gap
+            return t
+
+        raise ValueError(f"Paso desconocido: {step!r}")
+
+
+_default_registry = None
+
+
+class _Params(dict):
+    """Parámetros para las descripciones: los que faltan se dejan como {nombre}"""
+
+    def __missing__(self, key):
+        return '{' + key + '}'
+
+
+def get_shortcut_registry() -> ShortcutRegistry:
+    """Tabla por defecto (shortcuts/shortcuts.json), cargada una vez por proceso"""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = ShortcutRegistry(DEFAULT_SHORTCUTS_FILE)
+    return _default_registry
+
+
 class ShortcutSender:
-    def __init__(self):
-        self.device = None
-        self.out_report = None
+    def __init__(self, device=None, registry: Optional[ShortcutRegistry] = None):
+        self.device = device
+        self.transport = None
         self.report_size = 0
+        self.registry = registry or get_shortcut_registry()
         self.stats = {'shortcuts': 0, 'errors': 0}
+        # (codec_generation, línea de tiempo codificada) por atajo y parámetros
+        self._prepared: Dict[tuple, Tuple[int, List[Tuple[float, list]]]] = {}
 
     def connect_device(self):
         """Conecta con el dispositivo iMouse"""
-        VENDOR_ID = 0x720a
-        PRODUCT_ID = 0x3dab
-
         print("🔌 Conectando con dispositivo iMouse...")
-        devices = hid.HidDeviceFilter(vendor_id=VENDOR_ID, product_id=PRODUCT_ID).get_devices()
-
-        if not devices:
-            print(f"❌ Dispositivo no encontrado: 0x{VENDOR_ID:04x}:0x{PRODUCT_ID:04x}")
-            return False
+        self.transport = HIDTransport(device=self.device)
 
-        self.device = devices[0]
-
-        try:
-            self.device.open()
-        except Exception as e:
-            print(f"❌ No se pudo abrir el dispositivo: {e}")
+        if not self.transport.open():
             return False
 
-        print(f"✅ Conectado a: {self.device.product_name}")
-
-        # Obtener output report
-        for report in self.device.find_output_reports():
-            self.out_report = report
-            break
+        self.device = self.transport.device
+        print(f"✅ Conectado a: {self.transport.product_name}")
 
-        if not self.out_report:
-            print("❌ No se encontró output report")
-            self.device.close()
-            return False
-
-        self.report_size = len(self.out_report.get_raw_data())
+        self.report_size = self.transport.report_size
+        self._prepared.clear()
         return True
 
     def send_key_combo(self, scancode, modifier=MODIFIER_NONE, hold_time=0.05):
@@ -82,76 +305,115 @@ class ShortcutSender:
             modifier: Modificadores (CTRL, SHIFT, ALT, WIN)
             hold_time: Tiempo que se mantiene presionada la combinación
         """
-        if not self.out_report:
+        if not self.transport:
             return False
 
-        try:
-            # Preparar paquete keypress con modificador
-            packet = [0x00, 0xa2, modifier, 0x00, scancode]
-            while len(packet) < self.report_size:
-                packet.append(0x00)
+        # Enviar keypress con modificador
+        if not self.transport.send([0x00, 0xa2, modifier, 0x00, scancode]):
+            self.stats['errors'] += 1
+            return False
 
-            # Enviar keypress
-            self.out_report.set_raw_data(packet)
-            self.out_report.send()
+        # Mantener presionado
+        get_clock().sleep(hold_time)
 
-            # Mantener presionado
-            time.sleep(hold_time)
+        # Enviar release
+        if not self.transport.send(KEY_RELEASE):
+            self.stats['errors'] += 1
+            return False
 
-            # Enviar release
-            release = [0x00, 0xa2, 0x00, 0x00, 0x00]
-            while len(release) < self.report_size:
-                release.append(0x00)
+        # Pequeña pausa después de soltar
+        get_clock().sleep(0.05)
 
-            self.out_report.set_raw_data(release)
-            self.out_report.send()
+        self.stats['shortcuts'] += 1
+        return True
 
-            # Pequeña pausa después de soltar
-            time.sleep(0.05)
+    def prepare(self, name: str, params: Optional[Dict[str, str]] = None) -> List[Tuple[float, list]]:
+        """
+        Línea de tiempo del atajo ya codificada para el transporte abierto
 
-            self.stats['shortcuts'] += 1
-            return True
+        Se recodifica si una reconexión renegoció el codec (codec_generation)
+        """
+        key = (name, tuple(sorted((params or {}).items())))
+        generation = self.transport.codec_generation
+        cached = self._prepared.get(key)
+        if cached is None or cached[0] != generation:
+            timeline = self.registry.compile(name, params)
+            encoded = self.transport.encode_batch(packet for _, packet, _ in timeline)
+            cached = (generation, [(offset, data) for (offset, _, _), data in zip(timeline, encoded)])
+            self._prepared[key] = cached
+        return cached[1]
+
+    def send_shortcut(self, name: str, params: Optional[Dict[str, str]] = None) -> bool:
+        """
+        Envía un atajo de la tabla (combinación o secuencia) de una tirada
 
-        except Exception as e:
-            self.stats['errors'] += 1
-            print(f"❌ Error enviando combinación: {e}")
+        Raises:
+            KeyError, ValueError: si el atajo no existe o no compila
+        """
+        if not self.transport:
             return False
 
+        prepared = self.prepare(name, params)
+        generation = self.transport.codec_generation
+        clock = get_clock()
+        start = clock.now()
+        step = 0
+        while step < len(prepared):
+            offset, data = prepared[step]
+            delay = start + offset - clock.now()
+            if delay > 0:
+                self.transport.flush()
+                clock.sleep(delay)
+            downtime = self.transport.stats['downtime']
+            try:
+                ok = self.transport.send_encoded(data, generation)
+            except CodecChanged as e:
+                # Reconexión con otro codec: recodificar y reenviar este paso
+                start += self.transport.stats['downtime'] - downtime
+                print(f"🔁 {e}; recodificando el atajo")
+                prepared = self.prepare(name, params)
+                generation = self.transport.codec_generation
+                continue
+            # Desplazar la línea de tiempo si hubo reconexión
+            start += self.transport.stats['downtime'] - downtime
+            if not ok:
+                self.stats['errors'] += 1
+                # No dejar una tecla pulsada
+                self.transport.send(KEY_RELEASE)
+                return False
+            step += 1
+
+        self.transport.flush()
+        self.stats['shortcuts'] += 1
+        return True
+
+    def send_named(self, name, params: Optional[Dict[str, str]] = None):
+        """Envía un atajo de la tabla por nombre"""
+        description = self.registry.describe(name).format_map(_Params(params or {}))
+        print(f"⌨️  Enviando: {description}...", end='', flush=True)
+        try:
+            ok = self.send_shortcut(name, params)
+        except (KeyError, ValueError) as e:
+            print(f" ✗\n❌ {e.args[0] if e.args else e}")
+            return False
+        print(" ✓" if ok else " ✗")
+        return ok
+
     def go_home(self):
         """Win+H - Ir a la pantalla de inicio"""
-        print("🏠 Enviando: Win+H (Home Screen)...", end='', flush=True)
-        if self.send_key_combo(SCANCODE_H, MODIFIER_WIN):
-            print(" ✓")
-            return True
-        print(" ✗")
-        return False
+        return self.send_named('home')
 
     def app_switcher(self):
         """Win+Tab - Abrir selector de aplicaciones"""
-        print("📱 Enviando: Win+Tab (App Switcher)...", end='', flush=True)
-        if self.send_key_combo(SCANCODE_TAB, MODIFIER_WIN):
-            print(" ✓")
-            return True
-        print(" ✗")
-        return False
+        return self.send_named('switcher')
 
     def spotlight_search(self):
         """Win+Space - Búsqueda Spotlight"""
-        print("🔍 Enviando: Win+Space (Spotlight Search)...", end='', flush=True)
-        if self.send_key_combo(SCANCODE_SPACE, MODIFIER_WIN):
-            print(" ✓")
-            return True
-        print(" ✗")
-        return False
+        return self.send_named('spotlight')
 
     def screenshot(self):
         """Win+Shift+3 - Captura de pantalla"""
-        print("📸 Enviando: Win+Shift+3 (Screenshot)...", end='', flush=True)
-        if self.send_key_combo(SCANCODE_3, MODIFIER_WIN | MODIFIER_SHIFT):
-            print(" ✓")
-            return True
-        print(" ✗")
-        return False
+        return self.send_named('screenshot')
 
     def run(self):
         """Ejecuta el modo interactivo"""
@@ -182,6 +444,11 @@ class ShortcutSender:
         print("  s     → Abrir búsqueda Spotlight (Win+Space)")
         print("  p     → Tomar screenshot (Win+Shift+3)")
         print()
+        print("  === TABLA (shortcuts/shortcuts.json) ===")
+        for name in self.registry.names():
+            print(f"  {name:<12} → {self.registry.describe(name)}")
+        print("  (las secuencias con {text} aceptan el texto detrás: open_app Telegram)")
+        print()
         print("  clear → Limpiar pantalla")
         print("  exit  → Salir")
         print()
@@ -191,7 +458,8 @@ class ShortcutSender:
         try:
             while True:
                 try:
-                    choice = input("⌨️  Elige un atajo (número o comando) > ").strip().lower()
+                    line = input("⌨️  Elige un atajo (número o comando) > ").strip()
+                    choice = line.lower()
                 except KeyboardInterrupt:
                     print("\n⚠️  Interrupción detectada")
                     break
@@ -222,6 +490,12 @@ class ShortcutSender:
                     self.screenshot()
                     continue
 
+                # Atajo de la tabla por nombre, con texto opcional (ej: "open_app Telegram")
+                name, _, text = line.partition(' ')
+                if name in self.registry:
+                    self.send_named(name, {'text': text.strip()} if text.strip() else None)
+                    continue
+
                 # Ejecutar atajo por número
                 if choice in shortcuts:
                     name, func = shortcuts[choice]
@@ -234,8 +508,8 @@ class ShortcutSender:
 
         finally:
             # Cerrar dispositivo
-            if self.device:
-                self.device.close()
+            if self.transport:
+                self.transport.close()
 
             # Mostrar estadísticas
             print()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+iMouse Simulator - Dispositivo HID simulado para pruebas y benchmarks
+Imita la interfaz de pywinusb (HidDevice / HidReport) y registra cada
+reporte enviado con su timestamp, sin necesidad del dongle USB
+"""
+
+import time
+import heapq
+import random
+import threading
+from typing import List, Optional, Tuple
+
+from imouse_codec import is_frame, validate_frame
+from imouse_clock import get_clock
+
+
+VENDOR_ID = 0x720a
+PRODUCT_ID = 0x3dab
+REPORT_SIZE = 9
+
+ACK_MARKER = 0xee        # Input report de confirmación: [0x00, 0xee, <reporte[1:]>]
+DEFAULT_ACK_LATENCY = 0.002  # Latencia de ack del simulado con --ack (s)
+
+
+class SimulatedOutputReport:
+    """Output report simulado (misma API que pywinusb.hid.HidReport)"""
+
+    def __init__(self, device: 'SimulatedDevice', report_size: int = REPORT_SIZE):
+        self.device = device
+        self.report_size = report_size
+        self._raw_data = [0x00] * report_size
+
+    def get_raw_data(self) -> List[int]:
+        return list(self._raw_data)
+
+    def set_raw_data(self, data):
+        if len(data) != self.report_size:
+            raise ValueError(f"Tamaño de reporte inválido: {len(data)} (esperado {self.report_size})")
+        self._raw_data = list(data)
+
+    def send(self, raw_data=None):
+        if raw_data is not None:
+            self.set_raw_data(raw_data)
+        return self.device._write(bytes(self._raw_data))
+
+
+class SimulatedDevice:
+    """
+    Dispositivo iMouse simulado
+
+    Cada reporte enviado se guarda en `log` como (timestamp, bytes), usando
+    get_clock().now() (time.perf_counter() salvo reloj virtual, ver
+    imouse_clock) para poder medir la precisión de temporización.
+
+    Si se indica `responder(data) -> bytes | None`, se llama con cada reporte
+    enviado y lo que devuelva se entrega como input report al handler
+    registrado con set_raw_data_handler (como haría el dongle real).
+
+    `firmware` se expone como version_number (igual que pywinusb) para la
+    negociación del codec; las tramas W-0xAB con checksum incorrecto se
+    cuentan en `invalid_frames`.
+
+    Con `ack_latency` (s) cada reporte recibe un input report de
+    confirmación (ACK_MARKER) tras esa latencia más un jitter uniforme de
+    hasta `ack_jitter`, para probar imouse_flow.
+
+    stall(segundos) bloquea las escrituras durante ese tiempo, como un
+    dongle que deja de vaciar su endpoint. Cerrar el dispositivo cancela la
+    escritura bloqueada con IOError (como cerrar el handle HID real).
+    """
+
+    def __init__(self, report_size: int = REPORT_SIZE, write_latency: float = 0.0,
+                 vendor_id: int = VENDOR_ID, product_id: int = PRODUCT_ID,
+                 product_name: str = "iMouse (simulado)", responder=None,
+                 firmware: Optional[int] = None, ack_latency: Optional[float] = None,
+                 ack_jitter: float = 0.0):
+        self.report_size = report_size
+        self.write_latency = write_latency
+        self.responder = responder
+        self.version_number = firmware
+        self.ack_latency = ack_latency
+        self.ack_jitter = ack_jitter
+        self.invalid_frames = 0
+        self.vendor_id = vendor_id
+        self.product_id = product_id
+        self.product_name = product_name
+        self.log: List[Tuple[float, bytes]] = []
+        self.opened = False
+        self.plugged = True
+        self.raw_data_handler = None
+        self._lock = threading.Lock()
+        self._acks = []                     # heap de (vencimiento, orden, datos)
+        self._ack_cond = threading.Condition()
+        self._ack_thread = None
+        self._ack_seq = 0
+        self._stall_until = 0.0
+        self._stall_cond = threading.Condition()
+        self._generation = 0                # Aumenta al cerrar: cancela escrituras bloqueadas
+        self._out_report = SimulatedOutputReport(self, report_size)
+
+    # ===== API compatible con pywinusb =====
+
+    def open(self):
+        if not self.plugged:
+            raise IOError("Dispositivo simulado desconectado")
+        self.opened = True
+        self._stall_until = 0.0         # Reabrir resetea el endpoint
+
+    def close(self):
+        self.opened = False
+        with self._stall_cond:
+            self._generation += 1
+            self._stall_cond.notify_all()
+
+    def is_plugged(self) -> bool:
+        return self.plugged
+
+    def find_output_reports(self) -> List[SimulatedOutputReport]:
+        return [self._out_report]
+
+    def set_raw_data_handler(self, handler):
+        self.raw_data_handler = handler
+
+    # ===== Simulación =====
+
+    def _write(self, data: bytes) -> bool:
+        if not self.plugged:
+            raise IOError("Dispositivo simulado desconectado")
+        if not self.opened:
+            raise IOError("Dispositivo simulado no abierto")
+
+        clock = get_clock()
+        clock.sleep(self.write_latency)
+
+        with self._stall_cond:
+            generation = self._generation
+            while self._generation == generation:
+                stalled = self._stall_until - time.perf_counter()
+                if stalled <= 0:
+                    break
+                self._stall_cond.wait(stalled)
+            if self._generation != generation:
+                raise IOError("Escritura cancelada al cerrar el dispositivo")
+
+        with self._lock:
+            self.log.append((clock.now(), data))
+            if is_frame(data) and not validate_frame(data):
+                self.invalid_frames += 1
+
+        if self.responder and self.raw_data_handler:
+            response = self.responder(data)
+            if response:
+                self.raw_data_handler(list(response))
+
+        if self.ack_latency is not None and self.raw_data_handler:
+            self._schedule_ack(bytes([0x00, ACK_MARKER]) + data[1:self.report_size - 1])
+
+        return True
+
+    def _schedule_ack(self, payload: bytes):
+        due = time.perf_counter() + self.ack_latency + random.uniform(0.0, self.ack_jitter)
+        with self._ack_cond:
+            self._ack_seq += 1
+            heapq.heappush(self._acks, (due, self._ack_seq, payload))
+            if self._ack_thread is None:
+                self._ack_thread = threading.Thread(target=self._ack_loop, name='imouse-sim-ack', daemon=True)
+                self._ack_thread.start()
+            self._ack_cond.notify()
+
+    def _ack_loop(self):
+        """Entrega los acks en orden de vencimiento al handler de input reports"""
+        while True:
+            with self._ack_cond:
+                while not self._acks:
+                    self._ack_cond.wait()
+                due, _, payload = self._acks[0]
+                remaining = due - time.perf_counter()
+                if remaining > 0:
+                    self._ack_cond.wait(remaining)
+                    continue
+                heapq.heappop(self._acks)
+
+            handler = self.raw_data_handler
+            if handler and self.plugged:
+                handler(list(payload))
+
+    def unplug(self, duration: Optional[float] = None):
+        """
+        Simula la desconexión (re-enumeración) del dongle
+
+        Args:
+            duration: Si se indica, el dispositivo se reconecta solo tras
+                      `duration` segundos
+        """
+        self.plugged = False
+        self.opened = False
+        with self._ack_cond:
+            self._acks.clear()
+        if duration is not None:
+            timer = threading.Timer(duration, self.replug)
+            timer.daemon = True
+            timer.start()
+
+    def replug(self):
+        """Simula la reconexión del dongle (hay que volver a abrirlo)"""
+        self.plugged = True
+
+    def stall(self, duration: float):
+        """Bloquea las escrituras durante `duration` segundos"""
+        self._stall_until = time.perf_counter() + duration
+
+    def reports(self) -> List[bytes]:
+        """Devuelve solo los bytes de los reportes recibidos"""
+        with self._lock:
+            return [data for _, data in self.log]
+
+    def to_capture(self) -> List[dict]:
+        """Registro como captura JSON (timestamps relativos al primer reporte)"""
+        with self._lock:
+            origin = self.log[0][0] if self.log else 0.0
+            return [{'bytes': list(data), 'direction': 'out', 'timestamp': round(at - origin, 6)}
+                    for at, data in self.log]
+
+    def clear(self):
+        """Vacía el registro de reportes"""
+        with self._lock:
+            self.log.clear()
+
+
+def open_simulated_device(report_size: int = REPORT_SIZE,
+                          write_latency: float = 0.0) -> Tuple[SimulatedDevice, SimulatedOutputReport]:
+    """Crea, abre y devuelve (device, out_report) simulados"""
+    device = SimulatedDevice(report_size=report_size, write_latency=write_latency)
+    device.open()
+    return device, device.find_output_reports()[0]
@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+"""
+iMouse Store - Almacén de macros direccionado por contenido
+La biblioteca de capturas tiene muchos archivos casi iguales (correo.json y
+output.json son idénticos; los clicks solo cambian en las coordenadas). El
+almacén parte cada captura en bloques de reportes, identifica cada bloque
+por el sha256 de su contenido y lo guarda una sola vez. Una macro es una
+receta: la lista de (hash de bloque, instante de inicio), también
+direccionada por contenido; el índice asocia nombres a recetas.
+
+    store/
+        index.json                  nombre → receta, origen, reportes, duración
+        objects/ab/ab12....json     bloques y recetas (por hash)
+
+Cortes de bloque (dependen solo del contenido, así los prefijos comunes
+caen en los mismos bloques): tras un reset de posición, tras una
+liberación de botón o tecla, al cambiar el comando y cada MAX_BLOCK
+reportes. Dentro del bloque los tiempos son relativos a su primer reporte.
+
+Al cargar, los bloques decodificados se guardan en una caché LRU: el
+preámbulo reset/move compartido por muchas macros es un acierto de caché.
+Para repartir macros a los nodos de una granja, export/import mueven un
+bundle con solo los objetos que faltan (y verifican los hashes).
+
+    python imouse_store.py add samples/*.json
+    python imouse_store.py add samples/macros/abrir_telegram.json --profile ipad --name telegram_ipad
+    python imouse_store.py ls
+    python imouse_store.py compose login llamada telegram --gap 0.5
+    python imouse_store.py export correo llamada -o bundle.json
+    python replay_imouse.py store:correo --simulate
+"""
+
+import os
+import sys
+import json
+import hashlib
+import argparse
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+STORE_FORMAT_VERSION = 1
+STORE_ENV_VAR = "IMOUSE_STORE"
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'store')
+STORE_PREFIX = 'store:'             # replay_imouse.py store:NOMBRE
+
+MAX_BLOCK = 256                     # Reportes máximos por bloque
+DEFAULT_CACHE_BLOCKS = 1024         # Bloques decodificados en memoria
+DEFAULT_GAP = 0.1                   # Pausa entre partes al componer (s)
+MIN_PREFIX = 4                      # Caracteres mínimos para buscar por prefijo de hash
+
+TYPE_BLOCK = 'block'
+TYPE_MACRO = 'macro'
+
+MOVE_ABSOLUTE = 0xa0
+MOUSE_BUTTON = 0xa1
+KEYBOARD = 0xa2
+RESET_COORDS = b'\xff\xff\xff\xff'
+
+
+# ===== Bloques =====
+
+def packet_report(packet: dict) -> Optional[Tuple[float, bytes, str, str]]:
+    """Paquete de captura → (timestamp, bytes, descripción, dirección); None si no tiene datos"""
+    data = packet.get('bytes')
+    if data:
+        data = bytes(data)
+    elif packet.get('data'):
+        try:
+            data = bytes.fromhex(packet['data'])
+        except ValueError:
+            return None
+    if not data:
+        return None
+    return (float(packet.get('timestamp', 0.0)), data, packet.get('description', ''),
+            packet.get('direction', 'out'))
+
+
+def _command(data: bytes) -> int:
+    return data[1] if len(data) > 1 else -1
+
+
+def _ends_block(data: bytes) -> bool:
+    """Reset de posición o liberación de botón/tecla (fin natural de un gesto)"""
+    command = _command(data)
+    if command == MOVE_ABSOLUTE:
+        return data[3:7] == RESET_COORDS
+    if command in (MOUSE_BUTTON, KEYBOARD):
+        return not any(data[2:])
+    return False
+
+
+def split_blocks(reports: List[Tuple[float, bytes, str, str]]) -> List[list]:
+    """Parte los reportes en bloques por contenido (ver cabecera del módulo)"""
+    blocks, current = [], []
+    for report in reports:
+        data = report[1]
+        if current and (len(current) >= MAX_BLOCK or _command(current[-1][1]) != _command(data)):
+            blocks.append(current)
+            current = []
+        current.append(report)
+        if _ends_block(data):
+            blocks.append(current)
+            current = []
+    if current:
+        blocks.append(current)
+    return blocks
+
+
+def canonical(obj: dict) -> bytes:
+    return json.dumps(obj, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def object_hash(obj: dict) -> str:
+    return hashlib.sha256(canonical(obj)).hexdigest()
+
+
+def block_object(block: list) -> dict:
+    start = block[0][0]
+    return {'type': TYPE_BLOCK,
+            'reports': [[round(t - start, 6), data.hex(), description, direction]
+                        for t, data, description, direction in block]}
+
+
+# ===== Almacén =====
+
+class MacroStore:
+    """
+    Almacén de macros en un directorio (ver cabecera del módulo)
+
+    Args:
+        root: Directorio del almacén (default IMOUSE_STORE o ./store)
+        cache_blocks: Bloques decodificados que se mantienen en memoria
+    """
+
+    def __init__(self, root: Optional[str] = None, cache_blocks: int = DEFAULT_CACHE_BLOCKS):
+        self.root = root or os.environ.get(STORE_ENV_VAR) or DEFAULT_STORE_DIR
+        self.cache_blocks = cache_blocks
+        self.stats = {'hits': 0, 'misses': 0}
+        self._cache: 'OrderedDict[str, List[dict]]' = OrderedDict()
+        self._index: Dict[str, dict] = {}
+        self._load_index()
+
+    # ===== Índice =====
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.root, 'index.json')
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        version = data.get('version')
+        if version != STORE_FORMAT_VERSION:
+            raise ValueError(f"Versión de formato no soportada: {version}")
+        self._index = data.get('macros', {})
+
+    def _save_index(self):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self.index_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': STORE_FORMAT_VERSION, 'macros': self._index}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        os.replace(tmp, self.index_path)
+
+    def names(self) -> List[str]:
+        return sorted(self._index)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+
+    def info(self, name: str) -> dict:
+        """Entrada del índice (recipe, source, reports, duration, bytes)"""
+        if name not in self._index:
+            raise KeyError(f"Macro desconocida: {name}")
+        return dict(self._index[name])
+
+    # ===== Objetos =====
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.root, 'objects', digest[:2], digest + '.json')
+
+    def has(self, digest: str) -> bool:
+        return os.path.exists(self._object_path(digest))
+
+    def objects(self) -> Set[str]:
+        """Hashes de todos los objetos guardados"""
+        found = set()
+        base = os.path.join(self.root, 'objects')
+        if os.path.isdir(base):
+            for prefix in os.listdir(base):
+                for name in os.listdir(os.path.join(base, prefix)):
+                    if name.endswith('.json'):
+                        found.add(name[:-5])
+        return found
+
+    def put(self, obj: dict) -> str:
+        """Guarda un objeto (si no existe ya) y devuelve su hash"""
+        digest = object_hash(obj)
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(canonical(obj))
+            os.replace(tmp, path)
+        return digest
+
+    def get(self, digest: str) -> dict:
+        """
+        Objeto por hash
+
+        Raises:
+            KeyError: si no existe
+        """
+        try:
+            with open(self._object_path(digest), 'rb') as f:
+                return json.loads(f.read())
+        except FileNotFoundError:
+            raise KeyError(f"Objeto desconocido: {digest}")
+
+    def resolve(self, ref: str) -> str:
+        """
+        Nombre, hash de receta o prefijo de hash → hash de receta
+
+        Raises:
+            KeyError: si no existe o el prefijo es ambiguo
+        """
+        if ref in self._index:
+            return self._index[ref]['recipe']
+        ref = ref.lower()
+        if len(ref) == 64 and self.has(ref):
+            return ref
+        if len(ref) >= MIN_PREFIX and all(c in '0123456789abcdef' for c in ref):
+            folder = os.path.join(self.root, 'objects', ref[:2])
+            matches = [name[:-5] for name in os.listdir(folder)
+                       if name.startswith(ref) and name.endswith('.json')] if os.path.isdir(folder) else []
+            if len(matches) == 1:
+                return matches[0]
+            if len(matches) > 1:
+                raise KeyError(f"Prefijo de hash ambiguo: {ref} ({len(matches)} objetos)")
+        raise KeyError(f"Macro desconocida: {ref}")
+
+    # ===== Alta y carga =====
+
+    def add(self, name: str, packets: list, source: Optional[str] = None) -> str:
+        """Parte una captura en bloques, la guarda con `name` y devuelve el hash de la receta"""
+        reports = [report for report in map(packet_report, packets) if report is not None]
+        blocks = [[self.put(block_object(block)), round(block[0][0], 6)] for block in split_blocks(reports)]
+        duration = reports[-1][0] - reports[0][0] if reports else 0.0
+        recipe = self.put({'type': TYPE_MACRO, 'blocks': blocks, 'duration': round(duration, 6)})
+        self._index[name] = {'recipe': recipe, 'source': source, 'reports': len(reports),
+                             'duration': round(duration, 6), 'bytes': len(json.dumps(packets))}
+        self._save_index()
+        return recipe
+
+    def add_file(self, name: str, path: str, profile: Optional[str] = None) -> str:
+        """Captura o macro JSON (las macros se compilan para el perfil)"""
+        from replay_imouse import load_packets
+        return self.add(name, load_packets(path, profile), source=path)
+
+    def block(self, digest: str) -> List[dict]:
+        """Reportes de un bloque (tiempos relativos), con caché LRU"""
+        cached = self._cache.get(digest)
+        if cached is not None:
+            self._cache.move_to_end(digest)
+            self.stats['hits'] += 1
+            return cached
+
+        self.stats['misses'] += 1
+        obj = self.get(digest)
+        if obj.get('type') != TYPE_BLOCK:
+            raise ValueError(f"{digest[:12]} no es un bloque")
+        reports = [{'bytes': list(bytes.fromhex(data)), 'description': description, 'direction': direction,
+                    'timestamp': offset}
+                   for offset, data, description, direction in obj['reports']]
+        self._cache[digest] = reports
+        if len(self._cache) > self.cache_blocks:
+            self._cache.popitem(last=False)
+        return reports
+
+    def recipe(self, ref: str) -> dict:
+        digest = self.resolve(ref)
+        obj = self.get(digest)
+        if obj.get('type') != TYPE_MACRO:
+            raise ValueError(f"{digest[:12]} no es una macro")
+        return obj
+
+    def load(self, ref: str) -> List[dict]:
+        """
+        Captura completa (formato de replay_imouse.py) por nombre o hash
+
+        Raises:
+            KeyError: si la macro o alguno de sus bloques no existe
+        """
+        packets = []
+        for digest, start in self.recipe(ref)['blocks']:
+            for report in self.block(digest):
+                packet = dict(report)
+                packet['timestamp'] = round(start + report['timestamp'], 6)
+                packets.append(packet)
+        return packets
+
+    def compose(self, name: str, parts: Iterable[str], gap: float = DEFAULT_GAP) -> str:
+        """
+        Nueva macro que encadena otras por referencia (sin copiar bloques)
+
+        Cada parte empieza `gap` segundos después del último reporte de la anterior.
+        """
+        blocks, offset, reports = [], 0.0, 0
+        parts = list(parts)
+        for part in parts:
+            recipe = self.recipe(part)
+            if not recipe['blocks']:
+                continue
+            first = recipe['blocks'][0][1]
+            blocks.extend([digest, round(offset + start - first, 6)] for digest, start in recipe['blocks'])
+            offset += recipe['duration'] + gap
+            reports += sum(len(self.block(digest)) for digest, _ in recipe['blocks'])
+        duration = round(max(offset - gap, 0.0), 6)
+        recipe = self.put({'type': TYPE_MACRO, 'blocks': blocks, 'duration': duration})
+        self._index[name] = {'recipe': recipe, 'source': '+'.join(parts), 'reports': reports,
+                             'duration': duration, 'bytes': 0}
+        self._save_index()
+        return recipe
+
+    def remove(self, name: str):
+        """Quita el nombre del índice (los objetos se quedan; ver prune)"""
+        self.info(name)
+        del self._index[name]
+        self._save_index()
+
+    def prune(self) -> int:
+        """Borra los objetos que ninguna macro del índice referencia"""
+        live = set()
+        for entry in self._index.values():
+            live.add(entry['recipe'])
+            live.update(digest for digest, _ in self.get(entry['recipe'])['blocks'])
+        removed = 0
+        for digest in self.objects() - live:
+            os.remove(self._object_path(digest))
+            self._cache.pop(digest, None)
+            removed += 1
+        return removed
+
+    # ===== Distribución =====
+
+    def export_bundle(self, names: Iterable[str], have: Optional[Set[str]] = None) -> dict:
+        """Bundle con las macros y los objetos que el destino no tiene (`have`)"""
+        have = have or set()
+        macros, objects = {}, {}
+        for name in names:
+            entry = self.info(name)
+            macros[name] = entry
+            for digest in [entry['recipe']] + [d for d, _ in self.get(entry['recipe'])['blocks']]:
+                if digest not in have and digest not in objects:
+                    objects[digest] = self.get(digest)
+        return {'version': STORE_FORMAT_VERSION, 'macros': macros, 'objects': objects}
+
+    def import_bundle(self, bundle: dict) -> Tuple[int, int]:
+        """
+        Añade las macros y objetos de un bundle
+
+        Returns:
+            tuple: (macros importadas, objetos nuevos)
+
+        Raises:
+            ValueError: si la versión no es compatible, un objeto no
+                        coincide con su hash o falta alguno referenciado
+        """
+        if bundle.get('version') != STORE_FORMAT_VERSION:
+            raise ValueError(f"Versión de bundle no soportada: {bundle.get('version')}")
+        objects = bundle.get('objects', {})
+        for digest, obj in objects.items():
+            if object_hash(obj) != digest:
+                raise ValueError(f"Objeto corrupto en el bundle: {digest[:12]}")
+
+        def available(digest):
+            return digest in objects or self.has(digest)
+
+        for name, entry in bundle.get('macros', {}).items():
+            recipe = objects.get(entry['recipe']) or (self.get(entry['recipe']) if self.has(entry['recipe']) else None)
+            if recipe is None or not all(available(digest) for digest, _ in recipe['blocks']):
+                raise ValueError(f"Faltan objetos de la macro {name} en el bundle")
+
+        added = 0
+        for digest, obj in objects.items():
+            if not self.has(digest):
+                self.put(obj)
+                added += 1
+        self._index.update(bundle.get('macros', {}))
+        self._save_index()
+        return len(bundle.get('macros', {})), added
+
+    def summary(self) -> dict:
+        """Tamaño lógico (JSON de origen) frente a lo guardado"""
+        stored = 0
+        objects = self.objects()
+        for digest in objects:
+            stored += os.path.getsize(self._object_path(digest))
+        if os.path.exists(self.index_path):
+            stored += os.path.getsize(self.index_path)
+        logical = sum(entry.get('bytes', 0) for entry in self._index.values())
+        blocks = sum(1 for digest in objects if self.get(digest).get('type') == TYPE_BLOCK)
+        return {'macros': len(self._index), 'objects': len(objects), 'blocks': blocks,
+                'logical_bytes': logical, 'stored_bytes': stored,
+                'ratio': logical / stored if stored else 0.0}
+
+
+_default_store = None
+
+
+def get_macro_store() -> MacroStore:
+    """Almacén por defecto (IMOUSE_STORE o ./store), abierto una vez por proceso"""
+    global _default_store
+    if _default_store is None:
+        _default_store = MacroStore()
+    return _default_store
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    from imouse_targets import PROFILES, DEFAULT_PROFILE
+
+    parser = argparse.ArgumentParser(description='Almacén de macros direccionado por contenido')
+    parser.add_argument('--store', help=f'Directorio del almacén (default: {STORE_ENV_VAR} o ./store)')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('add', help='Añadir capturas o macros JSON')
+    p.add_argument('files', nargs='+')
+    p.add_argument('--name', help='Nombre (solo con un archivo; default: nombre del archivo)')
+    p.add_argument('--profile', default=DEFAULT_PROFILE, choices=sorted(PROFILES),
+                   help='Perfil para compilar macros (default: iphone)')
+
+    sub.add_parser('ls', help='Listar macros')
+
+    p = sub.add_parser('get', help='Reconstruir una macro como captura JSON')
+    p.add_argument('ref', help='Nombre o hash (o prefijo)')
+    p.add_argument('-o', '--output', help='Archivo de salida (default: stdout)')
+
+    p = sub.add_parser('compose', help='Encadenar macros por referencia')
+    p.add_argument('name')
+    p.add_argument('parts', nargs='+')
+    p.add_argument('--gap', type=float, default=DEFAULT_GAP, help=f'Pausa entre partes en s (default: {DEFAULT_GAP})')
+
+    p = sub.add_parser('rm', help='Quitar macros del índice')
+    p.add_argument('names', nargs='+')
+    p.add_argument('--prune', action='store_true', help='Borrar también los objetos sin referencias')
+
+    p = sub.add_parser('export', help='Exportar macros a un bundle')
+    p.add_argument('names', nargs='+')
+    p.add_argument('-o', '--output', required=True)
+    p.add_argument('--have', metavar='HASHES', help='Archivo con los hashes que ya tiene el destino (uno por línea)')
+
+    p = sub.add_parser('import', help='Importar un bundle')
+    p.add_argument('bundle')
+
+    sub.add_parser('objects', help='Listar los hashes guardados (para --have)')
+
+    sub.add_parser('stats', help='Tamaño lógico frente a guardado')
+    args = parser.parse_args(argv)
+
+    try:
+        store = MacroStore(args.store)
+
+        if args.command == 'add':
+            if args.name and len(args.files) > 1:
+                print("❌ --name solo se puede usar con un archivo")
+                return 1
+            for path in args.files:
+                name = args.name or os.path.splitext(os.path.basename(path))[0]
+                previous = store.info(name)['source'] if name in store else None
+                recipe = store.add_file(name, path, args.profile)
+                if previous and previous != path:
+                    print(f"⚠️  {name} sustituye a la versión de {previous}")
+                entry = store.info(name)
+                print(f"✅ {name}: {entry['reports']} reportes → {recipe[:12]}")
+
+        elif args.command == 'ls':
+            for name in store.names():
+                entry = store.info(name)
+                print(f"   {name:<24} {entry['recipe'][:12]}  {entry['reports']:>6} reportes  "
+                      f"{entry['duration']:>8.3f}s  {entry.get('source') or ''}")
+
+        elif args.command == 'get':
+            packets = store.load(args.ref)
+            if args.output:
+                with open(args.output, 'w', encoding='utf-8') as f:
+                    json.dump(packets, f, indent=2)
+                print(f"💾 {len(packets)} reportes guardados en: {args.output}")
+            else:
+                print(json.dumps(packets, indent=2))
+
+        elif args.command == 'compose':
+            recipe = store.compose(args.name, args.parts, args.gap)
+            entry = store.info(args.name)
+            print(f"✅ {args.name}: {entry['reports']} reportes, {entry['duration']:.3f}s → {recipe[:12]}")
+
+        elif args.command == 'rm':
+            for name in args.names:
+                store.remove(name)
+                print(f"🗑️  {name}")
+            if args.prune:
+                print(f"🧹 {store.prune()} objetos sin referencias borrados")
+
+        elif args.command == 'export':
+            have = set()
+            if args.have:
+                with open(args.have, 'r', encoding='utf-8') as f:
+                    have = {line.strip() for line in f if line.strip()}
+            bundle = store.export_bundle(args.names, have)
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(bundle, f, separators=(',', ':'))
+            print(f"📦 {len(bundle['macros'])} macros, {len(bundle['objects'])} objetos → {args.output}")
+
+        elif args.command == 'import':
+            with open(args.bundle, 'r', encoding='utf-8') as f:
+                macros, added = store.import_bundle(json.load(f))
+            print(f"✅ {macros} macros importadas, {added} objetos nuevos")
+
+        elif args.command == 'objects':
+            for digest in sorted(store.objects()):
+                print(digest)
+
+        elif args.command == 'stats':
+            summary = store.summary()
+            print(f"📊 {summary['macros']} macros, {summary['objects']} objetos ({summary['blocks']} bloques)")
+            print(f"   Lógico: {summary['logical_bytes']} bytes, guardado: {summary['stored_bytes']} bytes "
+                  f"({summary['ratio']:.1f}x)")
+
+    except (OSError, ValueError, KeyError) as e:
+        message = e.args[0] if isinstance(e, KeyError) and e.args else e
+        print(f"❌ {message}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
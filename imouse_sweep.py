@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+iMouse Sweep - Barrido paralelo del espacio de reportes
+Genera reportes candidatos a partir de rangos declarativos por byte y los
+envía en paralelo desde varios procesos, cada uno con su propio dispositivo
+(simulado o un dongle real distinto). Las respuestas se recogen en un
+archivo columnar (imouse_columnar) para filtrarlas rápido después.
+
+Especificación (JSON o --set POS=VALORES):
+    {
+        "base": [0, 162, 0, 0, 0, 0, 0, 0, 0],   # reporte de partida
+        "fields": {"1": "0xa0-0xaf", "4": "0x04-0x1d,0x28"},
+        "settle": 0.05,                          # espera de respuestas (s)
+        "after": [0, 162, 0, 0, 0, 0, 0, 0, 0]   # opcional: tras cada candidato
+    }
+
+Los valores admiten un entero, una lista, "a-b" (inclusivo) y listas
+separadas por comas de ambos. El primer campo es el que varía más lento.
+
+    python imouse_sweep.py --set 1=0xa0-0xaf --set 2=0x00-0x0f -j 4 --simulate
+    python imouse_sweep.py --spec sweep_keyboard.json -o keyboard.imcl --release
+    python imouse_sweep.py --show keyboard.imcl --responded
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+import multiprocessing
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from imouse_columnar import save_columnar, load_columnar, load_rows, read_header
+
+
+VENDOR_ID = 0x720a
+PRODUCT_ID = 0x3dab
+
+DEFAULT_BASE = [0x00, 0xa2, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00]
+KEY_RELEASE = DEFAULT_BASE
+DEFAULT_SETTLE = 0.05
+DEFAULT_CHUNK = 64
+RESPONSE_WIDTH = 16
+
+# Comandos que el dispositivo simulado "reconoce" (eco de la respuesta)
+SIMULATED_COMMANDS = (0xa0, 0xa1, 0xa2, 0xa4)
+
+COLUMN_TYPES = {
+    'index': 'I',
+    'ok': 'B',
+    'latency_us': 'f',
+    'responses': 'H',
+    'worker': 'H',
+}
+
+
+# ===== Especificación =====
+
+def parse_values(value) -> List[int]:
+    """Convierte 5, [1, 2], "0x04-0x1d" o "1,2,0x10-0x12" en lista de bytes"""
+    if isinstance(value, int):
+        values = [value]
+    elif isinstance(value, (list, tuple)):
+        values = [v for item in value for v in parse_values(item)]
+    else:
+        values = []
+        for part in str(value).split(','):
+            part = part.strip()
+            if not part:
+                continue
+            if '-' in part:
+                start, end = (int(x, 0) for x in part.split('-', 1))
+                values.extend(range(start, end + 1))
+            else:
+                values.append(int(part, 0))
+
+    for v in values:
+        if not 0 <= v <= 0xff:
+            raise ValueError(f"Valor fuera de rango de byte: {v}")
+    return values
+
+
+def normalize_spec(spec: dict) -> dict:
+    """Valida la especificación y expande los rangos"""
+    base = list(spec.get('base', DEFAULT_BASE))
+    fields = {}
+    for position, values in spec.get('fields', {}).items():
+        position = int(position)
+        if not 0 <= position < len(base):
+            raise ValueError(f"Posición {position} fuera del reporte base ({len(base)} bytes)")
+        fields[position] = parse_values(values)
+        if not fields[position]:
+            raise ValueError(f"Posición {position} sin valores")
+
+    return {
+        'base': base,
+        'fields': fields,
+        'settle': float(spec.get('settle', DEFAULT_SETTLE)),
+        'after': list(spec['after']) if spec.get('after') else None,
+    }
+
+
+def candidate_count(spec: dict) -> int:
+    count = 1
+    for values in spec['fields'].values():
+        count *= len(values)
+    return count
+
+
+def iter_candidates(spec: dict, start: int = 0, stop: Optional[int] = None) -> Iterator[bytes]:
+    """Genera los reportes candidatos [start, stop) en orden determinista"""
+    positions = list(spec['fields'])
+    report = bytearray(spec['base'])
+    combos = itertools.product(*(spec['fields'][p] for p in positions))
+
+    for values in itertools.islice(combos, start, stop):
+        for position, value in zip(positions, values):
+            report[position] = value
+        yield bytes(report)
+
+
+# ===== Worker =====
+
+_worker = {}
+
+
+def simulated_responder(data: bytes) -> Optional[bytes]:
+    """Respuesta del dispositivo simulado: eco para los comandos conocidos"""
+    if len(data) > 1 and data[1] in SIMULATED_COMMANDS:
+        return bytes([0x00, 0xee]) + data[1:]
+    return None
+
+
+def _init_worker(spec, simulate, vendor_id, product_id, slots):
+    """Inicializa un proceso: abre su propio dispositivo y ring de captura"""
+    from imouse_transport import HIDTransport
+    from imouse_capture import CaptureRing
+
+    slot = slots.get()
+    device = None
+    if simulate:
+        from imouse_simulator import SimulatedDevice
+        device = SimulatedDevice(report_size=len(spec['base']), responder=simulated_responder)
+
+    transport = HIDTransport(vendor_id, product_id, device=device, device_index=slot)
+    capture = CaptureRing(capacity=4096, report_size=RESPONSE_WIDTH)
+
+    def attach():
+        transport.device.set_raw_data_handler(capture.append)
+
+    opened = transport.open()
+    if opened:
+        attach()
+        transport.on_reconnect.append(attach)
+
+    _worker.update(spec=spec, slot=slot, transport=transport, capture=capture, opened=opened)
+
+
+def _run_chunk(bounds: Tuple[int, int]) -> Tuple[int, Dict[str, bytes]]:
+    """Envía los candidatos [start, stop) y devuelve sus columnas en bytes"""
+    start, stop = bounds
+    if not _worker['opened']:
+        # Falla la tarea (y el barrido) en vez de dar sus candidatos por no enviados
+        raise RuntimeError(f"El proceso {_worker['slot']} no pudo abrir su dispositivo")
+    spec = _worker['spec']
+    transport = _worker['transport']
+    capture = _worker['capture']
+    settle = spec['settle']
+    after = spec['after']
+
+    columns = {name: array(code) for name, code in COLUMN_TYPES.items()}
+    response = array('B')
+
+    for index, report in enumerate(iter_candidates(spec, start, stop), start):
+        seq = capture.total
+        t0 = time.perf_counter()
+        ok = transport.connected and transport.send(report)
+        latency = (time.perf_counter() - t0) * 1e6
+
+        if settle > 0:
+            time.sleep(settle)
+        records, _, _ = capture.read_since(seq)
+
+        if after and ok:
+            transport.send(after)
+
+        first = records[0][1] if records else b''
+        columns['index'].append(index)
+        columns['ok'].append(1 if ok else 0)
+        columns['latency_us'].append(latency)
+        columns['responses'].append(len(records))
+        columns['worker'].append(_worker['slot'])
+        response.frombytes(first[:RESPONSE_WIDTH].ljust(RESPONSE_WIDTH, b'\x00'))
+
+    result = {name: column.tobytes() for name, column in columns.items()}
+    result['response'] = response.tobytes()
+    return start, result
+
+
+# ===== Barrido =====
+
+def dongle_count(vendor_id: int = VENDOR_ID, product_id: int = PRODUCT_ID) -> int:
+    """Dongles conectados (0 si pywinusb no está instalado)"""
+    from imouse_transport import count_hid_devices
+
+    try:
+        return count_hid_devices(vendor_id, product_id)
+    except ImportError:
+        print("❌ Error: pywinusb no está instalado")
+        print("   pip install pywinusb")
+        return 0
+
+
+def run_sweep(spec: dict, output: str, workers: int = 1, simulate: bool = False,
+              vendor_id: int = VENDOR_ID, product_id: int = PRODUCT_ID,
+              chunk_size: int = DEFAULT_CHUNK, verbose: bool = True) -> Optional[dict]:
+    """
+    Ejecuta el barrido en `workers` procesos y guarda el resultado columnar
+
+    Con dongles reales, cada proceso abre el dongle número `worker` de los
+    conectados con el mismo VID/PID (hace falta uno por proceso).
+
+    Returns:
+        dict con el resumen, o None si no hay candidatos
+
+    Raises:
+        ValueError: si hay más procesos que dongles conectados
+        RuntimeError: si un proceso no puede abrir su dispositivo
+    """
+    spec = normalize_spec(spec)
+    total = candidate_count(spec)
+    if not spec['fields'] or total == 0:
+        print("❌ La especificación no tiene campos que barrer")
+        return None
+
+    report_size = len(spec['base'])
+    workers = max(1, min(workers, (total + chunk_size - 1) // chunk_size))
+    if not simulate:
+        available = dongle_count(vendor_id, product_id)
+        if not available:
+            raise ValueError(f"No hay dongles conectados (0x{vendor_id:04x}:0x{product_id:04x})")
+        if workers > available:
+            raise ValueError(f"{workers} procesos pero {available} dongle(s) conectado(s): "
+                             f"hace falta uno por proceso (usa -j {available})")
+    chunks = [(start, min(start + chunk_size, total)) for start in range(0, total, chunk_size)]
+
+    if verbose:
+        print(f"🔬 Barrido: {total} candidatos, {workers} procesos "
+              f"({'simulado' if simulate else 'dongle real'}), espera {spec['settle'] * 1000:.0f} ms")
+
+    columns = {name: array(code, [0]) * total for name, code in COLUMN_TYPES.items()}
+    columns['report'] = array('B', b''.join(iter_candidates(spec)))
+    columns['response'] = array('B', [0]) * (total * RESPONSE_WIDTH)
+
+    slots = multiprocessing.Queue()
+    for slot in range(workers):
+        slots.put(slot)
+
+    started = time.perf_counter()
+    done = 0
+    with multiprocessing.Pool(workers, initializer=_init_worker,
+                              initargs=(spec, simulate, vendor_id, product_id, slots)) as pool:
+        for start, result in pool.imap_unordered(_run_chunk, chunks):
+            for name, data in result.items():
+                chunk = array(columns[name].typecode)
+                chunk.frombytes(data)
+                offset = start * (RESPONSE_WIDTH if name == 'response' else 1)
+                columns[name][offset:offset + len(chunk)] = chunk
+            done += len(result['index']) // columns['index'].itemsize
+            if verbose:
+                print(f"\r   📤 {done}/{total} candidatos", end='', flush=True)
+    elapsed = time.perf_counter() - started
+
+    summary = {
+        'candidates': total,
+        'sent': sum(columns['ok']),
+        'responded': sum(1 for count in columns['responses'] if count),
+        'elapsed_s': elapsed,
+        'rate': total / elapsed if elapsed > 0 else 0.0,
+        'workers': workers,
+    }
+
+    save_columnar(output, columns, total,
+                  widths={'report': report_size, 'response': RESPONSE_WIDTH},
+                  meta={'spec': {**spec, 'fields': {str(k): v for k, v in spec['fields'].items()}},
+                        'simulated': simulate, 'summary': summary})
+
+    if verbose:
+        print()
+        print(f"✅ {summary['sent']}/{total} enviados, {summary['responded']} con respuesta "
+              f"en {elapsed:.2f}s ({summary['rate']:.0f}/s)")
+        print(f"💾 Resultados: {output}")
+    return summary
+
+
+def _byte_mask(column: bytes, stride: int, offset: int, values) -> int:
+    """
+    Máscara de filas (un byte 0/1 por fila, como entero) cuyo byte `offset`
+    de cada fila de `stride` bytes está en `values`: un corte y un translate,
+    sin bucle por fila
+    """
+    allowed = set(values)
+    table = bytes(1 if value in allowed else 0 for value in range(256))
+    return int.from_bytes(column[offset::stride].translate(table), 'little')
+
+
+def _nonzero_mask(column: array) -> int:
+    """Máscara de filas con valor distinto de 0 (columna de ancho 1)"""
+    data = column.tobytes()
+    size = column.itemsize
+    combined = 0
+    for offset in range(size):
+        combined |= int.from_bytes(data[offset::size], 'little')
+    return _byte_mask(combined.to_bytes(len(column), 'little'), 1, 0, range(1, 256))
+
+
+def filter_results(path: str, responded: bool = False,
+                   where: Optional[Dict[int, List[int]]] = None) -> List[dict]:
+    """
+    Filtra un archivo de resultados leyendo solo las columnas necesarias
+
+    La máscara se calcula con `responses` y `report` (cortes sobre la
+    columna aplanada); ok, latency_us y response se leen solo para las
+    filas que pasan el filtro.
+
+    Args:
+        responded: Solo candidatos con al menos una respuesta
+        where: {posición: [valores]} sobre los bytes del reporte
+    """
+    header = read_header(path)
+    total = header['rows']
+    report_size = header['columns']['report']['width']
+    needed = (['responses'] if responded else []) + (['report'] if where else [])
+    columns = load_columnar(path, needed) if needed else {}
+
+    mask = (1 << (8 * total)) // 255 if total else 0          # 0x0101...01: todas las filas
+    if responded:
+        mask &= _nonzero_mask(columns['responses'])
+    if where:
+        reports = columns['report'].tobytes()
+        for position, values in where.items():
+            if not 0 <= position < report_size:
+                raise ValueError(f"Posición fuera del reporte: {position} (tamaño {report_size})")
+            mask &= _byte_mask(reports, report_size, position, values)
+
+    matches = list(itertools.compress(range(total), mask.to_bytes(total, 'little')))
+    if not matches:
+        return []
+
+    names = ['report', 'ok', 'latency_us', 'responses', 'response']
+    picked = load_rows(path, names, matches)
+    reports = picked['report'].tobytes()
+    responses = picked['response'].tobytes()
+    return [{
+        'row': row,
+        'report': reports[i * report_size:(i + 1) * report_size],
+        'ok': bool(ok),
+        'latency_us': latency,
+        'responses': count,
+        'response': responses[i * RESPONSE_WIDTH:(i + 1) * RESPONSE_WIDTH],
+    } for i, (row, ok, latency, count) in enumerate(zip(matches, picked['ok'], picked['latency_us'],
+                                                          picked['responses']))]
+
+
+def show_results(path: str, responded: bool = False, where=None, limit: int = 50) -> int:
+    """Muestra por consola las filas que pasan el filtro"""
+    header = read_header(path)
+    summary = header['meta'].get('summary', {})
+    rows = filter_results(path, responded, where)
+
+    print(f"📊 {path}: {header['rows']} candidatos, {summary.get('responded', '?')} con respuesta")
+    print(f"   Filtro: {len(rows)} filas")
+    for row in rows[:limit]:
+        status = '✓' if row['ok'] else '✗'
+        reply = row['response'].hex(' ') if row['responses'] else '-'
+        print(f"   {status} {row['report'].hex(' ')}  {row['latency_us']:8.1f} us  "
+              f"{row['responses']:>3}  {reply}")
+    if len(rows) > limit:
+        print(f"   ... {len(rows) - limit} más")
+    return len(rows)
+
+
+def parse_assignment(text: str) -> Tuple[int, List[int]]:
+    """'4=0x04-0x1d' → (4, [0x04, ..., 0x1d])"""
+    position, _, values = text.partition('=')
+    if not values:
+        raise argparse.ArgumentTypeError(f"Formato esperado POS=VALORES: {text}")
+    return int(position, 0), parse_values(values)
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    parser = argparse.ArgumentParser(description='Barrido paralelo de reportes iMouse')
+    parser.add_argument('--spec', help='Especificación JSON del barrido')
+    parser.add_argument('--set', action='append', default=[], type=parse_assignment,
+                        metavar='POS=VALORES', help='Rango de un byte (repetible, ej: 4=0x04-0x1d)')
+    parser.add_argument('--settle', type=float, help='Espera de respuestas por candidato (s)')
+    parser.add_argument('--release', action='store_true',
+                        help='Enviar release de teclado tras cada candidato')
+    parser.add_argument('-o', '--output', default='imouse_sweep.imcl',
+                        help='Archivo columnar de resultados')
+    parser.add_argument('-j', '--workers', type=int,
+                        help='Procesos en paralelo (default: uno por dongle conectado, '
+                             'o uno por CPU con --simulate)')
+    parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNK, help='Candidatos por tarea')
+    parser.add_argument('--simulate', action='store_true', help='Dispositivos simulados (sin USB)')
+    parser.add_argument('--show', metavar='RESULTADOS', help='Mostrar un archivo de resultados')
+    parser.add_argument('--responded', action='store_true', help='Con --show: solo con respuesta')
+    parser.add_argument('--limit', type=int, default=50, help='Con --show: filas máximas')
+    args = parser.parse_args(argv)
+
+    if args.show:
+        where = dict(args.set) if args.set else None
+        try:
+            show_results(args.show, args.responded, where, args.limit)
+        except (OSError, ValueError) as e:
+            print(f"❌ {e}")
+            return 1
+        return 0
+
+    spec = {}
+    if args.spec:
+        with open(args.spec, 'r', encoding='utf-8') as f:
+            spec = json.load(f)
+    spec.setdefault('fields', {}).update({str(p): v for p, v in args.set})
+    if args.settle is not None:
+        spec['settle'] = args.settle
+    elif args.simulate:
+        spec.setdefault('settle', 0.0)
+    if args.release:
+        spec['after'] = KEY_RELEASE
+
+    workers = args.workers
+    if workers is None:
+        workers = (os.cpu_count() or 1) if args.simulate else dongle_count()
+        if not workers:
+            print(f"❌ No hay dongles conectados (0x{VENDOR_ID:04x}:0x{PRODUCT_ID:04x})")
+            return 1
+
+    try:
+        summary = run_sweep(spec, args.output, workers, args.simulate, chunk_size=args.chunk)
+    except (ValueError, RuntimeError) as e:
+        print(f"❌ {e}")
+        return 1
+    return 0 if summary else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,88 +2,72 @@
 """
 iMouse Swipe - Control de gestos y swipes para iPhone/iPad
 Implementa swipes fluidos con múltiples puntos intermedios y easing natural
-"""
 
-import sys
-import time
+Los puntos intermedios van por un stream COALESCE_LATEST de HIDSender: si el
+dispositivo es más lento que el trazo, el punto pendiente se reemplaza por
+el más reciente en vez de acumular retraso.
+"""
 
-try:
-    import pywinusb.hid as hid
-except ImportError:
-    print("❌ Error: pywinusb no está instalado")
-    print("   pip install pywinusb")
-    sys.exit(1)
 
 from imouse_hid_protocol import iMouseHIDProtocol, ButtonState
+from imouse_gestures import swipe_path
+from imouse_trace import get_tracer, STAGE_COMPILE, STAGE_ENCODE, STAGE_WAIT
+from imouse_clock import get_clock
+from imouse_transport import HIDTransport
+from imouse_sender import HIDSender, COALESCE_LATEST
+
+
+# Puntos del trazo pendientes como máximo en el stream de movimiento
+MOTION_QUEUE_CAPACITY = 8
 
 
 class SwipeController:
-    def __init__(self, screen_width=365, screen_height=667):
+    def __init__(self, screen_width=365, screen_height=667, device=None):
         self.screen_width = screen_width
         self.screen_height = screen_height
         self.protocol = iMouseHIDProtocol(screen_width=screen_width, screen_height=screen_height)
-        self.device = None
-        self.out_report = None
+        self.device = device
+        self.transport = None
+        self.sender = None
         self.report_size = 0
 
     def connect_device(self):
         """Conecta con el dispositivo iMouse"""
-        VENDOR_ID = 0x720a
-        PRODUCT_ID = 0x3dab
-
         print("🔌 Conectando con dispositivo iMouse...")
-        devices = hid.HidDeviceFilter(vendor_id=VENDOR_ID, product_id=PRODUCT_ID).get_devices()
-
-        if not devices:
-            print(f"❌ Dispositivo no encontrado: 0x{VENDOR_ID:04x}:0x{PRODUCT_ID:04x}")
-            return False
-
-        self.device = devices[0]
+        self.transport = HIDTransport(device=self.device)
 
-        try:
-            self.device.open()
-        except Exception as e:
-            print(f"❌ No se pudo abrir el dispositivo: {e}")
+        if not self.transport.open():
             return False
 
-        print(f"✅ Conectado a: {self.device.product_name}")
-
-        # Obtener output report
-        for report in self.device.find_output_reports():
-            self.out_report = report
-            break
+        self.device = self.transport.device
+        self.transport.on_reconnect.append(self.on_reconnect)
+        print(f"✅ Conectado a: {self.transport.product_name}")
 
-        if not self.out_report:
-            print("❌ No se encontró output report")
-            self.device.close()
-            return False
-
-        self.report_size = len(self.out_report.get_raw_data())
+        self.report_size = self.transport.report_size
+        self.sender = HIDSender(self.transport, name='imouse-swipe')
+        self.sender.add_stream('motion', COALESCE_LATEST, capacity=MOTION_QUEUE_CAPACITY)
+        self.sender.start()
         print(f"   Report size: {self.report_size} bytes")
         print(f"   Resolución: {self.screen_width}x{self.screen_height}")
         return True
 
+    def on_reconnect(self):
+        """Restaura el estado del protocolo tras reconectar el dongle"""
+        self.protocol.reset_state()
+
     def send_packet(self, packet, delay=0):
         """Envía un paquete al dispositivo"""
-        if not self.out_report:
+        if not self.transport:
             return False
 
-        try:
-            data_list = list(packet)
-            while len(data_list) < self.report_size:
-                data_list.append(0x00)
-
-            self.out_report.set_raw_data(data_list)
-            self.out_report.send()
-
-            if delay > 0:
-                time.sleep(delay)
+        if not self.transport.send(packet):
+            return False
 
-            return True
+        if delay > 0:
+            with get_tracer().span('sleep', STAGE_WAIT, delay=delay):
+                get_clock().sleep(delay)
 
-        except Exception as e:
-            print(f"❌ Error enviando paquete: {e}")
-            return False
+        return True
 
     def swipe(self, start_x, start_y, end_x, end_y, duration=0.3, steps=10):
         """
@@ -127,35 +111,40 @@ class SwipeController:
             return False
 
         # Calcular los puntos intermedios
-        delta_x = end_x - start_x
-        delta_y = end_y - start_y
         step_delay = duration / steps
+        tracer = get_tracer()
 
-        print(f"   ↗ Deslizando ({steps} pasos):", end='', flush=True)
-
-        # Enviar cada punto intermedio
-        for i in range(1, steps + 1):
-            # Calcular posición interpolada
-            progress = i / steps
+        with tracer.span('swipe_path', STAGE_COMPILE, steps=steps):
+            path = swipe_path(start_x, start_y, end_x, end_y, steps)
 
-            # Usar una curva de easing para movimiento más natural
-            # ease_out_cubic para desaceleración al final
-            eased_progress = 1 - pow(1 - progress, 3)
+        print(f"   ↗ Deslizando ({steps} pasos):", end='', flush=True)
 
-            current_x = int(start_x + delta_x * eased_progress)
-            current_y = int(start_y + delta_y * eased_progress)
+        motion = self.sender.streams['motion'].stats
+        errors, coalesced = motion['errors'], motion['coalesced']
 
+        # Encolar cada punto intermedio al ritmo del trazo
+        for i, (current_x, current_y) in enumerate(path, 1):
             # Mover a la posición manteniendo el botón presionado
-            move_packet = self.protocol.move_absolute(current_x, current_y, button=ButtonState.LEFT)
+            with tracer.span('move_absolute', STAGE_ENCODE):
+                move_packet = self.protocol.move_absolute(current_x, current_y, button=ButtonState.LEFT)
 
-            if self.send_packet(move_packet, step_delay):
-                if i % (steps // 5) == 0 or i == steps:  # Mostrar progreso cada 20%
-                    print(".", end='', flush=True)
-            else:
+            if not self.sender.put('motion', move_packet, key='move'):
                 print(" ✗")
                 return False
+            if i % max(1, steps // 5) == 0 or i == steps:  # Mostrar progreso cada 20%
+                print(".", end='', flush=True)
+            with tracer.span('sleep', STAGE_WAIT, delay=step_delay):
+                get_clock().sleep(step_delay)
+
+        # El último punto debe llegar antes de soltar
+        self.sender.join()
+        if motion['errors'] > errors:
+            print(" ✗")
+            return False
 
         print(" ✓")
+        if motion['coalesced'] > coalesced:
+            print(f"   ⚠️  {motion['coalesced'] - coalesced} punto(s) fusionados: el dispositivo iba más lento que el trazo")
 
         # Soltar el "dedo"
         print("   • Soltando toque...", end='', flush=True)
@@ -242,8 +231,11 @@ class SwipeController:
 
     def close(self):
         """Cierra la conexión con el dispositivo"""
-        if self.device:
-            self.device.close()
+        if self.sender:
+            self.sender.stop()
+            self.sender = None
+        if self.transport:
+            self.transport.close()
 
 
 def main():
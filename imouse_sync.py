@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+iMouse Sync - Replay sincronizado en varios dispositivos
+Para comparar teléfonos (A/B) la misma captura tiene que empezar a la vez en
+todos y seguir alineada. Varios procesos de replay_imouse.py arrancan cada
+uno cuando termina de cargar el JSON y abrir su dongle, así que las
+mediciones quedan contaminadas por ese desfase de arranque.
+
+Aquí la captura se carga y prepara una sola vez, se abren todos los
+dispositivos y cada uno tiene su hilo de envío. Los hilos esperan en una
+barrera; al pasarla se fija un único instante de inicio (perf_counter, reloj
+monotónico) un poco en el futuro (--lead) y todos siguen la misma línea de
+tiempo a partir de él. Al terminar se informa, por dispositivo, del retraso
+de cada reporte respecto a su tiempo objetivo y, entre dispositivos, de la
+dispersión del mismo reporte.
+
+    python imouse_sync.py samples/demo.json --devices 3 --simulate
+    python imouse_sync.py samples/telegram.json --devices 2 --lead 0.1
+    python imouse_sync.py samples/demo.json --network 10.0.0.5:7430,10.0.0.6:7430 --json
+"""
+
+import sys
+import json
+import time
+import argparse
+import threading
+from typing import List, Optional
+
+from imouse_transport import HIDTransport, CodecChanged, VENDOR_ID, PRODUCT_ID
+from imouse_targets import PROFILES, DEFAULT_PROFILE
+
+
+DEFAULT_LEAD = 0.05         # Margen entre la barrera y el inicio común (s)
+SKEW_PERCENTILES = (50, 99)
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Percentil por rango más cercano (sin NumPy)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+
+def _summary_ms(values: List[float]) -> dict:
+    ms = [v * 1000 for v in values]
+    summary = {'mean': sum(ms) / len(ms) if ms else 0.0}
+    summary.update({f'p{p}': percentile(ms, p) for p in SKEW_PERCENTILES})
+    summary['max'] = max(ms) if ms else 0.0
+    return summary
+
+
+class DeviceLane:
+    """Un dispositivo de la sesión: transporte, reportes codificados y tiempos reales"""
+
+    def __init__(self, index: int, transport: HIDTransport, label: str):
+        self.index = index
+        self.transport = transport
+        self.label = label
+        self.reports = []
+        self.generation = 0
+        self.sent_at: List[Optional[float]] = []
+        self.errors = 0
+        self._source = ([], 1.0)
+
+    def prepare(self, out_packets: list, speed: float):
+        self._source = (out_packets, speed)
+        self._encode()
+        self.sent_at = [None] * len(self.reports)
+
+    def _encode(self):
+        from replay_imouse import prepare_reports
+
+        out_packets, speed = self._source
+        self.generation = self.transport.codec_generation
+        self.reports = prepare_reports(out_packets, self.transport.report_size, speed,
+                                       codec=self.transport.codec)
+
+    def _send(self, position: int) -> bool:
+        try:
+            return self.transport.send_encoded(self.reports[position][2], self.generation)
+        except CodecChanged as e:
+            # Reconexión con otro codec: recodificar lo que queda y reenviar
+            print(f"🔁 [{self.label}] {e}; recodificando")
+            self._encode()
+            return self.transport.send_encoded(self.reports[position][2], self.generation)
+
+    def run(self, barrier: threading.Barrier, session: 'SyncReplay'):
+        """Espera en la barrera y sigue la línea de tiempo común"""
+        transport = self.transport
+        try:
+            barrier.wait()
+        except threading.BrokenBarrierError:
+            return
+
+        start = session.start_time
+        for position in range(len(self.reports)):
+            target_time = self.reports[position][1]
+            sleep_time = start + target_time - time.perf_counter()
+            if sleep_time > 0:
+                transport.flush()
+                time.sleep(sleep_time)
+
+            sent_at = time.perf_counter()
+            if not self._send(position):
+                self.errors += 1
+                if not transport.connected:
+                    print(f"❌ [{self.label}] Dispositivo perdido en el reporte {position + 1}")
+                    break
+                continue
+            # Medido respecto al inicio común: una reconexión cuenta como desfase
+            self.sent_at[position] = sent_at - start
+        transport.flush()
+
+    def lateness(self) -> List[float]:
+        return [sent - target for (_, target, _, _), sent in zip(self.reports, self.sent_at)
+                if sent is not None]
+
+
+class SyncReplay:
+    """
+    Replay de una captura en varios dispositivos con barrera de inicio
+
+    Args:
+        transports: Transportes ya abiertos (uno por dispositivo)
+        lead: Margen entre la barrera y el inicio común (s); debe cubrir lo
+              que tarda el último hilo en despertar
+    """
+
+    def __init__(self, transports: List[HIDTransport], labels: Optional[List[str]] = None,
+                 lead: float = DEFAULT_LEAD):
+        labels = labels or [f"dev{i}" for i in range(len(transports))]
+        self.lanes = [DeviceLane(i, transport, label)
+                      for i, (transport, label) in enumerate(zip(transports, labels))]
+        self.lead = lead
+        self.start_time = 0.0
+
+    def prepare(self, out_packets: list, speed: float = 1.0):
+        """Prepara (y codifica) los reportes de cada dispositivo antes de la barrera"""
+        for lane in self.lanes:
+            lane.prepare(out_packets, speed)
+
+    def _set_start(self):
+        # La ejecuta un único hilo cuando todos han llegado a la barrera
+        self.start_time = time.perf_counter() + self.lead
+
+    def run(self) -> dict:
+        barrier = threading.Barrier(len(self.lanes), action=self._set_start)
+        threads = [threading.Thread(target=lane.run, args=(barrier, self), name=f"imouse-sync-{lane.label}",
+                                    daemon=True)
+                   for lane in self.lanes]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                thread.join()
+        except KeyboardInterrupt:
+            barrier.abort()
+            raise
+        return self.report()
+
+    def report(self) -> dict:
+        """Retraso por dispositivo y dispersión entre dispositivos por reporte"""
+        devices = []
+        for lane in self.lanes:
+            lateness = lane.lateness()
+            devices.append({
+                'device': lane.label,
+                'sent': len(lateness),
+                'reports': len(lane.reports),
+                'errors': lane.errors,
+                'first_ms': lateness[0] * 1000 if lateness else None,
+                'lateness_ms': _summary_ms(lateness),
+            })
+
+        spread = []
+        for times in zip(*(lane.sent_at for lane in self.lanes)):
+            if None not in times:
+                spread.append(max(times) - min(times))
+
+        return {
+            'devices': devices,
+            'aligned_reports': len(spread),
+            'spread_ms': _summary_ms(spread),
+        }
+
+
+def open_lanes(count: int, simulate: bool = False, network: Optional[str] = None,
+               vendor_id: int = VENDOR_ID, product_id: int = PRODUCT_ID,
+               batch: int = 1) -> Optional[List[HIDTransport]]:
+    """
+    Abre `count` dispositivos (dongles por índice, simulados o uno por
+    dirección de red). Devuelve None si alguno falla (cerrando los abiertos)
+    """
+    addresses = network.split(',') if network else [None] * count
+    transports = []
+    for index, address in enumerate(addresses):
+        device = None
+        if address:
+            from imouse_network import NetworkDevice, parse_address
+            device = NetworkDevice(*parse_address(address), batch=batch)
+        elif simulate:
+            from imouse_simulator import SimulatedDevice
+            device = SimulatedDevice(vendor_id=vendor_id, product_id=product_id,
+                                     product_name=f"iMouse (simulado {index})")
+
+        transport = HIDTransport(vendor_id, product_id, device=device, device_index=index)
+        if not transport.open():
+            print(f"❌ No se pudo abrir el dispositivo {address or index}")
+            for opened in transports:
+                opened.close()
+            return None
+        transports.append(transport)
+    return transports
+
+
+def print_report(report: dict):
+    print("📊 RETRASO RESPECTO A LA LÍNEA DE TIEMPO COMÚN (ms):")
+    for device in report['devices']:
+        lateness = device['lateness_ms']
+        first = f"{device['first_ms']:.3f}" if device['first_ms'] is not None else '-'
+        print(f"   {device['device']:<10} {device['sent']}/{device['reports']} enviados, "
+              f"primero {first}, media {lateness['mean']:.3f}, "
+              f"p99 {lateness['p99']:.3f}, máx {lateness['max']:.3f}"
+              + (f", errores {device['errors']}" if device['errors'] else ''))
+    spread = report['spread_ms']
+    print(f"↔️  Dispersión entre dispositivos ({report['aligned_reports']} reportes): "
+          f"media {spread['mean']:.3f}, p50 {spread['p50']:.3f}, p99 {spread['p99']:.3f}, "
+          f"máx {spread['max']:.3f} ms")
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    from replay_imouse import load_packets, filter_out_packets
+
+    parser = argparse.ArgumentParser(description='Replay sincronizado de una captura en varios dispositivos')
+    parser.add_argument('capture_file', help='Captura JSON o macro')
+    parser.add_argument('-n', '--devices', type=int, default=2,
+                        help='Número de dispositivos (default: 2; con --network uno por dirección)')
+    parser.add_argument('-s', '--speed', type=float, default=1.0, help='Velocidad de reproducción')
+    parser.add_argument('--lead', type=float, default=DEFAULT_LEAD,
+                        help=f'Margen entre la barrera y el inicio común en s (default: {DEFAULT_LEAD})')
+    parser.add_argument('--simulate', action='store_true', help='Usar dispositivos simulados')
+    parser.add_argument('--network', metavar='HOST:PUERTO,...', help='Un dispositivo por dirección de red')
+    parser.add_argument('--batch', type=int, default=1, help='Registros por escritura en la ruta de red')
+    parser.add_argument('--profile', default=DEFAULT_PROFILE, choices=sorted(PROFILES),
+                        help='Perfil para compilar macros (default: iphone)')
+    parser.add_argument('--vendor', type=lambda x: int(x, 0), default=VENDOR_ID, help='Vendor ID')
+    parser.add_argument('--product', type=lambda x: int(x, 0), default=PRODUCT_ID, help='Product ID')
+    parser.add_argument('--json', action='store_true', help='Informe como JSON')
+    args = parser.parse_args(argv)
+
+    if args.devices < 1 or args.speed <= 0 or args.lead < 0:
+        print("❌ --devices debe ser >= 1, --speed > 0 y --lead >= 0")
+        return 1
+
+    # Cargar una sola vez para todos
+    try:
+        out_packets = filter_out_packets(load_packets(args.capture_file, args.profile))
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    if not out_packets:
+        print("❌ No hay paquetes OUT para enviar")
+        return 1
+
+    transports = open_lanes(args.devices, simulate=args.simulate, network=args.network,
+                            vendor_id=args.vendor, product_id=args.product, batch=args.batch)
+    if transports is None:
+        return 1
+
+    session = SyncReplay(transports, labels=args.network.split(',') if args.network else None,
+                         lead=args.lead)
+    session.prepare(out_packets, args.speed)
+    print(f"🔄 {len(out_packets)} reportes × {len(transports)} dispositivos, "
+          f"inicio común {args.lead * 1000:.0f} ms tras la barrera")
+
+    try:
+        report = session.run()
+    except KeyboardInterrupt:
+        print("\n⚠️  Interrumpido")
+        return 1
+    finally:
+        for transport in transports:
+            transport.close()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+    complete = all(d['sent'] == d['reports'] for d in report['devices'])
+    return 0 if complete else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
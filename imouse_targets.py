@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+iMouse Targets - Índice de objetivos de UI con nombre
+Guarda las posiciones de botones/iconos por app (ej: "home.telegram",
+"telegram.send_button") en coordenadas normalizadas 0-32767, el mismo
+espacio que usa el payload 0xa0, así un mismo nombre sirve para cualquier
+resolución. Si el layout cambia en un perfil (iPad, landscape) se guarda una
+posición específica para ese perfil; si no, se usa la genérica ("*").
+
+Archivo (targets/targets.json):
+    {
+        "version": 1,
+        "apps": {
+            "home": {
+                "telegram": {"*": [28906, 30458], "ipad": [30100, 31000]}
+            }
+        }
+    }
+
+    python imouse_targets.py --list
+    python imouse_targets.py --resolve home.telegram --profile ipad
+    python imouse_targets.py --define telegram.send_button 340 640 --profile iphone
+"""
+
+import os
+import sys
+import json
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+
+TARGETS_FORMAT_VERSION = 1
+NORM_MAX = 32767
+ANY_PROFILE = '*'
+
+DEFAULT_TARGETS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'targets', 'targets.json')
+
+# Perfiles de dispositivo: nombre → (ancho, alto) en píxeles lógicos
+PROFILES = {
+    'iphone': (365, 667),
+    'iphone-landscape': (667, 365),
+    'ipad': (768, 1024),
+    'ipad-landscape': (1024, 768),
+}
+DEFAULT_PROFILE = 'iphone'
+
+
+def profile_size(profile: str) -> Tuple[int, int]:
+    if profile not in PROFILES:
+        raise KeyError(f"Perfil desconocido: {profile} (opciones: {', '.join(PROFILES)})")
+    return PROFILES[profile]
+
+
+def profile_for(width: int, height: int) -> Optional[str]:
+    """Nombre del perfil con esa resolución (o None)"""
+    for name, size in PROFILES.items():
+        if size == (width, height):
+            return name
+    return None
+
+
+def normalize(x: int, y: int, width: int, height: int) -> Tuple[int, int]:
+    """Píxeles → 0-32767 (mismo redondeo que iMouseHIDProtocol.move_absolute)"""
+    return int((x / width) * NORM_MAX), int((y / height) * NORM_MAX)
+
+
+def denormalize(x_norm: int, y_norm: int, width: int, height: int) -> Tuple[int, int]:
+    """0-32767 → píxeles de una resolución"""
+    return round(x_norm * width / NORM_MAX), round(y_norm * height / NORM_MAX)
+
+
+def split_name(name: str) -> Tuple[str, str]:
+    """'telegram.send_button' → ('telegram', 'send_button')"""
+    app, sep, target = name.partition('.')
+    if not sep or not app or not target:
+        raise KeyError(f"Nombre de objetivo inválido: {name!r} (formato app.objetivo)")
+    return app, target
+
+
+class TargetIndex:
+    """
+    Índice en memoria de objetivos con nombre
+
+    Las entradas se aplanan en un dict {(app, objetivo, perfil): (x, y)}
+    al cargar, así resolver un nombre es una sola búsqueda.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._index: Dict[Tuple[str, str, str], Tuple[int, int]] = {}
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self) -> int:
+        return len({(app, target) for app, target, _ in self._index})
+
+    def __contains__(self, name: str) -> bool:
+        app, target = split_name(name)
+        return any(key[:2] == (app, target) for key in self._index)
+
+    def load(self, path: str):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        version = data.get('version')
+        if version != TARGETS_FORMAT_VERSION:
+            raise ValueError(f"Versión de formato no soportada: {version}")
+
+        self._index.clear()
+        for app, targets in data.get('apps', {}).items():
+            for target, positions in targets.items():
+                for profile, (x_norm, y_norm) in positions.items():
+                    self._index[(app, target, profile)] = (int(x_norm), int(y_norm))
+        self.path = path
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.path
+        apps: Dict[str, Dict[str, Dict[str, List[int]]]] = {}
+        for (app, target, profile), position in sorted(self._index.items()):
+            apps.setdefault(app, {}).setdefault(target, {})[profile] = list(position)
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'version': TARGETS_FORMAT_VERSION, 'apps': apps}, f, indent=2)
+            f.write('\n')
+        self.path = path
+
+    def define(self, name: str, x: int, y: int, profile: str = DEFAULT_PROFILE,
+               generic: bool = True) -> Tuple[int, int]:
+        """
+        Registra un objetivo medido en píxeles de `profile`
+
+        Args:
+            generic: Guardarlo también como posición genérica ("*") si aún no
+                     existe una (el resto de perfiles la usarán)
+
+        Returns:
+            tuple: coordenadas normalizadas guardadas
+        """
+        width, height = profile_size(profile)
+        if not (0 <= x <= width and 0 <= y <= height):
+            raise ValueError(f"({x}, {y}) fuera de la pantalla {profile} ({width}x{height})")
+
+        app, target = split_name(name)
+        position = normalize(x, y, width, height)
+        self._index[(app, target, profile)] = position
+        if generic:
+            self._index.setdefault((app, target, ANY_PROFILE), position)
+        return position
+
+    def resolve(self, name: str, profile: str = DEFAULT_PROFILE) -> Tuple[int, int]:
+        """
+        Coordenadas normalizadas (0-32767) de un objetivo para un perfil
+
+        Raises:
+            KeyError: si el objetivo no existe
+        """
+        app, target = split_name(name)
+        position = self._index.get((app, target, profile)) or self._index.get((app, target, ANY_PROFILE))
+        if position is None:
+            raise KeyError(f"Objetivo desconocido: {name} (perfil {profile})")
+        return position
+
+    def resolve_pixels(self, name: str, width: int, height: int,
+                       profile: Optional[str] = None) -> Tuple[int, int]:
+        """Coordenadas en píxeles para una resolución concreta"""
+        profile = profile or profile_for(width, height) or ANY_PROFILE
+        return denormalize(*self.resolve(name, profile), width, height)
+
+    def names(self, app: Optional[str] = None) -> List[str]:
+        return sorted({f"{a}.{t}" for a, t, _ in self._index if app is None or a == app})
+
+    def profiles(self, name: str) -> List[str]:
+        app, target = split_name(name)
+        return sorted(p for a, t, p in self._index if (a, t) == (app, target))
+
+
+_default_index = None
+
+
+def get_target_index() -> TargetIndex:
+    """Índice por defecto (targets/targets.json), cargado una vez por proceso"""
+    global _default_index
+    if _default_index is None:
+        _default_index = TargetIndex(DEFAULT_TARGETS_FILE)
+    return _default_index
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    parser = argparse.ArgumentParser(description='Índice de objetivos de UI con nombre')
+    parser.add_argument('--file', default=DEFAULT_TARGETS_FILE, help='Archivo de objetivos')
+    parser.add_argument('--profile', default=DEFAULT_PROFILE, choices=sorted(PROFILES),
+                        help='Perfil de dispositivo')
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument('--list', nargs='?', const='', metavar='APP', help='Listar objetivos')
+    action.add_argument('--resolve', metavar='NOMBRE', help='Coordenadas de un objetivo')
+    action.add_argument('--define', nargs=3, metavar=('NOMBRE', 'X', 'Y'),
+                        help='Registrar un objetivo medido en el perfil indicado')
+    args = parser.parse_args(argv)
+
+    try:
+        index = TargetIndex(args.file)
+
+        if args.define:
+            name, x, y = args.define[0], int(args.define[1]), int(args.define[2])
+            x_norm, y_norm = index.define(name, x, y, args.profile)
+            index.save(args.file)
+            print(f"✅ {name} ({args.profile}: {x}, {y}) → normalizado ({x_norm}, {y_norm})")
+            return 0
+
+        if args.resolve:
+            width, height = profile_size(args.profile)
+            x_norm, y_norm = index.resolve(args.resolve, args.profile)
+            x, y = denormalize(x_norm, y_norm, width, height)
+            print(f"🎯 {args.resolve} [{args.profile} {width}x{height}]: ({x}, {y}) "
+                  f"normalizado ({x_norm}, {y_norm})")
+            return 0
+
+        names = index.names(args.list or None)
+        print(f"📍 {len(names)} objetivos en {args.file}")
+        for name in names:
+            print(f"   {name:<32} {', '.join(index.profiles(name))}")
+        return 0
+
+    except (KeyError, ValueError) as e:
+        print(f"❌ {e.args[0] if e.args else e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
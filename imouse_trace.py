@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+iMouse Trace - Perfilado opcional en formato Chrome Trace / Perfetto
+Registra spans por etapa (load, compile, encode, schedule-wait, send, console)
+y los exporta como JSON que se abre en chrome://tracing o ui.perfetto.dev
+
+Activación:
+    IMOUSE_TRACE=trace.json python replay_imouse.py samples/demo.json
+    python replay_imouse.py samples/demo.json --trace trace.json
+"""
+
+import os
+import json
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+
+# Etapas estándar (categorías del trace)
+STAGE_LOAD = "load"                  # Lectura/parseo de JSON
+STAGE_COMPILE = "compile"            # Preparación de paquetes / cálculo de trayectorias
+STAGE_ENCODE = "encode"              # Traducción keymap / generación de paquetes HID
+STAGE_WAIT = "schedule-wait"         # Esperas de temporización (sleep)
+STAGE_SEND = "send"                  # Llamada send() al dispositivo
+STAGE_CONSOLE = "console"            # Impresión por consola
+
+TRACE_ENV_VAR = "IMOUSE_TRACE"
+
+
+class _NullSpan:
+    """Context manager vacío usado cuando el trazado está desactivado"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """Colector de eventos en formato Chrome Trace Event (JSON)"""
+
+    def __init__(self, path: Optional[str] = None, process_name: str = "imouse"):
+        self.path = path
+        self.enabled = path is not None
+        self.process_name = process_name
+        self.events = []
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter_ns()
+        self._thread_names = {}
+
+    def _now_us(self) -> float:
+        return (time.perf_counter_ns() - self._t0) / 1000.0
+
+    def _register_thread(self, tid: int):
+        if tid not in self._thread_names:
+            self._thread_names[tid] = threading.current_thread().name
+
+    def span(self, name: str, cat: str = STAGE_SEND, **args):
+        """
+        Context manager que registra un evento completo ("X") con duración
+
+        Args:
+            name: Nombre del span (ej: 'send', 'swipe_path')
+            cat: Etapa/categoría (STAGE_*)
+            **args: Datos adicionales visibles en el visor
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name, cat, args)
+
+    @contextmanager
+    def _span(self, name, cat, args):
+        tid = threading.get_ident()
+        start = self._now_us()
+        try:
+            yield self
+        finally:
+            end = self._now_us()
+            event = {
+                "name": name,
+                "cat": cat,
+                "ph": "X",
+                "ts": start,
+                "dur": end - start,
+                "pid": self.pid,
+                "tid": tid,
+            }
+            if args:
+                event["args"] = args
+            with self._lock:
+                self._register_thread(tid)
+                self.events.append(event)
+
+    def instant(self, name: str, cat: str = STAGE_SEND, **args):
+        """Registra un evento instantáneo ("i")"""
+        if not self.enabled:
+            return
+        tid = threading.get_ident()
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "i",
+            "s": "t",
+            "ts": self._now_us(),
+            "pid": self.pid,
+            "tid": tid,
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self._register_thread(tid)
+            self.events.append(event)
+
+    def counter(self, name: str, **values):
+        """Registra un contador ("C"), ej: profundidad de cola"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.events.append({
+                "name": name,
+                "ph": "C",
+                "ts": self._now_us(),
+                "pid": self.pid,
+                "args": values,
+            })
+
+    def to_dict(self) -> dict:
+        """Devuelve el trace completo en formato Chrome Trace"""
+        with self._lock:
+            metadata = [{
+                "name": "process_name",
+                "ph": "M",
+                "pid": self.pid,
+                "args": {"name": self.process_name},
+            }]
+            for tid, thread_name in self._thread_names.items():
+                metadata.append({
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": self.pid,
+                    "tid": tid,
+                    "args": {"name": thread_name},
+                })
+            return {
+                "traceEvents": metadata + list(self.events),
+                "displayTimeUnit": "ms",
+            }
+
+    def save(self, path: Optional[str] = None) -> Optional[str]:
+        """Escribe el trace en disco (JSON). Devuelve la ruta o None"""
+        path = path or self.path
+        if not self.enabled or not path:
+            return None
+
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+
+        return path
+
+
+# ===== TRACER GLOBAL =====
+_tracer = Tracer(os.environ.get(TRACE_ENV_VAR) or None)
+
+
+def get_tracer() -> Tracer:
+    """Devuelve el tracer global (desactivado salvo IMOUSE_TRACE o enable_tracing)"""
+    return _tracer
+
+
+def enable_tracing(path: str, process_name: str = "imouse") -> Tracer:
+    """Activa el trazado global y lo guarda automáticamente al salir"""
+    global _tracer
+    if _tracer.enabled:
+        _tracer.path = path
+        return _tracer
+    _tracer = Tracer(path, process_name=process_name)
+    return _tracer
+
+
+def _save_on_exit():
+    path = _tracer.save()
+    if path:
+        print(f"\n🧭 Trace guardado en: {path} (abrir en ui.perfetto.dev)")
+
+
+atexit.register(_save_on_exit)
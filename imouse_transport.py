@@ -0,0 +1,661 @@
+#!/usr/bin/env python3
+"""
+iMouse Transport - Capa de envío de reportes HID
+Encapsula la conexión con el dongle (pywinusb) o con el dispositivo simulado
+y expone una única operación send(packet) para todas las herramientas.
+
+Si el dongle se re-enumera a mitad de ejecución, el transporte detecta la
+pérdida, lo reabre por VID/PID con backoff exponencial, restaura el estado
+del protocolo (suelta botones/teclas y re-homea con reset_position) y
+reenvía el reporte que falló, de modo que el trabajo continúa desde el
+último reporte confirmado.
+
+Las escrituras llevan plazo (como hid_write_timeout(..., 9, 500) en la DLL
+del fabricante): pywinusb no tiene timeout, así que el send() bloqueante se
+hace en un hilo escritor y el llamador espera como mucho `write_timeout`.
+Si no termina, la escritura se marca como bloqueo (stats['stalls']) y se
+aplica `on_stall`:
+
+    skip        No se espera más y send() devuelve False (default). La
+                escritura no se puede cancelar: si termina después, el
+                reporte llegó con retraso y pasa de stats['skipped'] a
+                stats['sent'] y stats['late'] (ver write_pending)
+    retry       Se espera hasta `stall_retries` plazos más a que termine
+    reconnect   Se cierra el dispositivo (cancela la escritura colgada), se
+                espera a que esta termine, se reabre y se reenvía el reporte
+
+Configurable también con IMOUSE_WRITE_TIMEOUT (ms, 0 = sin plazo) e
+IMOUSE_ON_STALL.
+
+Al reabrir se vuelve a negociar el codec: si cambian codec.name, firmware o
+report_size, codec_generation aumenta. send() recodifica el reporte
+pendiente con el codec nuevo; los reportes precodificados con el anterior
+no se envían: send_encoded() lanza CodecChanged para que el llamador los
+vuelva a preparar (prepare_reports, encode_batch).
+"""
+
+import os
+import time
+import queue
+import threading
+from typing import Callable, Dict, List, Optional
+
+from imouse_trace import get_tracer, STAGE_SEND
+from imouse_codec import HIDCodec, negotiate_codec
+from imouse_rt import RealtimeSettings, realtime_settings
+
+
+VENDOR_ID = 0x720a
+PRODUCT_ID = 0x3dab
+
+# Reporte de teclado sin teclas pulsadas
+KEY_RELEASE = [0x00, 0xa2, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00]
+
+DEFAULT_WRITE_TIMEOUT = 0.5         # Mismo plazo que la DLL del fabricante (s)
+WRITE_TIMEOUT_ENV_VAR = "IMOUSE_WRITE_TIMEOUT"
+ON_STALL_ENV_VAR = "IMOUSE_ON_STALL"
+
+STALL_SKIP = 'skip'
+STALL_RETRY = 'retry'
+STALL_RECONNECT = 'reconnect'
+STALL_POLICIES = (STALL_SKIP, STALL_RETRY, STALL_RECONNECT)
+
+
+class WriteStall(IOError):
+    """La escritura no se completó dentro del plazo"""
+
+
+class CodecChanged(RuntimeError):
+    """El codec se renegoció al reconectar: los reportes precodificados ya no valen"""
+
+
+def find_hid_device(vendor_id: int = VENDOR_ID, product_id: int = PRODUCT_ID, index: int = 0):
+    """
+    Busca el dongle iMouse por VID/PID con pywinusb (importado bajo demanda)
+
+    Args:
+        index: Qué dongle usar si hay varios conectados con el mismo VID/PID
+
+    Returns:
+        HidDevice o None si no se encuentra
+
+    Raises:
+        ImportError: si pywinusb no está instalado
+    """
+    import pywinusb.hid as hid
+
+    devices = hid.HidDeviceFilter(vendor_id=vendor_id, product_id=product_id).get_devices()
+    return devices[index] if len(devices) > index else None
+
+
+def count_hid_devices(vendor_id: int = VENDOR_ID, product_id: int = PRODUCT_ID) -> int:
+    """
+    Número de dongles iMouse conectados con ese VID/PID
+
+    Raises:
+        ImportError: si pywinusb no está instalado
+    """
+    import pywinusb.hid as hid
+
+    return len(hid.HidDeviceFilter(vendor_id=vendor_id, product_id=product_id).get_devices())
+
+
+class _WriteJob:
+    __slots__ = ('report', 'data', 'done', 'error', 'started', 'finished', 'skipped')
+
+    def __init__(self, report, data):
+        self.report = report
+        self.data = data
+        self.done = threading.Event()
+        self.error = None
+        self.started = time.perf_counter()
+        self.finished = None
+        self.skipped = False            # send() ya devolvió False por ella
+
+
+class _Writer:
+    """Hilo que hace las escrituras bloqueantes de un dispositivo"""
+
+    def __init__(self, realtime: Optional[RealtimeSettings] = None):
+        self.realtime = realtime
+        self.realtime_status: Dict[str, str] = {}
+        self._jobs = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name='imouse-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, report, data) -> _WriteJob:
+        job = _WriteJob(report, data)
+        self._jobs.put(job)
+        return job
+
+    def stop(self):
+        # Si está colgado en una escritura, termina cuando esta vuelva
+        self._jobs.put(None)
+
+    def _run(self):
+        if self.realtime:
+            self.realtime_status = self.realtime.apply('escritura')
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            try:
+                job.report.set_raw_data(job.data)
+                job.report.send()
+            except Exception as e:
+                job.error = e
+            job.finished = time.perf_counter()
+            job.done.set()
+
+
+def _env_write_timeout() -> float:
+    value = os.environ.get(WRITE_TIMEOUT_ENV_VAR)
+    if not value:
+        return DEFAULT_WRITE_TIMEOUT
+    try:
+        return max(float(value), 0.0) / 1000.0
+    except ValueError:
+        print(f"⚠️  {WRITE_TIMEOUT_ENV_VAR} inválido: {value} (milisegundos), "
+              f"usando {DEFAULT_WRITE_TIMEOUT * 1000:.0f} ms")
+        return DEFAULT_WRITE_TIMEOUT
+
+
+def _env_on_stall() -> str:
+    value = os.environ.get(ON_STALL_ENV_VAR) or STALL_SKIP
+    if value not in STALL_POLICIES:
+        print(f"⚠️  {ON_STALL_ENV_VAR} desconocido: {value} (opciones: {', '.join(STALL_POLICIES)}), "
+              f"usando {STALL_SKIP}")
+        return STALL_SKIP
+    return value
+
+
+class HIDTransport:
+    """
+    Transporte de reportes HID hacia el dongle iMouse
+
+    Args:
+        vendor_id, product_id: Identificadores USB del dongle
+        device: Dispositivo ya creado (ej: SimulatedDevice); si es None se
+                busca el dongle real por VID/PID
+        device_index: Qué dongle abrir si hay varios con el mismo VID/PID
+        codec: auto | hid | framed (ver imouse_codec; default IMOUSE_CODEC o auto)
+        firmware: Forzar la revisión de firmware usada en la negociación
+        auto_reconnect: Reabrir el dispositivo automáticamente si se pierde
+        max_reconnect_attempts: Intentos antes de rendirse
+        backoff_initial, backoff_max: Espera inicial y máxima entre intentos (s)
+        write_timeout: Plazo de cada escritura (s); 0 = escritura bloqueante
+                       sin plazo (default IMOUSE_WRITE_TIMEOUT o 0.5)
+        on_stall: skip | retry | reconnect (default IMOUSE_ON_STALL o skip)
+        stall_retries: Plazos adicionales que espera la política retry
+        realtime: Ajustes de tiempo real del hilo escritor (ver imouse_rt;
+                  texto o RealtimeSettings, default IMOUSE_REALTIME). Con
+                  write_timeout=0 no hay hilo escritor: se aplican en el
+                  hilo que llama a send() al abrir
+    """
+
+    def __init__(self, vendor_id: int = VENDOR_ID, product_id: int = PRODUCT_ID, device=None,
+                 auto_reconnect: bool = True, max_reconnect_attempts: int = 10,
+                 backoff_initial: float = 0.25, backoff_max: float = 5.0, device_index: int = 0,
+                 codec: Optional[str] = None, firmware: Optional[int] = None,
+                 write_timeout: Optional[float] = None, on_stall: Optional[str] = None,
+                 stall_retries: int = 2, realtime=None):
+        self.vendor_id = vendor_id
+        self.product_id = product_id
+        self.device_index = device_index
+        self.device = device
+        self.out_report = None
+        self.report_size = 0
+        self.codec_mode = codec
+        self.firmware = firmware
+        self.codec = HIDCodec()
+        self.codec_generation = 0
+        self._codec_key = None
+        self.connected = False
+        self.auto_reconnect = auto_reconnect
+        self.max_reconnect_attempts = max_reconnect_attempts
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        if write_timeout is None:
+            write_timeout = _env_write_timeout()
+        self.write_timeout = write_timeout or None
+        self.on_stall = on_stall or _env_on_stall()
+        if self.on_stall not in STALL_POLICIES:
+            raise ValueError(f"Política de bloqueo desconocida: {self.on_stall} "
+                             f"(opciones: {', '.join(STALL_POLICIES)})")
+        self.stall_retries = stall_retries
+        self.realtime = realtime_settings(realtime)
+        self._realtime_status: Dict[str, str] = {}
+        self.on_reconnect: List[Callable[[], None]] = []
+        self.stats = {'sent': 0, 'errors': 0, 'reconnects': 0, 'downtime': 0.0,
+                      'stalls': 0, 'skipped': 0, 'late': 0, 'writes': 0, 'write_total': 0.0, 'write_max': 0.0}
+        self._owns_device = device is None
+        self._lock = threading.RLock()
+        self._writer: Optional[_Writer] = None
+        self._stalled: Optional[_WriteJob] = None
+
+    @property
+    def product_name(self) -> str:
+        return getattr(self.device, 'product_name', '') if self.device else ''
+
+    def open(self) -> bool:
+        """Abre el dispositivo y obtiene el output report"""
+        if self.device is None:
+            try:
+                self.device = find_hid_device(self.vendor_id, self.product_id, self.device_index)
+            except ImportError:
+                print("❌ Error: pywinusb no está instalado")
+                print("   pip install pywinusb")
+                return False
+
+            if self.device is None:
+                print(f"❌ Dispositivo no encontrado: 0x{self.vendor_id:04x}:0x{self.product_id:04x}")
+                return False
+
+        try:
+            self.device.open()
+        except Exception as e:
+            print(f"❌ No se pudo abrir el dispositivo: {e}")
+            return False
+
+        self.out_report = None
+        for report in self.device.find_output_reports():
+            self.out_report = report
+            break
+
+        if not self.out_report:
+            print("❌ No se encontró output report")
+            self.device.close()
+            return False
+
+        self.report_size = len(self.out_report.get_raw_data())
+        try:
+            self.codec = negotiate_codec(self.device, self.report_size, self.codec_mode, self.firmware)
+        except ValueError as e:
+            print(f"❌ {e}")
+            self.device.close()
+            return False
+
+        key = self.codec_key()
+        if self._codec_key is not None and key != self._codec_key:
+            self.codec_generation += 1
+            print(f"⚠️  Codec renegociado: {_describe_codec(self._codec_key)} → {_describe_codec(key)}")
+        self._codec_key = key
+
+        self.connected = True
+        if self.write_timeout is None and self.realtime and not self.realtime_status:
+            self.realtime_status = self.realtime.apply('escritura')
+        return True
+
+    def codec_key(self) -> tuple:
+        """Lo que determina la codificación: (codec, firmware, report_size)"""
+        return self.codec.name, getattr(self.codec, 'firmware', None), self.report_size
+
+    @property
+    def realtime_status(self) -> Dict[str, str]:
+        """Resultado de aplicar los ajustes de tiempo real (ajuste → 'ok' o motivo)"""
+        if self._writer is not None:
+            return self._writer.realtime_status
+        return self._realtime_status
+
+    @realtime_status.setter
+    def realtime_status(self, status: Dict[str, str]):
+        self._realtime_status = status
+
+    def pad(self, packet) -> list:
+        """Ajusta un paquete al tamaño del reporte"""
+        data_list = list(packet)
+        while len(data_list) < self.report_size:
+            data_list.append(0x00)
+        if len(data_list) > self.report_size:
+            data_list = data_list[:self.report_size]
+        return data_list
+
+    def encode_batch(self, packets) -> list:
+        """Codifica un flujo completo con el codec negociado (checksums incluidos)"""
+        return self.codec.encode_batch(packets)
+
+    @property
+    def write_pending(self) -> bool:
+        """True si una escritura colgada puede completarse todavía (el reporte llegaría tarde)"""
+        job = self._stalled
+        return job is not None and (not job.done.is_set() or job.error is None)
+
+    def flush(self):
+        """
+        Vacía el buffer del dispositivo si lo tiene (ej: NetworkDevice con batch)
+        y espera como mucho un plazo de escritura a una escritura colgada
+        """
+        if self._stalled is not None:
+            with self._lock:
+                if self._stalled is not None:
+                    self._finish_stalled(self.write_timeout)
+        flush = getattr(self.device, 'flush', None)
+        if flush is None or not self.connected:
+            return True
+        with self._lock:
+            try:
+                flush()
+                return True
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"❌ Error vaciando el buffer: {e}")
+                return False
+
+    def _write(self, data_list):
+        with get_tracer().span('send', STAGE_SEND, command=data_list[1]):
+            if self.write_timeout is None:
+                started = time.perf_counter()
+                self.out_report.set_raw_data(data_list)
+                self.out_report.send()
+                self._record_write(time.perf_counter() - started)
+                return
+
+            # Una escritura anterior sigue colgada: no encolar detrás sin plazo
+            if self._stalled is not None and not self._finish_stalled(self.write_timeout):
+                raise WriteStall("El dispositivo sigue sin completar una escritura anterior")
+
+            if self._writer is None:
+                self._writer = _Writer(self.realtime)
+            job = self._writer.submit(self.out_report, data_list)
+            if not job.done.wait(self.write_timeout):
+                self.stats['stalls'] += 1
+                self._stalled = job
+                raise WriteStall(f"Escritura sin completar en {self.write_timeout * 1000:.0f} ms")
+            self._check(job)
+
+    def _check(self, job: _WriteJob):
+        self._record_write(job.finished - job.started)
+        if job.error is not None:
+            raise job.error
+
+    def _record_write(self, elapsed: float):
+        self.stats['writes'] += 1
+        self.stats['write_total'] += elapsed
+        self.stats['write_max'] = max(self.stats['write_max'], elapsed)
+
+    def _finish_stalled(self, timeout: float) -> bool:
+        """Espera a la escritura colgada; True si ya terminó (bien o mal)"""
+        job = self._stalled
+        if not job.done.wait(timeout):
+            return False
+        self._stalled = None
+        self._record_write(job.finished - job.started)
+        if job.skipped and job.error is None:
+            # send() devolvió False, pero el reporte llegó al dispositivo
+            self.stats['skipped'] -= 1
+            self.stats['sent'] += 1
+            self.stats['late'] += 1
+            print(f"⚠️  Reporte descartado entregado con retraso "
+                  f"({(job.finished - job.started) * 1000:.0f} ms)")
+        return True
+
+    def _abandon_writer(self):
+        """Deja atrás el hilo colgado; la próxima escritura usa uno nuevo"""
+        if self._writer is not None:
+            self._writer.stop()
+            self._writer = None
+        self._stalled = None
+
+    def _cancel_stalled(self) -> bool:
+        """
+        Cierra el dispositivo para cancelar la escritura colgada y espera a
+        que termine (True). Si sigue colgada, podría llegar después de los
+        reportes de restore_state y del reenvío: no se debe reconectar.
+        """
+        job = self._stalled
+        try:
+            self.device.close()
+        except Exception:
+            pass
+        self.connected = False
+        if job is None or job.done.wait(self.write_timeout):
+            return True
+        print("❌ La escritura colgada no terminó al cerrar el dispositivo; no se reenvía")
+        return False
+
+    def _handle_stall(self, data_list, resend: Callable[[], list]) -> bool:
+        """
+        Aplica on_stall tras un WriteStall. True si el reporte acabó enviado
+
+        resend() da el reporte a reenviar tras reconectar (ver _resend_data)
+        """
+        if self.on_stall == STALL_RETRY and self._stalled is not None:
+            job = self._stalled
+            for attempt in range(1, self.stall_retries + 1):
+                if self._finish_stalled(self.write_timeout):
+                    if job.error is None:
+                        print(f"⚠️  Escritura completada con retraso (reintento {attempt})")
+                        return True
+                    # Terminó con error: reenviar una vez por el camino normal
+                    try:
+                        self._write(data_list)
+                        return True
+                    except Exception as e:
+                        self.stats['errors'] += 1
+                        print(f"❌ Error reenviando paquete tras bloqueo: {e}")
+                        return False
+
+        if self.on_stall == STALL_RECONNECT and self.auto_reconnect:
+            job = self._stalled
+            if not self._cancel_stalled():
+                self.stats['skipped'] += 1
+                job.skipped = True
+                return False
+            # Terminó antes de cerrar: el reporte llegó y reenviarlo lo duplicaría
+            delivered = job is not None and job.error is None
+            if delivered:
+                self._record_write(job.finished - job.started)
+                self.stats['late'] += 1
+            self._abandon_writer()
+            if not self.reconnect():
+                return delivered
+            if delivered:
+                print("⚠️  La escritura colgada se completó al cerrar: no se reenvía")
+                return True
+            data_list = resend()
+            try:
+                self._write(data_list)
+                return True
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"❌ Error reenviando paquete tras reconexión: {e}")
+                return False
+
+        self.stats['skipped'] += 1
+        if self._stalled is not None:
+            self._stalled.skipped = True
+        return False
+
+    def write_latency(self) -> dict:
+        """Latencia de escritura completada: media y máxima (ms)"""
+        count = self.stats['writes']
+        return {'mean_ms': self.stats['write_total'] / count * 1000 if count else 0.0,
+                'max_ms': self.stats['write_max'] * 1000}
+
+    def send(self, packet) -> bool:
+        """
+        Envía un paquete codificado con el codec negociado (HID rellenado
+        hasta report_size o trama W-0xAB)
+
+        Si la escritura falla y el dispositivo se ha perdido, intenta
+        reconectar y reenviar el mismo paquete antes de devolver False.
+        """
+        return self._send(packet, encoded=False)
+
+    def send_encoded(self, data_list, generation: Optional[int] = None) -> bool:
+        """
+        Como send() para un reporte ya codificado con este codec
+        (prepare_reports(..., codec=transport.codec), encode_batch): no lo
+        vuelve a codificar ni cuenta de nuevo en codec.stats
+
+        Args:
+            generation: codec_generation con el que se codificó (default: el
+                        actual, solo detecta un cambio durante este envío)
+
+        Raises:
+            CodecChanged: si el codec ya no es el de `generation` (también
+                          tras reconectar durante el envío); el reporte no
+                          se envía
+        """
+        return self._send(data_list, encoded=True, generation=generation)
+
+    def _send(self, packet, encoded: bool, generation: Optional[int] = None) -> bool:
+        with self._lock:
+            if not self.out_report:
+                return False
+
+            if generation is None:
+                generation = self.codec_generation
+            elif encoded and generation != self.codec_generation:
+                raise CodecChanged(f"Reporte codificado para un codec anterior "
+                                   f"(ahora {_describe_codec(self._codec_key)})")
+
+            data_list = list(packet) if encoded else self.codec.encode(packet)
+            resend = lambda: self._resend_data(packet, encoded, data_list, generation)
+
+            try:
+                self._write(data_list)
+                self.stats['sent'] += 1
+                return True
+
+            except WriteStall as e:
+                print(f"⚠️  {e} (política: {self.on_stall})")
+                if self._handle_stall(data_list, resend):
+                    self.stats['sent'] += 1
+                    return True
+                return False
+
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"❌ Error enviando paquete: {e}")
+
+                if not self.auto_reconnect or self.is_plugged():
+                    return False
+
+            # Dispositivo perdido: reconectar y reenviar el reporte pendiente
+            self.connected = False
+            if not self.reconnect():
+                return False
+
+            data_list = resend()
+            try:
+                self._write(data_list)
+                self.stats['sent'] += 1
+                return True
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"❌ Error reenviando paquete tras reconexión: {e}")
+                return False
+
+    def _resend_data(self, packet, encoded: bool, data_list, generation: int) -> list:
+        """Reporte a reenviar tras reconectar: recodificado si cambió el codec"""
+        if self.codec_generation == generation:
+            return data_list
+        if encoded:
+            raise CodecChanged(f"El codec cambió al reconectar ({_describe_codec(self._codec_key)}): "
+                               f"hay que volver a codificar los reportes")
+        return self.codec.encode(packet)
+
+    def is_plugged(self) -> bool:
+        """Comprueba si el dispositivo sigue conectado"""
+        if not self.device:
+            return False
+        try:
+            return bool(self.device.is_plugged())
+        except Exception:
+            return False
+
+    def reconnect(self) -> bool:
+        """Reabre el dispositivo por VID/PID con backoff exponencial"""
+        with self._lock:
+            print(f"🔌 Dispositivo perdido (0x{self.vendor_id:04x}:0x{self.product_id:04x}), reconectando...")
+            lost_at = time.monotonic()
+            delay = self.backoff_initial
+
+            for attempt in range(1, self.max_reconnect_attempts + 1):
+                time.sleep(delay)
+                self.close()
+                if self._owns_device:
+                    self.device = None
+
+                if self.is_plugged_or_found() and self.open():
+                    self.stats['reconnects'] += 1
+                    self.stats['downtime'] += time.monotonic() - lost_at
+                    print(f"✅ Reconectado (intento {attempt})")
+                    self.restore_state()
+                    for callback in self.on_reconnect:
+                        callback()
+                    return True
+
+                print(f"   ⏳ Intento {attempt}/{self.max_reconnect_attempts} fallido, "
+                      f"reintentando en {min(delay * 2, self.backoff_max):.2f}s")
+                delay = min(delay * 2, self.backoff_max)
+
+            self.stats['downtime'] += time.monotonic() - lost_at
+            print("❌ No se pudo reconectar con el dispositivo")
+            return False
+
+    def is_plugged_or_found(self) -> bool:
+        """True si hay un dispositivo disponible para abrir"""
+        if self.device is not None:
+            # Los dispositivos de red se reabren directamente (open() reconecta)
+            return self.is_plugged() or getattr(self.device, 'reconnectable', False)
+        try:
+            self.device = find_hid_device(self.vendor_id, self.product_id, self.device_index)
+        except ImportError:
+            return False
+        return self.device is not None
+
+    def restore_state(self):
+        """Suelta botones y teclas y re-homea el cursor tras una reconexión"""
+        from imouse_hid_protocol import iMouseHIDProtocol
+
+        protocol = iMouseHIDProtocol()
+        for packet in (KEY_RELEASE, protocol.left_up(), protocol.reset_position()):
+            try:
+                self._write(self.codec.encode(packet))
+            except Exception as e:
+                print(f"⚠️  No se pudo restaurar el estado: {e}")
+                return
+
+    def close(self):
+        """Cierra el dispositivo"""
+        if self._stalled is not None and self._stalled.done.is_set():
+            self._finish_stalled(0)
+        self._abandon_writer()
+        if self.device:
+            try:
+                self.device.close()
+            except Exception:
+                pass
+        self.out_report = None
+        self.connected = False
+
+
+def _describe_codec(key: tuple) -> str:
+    name, firmware, report_size = key
+    fw = f", firmware 0x{firmware:02x}" if firmware is not None else ""
+    return f"{name}, {report_size} bytes{fw}"
+
+
+def open_transport(vendor_id: int = VENDOR_ID, product_id: int = PRODUCT_ID,
+                   simulate: bool = False, network: Optional[str] = None,
+                   batch: int = 1, device_index: int = 0) -> Optional[HIDTransport]:
+    """
+    Crea y abre un transporte (real, simulado o por red). Devuelve None si falla
+
+    Args:
+        network: 'host:puerto' para usar la ruta de red (imouse_network)
+        batch: Registros por escritura en la ruta de red
+        device_index: Qué dongle abrir si hay varios con el mismo VID/PID
+    """
+    device = None
+    if network:
+        from imouse_network import NetworkDevice, parse_address
+        device = NetworkDevice(*parse_address(network), batch=batch)
+    elif simulate:
+        from imouse_simulator import SimulatedDevice
+        device = SimulatedDevice(vendor_id=vendor_id, product_id=product_id)
+
+    transport = HIDTransport(vendor_id, product_id, device=device, device_index=device_index)
+    return transport if transport.open() else None
@@ -0,0 +1,513 @@
+#!/usr/bin/env python3
+"""
+iMouse Vision - Localización de elementos de UI en el espejo de pantalla
+Lee frames del espejo AirPlay (o de un directorio de imágenes / vídeo como
+sustituto), busca plantillas de UI registradas con correlación normalizada
+(NCC por FFT, vectorizada con NumPy) y entrega las coordenadas al clicker,
+así los taps dejan de ser coordenadas fijas a ciegas.
+
+La búsqueda va de grueso a fino: primero en el nivel más reducido de una
+pirámide de imagen (2x2 por nivel) y luego se refina en resolución completa
+solo alrededor de los candidatos. La pirámide del frame se cachea y se
+reutiliza para todas las plantillas que se busquen en el mismo frame.
+
+Las plantillas deben recortarse del espejo a la misma resolución de los
+frames. Formatos: .npy y .pgm/.ppm sin dependencias; .png/.jpg con OpenCV
+o Pillow si están instalados.
+
+    python imouse_vision.py --frames capturas/ --templates plantillas/ --locate send_button
+    python imouse_vision.py --frames capturas/ --templates plantillas/ --tap send_button --simulate
+    python imouse_vision.py --video rtsp://127.0.0.1:7000/mirror --templates plantillas/ --tap send_button
+"""
+
+import os
+import sys
+import time
+import argparse
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+DEFAULT_THRESHOLD = 0.8
+MIN_TEMPLATE_SIZE = 8                # Lado mínimo de la plantilla en el nivel grueso
+MAX_LEVELS = 4
+CANDIDATES = 3                       # Candidatos del nivel grueso que se refinan
+IMAGE_EXTENSIONS = ('.npy', '.pgm', '.ppm', '.png', '.jpg', '.jpeg', '.bmp')
+
+
+def require_numpy():
+    """Lanza ImportError con instrucciones si NumPy no está instalado"""
+    if np is None:
+        raise ImportError("NumPy no está instalado (pip install numpy)")
+
+
+# ===== Carga de imágenes =====
+
+def to_gray(image):
+    """Convierte a escala de grises float32"""
+    image = np.asarray(image)
+    if image.ndim == 3:
+        image = image[..., :3] @ np.array([0.299, 0.587, 0.114])
+    return image.astype(np.float32)
+
+
+def _load_netpbm(path: str):
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    fields = []
+    pos = 0
+    while len(fields) < 4:
+        while data[pos:pos + 1].isspace():
+            pos += 1
+        if data[pos:pos + 1] == b'#':
+            pos = data.index(b'\n', pos) + 1
+            continue
+        end = pos
+        while not data[end:end + 1].isspace():
+            end += 1
+        fields.append(data[pos:end])
+        pos = end
+    pos += 1
+
+    magic, width, height, maxval = fields[0], int(fields[1]), int(fields[2]), int(fields[3])
+    if magic not in (b'P5', b'P6'):
+        raise ValueError(f"Formato PNM no soportado: {magic!r} (solo P5/P6 binario)")
+
+    channels = 3 if magic == b'P6' else 1
+    dtype = '>u2' if maxval > 255 else 'u1'
+    pixels = np.frombuffer(data, dtype=dtype, count=width * height * channels, offset=pos)
+    return pixels.reshape((height, width, channels) if channels == 3 else (height, width))
+
+
+def load_image(path: str):
+    """Carga una imagen en escala de grises (float32)"""
+    require_numpy()
+    ext = os.path.splitext(path)[1].lower()
+
+    if ext == '.npy':
+        return to_gray(np.load(path))
+    if ext in ('.pgm', '.ppm'):
+        return to_gray(_load_netpbm(path))
+
+    try:
+        import cv2
+        image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            raise ValueError(f"No se pudo leer la imagen: {path}")
+        return image.astype(np.float32)
+    except ImportError:
+        pass
+
+    try:
+        from PIL import Image
+    except ImportError:
+        raise ImportError(f"Para leer {ext} hace falta OpenCV o Pillow (pip install opencv-python)")
+    with Image.open(path) as image:
+        return to_gray(image.convert('L'))
+
+
+# ===== Fuentes de frames =====
+
+class DirectoryFrameSource:
+    """
+    Frames desde un directorio de imágenes (sustituto del espejo)
+
+    Cada read() devuelve la siguiente imagen en orden alfabético; con
+    loop=True vuelve a empezar al llegar al final.
+    """
+
+    def __init__(self, directory: str, loop: bool = False):
+        require_numpy()
+        self.directory = directory
+        self.loop = loop
+        self.paths = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                            if name.lower().endswith(IMAGE_EXTENSIONS))
+        self.frame_id = -1
+        self._next = 0
+
+    def read(self):
+        """Siguiente frame (escala de grises) o None si no quedan"""
+        if self._next >= len(self.paths):
+            if not self.loop or not self.paths:
+                return None
+            self._next = 0
+
+        path = self.paths[self._next]
+        self._next += 1
+        self.frame_id += 1
+        return load_image(path)
+
+    def close(self):
+        pass
+
+
+class VideoFrameSource:
+    """Frames desde un vídeo o un stream del espejo (requiere OpenCV)"""
+
+    def __init__(self, uri: str):
+        require_numpy()
+        try:
+            import cv2
+        except ImportError:
+            raise ImportError("OpenCV no está instalado (pip install opencv-python)")
+
+        self._cv2 = cv2
+        self.uri = uri
+        self.capture = cv2.VideoCapture(uri)
+        if not self.capture.isOpened():
+            raise IOError(f"No se pudo abrir el stream: {uri}")
+        self.frame_id = -1
+
+    def read(self):
+        ok, frame = self.capture.read()
+        if not ok:
+            return None
+        self.frame_id += 1
+        return self._cv2.cvtColor(frame, self._cv2.COLOR_BGR2GRAY).astype(np.float32)
+
+    def close(self):
+        self.capture.release()
+
+
+# ===== Matching =====
+
+def downsample(image):
+    """Reduce a la mitad promediando bloques de 2x2"""
+    h, w = image.shape[0] // 2 * 2, image.shape[1] // 2 * 2
+    image = image[:h, :w]
+    return (image[0::2, 0::2] + image[1::2, 0::2] + image[0::2, 1::2] + image[1::2, 1::2]) * 0.25
+
+
+def build_pyramid(image, levels: int) -> list:
+    """[nivel 0 (original), nivel 1 (1/2), ...]"""
+    pyramid = [image]
+    for _ in range(levels):
+        pyramid.append(downsample(pyramid[-1]))
+    return pyramid
+
+
+def match_template(image, template):
+    """
+    Mapa de correlación normalizada (NCC) en las posiciones válidas
+
+    Returns:
+        ndarray (H - h + 1, W - w + 1) con valores en [-1, 1]; la posición
+        (y, x) corresponde a la esquina superior izquierda de la plantilla
+    """
+    H, W = image.shape
+    h, w = template.shape
+    if h > H or w > W:
+        return np.zeros((0, 0), dtype=np.float64)
+
+    image = image.astype(np.float64)
+    t = template.astype(np.float64)
+    t = t - t.mean()
+    t_norm = np.sqrt((t * t).sum())
+    n = h * w
+
+    # Correlación cruzada por FFT (la zona válida no sufre el wrap circular)
+    spectrum = np.fft.rfft2(image) * np.fft.rfft2(t[::-1, ::-1], s=(H, W))
+    corr = np.fft.irfft2(spectrum, s=(H, W))[h - 1:, w - 1:]
+
+    # Suma y suma de cuadrados por ventana con imágenes integrales
+    def window_sums(values):
+        integral = np.zeros((H + 1, W + 1))
+        integral[1:, 1:] = values.cumsum(0).cumsum(1)
+        return integral[h:, w:] - integral[:-h, w:] - integral[h:, :-w] + integral[:-h, :-w]
+
+    sums = window_sums(image)
+    variance = window_sums(image * image) - sums * sums / n
+
+    denom = np.sqrt(np.maximum(variance, 0.0)) * t_norm
+    scores = np.zeros_like(corr)
+    valid = denom > 1e-6 * max(t_norm, 1.0)
+    scores[valid] = corr[valid] / denom[valid]
+    return np.clip(scores, -1.0, 1.0)
+
+
+@dataclass
+class Match:
+    """Resultado de localizar una plantilla (coordenadas en píxeles del frame)"""
+    name: str
+    x: int
+    y: int
+    score: float
+    width: int
+    height: int
+
+    @property
+    def center(self):
+        return self.x + self.width // 2, self.y + self.height // 2
+
+
+class Template:
+    """Plantilla registrada con su pirámide precalculada"""
+
+    def __init__(self, name: str, image, threshold: float = DEFAULT_THRESHOLD):
+        self.name = name
+        self.image = to_gray(image)
+        self.threshold = threshold
+        self.levels = 0
+        while (self.levels < MAX_LEVELS
+               and min(self.image.shape) >> (self.levels + 1) >= MIN_TEMPLATE_SIZE):
+            self.levels += 1
+        self.pyramid = build_pyramid(self.image, self.levels)
+
+
+class TemplateMatcher:
+    """
+    Registro de plantillas de UI y búsqueda grueso→fino
+
+    La pirámide del último frame se cachea: buscar varias plantillas en el
+    mismo frame (mismo objeto o mismo frame_key) la calcula una sola vez.
+    """
+
+    def __init__(self):
+        require_numpy()
+        self.templates: Dict[str, Template] = {}
+        self._frame = None
+        self._frame_key = None
+        self._pyramid: list = []
+        self.stats = {'pyramids': 0, 'pyramid_hits': 0, 'searches': 0}
+
+    def register(self, name: str, image, threshold: float = DEFAULT_THRESHOLD) -> Template:
+        template = Template(name, image, threshold)
+        self.templates[name] = template
+        return template
+
+    def load_directory(self, directory: str, threshold: float = DEFAULT_THRESHOLD) -> int:
+        """Registra cada imagen del directorio con su nombre de archivo (sin extensión)"""
+        count = 0
+        for filename in sorted(os.listdir(directory)):
+            name, ext = os.path.splitext(filename)
+            if ext.lower() in IMAGE_EXTENSIONS:
+                self.register(name, load_image(os.path.join(directory, filename)), threshold)
+                count += 1
+        return count
+
+    def pyramid(self, frame, levels: int, frame_key=None) -> list:
+        """Pirámide del frame (cacheada por frame_key o por identidad)"""
+        same = (self._frame_key == frame_key) if frame_key is not None else (self._frame is frame)
+        if same and len(self._pyramid) > levels:
+            self.stats['pyramid_hits'] += 1
+            return self._pyramid
+
+        if same and self._pyramid:
+            # Ya hay niveles: solo añadir los que faltan
+            while len(self._pyramid) <= levels:
+                self._pyramid.append(downsample(self._pyramid[-1]))
+            return self._pyramid
+
+        self._frame = frame
+        self._frame_key = frame_key
+        self._pyramid = build_pyramid(to_gray(frame), levels)
+        self.stats['pyramids'] += 1
+        return self._pyramid
+
+    def locate(self, name: str, frame, frame_key=None) -> Optional[Match]:
+        """
+        Busca una plantilla en el frame
+
+        Returns:
+            Match con la mejor posición (aunque no supere el umbral), o None si
+            la plantilla no cabe en el frame
+        """
+        template = self.templates[name]
+        self.stats['searches'] += 1
+        pyramid = self.pyramid(frame, template.levels, frame_key)
+
+        # Nivel grueso: reducir hasta que la plantilla siga siendo útil
+        level = template.levels
+        while level > 0 and any(t > f for t, f in zip(template.pyramid[level].shape, pyramid[level].shape)):
+            level -= 1
+
+        scores = match_template(pyramid[level], template.pyramid[level])
+        if scores.size == 0:
+            return None
+
+        # Candidatos: los mejores máximos del nivel grueso, separados entre sí
+        candidates = []
+        flat = scores.ravel()
+        order = np.argsort(flat)[::-1]
+        th, tw = template.pyramid[level].shape
+        for index in order[:256]:
+            cy, cx = divmod(int(index), scores.shape[1])
+            if all(abs(cy - py) >= th // 2 or abs(cx - px) >= tw // 2 for py, px in candidates):
+                candidates.append((cy, cx))
+                if len(candidates) >= CANDIDATES:
+                    break
+
+        # Refinar en resolución completa alrededor de cada candidato
+        full = pyramid[0]
+        h, w = template.image.shape
+        radius = (1 << level) + 1
+        best = None
+        for cy, cx in candidates:
+            y0 = max(0, (cy << level) - radius)
+            x0 = max(0, (cx << level) - radius)
+            y1 = min(full.shape[0], (cy << level) + radius + h)
+            x1 = min(full.shape[1], (cx << level) + radius + w)
+            local = match_template(full[y0:y1, x0:x1], template.image)
+            if local.size == 0:
+                continue
+            ly, lx = np.unravel_index(int(np.argmax(local)), local.shape)
+            score = float(local[ly, lx])
+            if best is None or score > best.score:
+                best = Match(name, x0 + int(lx), y0 + int(ly), score, w, h)
+
+        return best
+
+
+# ===== Tap en bucle cerrado =====
+
+class TapTargeter:
+    """
+    Localiza plantillas en el espejo y hace click en su centro
+
+    Args:
+        click: Función click(x, y) -> bool en coordenadas de pantalla
+               (ej: InteractiveClicker.perform_click)
+        source: Fuente de frames (DirectoryFrameSource / VideoFrameSource)
+        matcher: TemplateMatcher con las plantillas registradas
+        screen_width, screen_height: Resolución lógica del dispositivo
+        retries: Frames nuevos que se prueban si la plantilla no aparece
+        retry_delay: Espera entre reintentos (s)
+    """
+
+    def __init__(self, click: Callable[[int, int], bool], source, matcher: TemplateMatcher,
+                 screen_width: int = 365, screen_height: int = 667,
+                 retries: int = 3, retry_delay: float = 0.25):
+        self.click = click
+        self.source = source
+        self.matcher = matcher
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.stats = {'taps': 0, 'misses': 0, 'frames': 0}
+
+    def to_screen(self, match: Match, frame_shape) -> tuple:
+        """Centro del match en coordenadas de pantalla del dispositivo"""
+        cx, cy = match.center
+        frame_h, frame_w = frame_shape[:2]
+        x = round(cx * self.screen_width / frame_w)
+        y = round(cy * self.screen_height / frame_h)
+        return min(max(x, 0), self.screen_width), min(max(y, 0), self.screen_height)
+
+    def find(self, name: str):
+        """
+        Busca la plantilla en frames nuevos hasta `retries` veces
+
+        Returns:
+            tuple: (Match, (x, y) en pantalla) o (mejor Match o None, None)
+        """
+        template = self.matcher.templates[name]
+        best = None
+
+        for attempt in range(self.retries + 1):
+            frame = self.source.read()
+            if frame is None:
+                break
+            self.stats['frames'] += 1
+
+            match = self.matcher.locate(name, frame, getattr(self.source, 'frame_id', None))
+            if match and match.score >= template.threshold:
+                return match, self.to_screen(match, frame.shape)
+            if match and (best is None or match.score > best.score):
+                best = match
+
+            if attempt < self.retries:
+                time.sleep(self.retry_delay)
+
+        return best, None
+
+    def tap(self, name: str) -> bool:
+        """Localiza la plantilla y hace click en su centro"""
+        match, point = self.find(name)
+        if point is None:
+            self.stats['misses'] += 1
+            score = f"{match.score:.2f}" if match else "-"
+            print(f"❌ '{name}' no encontrado (mejor score {score})")
+            return False
+
+        print(f"🎯 '{name}' en ({point[0]}, {point[1]}) score {match.score:.2f}")
+        if not self.click(*point):
+            return False
+        self.stats['taps'] += 1
+        return True
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    parser = argparse.ArgumentParser(description='Taps guiados por plantillas sobre el espejo de pantalla')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--frames', help='Directorio de imágenes (sustituto del espejo)')
+    source.add_argument('--video', help='Vídeo o URL del stream del espejo (requiere OpenCV)')
+    parser.add_argument('--templates', required=True, help='Directorio de plantillas (nombre = archivo)')
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--locate', metavar='NOMBRE', help='Solo localizar y mostrar coordenadas')
+    action.add_argument('--tap', metavar='NOMBRE', help='Localizar y hacer click')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='Score NCC mínimo')
+    parser.add_argument('--retries', type=int, default=3, help='Frames nuevos a probar si no aparece')
+    parser.add_argument('-w', '--width', type=int, default=365, help='Ancho de pantalla (default: 365)')
+    parser.add_argument('--height', type=int, default=667, help='Alto de pantalla (default: 667)')
+    parser.add_argument('--simulate', action='store_true', help='Dispositivo simulado (sin USB)')
+    args = parser.parse_args(argv)
+
+    try:
+        frames = DirectoryFrameSource(args.frames) if args.frames else VideoFrameSource(args.video)
+        matcher = TemplateMatcher()
+        count = matcher.load_directory(args.templates, args.threshold)
+    except (ImportError, IOError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    name = args.locate or args.tap
+    if name not in matcher.templates:
+        print(f"❌ Plantilla desconocida: {name} ({count} registradas)")
+        return 1
+
+    clicker = None
+    if args.tap:
+        from imouse_clicker import InteractiveClicker
+
+        device = None
+        if args.simulate:
+            from imouse_simulator import SimulatedDevice
+            device = SimulatedDevice()
+        clicker = InteractiveClicker(args.width, args.height, device=device)
+        if not clicker.connect_device():
+            return 1
+
+    targeter = TapTargeter(clicker.perform_click if clicker else None, frames, matcher,
+                           args.width, args.height, retries=args.retries)
+    try:
+        if args.tap:
+            ok = targeter.tap(name)
+        else:
+            match, point = targeter.find(name)
+            ok = point is not None
+            if ok:
+                print(f"🎯 '{name}': frame ({match.center[0]}, {match.center[1]}) → "
+                      f"pantalla ({point[0]}, {point[1]}), score {match.score:.3f}")
+            else:
+                print(f"❌ '{name}' no encontrado"
+                      + (f" (mejor score {match.score:.3f})" if match else ""))
+    finally:
+        frames.close()
+        if clicker and clicker.transport:
+            clicker.transport.close()
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,38 +6,285 @@ El protocolo iMouse usa 0xa1 como marcador, NO como Report ID
 
 import sys
 import json
-import time
+from typing import Callable, Optional
+
+from imouse_trace import (get_tracer, enable_tracing, STAGE_LOAD, STAGE_COMPILE,
+                          STAGE_WAIT, STAGE_CONSOLE)
+from imouse_transport import HIDTransport, CodecChanged, STALL_POLICIES
+from imouse_flow import FlowController
+from imouse_rt import RealtimeSettings
+from imouse_clock import get_clock, use_clock, VirtualClock
+from imouse_codec import CODECS, CODEC_FRAMED, FRAME_SIZE, FRAMED_MIN_FIRMWARE
+from imouse_targets import PROFILES, DEFAULT_PROFILE
+
+
+def load_capture(capture_file: str) -> list:
+    """
+    Carga un archivo JSON de captura
+
+    Raises:
+        FileNotFoundError, json.JSONDecodeError
+    """
+    with get_tracer().span('json_load', STAGE_LOAD, file=capture_file):
+        with open(capture_file, 'r') as f:
+            return json.load(f)
+
+
+def load_packets(capture_file: str, profile: str = None) -> list:
+    """
+    Carga una captura o una macro (imouse_macro); las macros se compilan
+    aquí para el perfil indicado resolviendo sus objetivos con nombre.
+    'store:NOMBRE' (o hash) se carga del almacén de macros (imouse_store)
+
+    Raises:
+        FileNotFoundError, json.JSONDecodeError, ValueError (macro inválida)
+    """
+    from imouse_store import STORE_PREFIX
+    if capture_file.startswith(STORE_PREFIX):
+        from imouse_store import get_macro_store
+        with get_tracer().span('store_load', STAGE_LOAD, ref=capture_file):
+            try:
+                return get_macro_store().load(capture_file[len(STORE_PREFIX):])
+            except KeyError as e:
+                raise FileNotFoundError(e.args[0])
+
+    data = load_capture(capture_file)
+
+    from imouse_macro import is_macro, compile_macro
+    if is_macro(data):
+        return compile_macro(data, profile or DEFAULT_PROFILE)
+    return data
+
+
+def filter_out_packets(packets: list) -> list:
+    """Filtra paquetes OUT con datos o bytes"""
+    with get_tracer().span('filter_out', STAGE_COMPILE, packets=len(packets)):
+        return [p for p in packets if p.get('direction') == 'out' and (p.get('data') or p.get('bytes'))]
+
+
+def prepare_reports(out_packets: list, report_size: int, speed: float = 1.0, codec=None) -> list:
+    """
+    Convierte los paquetes OUT en reportes listos para enviar
+
+    Con `codec` (ver imouse_codec) el flujo entero se codifica aquí, de una
+    vez: las tramas y sus checksums quedan precalculados antes del replay.
+
+    Returns:
+        list: [(indice, tiempo_objetivo, data_list, descripcion), ...]
+              tiempo_objetivo es relativo al primer paquete y ya escalado por speed
+    """
+    if not out_packets:
+        return []
 
-try:
-    import pywinusb.hid as hid
-except ImportError:
-    print("❌ Error: pywinusb no está instalado")
-    print("   pip install pywinusb")
-    sys.exit(1)
+    first_timestamp = out_packets[0]['timestamp']
+    reports = []
+
+    with get_tracer().span('prepare_reports', STAGE_COMPILE, packets=len(out_packets)):
+        for i, packet in enumerate(out_packets, 1):
+            # Obtener datos (priorizar 'bytes' sobre 'data')
+            data_bytes = None
+
+            if 'bytes' in packet and packet['bytes']:
+                data_bytes = packet['bytes']
+            elif packet.get('data'):
+                try:
+                    data_bytes = list(bytes.fromhex(packet['data']))
+                except ValueError:
+                    print(f"  [{i:3d}] ⚠️  Datos hex inválidos")
+                    continue
+
+            if not data_bytes:
+                continue
 
+            # PROTOCOLO iMouse:
+            # El formato correcto es [0x00][0xa1][mod][res][key][0][0][0][0]
+            # donde 0x00 es el Report ID del dispositivo
+
+            data_list = data_bytes[:]
+
+            # Ajustar al tamaño del reporte
+            while len(data_list) < report_size:
+                data_list.append(0x00)
+
+            if len(data_list) > report_size:
+                data_list = data_list[:report_size]
+
+            # El JSON ya debería tener el formato correcto con 0x00 al inicio
+            # Si no lo tiene, verificamos y corregimos
+            if data_list[0] != 0x00:
+                # El paquete no tiene Report ID, añadirlo
+                data_list = [0x00] + data_list[:(report_size-1)]
+
+            target_time = (packet['timestamp'] - first_timestamp) / speed
+            reports.append((i, target_time, data_list, packet.get('description', '')))
+
+        if codec is not None:
+            encoded = codec.encode_batch(report[2] for report in reports)
+            reports = [(i, target_time, data_list, desc)
+                       for (i, target_time, _, desc), data_list in zip(reports, encoded)]
+
+    return reports
+
+
+def play_reports(transport: HIDTransport, reports: list, start_at: int = 1, verbose: bool = True,
+                 follow_timeline: bool = True, encoded: bool = False,
+                 prepare: Optional[Callable[[], list]] = None):
+    """
+    Envía los reportes preparados respetando su tiempo objetivo
+
+    Si el transporte pierde el dispositivo y se reconecta, la línea de tiempo
+    se desplaza por la duración del corte y el trabajo continúa desde el
+    reporte que falló. Si no se puede reconectar, el replay se detiene. Un
+    reporte dado por descartado tras un bloqueo (on_stall=skip) que acaba
+    llegando tarde (stats['late']) se cuenta como enviado.
+
+    Args:
+        transport: HIDTransport abierto
+        reports: Salida de prepare_reports()
+        start_at: Índice (1-based) del primer paquete a enviar, para reanudar
+        follow_timeline: Esperar a los tiempos de la captura; con False cada
+                         reporte sale en cuanto el transporte lo acepta. Con
+                         un FlowController y True cada reporte sale en
+                         max(tiempo objetivo, hueco libre en la ventana)
+        encoded: Los reportes ya están codificados con el codec del
+                 transporte (prepare_reports con codec): send_encoded()
+        prepare: Con encoded, vuelve a preparar los reportes con el codec
+                 actual si una reconexión lo renegocia (CodecChanged); sin
+                 ella el replay se detiene en ese reporte
+
+    Returns:
+        tuple: (enviados, errores, tiempo_total, ultimo_indice_confirmado)
+
+    Las esperas y el tiempo total usan get_clock() (ver imouse_clock): con
+    un VirtualClock no se espera de verdad.
+    """
+    tracer = get_tracer()
+    clock = get_clock()
+    reports = [r for r in reports if r[0] >= start_at]
+    if not reports:
+        return 0, 0, 0.0, start_at - 1
+
+    start_time = clock.now() - reports[0][1]
+    sent = 0
+    errors = 0
+    last_acked = start_at - 1
+    pending = None          # Reporte descartado cuya escritura colgada aún puede llegar
+    generation = transport.codec_generation
+    send = (lambda data: transport.send_encoded(data, generation)) if encoded else transport.send
+
+    def settle_pending(late):
+        nonlocal sent, errors, last_acked, pending
+        if pending is not None and transport.stats['late'] > late:
+            sent += 1
+            errors -= 1
+            last_acked = max(last_acked, pending)
+        if not transport.write_pending:
+            pending = None
 
-def replay_imouse(vendor_id: int, product_id: int, capture_file: str, speed: float = 1.0):
-    """Reenvía datos al dispositivo iMouse"""
+    position = 0
+    while position < len(reports):
+        i, target_time, data_list, desc = reports[position]
+        position += 1
+
+        # Timing
+        sleep_time = target_time - (clock.now() - start_time) if follow_timeline else 0.0
+
+        if sleep_time > 0:
+            # Vaciar lo acumulado (ruta de red con batch) antes de esperar
+            transport.flush()
+            with tracer.span('sleep', STAGE_WAIT, target=target_time):
+                clock.sleep(sleep_time)
+
+        # Enviar
+        downtime = transport.stats['downtime']
+        late = transport.stats['late']
+        try:
+            ok = send(data_list)
+        except CodecChanged as e:
+            start_time += transport.stats['downtime'] - downtime
+            if prepare is None:
+                print(f"  [{i:3d}] ❌ {e}. Reanudar con: --start-at {i}")
+                break
+            print(f"  [{i:3d}] 🔁 {e}; recodificando con {transport.codec.name}")
+            generation = transport.codec_generation
+            reports = [r for r in prepare() if r[0] >= i]
+            position = 0
+            continue
+        settle_pending(late)
+
+        # Desplazar la línea de tiempo si hubo reconexión
+        start_time += transport.stats['downtime'] - downtime
+
+        if not ok:
+            errors += 1
+            if transport.write_pending:
+                pending = i
+            if not transport.connected:
+                print(f"  [{i:3d}] ✗ Dispositivo perdido. Reanudar con: --start-at {i}")
+                break
+            if verbose and errors <= 5:
+                print(f"  [{i:3d}] ✗ Error enviando reporte")
+            continue
+
+        sent += 1
+        last_acked = i
+
+        # Mostrar progreso
+        if verbose and (sent <= 10 or sent % 10 == 0):
+            with tracer.span('progress', STAGE_CONSOLE):
+                data_str = ' '.join(f'{b:02x}' for b in data_list[:8])
+                if desc:
+                    print(f"  [{sent:3d}] ✓ {data_str}  # {desc}")
+                else:
+                    print(f"  [{sent:3d}] ✓ {data_str}")
+
+    late = transport.stats['late']
+    transport.flush()
+    settle_pending(late)
+    return sent, errors, clock.now() - start_time, last_acked
+
+
+def replay_imouse(vendor_id: int, product_id: int, capture_file: str, speed: float = 1.0,
+                  device=None, start_at: int = 1, codec=None, firmware=None, profile=None,
+                  ack: bool = False, window: int = 1, write_timeout=None, on_stall=None,
+                  realtime=None):
+    """
+    Reenvía datos al dispositivo iMouse
+
+    Args:
+        device: Dispositivo ya creado (ej: SimulatedDevice). Si es None se
+                busca el dispositivo USB por VID/PID con pywinusb
+        start_at: Índice (1-based) del primer paquete a enviar (reanudar)
+        codec, firmware: Codec del transporte (auto | hid | framed) y revisión
+                         de firmware forzada (ver imouse_codec)
+        profile: Perfil de dispositivo para compilar macros (ver imouse_targets)
+        ack, window: Control de flujo por acks (ver imouse_flow)
+        write_timeout, on_stall: Plazo de escritura (s) y política ante bloqueos
+                                 (ver imouse_transport)
+        realtime: Ajustes de tiempo real del hilo escritor y del bucle de
+                  replay (ver imouse_rt; default IMOUSE_REALTIME)
+    """
 
     print("\n🔄 REPLAY IMOUSE")
     print("=" * 80)
 
     # Cargar datos capturados
     try:
-        with open(capture_file, 'r') as f:
-            packets = json.load(f)
+        packets = load_packets(capture_file, profile)
     except FileNotFoundError:
         print(f"❌ Archivo no encontrado: {capture_file}")
         return False
     except json.JSONDecodeError:
         print(f"❌ Error al leer JSON: {capture_file}")
         return False
+    except ValueError as e:
+        print(f"❌ Macro inválida: {e}")
+        return False
 
     print(f"📂 Archivo: {capture_file}")
     print(f"📦 Total paquetes: {len(packets)}")
 
-    # Filtrar paquetes OUT con datos o bytes
-    out_packets = [p for p in packets if p.get('direction') == 'out' and (p.get('data') or p.get('bytes'))]
+    out_packets = filter_out_packets(packets)
 
     if not out_packets:
         print("\n❌ No hay paquetes OUT para enviar")
@@ -49,124 +296,74 @@ def replay_imouse(vendor_id: int, product_id: int, capture_file: str, speed: flo
 
     # Buscar dispositivo
     print("🔌 Buscando dispositivo...")
-    devices = hid.HidDeviceFilter(vendor_id=vendor_id, product_id=product_id).get_devices()
-    
-    if not devices:
-        print(f"❌ Dispositivo no encontrado: 0x{vendor_id:04x}:0x{product_id:04x}")
-        return False
+    transport = HIDTransport(vendor_id, product_id, device=device, codec=codec, firmware=firmware,
+                             write_timeout=write_timeout, on_stall=on_stall, realtime=realtime)
 
-    device = devices[0]
-    device.open()
+    if not transport.open():
+        return False
+    # Sin plazo de escritura el transporte ya los aplicó en este hilo al abrir
+    if transport.realtime and transport.write_timeout is not None:
+        transport.realtime.apply('replay')
 
-    print(f"✅ Conectado a: {device.product_name}")
+    print(f"✅ Conectado a: {transport.product_name}")
     print(f"   VID: 0x{vendor_id:04x}")
     print(f"   PID: 0x{product_id:04x}")
 
-    # Obtener output report
-    out_report = None
-    for report in device.find_output_reports():
-        out_report = report
-        break
-
-    if not out_report:
-        print("❌ No se encontró output report")
-        device.close()
-        return False
-
-    report_size = len(out_report.get_raw_data())
-    current_data = out_report.get_raw_data()
-    device_report_id = current_data[0]
+    report_size = transport.report_size
+    device_report_id = transport.out_report.get_raw_data()[0]
 
     print(f"   Report size: {report_size} bytes")
     print(f"   Report ID:   0x{device_report_id:02x}")
+    print(f"   Codec:       {transport.codec.name}")
+    if transport.realtime:
+        print(f"   Tiempo real: {transport.realtime.describe()}")
     print()
 
-    print("⌨️  ENVIANDO DATOS (protocolo iMouse)...")
-    print("=" * 80)
-
-    first_timestamp = out_packets[0]['timestamp']
-    start_time = time.time()
-    sent = 0
-    errors = 0
-
-    for i, packet in enumerate(out_packets, 1):
-        # Timing
-        target_time = (packet['timestamp'] - first_timestamp) / speed
-        current_time = time.time() - start_time
-        sleep_time = target_time - current_time
-
-        if sleep_time > 0:
-            time.sleep(sleep_time)
-
-        # Obtener datos (priorizar 'bytes' sobre 'data')
-        data_bytes = None
-
-        if 'bytes' in packet and packet['bytes']:
-            data_bytes = packet['bytes']
-        elif packet.get('data'):
-            try:
-                data_bytes = list(bytes.fromhex(packet['data']))
-            except ValueError:
-                print(f"  [{i:3d}] ⚠️  Datos hex inválidos")
-                continue
-
-        if not data_bytes:
-            continue
-
-        # PROTOCOLO iMouse:
-        # El formato correcto es [0x00][0xa1][mod][res][key][0][0][0][0]
-        # donde 0x00 es el Report ID del dispositivo
-
-        data_list = data_bytes[:]
-
-        # Ajustar al tamaño del reporte
-        while len(data_list) < report_size:
-            data_list.append(0x00)
-
-        if len(data_list) > report_size:
-            data_list = data_list[:report_size]
-
-        # El JSON ya debería tener el formato correcto con 0x00 al inicio
-        # Si no lo tiene, verificamos y corregimos
-        if data_list[0] != 0x00:
-            # El paquete no tiene Report ID, añadirlo
-            data_list = [0x00] + data_list[:(report_size-1)]
+    reports = prepare_reports(out_packets, report_size, speed, codec=transport.codec)
 
-        # Enviar
-        try:
-            out_report.set_raw_data(data_list)
-            out_report.send()
-            sent += 1
+    flow = None
+    if ack:
+        flow = FlowController(transport, window=window)
+        flow.attach()
 
-            # Mostrar progreso
-            if sent <= 10 or sent % 10 == 0:
-                data_str = ' '.join(f'{b:02x}' for b in data_list[:8])
-                desc = packet.get('description', '')
-                if desc:
-                    print(f"  [{sent:3d}] ✓ {data_str}  # {desc}")
-                else:
-                    print(f"  [{sent:3d}] ✓ {data_str}")
-
-        except Exception as e:
-            errors += 1
-            if errors <= 5:
-                print(f"  [{i:3d}] ✗ Error: {e}")
+    print("⌨️  ENVIANDO DATOS (protocolo iMouse)...")
+    if start_at > 1:
+        print(f"   ⏩ Reanudando desde el paquete {start_at}")
+    if flow:
+        print(f"   🔁 Control de flujo por acks (ventana {window}) sobre la línea de tiempo de la captura")
+    print("=" * 80)
 
-    elapsed = time.time() - start_time
+    # La línea de tiempo es el mínimo: los acks solo limitan los reportes en vuelo
+    sent, errors, elapsed, last_acked = play_reports(
+        flow or transport, reports, start_at, encoded=True,
+        prepare=lambda: prepare_reports(out_packets, transport.report_size, speed, codec=transport.codec))
+    if flow:
+        flow.drain()
 
-    device.close()
+    transport.close()
 
     print("\n" + "=" * 80)
-    print("✅ REPLAY COMPLETADO")
+    print("✅ REPLAY COMPLETADO" if last_acked >= len(out_packets) else "⚠️  REPLAY INCOMPLETO")
     print(f"   Paquetes enviados: {sent}/{len(out_packets)}")
     print(f"   Errores:           {errors}")
+    print(f"   Reconexiones:      {transport.stats['reconnects']}")
+    if transport.stats['stalls']:
+        print(f"   Bloqueos:          {transport.stats['stalls']} "
+              f"(sin entregar: {transport.stats['skipped']}, entregados tarde: {transport.stats['late']}, "
+              f"política: {transport.on_stall})")
+    latency = transport.write_latency()
+    print(f"   Escritura:         media {latency['mean_ms']:.3f} ms, máx {latency['max_ms']:.3f} ms")
+    if flow:
+        stats = flow.get_stats()
+        print(f"   Acks:              {stats['acked']}/{stats['sent']} "
+              f"(timeouts: {stats['timeouts']}, RTT medio: {stats['rtt_mean'] * 1000:.2f} ms)")
     print(f"   Tiempo:            {elapsed:.3f}s")
     print("=" * 80)
 
     return sent > 0
 
 
-def main():
+def main(argv=None):
     import argparse
 
     parser = argparse.ArgumentParser(
@@ -183,6 +380,21 @@ EJEMPLOS DE USO:
   Reproducir a velocidad rápida (2x):
     python replay_imouse.py samples/demo.json -s 2.0
 
+  Probar sin dispositivo USB (simulado):
+    python replay_imouse.py samples/demo.json --simulate
+
+  Con plazo de escritura de 100 ms y reconexión si el dongle se bloquea:
+    python replay_imouse.py samples/demo.json --write-timeout 100 --on-stall reconnect
+
+  Con acks del dongle (los tiempos de la captura siguen siendo el mínimo):
+    python replay_imouse.py samples/demo.json --ack --window 2
+
+  Por red (iMouseSrv o python imouse_network.py --listen 7430):
+    python replay_imouse.py samples/demo.json --network 127.0.0.1:7430
+
+  Macro con objetivos con nombre, compilada para iPad:
+    python replay_imouse.py samples/macros/abrir_telegram.json --profile ipad
+
   Con dispositivo específico:
     python replay_imouse.py samples/test.json -v 0x720a -p 0x3dab
 
@@ -205,10 +417,42 @@ ARCHIVOS DE EJEMPLO DISPONIBLES:
                         help='Product ID (default: 0x3dab)')
     parser.add_argument('-s', '--speed', type=float, default=1.0,
                         help='Velocidad de reproducción (default: 1.0)')
+    parser.add_argument('--start-at', type=int, default=1, metavar='N',
+                        help='Reanudar desde el paquete N (1-based)')
+    parser.add_argument('--simulate', action='store_true',
+                        help='Usar dispositivo simulado (sin USB)')
+    parser.add_argument('--profile', choices=sorted(PROFILES),
+                        help='Perfil de dispositivo para compilar macros (default: iphone)')
+    parser.add_argument('--codec', choices=CODECS,
+                        help='Codificación de reportes (default: IMOUSE_CODEC o auto)')
+    parser.add_argument('--firmware', type=lambda x: int(x, 0),
+                        help='Forzar revisión de firmware para negociar el codec (ej: 0x37)')
+    parser.add_argument('--network', metavar='HOST:PUERTO',
+                        help='Enviar por la ruta de red W 0xAB 0xFF 0x02 (ver imouse_network.py)')
+    parser.add_argument('--batch', type=int, default=8,
+                        help='Registros por escritura en la ruta de red (default: 8)')
+    parser.add_argument('--write-timeout', type=float, metavar='MS',
+                        help='Plazo de cada escritura en ms, 0 = sin plazo (default: IMOUSE_WRITE_TIMEOUT o 500)')
+    parser.add_argument('--on-stall', choices=STALL_POLICIES,
+                        help='Si una escritura no termina a tiempo: skip | retry | reconnect (default: skip)')
+    parser.add_argument('--realtime', metavar='AJUSTES',
+                        help='Prioridad/afinidad/mlock del envío, ej: fifo:50,cpus=1,mlock '
+                             '(default: IMOUSE_REALTIME; ver imouse_rt.py)')
+    parser.add_argument('--virtual-clock', action='store_true',
+                        help='Con --simulate: reloj virtual, sin esperas reales (ver imouse_clock.py)')
+    parser.add_argument('--ack', action='store_true',
+                        help='Limitar los reportes en vuelo a los confirmados por el dongle '
+                             '(sin adelantar los tiempos de la captura)')
+    parser.add_argument('--window', type=int, default=1,
+                        help='Reportes sin confirmar con --ack (default: 1)')
+    parser.add_argument('--trace', metavar='TRACE_JSON',
+                        help='Guardar trace Chrome/Perfetto de la ejecución')
 
     # Si no hay argumentos, mostrar ayuda
     import sys
-    if len(sys.argv) == 1:
+    if argv is None:
+        argv = sys.argv[1:]
+    if not argv:
         parser.print_help()
         print("\n⚡ INICIO RÁPIDO:")
         print("  python replay_imouse.py samples/click_300_300.json")
@@ -217,10 +461,46 @@ ARCHIVOS DE EJEMPLO DISPONIBLES:
         print("  python generate_click_json.py -x 100 -y 200 -o samples/mi_click.json")
         sys.exit(0)
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+
+    if args.trace:
+        enable_tracing(args.trace, process_name='replay_imouse')
+
+    if args.virtual_clock and not args.simulate:
+        print("❌ --virtual-clock solo tiene sentido con --simulate")
+        return 1
 
-    replay_imouse(args.vendor, args.product, args.capture_file, args.speed)
+    try:
+        realtime = RealtimeSettings.parse(args.realtime) if args.realtime is not None else None
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    device = None
+    if args.network:
+        from imouse_network import NetworkDevice, parse_address
+        try:
+            device = NetworkDevice(*parse_address(args.network), batch=args.batch)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
+    elif args.simulate:
+        from imouse_simulator import SimulatedDevice, REPORT_SIZE, DEFAULT_ACK_LATENCY
+        # Con --codec framed el simulado imita un firmware con modo W-0xAB
+        framed = args.codec == CODEC_FRAMED
+        device = SimulatedDevice(report_size=FRAME_SIZE if framed else REPORT_SIZE,
+                                 vendor_id=args.vendor, product_id=args.product,
+                                 firmware=args.firmware or (FRAMED_MIN_FIRMWARE if framed else None),
+                                 ack_latency=DEFAULT_ACK_LATENCY if args.ack else None)
+
+    with use_clock(VirtualClock() if args.virtual_clock else None):
+        ok = replay_imouse(args.vendor, args.product, args.capture_file, args.speed,
+                           device=device, start_at=args.start_at, codec=args.codec, firmware=args.firmware,
+                           profile=args.profile, ack=args.ack, window=args.window,
+                           write_timeout=args.write_timeout / 1000.0 if args.write_timeout is not None else None,
+                           on_stall=args.on_stall, realtime=realtime)
+    return 0 if ok else 1
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
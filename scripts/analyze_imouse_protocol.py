@@ -4,10 +4,11 @@ Análisis del protocolo iMouse
 Captura y analiza cómo iMouse procesa los comandos USB
 """
 
+import os
 import sys
 import time
-import threading
 import json
+import argparse
 
 try:
     import pywinusb.hid as hid
@@ -15,27 +16,31 @@ except ImportError:
     print("❌ pywinusb no instalado")
     sys.exit(1)
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from imouse_capture import CaptureRing, SpillWriter, DEFAULT_CAPACITY
+from imouse_codec import is_frame, validate_frame
+
 
 class iMouseProtocolAnalyzer:
     """Analizador del protocolo iMouse"""
 
-    def __init__(self, vendor_id=0x720a, product_id=0x3dab):
+    def __init__(self, vendor_id=0x720a, product_id=0x3dab, capacity=DEFAULT_CAPACITY):
         self.vendor_id = vendor_id
         self.product_id = product_id
         self.device = None
-        self.input_buffer = []
+        self.capture = CaptureRing(capacity=capacity)
         self.receiving = False
+        self.verbose = True
 
     def on_input_data(self, data):
         """Callback cuando el dispositivo envía datos al host"""
         if self.receiving:
-            timestamp = time.time()
-            self.input_buffer.append({
-                'timestamp': timestamp,
-                'data': data,
-                'hex': ' '.join(f'{b:02x}' for b in data)
-            })
-            print(f"  ← INPUT: {' '.join(f'{b:02x}' for b in data[:16])}")
+            self.capture.append(data)
+            if self.verbose:
+                print(f"  ← INPUT: {' '.join(f'{b:02x}' for b in data[:16])}")
+                if is_frame(data) and not validate_frame(data):
+                    print("     ⚠️  Trama W-0xAB con checksum inválido")
 
     def connect(self):
         """Conecta al dispositivo iMouse"""
@@ -81,8 +86,8 @@ class iMouseProtocolAnalyzer:
         if len(data) > report_size:
             data = data[:report_size]
 
-        # Limpiar buffer de entrada
-        self.input_buffer.clear()
+        # Marcar el inicio de las respuestas a este paquete
+        first_seq = self.capture.total
         self.receiving = True
 
         # Enviar
@@ -98,9 +103,10 @@ class iMouseProtocolAnalyzer:
             # Esperar respuesta
             time.sleep(0.1)
 
-            if self.input_buffer:
-                print(f"     ✓ Recibidas {len(self.input_buffer)} respuestas")
-                return self.input_buffer.copy()
+            records, _, _ = self.capture.read_since(first_seq)
+            if records:
+                print(f"     ✓ Recibidas {len(records)} respuestas")
+                return [{'timestamp': timestamp, 'hex': data.hex(' ')} for timestamp, data in records]
             else:
                 print(f"     ⚠️  Sin respuesta del dispositivo")
                 return []
@@ -220,11 +226,45 @@ class iMouseProtocolAnalyzer:
 
         return results
 
+    def record(self, duration, spill_path, report_every=1.0):
+        """
+        Graba input reports durante `duration` segundos (0 = hasta Ctrl+C)
+
+        Los reportes van al ring buffer y se vuelcan a `spill_path` en binario
+        (leer con imouse_capture.read_capture). Muestra la tasa en vivo.
+        """
+        print(f"\n🎙️  Grabando input reports en: {spill_path}")
+        print("   Ctrl+C para detener")
+
+        self.verbose = False
+        self.receiving = True
+        writer = SpillWriter(self.capture, spill_path).start()
+        started = time.monotonic()
+
+        try:
+            while not duration or time.monotonic() - started < duration:
+                time.sleep(report_every)
+                stats = self.capture.stats.snapshot()
+                print(f"\r   📈 {stats['reports']:>10} reportes | {stats['rate']:8.1f}/s "
+                      f"(pico {stats['peak_rate']:.1f}/s) | gap máx {stats['max_gap_ms']:.1f} ms | "
+                      f"perdidos {writer.lost}", end='', flush=True)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.receiving = False
+            writer.close()
+
+        stats = self.capture.stats.snapshot()
+        print()
+        print(f"💾 {writer.written} reportes guardados ({writer.lost} perdidos)")
+        print(f"   Tasa media: {stats['mean_rate']:.1f}/s, pico: {stats['peak_rate']:.1f}/s")
+        return stats
+
     def save_results(self, results, filename):
         """Guarda los resultados del análisis"""
 
         with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=2, ensure_ascii=False, default=str)
+            json.dump(results, f, indent=2, ensure_ascii=False)
 
         print(f"\n💾 Resultados guardados en: {filename}")
 
@@ -237,7 +277,16 @@ class iMouseProtocolAnalyzer:
 
 
 def main():
-    analyzer = iMouseProtocolAnalyzer()
+    parser = argparse.ArgumentParser(description='Analizador de protocolo iMouse')
+    parser.add_argument('--record', type=float, metavar='SEGUNDOS',
+                        help='Solo grabar input reports (0 = hasta Ctrl+C)')
+    parser.add_argument('--spill', default='imouse_input_capture.bin',
+                        help='Archivo binario de la grabación')
+    parser.add_argument('--capacity', type=int, default=DEFAULT_CAPACITY,
+                        help='Reportes en el ring buffer')
+    args = parser.parse_args()
+
+    analyzer = iMouseProtocolAnalyzer(capacity=args.capacity)
 
     print("=" * 80)
     print("🔬 ANALIZADOR DE PROTOCOLO iMouse")
@@ -250,6 +299,13 @@ def main():
     if not analyzer.connect():
         return
 
+    if args.record is not None:
+        try:
+            analyzer.record(args.record, args.spill)
+        finally:
+            analyzer.disconnect()
+        return
+
     try:
         # Analizar protocolo de teclado
         keyboard_results = analyzer.analyze_keyboard_protocol()
@@ -4,7 +4,22 @@ Parser de la tabla de lookup de caracteres de iMouse
 Extrae la estructura: [ptr_string][ptr_data][modifier][scancode]
 """
 
+import os
+import sys
 import struct
+import hashlib
+import argparse
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from imouse_keymap_bin import pack_keymap, KEYMAP_FORMAT_VERSION
+
+# Entrada de la tabla: [ptr_string][ptr_data][modifier][scancode]
+ENTRY = struct.Struct('<4I')
+
+DEFAULT_MODULE = os.path.join(ROOT_DIR, 'imouse_keymap_data.py')
+DEFAULT_BIN_DIR = os.path.join(ROOT_DIR, 'keymaps')
 
 # Dump hexadecimal de la tabla (0x1001901c - 0x10019a7c)
 HEX_DUMP = """
@@ -12,45 +27,37 @@ a8 55 01 10 b4 55 01 10 00 00 00 00 02 00 00 00 c4 55 01 10 d0 55 01 10 00 00 00
 """
 
 
-def parse_table():
+def parse_table(hex_dump=HEX_DUMP, verbose=True):
     """Parsea el dump hexadecimal de la tabla"""
 
     # Limpiar y convertir hex a bytes
-    hex_clean = HEX_DUMP.replace('\n', ' ').strip()
+    hex_clean = hex_dump.replace('\n', ' ').strip()
     hex_bytes = bytes.fromhex(hex_clean)
 
-    print("=" * 100)
-    print("🔬 PARSER DE TABLA DE LOOKUP - iMouse")
-    print("=" * 100)
-    print()
-    print(f"📊 Tamaño total: {len(hex_bytes)} bytes")
-    print(f"📦 Entradas: {len(hex_bytes) // 16}")
-    print()
-
-    entries = []
-
-    # Cada entrada son 16 bytes (4 dwords)
-    for i in range(0, len(hex_bytes), 16):
-        if i + 16 > len(hex_bytes):
-            break
-
-        chunk = hex_bytes[i:i+16]
-
-        # Parsear 4 dwords (little endian)
-        ptr_string = struct.unpack('<I', chunk[0:4])[0]
-        ptr_data = struct.unpack('<I', chunk[4:8])[0]
-        modifier = struct.unpack('<I', chunk[8:12])[0]
-        scancode = struct.unpack('<I', chunk[12:16])[0]
-
-        entry = {
-            'index': len(entries),
+    # Cada entrada son 16 bytes (4 dwords little endian); se ignora un
+    # posible resto incompleto al final
+    usable = len(hex_bytes) - len(hex_bytes) % ENTRY.size
+
+    if verbose:
+        print("=" * 100)
+        print("🔬 PARSER DE TABLA DE LOOKUP - iMouse")
+        print("=" * 100)
+        print()
+        print(f"📊 Tamaño total: {len(hex_bytes)} bytes")
+        print(f"📦 Entradas: {usable // ENTRY.size}")
+        print()
+
+    entries = [
+        {
+            'index': index,
             'ptr_string': ptr_string,
             'ptr_data': ptr_data,
             'modifier': modifier,
             'scancode': scancode,
         }
-
-        entries.append(entry)
+        for index, (ptr_string, ptr_data, modifier, scancode)
+        in enumerate(ENTRY.iter_unpack(hex_bytes[:usable]))
+    ]
 
     return entries
 
@@ -182,8 +189,166 @@ def analyze_patterns(entries):
     print()
 
 
+# ===== GENERACIÓN DE KEYMAP =====
+
+# Distribución US: scancode HID → (carácter sin Shift, carácter con Shift)
+HID_US_LAYOUT = {
+    **{0x04 + i: (chr(ord('a') + i), chr(ord('A') + i)) for i in range(26)},
+    0x1e: ('1', '!'), 0x1f: ('2', '@'), 0x20: ('3', '#'), 0x21: ('4', '$'),
+    0x22: ('5', '%'), 0x23: ('6', '^'), 0x24: ('7', '&'), 0x25: ('8', '*'),
+    0x26: ('9', '('), 0x27: ('0', ')'),
+    0x28: ('\n', None), 0x2a: ('\x08', None), 0x2b: ('\t', None), 0x2c: (' ', None),
+    0x2d: ('-', '_'), 0x2e: ('=', '+'), 0x2f: ('[', '{'), 0x30: (']', '}'),
+    0x31: ('\\', '|'), 0x33: (';', ':'), 0x34: ("'", '"'), 0x35: ('`', '~'),
+    0x36: (',', '<'), 0x37: ('.', '>'), 0x38: ('/', '?'),
+}
+
+# Teclas con nombre (sin modificador): scancode HID → nombre
+HID_KEY_NAMES = {
+    **{0x3a + i: f'<F{i + 1}>' for i in range(12)},
+    0x29: '<Esc>', 0x46: '<PrintScreen>', 0x48: '<Pause>', 0x49: '<Insert>',
+    0x4a: '<Home>', 0x4b: '<PageUp>', 0x4c: '<Delete>', 0x4d: '<End>',
+    0x4e: '<PageDown>', 0x4f: '<Right>', 0x50: '<Left>', 0x51: '<Down>', 0x52: '<Up>',
+    0x56: '<KeypadMinus>', 0x57: '<KeypadPlus>', 0x58: '<KeypadEnter>',
+    **{0x59 + i: f'<Keypad{i + 1}>' for i in range(9)},
+    0x62: '<Keypad0>', 0x63: '<KeypadDot>',
+}
+
+# Entradas solo-modificador (scancode 0x00)
+MODIFIER_KEY_NAMES = {0x01: '<Ctrl>', 0x02: '<Shift>', 0x04: '<Alt>', 0x08: '<Win>'}
+
+# Teclas verificadas en el dispositivo que no aparecen en este dump de la
+# tabla (se añaden si el firmware no las trae)
+EXTRA_KEYS = {
+    '\\': (0x31, 0x00),
+    "'": (0x34, 0x00),
+    '\n': (0x28, 0x00),
+    '<Alt>': (0x00, 0x04),
+    '<Win>': (0x00, 0x08),
+    **{f'<Keypad{i + 1}>': (0x59 + i, 0x00) for i in range(7)},
+    '<KeypadEnter>': (0x58, 0x00),
+    '<KeypadPlus>': (0x57, 0x00),
+    '<KeypadMinus>': (0x56, 0x00),
+}
+
+
+def entry_key_name(entry):
+    """Nombre de tecla para una entrada de la tabla, o None si no se reconoce"""
+    scancode, modifier = entry['scancode'], entry['modifier']
+
+    if scancode == 0x00:
+        return MODIFIER_KEY_NAMES.get(modifier)
+
+    if scancode in HID_US_LAYOUT and modifier in (0x00, 0x02):
+        return HID_US_LAYOUT[scancode][1 if modifier else 0]
+
+    if scancode in HID_KEY_NAMES and modifier == 0x00:
+        return HID_KEY_NAMES[scancode]
+
+    return None
+
+
+def build_keymap(entries):
+    """
+    Construye el keymap {tecla: (scancode, modifier)} desde la tabla
+
+    Returns:
+        tuple: (keymap, nombres_desde_tabla, entradas_no_reconocidas)
+    """
+    keymap = {}
+    unnamed = []
+
+    for entry in entries:
+        name = entry_key_name(entry)
+        if name is None:
+            unnamed.append(entry)
+        elif name not in keymap:
+            keymap[name] = (entry['scancode'], entry['modifier'])
+
+    from_table = set(keymap)
+    for name, value in EXTRA_KEYS.items():
+        keymap.setdefault(name, value)
+
+    return keymap, from_table, unnamed
+
+
+def render_keymap_module(keymap, firmware, source_sha256):
+    """Genera el código del módulo Python con el keymap"""
+    lines = [
+        '#!/usr/bin/env python3',
+        '"""',
+        'Keymap iMouse GENERADO por scripts/parse_lookup_table.py --generate',
+        'No editar a mano: regenerar desde la tabla de lookup del firmware.',
+        '"""',
+        '',
+        f'KEYMAP_FORMAT_VERSION = {KEYMAP_FORMAT_VERSION}',
+        f'FIRMWARE = {firmware!r}',
+        f'SOURCE_SHA256 = {source_sha256!r}',
+        '',
+        '# Formato: carácter/tecla → (scancode, modifier)',
+        'IMOUSE_KEYMAP = {',
+    ]
+    for name, (scancode, modifier) in keymap.items():
+        lines.append(f'    {name!r}: (0x{scancode:02x}, 0x{modifier:02x}),')
+    lines.append('}')
+    return '\n'.join(lines) + '\n'
+
+
+def generate(hex_dump=HEX_DUMP, firmware='default', module_path=DEFAULT_MODULE, bin_path=None):
+    """Genera el keymap binario y el módulo Python desde un dump de la tabla"""
+    entries = parse_table(hex_dump, verbose=False)
+    keymap, from_table, unnamed = build_keymap(entries)
+    source_sha256 = hashlib.sha256(hex_dump.encode('ascii')).hexdigest()
+
+    if bin_path is None:
+        bin_path = os.path.join(DEFAULT_BIN_DIR, f'imouse_keymap_{firmware}.bin')
+
+    os.makedirs(os.path.dirname(bin_path), exist_ok=True)
+    with open(bin_path, 'wb') as f:
+        f.write(pack_keymap(keymap, firmware))
+
+    if module_path:
+        with open(module_path, 'w', encoding='utf-8') as f:
+            f.write(render_keymap_module(keymap, firmware, source_sha256))
+
+    print("=" * 100)
+    print(f"🛠️  KEYMAP GENERADO (firmware: {firmware})")
+    print("=" * 100)
+    print(f"  Entradas en la tabla:      {len(entries)}")
+    print(f"  Teclas desde la tabla:     {len(from_table)}")
+    print(f"  Teclas complementarias:    {len(keymap) - len(from_table)}")
+    print(f"  Entradas no reconocidas:   {len(unnamed)}")
+    for entry in unnamed:
+        print(f"     #{entry['index']:<3} modifier 0x{entry['modifier']:02x} scancode 0x{entry['scancode']:02x}")
+    print(f"  Binario: {bin_path}")
+    if module_path:
+        print(f"  Módulo:  {module_path}")
+    print()
+
+    return keymap
+
+
 def main():
-    entries = parse_table()
+    parser = argparse.ArgumentParser(description='Parser de la tabla de lookup de iMouse')
+    parser.add_argument('--generate', action='store_true',
+                        help='Generar keymap binario + módulo Python en lugar del análisis')
+    parser.add_argument('--hex-file', help='Dump hexadecimal de otra versión de firmware')
+    parser.add_argument('--firmware', default='default', help='Nombre de la versión de firmware')
+    parser.add_argument('--bin', help='Ruta del keymap binario (default: keymaps/imouse_keymap_<firmware>.bin)')
+    parser.add_argument('--module', default=DEFAULT_MODULE,
+                        help='Ruta del módulo Python generado ("" para no generarlo)')
+    args = parser.parse_args()
+
+    hex_dump = HEX_DUMP
+    if args.hex_file:
+        with open(args.hex_file, 'r', encoding='utf-8') as f:
+            hex_dump = f.read()
+
+    if args.generate:
+        generate(hex_dump, args.firmware, args.module or None, args.bin)
+        return
+
+    entries = parse_table(hex_dump)
     print_entries(entries)
     analyze_patterns(entries)
 